@@ -1,15 +1,22 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import bindparam, case, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from collections import defaultdict
+from typing import Dict, List
 from models import (
     Base, engine, SessionLocal, 
     Bot, BotCreate, BotUpdate, BotResponse, bot_to_pydantic,
     LocalOrder, LocalOrderCreate, LocalOrderResponse, OrderStatusUpdate,
     GlobalExecution, GlobalExecutionCreate, BotStatsResponse,
-    BotSession, BotSessionResponse, BotSessionDetailResponse
+    BotSession, BotSessionResponse, BotSessionDetailResponse,
+    LedgerBatchRequest, LedgerBatchResponse,
+    ExecutionImportRequest, ExecutionImportResponse, ExecutionCursorResponse,
+    BotStatusTransition, BotTransitionRequest, BotTransitionResponse, BotStatusTransitionResponse
 )
-from datetime import datetime
+from pydantic import ValidationError
+from datetime import datetime, timezone
 import json
 import uuid
 Base.metadata.create_all(bind=engine)
@@ -24,6 +31,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 봇 ID -> 활성 세션 ID 캐시 (start/stop 시 갱신). 주문 생성 시 세션 조회를 생략합니다.
+active_sessions: Dict[str, str] = {}
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -79,7 +89,12 @@ def update_bot(bot_id: str, bot_in: BotUpdate, db: Session = Depends(get_db)):
         "global_settings": bot_in.global_settings,
         "pipeline": bot_in.pipeline
     }
+    previous_config_json = db_bot.config_json
     db_bot.set_config(config_dict)
+    if db_bot.config_json != previous_config_json:
+        # 설정 리비전 증가 (SQL 식으로 증가시켜 동시 수정에도 누락 없음)
+        # ExecutionService는 이 값만 비교하여 실행 중인 봇의 설정 변경을 감지합니다.
+        db_bot.config_version = Bot.config_version + 1
 
     db.commit()
     db.refresh(db_bot)
@@ -89,10 +104,54 @@ def update_bot(bot_id: str, bot_in: BotUpdate, db: Session = Depends(get_db)):
     db.commit()
     return {"ok": True}
 
+@app.post("/bots/{bot_id}/transition", response_model=BotTransitionResponse)
+def transition_bot_status(bot_id: str, req: BotTransitionRequest, db: Session = Depends(get_db)):
+    """
+    봇 상태를 조건부로 전이합니다 (Compare-And-Set).
+    현재 상태가 expected_status일 때만 단일 UPDATE 문으로 변경하므로, 설정(config_json)을 다시 쓰지 않고
+    동시에 상태를 바꾸려는 다른 쓰기와 경합해도 한쪽만 성공합니다.
+    """
+    values = {Bot.status: req.new_status, Bot.updated_at: datetime.utcnow()}
+    if req.message is not None:
+        values[Bot.status_message] = req.message
+
+    query = db.query(Bot).filter(Bot.id == bot_id)
+    if req.expected_status is not None:
+        query = query.filter(Bot.status == req.expected_status)
+
+    if query.update(values, synchronize_session=False):
+        db.add(BotStatusTransition(
+            bot_id=bot_id,
+            from_status=req.expected_status,
+            to_status=req.new_status,
+            message=req.message,
+        ))
+        db.commit()
+        return BotTransitionResponse(ok=True, bot_id=bot_id, status=req.new_status)
+
+    db.rollback()
+    current = db.query(Bot.status).filter(Bot.id == bot_id).scalar()
+    if current is None:
+        raise HTTPException(status_code=404, detail="Bot not found")
+    print(f"[BotService] Transition rejected for bot {bot_id}: expected {req.expected_status}, current {current}")
+    return BotTransitionResponse(ok=False, bot_id=bot_id, status=current)
+
+@app.get("/bots/{bot_id}/transitions", response_model=List[BotStatusTransitionResponse])
+def get_bot_transitions(bot_id: str, limit: int = 100, db: Session = Depends(get_db)):
+    """봇 상태 전이 이력 (최신순)."""
+    rows = db.query(BotStatusTransition).filter(BotStatusTransition.bot_id == bot_id) \
+        .order_by(BotStatusTransition.id.desc()).limit(limit).all()
+    return [BotStatusTransitionResponse.from_orm(r) for r in rows]
+
 # --- Session APIs ---
 
 @app.post("/bots/{bot_id}/start", response_model=BotSessionResponse)
-def start_bot_session(bot_id: str, db: Session = Depends(get_db)):
+def start_bot_session(bot_id: str, status: str = "RUNNING", resume: bool = False, db: Session = Depends(get_db)):
+    """
+    새 세션을 시작하고 봇 상태를 status(기본 RUNNING)로 변경합니다.
+    ExecutionService 러너는 status=BOOTING으로 호출하여 받은 세션 ID를 원장 기록에 사용합니다.
+    resume=true이면 활성 세션이 있을 때 닫지 않고 그대로 반환합니다 (서비스 재시작 후 재개).
+    """
     db_bot = db.query(Bot).filter(Bot.id == bot_id).first()
     if not db_bot:
         raise HTTPException(status_code=404, detail="Bot not found")
@@ -102,6 +161,14 @@ def start_bot_session(bot_id: str, db: Session = Depends(get_db)):
         BotSession.bot_id == bot_id, 
         BotSession.status == "ACTIVE"
     ).first()
+
+    if active_session and resume:
+        db_bot.status = status
+        db.add(BotStatusTransition(bot_id=bot_id, to_status=status, message="session resumed"))
+        db.commit()
+        db.refresh(active_session)
+        active_sessions[bot_id] = active_session.id
+        return active_session
     
     if active_session:
         print(f"[Session] Closing stale active session {active_session.id} for bot {bot_id}")
@@ -117,11 +184,13 @@ def start_bot_session(bot_id: str, db: Session = Depends(get_db)):
     db.add(new_session)
     
     # 3. Update Bot Status
-    db_bot.status = "RUNNING"
+    db_bot.status = status
+    db.add(BotStatusTransition(bot_id=bot_id, to_status=status, message="session started"))
     
     db.commit()
     db.refresh(new_session)
     db.refresh(db_bot)
+    active_sessions[bot_id] = new_session.id
     
     return new_session
 
@@ -149,8 +218,10 @@ def stop_bot_session(bot_id: str, db: Session = Depends(get_db)):
 
     # 2. Update Bot Status
     db_bot.status = "STOPPED"
+    db.add(BotStatusTransition(bot_id=bot_id, to_status="STOPPED", message="session ended"))
     
     db.commit()
+    active_sessions.pop(bot_id, None)
     if active_session:
         db.refresh(active_session)
         return active_session
@@ -180,42 +251,81 @@ def get_session_detail(session_id: str, db: Session = Depends(get_db)):
 
 # --- Ledger APIs ---
 
+def resolve_active_session_id(db: Session, bot_id: str) -> str:
+    """
+    봇의 활성 세션 ID. 캐시에 없을 때만 DB를 조회하며, 세션이 없으면 긴급 세션을 생성합니다.
+    """
+    session_id = active_sessions.get(bot_id)
+    if session_id:
+        return session_id
+
+    active_session = db.query(BotSession).filter(
+        BotSession.bot_id == bot_id,
+        BotSession.status == "ACTIVE"
+    ).order_by(BotSession.start_time.desc()).first()
+
+    if active_session is None:
+        print(f"[WARN] No active session found for bot {bot_id}. Creating emergency session.")
+        active_session = BotSession(bot_id=bot_id, status="ACTIVE", start_time=datetime.utcnow())
+        db.add(active_session)
+        db.commit() # Need ID
+        db.refresh(active_session)
+
+    active_sessions[bot_id] = active_session.id
+    return active_session.id
+
 @app.post("/orders", response_model=LocalOrderResponse)
 def create_local_order(order_in: LocalOrderCreate, db: Session = Depends(get_db)):
     print(f"[BotService] Received Local Order: {order_in.symbol} {order_in.side} ({order_in.reason})")
-    
-    # Session Linking Logic
-    session_id = order_in.session_id
-    if not session_id:
-        # Auto-detect active session
-        active_session = db.query(BotSession).filter(
-            BotSession.bot_id == order_in.bot_id,
-            BotSession.status == "ACTIVE"
-        ).order_by(BotSession.start_time.desc()).first()
-        
-        if active_session:
-            session_id = active_session.id
-        else:
-            print(f"[WARN] No active session found for bot {order_in.bot_id}. Creating emergency session.")
-            emerg_session = BotSession(bot_id=order_in.bot_id, status="ACTIVE", start_time=datetime.utcnow())
-            db.add(emerg_session)
-            db.commit() # Need ID
-            db.refresh(emerg_session)
-            session_id = emerg_session.id
+
+    # Session Linking: ExecutionService가 세션 ID를 전달하면 조회 없이 사용 (INSERT 1회)
+    session_id = order_in.session_id or resolve_active_session_id(db, order_in.bot_id)
 
     db_order = LocalOrder(
+        id=order_in.id or str(uuid.uuid4()),
         bot_id=order_in.bot_id,
         session_id=session_id,
         symbol=order_in.symbol,
         side=order_in.side,
         quantity=order_in.quantity,
         reason=order_in.reason,
-        timestamp=order_in.timestamp
+        timestamp=order_in.timestamp or datetime.utcnow(),
+        status="PENDING"
+    )
+    # 커밋 후 다시 읽지 않도록 응답을 미리 구성합니다 (새 주문은 체결이 없음).
+    response = LocalOrderResponse(
+        id=db_order.id, bot_id=db_order.bot_id, session_id=session_id,
+        symbol=db_order.symbol, side=db_order.side, quantity=db_order.quantity,
+        timestamp=db_order.timestamp, status=db_order.status, reason=db_order.reason,
     )
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-    return LocalOrderResponse.from_orm(db_order)
+    try:
+        db.commit()
+    except IntegrityError:
+        # 멱등성: 실행 서비스가 발급한 ID가 이미 있으면 (아웃박스 재전달 등) 기존 주문을 그대로 반환
+        db.rollback()
+        existing = db.query(LocalOrder).filter(LocalOrder.id == order_in.id).first() if order_in.id else None
+        if existing is None:
+            raise
+        print(f"[BotService] Local Order {order_in.id} already exists. Skipping.")
+        return LocalOrderResponse.from_orm(existing)
+    return response
+
+@app.get("/orders", response_model=List[LocalOrderResponse])
+def read_local_orders(status: str = None, bot_id: str = None, limit: int = 500, db: Session = Depends(get_db)):
+    """
+    로컬 주문 목록 조회. status는 콤마(,)로 여러 개 지정할 수 있습니다 (예: PENDING,SENT).
+    오래된 주문부터 반환합니다 (대사 워커용).
+    """
+    query = db.query(LocalOrder)
+    if status:
+        query = query.filter(LocalOrder.status.in_([s.strip() for s in status.split(",") if s.strip()]))
+    if bot_id:
+        query = query.filter(LocalOrder.bot_id == bot_id)
+    orders = query.order_by(LocalOrder.timestamp.asc()).limit(limit).all()
+    return [LocalOrderResponse.from_orm(o) for o in orders]
+
+TERMINAL_ORDER_STATUSES = ("FILLED", "FAILED", "CANCELED", "REJECTED")
 
 @app.put("/orders/{order_id}/status", response_model=LocalOrderResponse)
 def update_order_status(order_id: str, status_update: OrderStatusUpdate, db: Session = Depends(get_db)):
@@ -224,7 +334,13 @@ def update_order_status(order_id: str, status_update: OrderStatusUpdate, db: Ses
     if not db_order:
         raise HTTPException(status_code=404, detail="Local Order not found")
     
-    db_order.status = status_update.status
+    if db_order.status in TERMINAL_ORDER_STATUSES and status_update.status != db_order.status:
+        # 멱등성: 확정된 주문은 뒤늦게 재전달된 상태 변경(예: 아웃박스의 SENT)으로 되돌리지 않음
+        print(f"[BotService] Order {order_id} already {db_order.status}. Ignoring {status_update.status}.")
+    else:
+        db_order.status = status_update.status
+    if status_update.exchange_order_id:
+        db_order.exchange_order_id = status_update.exchange_order_id
     db.commit()
     db.refresh(db_order)
     return LocalOrderResponse.from_orm(db_order)
@@ -287,6 +403,12 @@ def record_execution(exec_in: GlobalExecutionCreate, db: Session = Depends(get_d
     db_order = db.query(LocalOrder).filter(LocalOrder.id == exec_in.local_order_id).first()
     if not db_order:
         raise HTTPException(status_code=404, detail="Local Order not found")
+
+    # 멱등성: 같은 거래소 Trade ID가 이미 기록되어 있으면 (대사 워커의 재시도 등) 그대로 반환
+    existing = db.query(GlobalExecution).filter(GlobalExecution.id == exec_in.exchange_trade_id).first()
+    if existing:
+        print(f"[BotService] Execution {exec_in.exchange_trade_id} already recorded. Skipping.")
+        return {"ok": True, "realized_pnl": existing.realized_pnl, "duplicate": True}
     
     # Create Execution Entity with FULL fields
     db_exec = GlobalExecution(
@@ -361,6 +483,217 @@ def record_execution(exec_in: GlobalExecutionCreate, db: Session = Depends(get_d
     
     return {"ok": True, "realized_pnl": db_exec.realized_pnl}
 
+IN_CLAUSE_CHUNK = 500 # SQLite 바인드 변수 한도 이내로 IN 조회를 나눕니다.
+
+def _chunks(values: List, size: int = IN_CLAUSE_CHUNK):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+@app.get("/executions/cursor", response_model=ExecutionCursorResponse)
+def get_execution_cursor(symbol: str, bot_ids: str, db: Session = Depends(get_db)):
+    """
+    봇들(콤마 구분, 같은 거래소 키)의 심볼 기준 마지막 체결 시각과 가장 오래된 미해결 주문 시각.
+    ExecutionService 부팅 대사가 거래소 체결을 어디서부터 가져올지 정할 때 사용합니다.
+    """
+    ids = [b.strip() for b in bot_ids.split(",") if b.strip()]
+    last_execution_at = db.query(func.max(GlobalExecution.timestamp)).join(LocalOrder).filter(
+        LocalOrder.bot_id.in_(ids), GlobalExecution.symbol == symbol
+    ).scalar()
+    oldest_unresolved_at = db.query(func.min(LocalOrder.timestamp)).filter(
+        LocalOrder.bot_id.in_(ids), LocalOrder.symbol == symbol, LocalOrder.status.in_(("PENDING", "SENT"))
+    ).scalar()
+    return ExecutionCursorResponse(last_execution_at=last_execution_at, oldest_unresolved_at=oldest_unresolved_at)
+
+def _naive_utc(ts: datetime) -> datetime:
+    # 원장 타임스탬프는 naive UTC로 저장됩니다 (record_execution 경로와 정렬 기준을 맞춤).
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+def _replay_fifo(rows: List[Dict]) -> None:
+    """
+    한 봇/심볼의 전체 체결을 시간순으로 다시 매칭합니다 (match_fifo_orders와 같은 규칙).
+    rows의 remaining_qty / realized_pnl을 제자리에서 갱신합니다.
+    """
+    lots = []  # 잔여 수량이 남은 BUY 행 (FIFO)
+    head = 0
+    for row in sorted(rows, key=lambda r: (r["timestamp"] or datetime.min, r["id"])):
+        if row["side"] == "BUY":
+            row["remaining_qty"] = row["quantity"]
+            row["realized_pnl"] = 0.0
+            lots.append(row)
+            continue
+        row["remaining_qty"] = 0.0
+        if row["side"] != "SELL":
+            row["realized_pnl"] = 0.0
+            continue
+        sell_remain, pnl = row["quantity"], 0.0
+        while sell_remain > 0 and head < len(lots):
+            lot = lots[head]
+            match_qty = min(lot["remaining_qty"], sell_remain)
+            pnl += (row["price"] - lot["price"]) * match_qty
+            lot["remaining_qty"] -= match_qty
+            sell_remain -= match_qty
+            if lot["remaining_qty"] <= 0:
+                head += 1
+        row["realized_pnl"] = pnl
+
+def import_executions(db: Session, req: ExecutionImportRequest) -> ExecutionImportResponse:
+    """
+    거래소 체결 목록을 원장과 비교하여 빠진 체결만 일괄 기록합니다 (단일 트랜잭션).
+
+    1. 기존 GlobalExecution ID와 비교 (IN 조회)
+    2. 로컬 주문 매칭: clientOrderId(= 로컬 주문 ID) 우선, 없으면 exchange_order_id
+    3. 영향받은 (봇, 심볼)의 체결 전체를 FIFO로 다시 매칭 (과거 시점의 체결이 빠졌던 경우 이후 SELL의 손익도 바뀜)
+    4. 신규 체결 INSERT / 바뀐 기존 체결 UPDATE를 executemany로 실행하고, 영향받은 세션 요약을 재계산
+    """
+    fills = list({f.exchange_trade_id: f for f in req.fills}.values())
+    trade_ids = [f.exchange_trade_id for f in fills]
+    existing = set()
+    for chunk in _chunks(trade_ids):
+        existing.update(i for (i,) in db.query(GlobalExecution.id).filter(GlobalExecution.id.in_(chunk)))
+    missing = [f for f in fills if f.exchange_trade_id not in existing]
+
+    client_ids = list({f.client_order_id for f in missing if f.client_order_id})
+    exchange_ids = list({f.exchange_order_id for f in missing})
+    columns = (LocalOrder.id, LocalOrder.bot_id, LocalOrder.session_id, LocalOrder.symbol, LocalOrder.exchange_order_id)
+    orders = {}
+    for field, values in ((LocalOrder.id, client_ids), (LocalOrder.exchange_order_id, exchange_ids)):
+        for chunk in _chunks(values):
+            query = db.query(*columns).filter(field.in_(chunk))
+            if req.bot_ids is not None:
+                query = query.filter(LocalOrder.bot_id.in_(req.bot_ids))
+            orders.update((o.id, o) for o in query)
+    by_exchange_id = {o.exchange_order_id: o for o in orders.values() if o.exchange_order_id}
+
+    new_rows, unmatched, order_ids = [], [], set()
+    learned_exchange_ids = {}  # clientOrderId로 찾은 주문 중 exchange_order_id가 비어 있던 것
+    for f in missing:
+        order = orders.get(f.client_order_id) or by_exchange_id.get(f.exchange_order_id)
+        if order is None or order.symbol != f.symbol:
+            unmatched.append(f.exchange_trade_id)
+            continue
+        if not order.exchange_order_id:
+            learned_exchange_ids[order.id] = f.exchange_order_id
+        order_ids.add(order.id)
+        new_rows.append({
+            "id": f.exchange_trade_id, "local_order_id": order.id, "exchange_order_id": f.exchange_order_id,
+            "order_list_id": None, "symbol": f.symbol, "side": f.side.upper(), "price": f.price,
+            "quantity": f.quantity, "quote_qty": f.quote_qty if f.quote_qty is not None else f.price * f.quantity,
+            "fee": f.fee, "fee_asset": f.fee_asset, "timestamp": _naive_utc(f.timestamp),
+            "remaining_qty": 0.0, "realized_pnl": 0.0, "_bot_id": order.bot_id,
+        })
+
+    # (봇, 심볼)별 기존 체결 + 신규 체결을 FIFO로 다시 매칭
+    groups = defaultdict(list)
+    for row in new_rows:
+        groups[(row["_bot_id"], row["symbol"])].append(row)
+    updates = []
+    for (bot_id, symbol), rows in groups.items():
+        stored = db.query(
+            GlobalExecution.id, GlobalExecution.local_order_id, GlobalExecution.side, GlobalExecution.price,
+            GlobalExecution.quantity, GlobalExecution.timestamp, GlobalExecution.remaining_qty, GlobalExecution.realized_pnl,
+        ).join(LocalOrder).filter(LocalOrder.bot_id == bot_id, GlobalExecution.symbol == symbol).all()
+        previous = {r.id: (r.remaining_qty or 0.0, r.realized_pnl or 0.0) for r in stored}
+        replay = [dict(r._mapping) for r in stored] + rows
+        _replay_fifo(replay)
+        for row in replay[:len(stored)]:
+            old_remaining, old_pnl = previous[row["id"]]
+            if abs(row["remaining_qty"] - old_remaining) > 1e-12 or abs(row["realized_pnl"] - old_pnl) > 1e-9:
+                updates.append({"b_id": row["id"], "b_remaining": row["remaining_qty"], "b_pnl": row["realized_pnl"]})
+                order_ids.add(row["local_order_id"])
+
+    table = GlobalExecution.__table__
+    if new_rows:
+        db.execute(table.insert(), [{k: v for k, v in row.items() if not k.startswith("_")} for row in new_rows])
+    if updates:
+        db.execute(
+            table.update().where(table.c.id == bindparam("b_id"))
+            .values(remaining_qty=bindparam("b_remaining"), realized_pnl=bindparam("b_pnl")),
+            updates,
+        )
+    if learned_exchange_ids:
+        orders_table = LocalOrder.__table__
+        db.execute(
+            orders_table.update().where(orders_table.c.id == bindparam("b_id"))
+            .values(exchange_order_id=bindparam("b_exchange_id")),
+            [{"b_id": oid, "b_exchange_id": eid} for oid, eid in learned_exchange_ids.items()],
+        )
+    sessions = _recompute_session_summaries(db, list(order_ids)) if order_ids else 0
+    db.commit()
+
+    print(f"[BotService] Imported executions: {len(new_rows)} new, {len(existing)} duplicates, "
+          f"{len(unmatched)} unmatched, {len(updates)} rematched")
+    return ExecutionImportResponse(
+        received=len(fills), duplicates=len(existing), imported=len(new_rows), unmatched=unmatched,
+        orders=sorted({row["local_order_id"] for row in new_rows}),
+        rematched=len(updates), sessions=sessions,
+    )
+
+def _recompute_session_summaries(db: Session, order_ids: List[str]) -> int:
+    """
+    주문들이 속한 세션의 손익/승률/수수료 요약을 체결 기록에서 다시 계산합니다.
+    record_execution의 누적 규칙과 같습니다 (실현 손익이 0이 아닌 체결만 거래 수에 포함).
+    """
+    session_ids = set()
+    for chunk in _chunks(order_ids):
+        session_ids.update(s for (s,) in db.query(LocalOrder.session_id).filter(LocalOrder.id.in_(chunk)) if s)
+    if not session_ids:
+        return 0
+    db.flush()
+    stats = db.query(
+        LocalOrder.session_id,
+        func.sum(GlobalExecution.realized_pnl),
+        func.sum(case((GlobalExecution.realized_pnl != 0, 1), else_=0)),
+        func.sum(case((GlobalExecution.realized_pnl > 0, 1), else_=0)),
+        func.sum(case((GlobalExecution.fee > 0, GlobalExecution.fee), else_=0.0)),
+    ).join(LocalOrder).filter(LocalOrder.session_id.in_(session_ids)).group_by(LocalOrder.session_id).all()
+    by_session = {row[0]: row[1:] for row in stats}
+    for session in db.query(BotSession).filter(BotSession.id.in_(session_ids)):
+        total_pnl, trades, wins, fees = by_session.get(session.id, (0.0, 0, 0, 0.0))
+        summary = session.get_summary()
+        summary.update(
+            total_pnl=total_pnl or 0.0, trade_count=trades or 0, win_count=wins or 0,
+            win_rate=(wins or 0) / trades if trades else 0.0, total_fee=fees or 0.0,
+        )
+        session.set_summary(summary)
+    return len(session_ids)
+
+@app.post("/executions/import", response_model=ExecutionImportResponse)
+def import_executions_endpoint(req: ExecutionImportRequest, db: Session = Depends(get_db)):
+    """
+    ExecutionService 부팅 대사용: 거래소 내 체결 목록 중 원장에 없는 체결을 한 트랜잭션으로 기록합니다.
+    Trade ID 기준으로 멱등하므로 같은 목록을 다시 보내도 안전합니다.
+    """
+    try:
+        return import_executions(db, req)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Failed to import executions: {str(e)}")
+
+@app.post("/ledger/batch", response_model=LedgerBatchResponse)
+def apply_ledger_batch(batch: LedgerBatchRequest, db: Session = Depends(get_db)):
+    """
+    ExecutionService 원장 아웃박스의 작업들을 순서대로 반영합니다.
+    각 작업은 주문 ID / Trade ID 기준으로 멱등하므로 같은 배치를 다시 보내도 안전합니다.
+    실패한 작업에서 멈추고, 그 앞까지 반영된 작업 수와 오류를 반환합니다.
+    """
+    handlers = {
+        "create_local_order": lambda p: create_local_order(LocalOrderCreate(**p), db),
+        "update_order_status": lambda p: update_order_status(
+            p["local_order_id"], OrderStatusUpdate(status=p["status"], exchange_order_id=p.get("exchange_order_id")), db),
+        "record_execution": lambda p: record_execution(GlobalExecutionCreate(**p), db),
+    }
+    for index, item in enumerate(batch.ops):
+        handler = handlers.get(item.op)
+        try:
+            if handler is None:
+                raise HTTPException(status_code=400, detail=f"Unknown ledger op: {item.op}")
+            handler(item.payload)
+        except HTTPException as e:
+            return LedgerBatchResponse(applied=index, error={"index": index, "status_code": e.status_code, "detail": e.detail})
+        except (ValidationError, KeyError) as e:
+            return LedgerBatchResponse(applied=index, error={"index": index, "status_code": 422, "detail": str(e)})
+    return LedgerBatchResponse(applied=len(batch.ops))
+
 @app.get("/bots/{bot_id}/stats", response_model=BotStatsResponse)
 def get_bot_stats(bot_id: str, db: Session = Depends(get_db)):
     """
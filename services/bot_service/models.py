@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, create_engine, Float, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, create_engine, Float, ForeignKey, Integer
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -24,6 +24,7 @@ class Bot(Base):
     status = Column(String, default="STOPPED") # STOPPED, BOOTING, RUNNING, STOPPING
     status_message = Column(String, nullable=True) # UI 표시용 상태 메시지
     config_json = Column(Text) # 전체 JSON 설정 저장
+    config_version = Column(Integer, default=1, nullable=False) # config_json이 바뀔 때마다 1 증가 (실행 중 설정 변경 감지용)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -62,6 +63,17 @@ class BotSession(Base):
     def get_summary(self):
         return json.loads(self.summary_json) if self.summary_json else {}
 
+class BotStatusTransition(Base):
+    """봇 상태 전이 이력 (POST /bots/{id}/transition 성공 시 1행 추가)."""
+    __tablename__ = "bot_status_transitions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    bot_id = Column(String, ForeignKey("bots.id"), index=True)
+    from_status = Column(String, nullable=True) # 조건으로 지정한 이전 상태 (무조건 전이면 Null)
+    to_status = Column(String)
+    message = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class LocalOrder(Base):
     __tablename__ = "local_orders"
 
@@ -73,8 +85,9 @@ class LocalOrder(Base):
     side = Column(String)     # BUY, SELL
     quantity = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
-    status = Column(String, default="PENDING") # PENDING, SENT, FILLED, FAILED
+    status = Column(String, default="PENDING") # PENDING, SENT, FILLED, FAILED, CANCELED, REJECTED (리스크 게이트 거부)
     reason = Column(String, nullable=True) # 주문 사유 (예: "RSI < 30")
+    exchange_order_id = Column(String, index=True, nullable=True) # 거래소 주문 ID (SENT 이후 대사용)
 
     bot = relationship("Bot", back_populates="orders")
     session = relationship("BotSession", back_populates="orders")
@@ -128,6 +141,7 @@ class BotUpdate(BotBase):
 
 class BotResponse(BotBase):
     id: str
+    config_version: int = 1
     created_at: datetime
     updated_at: datetime
 
@@ -136,6 +150,7 @@ class BotResponse(BotBase):
 
 # Ledger Schemas
 class LocalOrderCreate(BaseModel):
+    id: Optional[str] = None # 실행 서비스가 발급한 주문 ID (UUIDv7, 거래소 clientOrderId와 동일)
     bot_id: str
     symbol: str
     side: str
@@ -154,6 +169,7 @@ class LocalOrderResponse(BaseModel):
     timestamp: datetime
     status: str
     reason: Optional[str] = None
+    exchange_order_id: Optional[str] = None
     realized_pnl: Optional[float] = 0.0
     fee: Optional[float] = 0.0
 
@@ -179,6 +195,7 @@ class BotSessionDetailResponse(BotSessionResponse):
 
 class OrderStatusUpdate(BaseModel):
     status: str
+    exchange_order_id: Optional[str] = None
 
 class GlobalExecutionCreate(BaseModel):
     local_order_id: str
@@ -194,6 +211,68 @@ class GlobalExecutionCreate(BaseModel):
     fee_asset: Optional[str] = None
     timestamp: datetime
 
+class ExecutionImportFill(BaseModel):
+    """거래소 내 체결 1건 (부팅 대사 일괄 반영용). 로컬 주문은 client_order_id 또는 exchange_order_id로 찾습니다."""
+    exchange_trade_id: str
+    exchange_order_id: str
+    client_order_id: Optional[str] = None
+    symbol: str
+    side: str
+    price: float
+    quantity: float
+    quote_qty: Optional[float] = None
+    fee: float = 0.0
+    fee_asset: Optional[str] = None
+    timestamp: datetime
+
+class ExecutionImportRequest(BaseModel):
+    fills: List[ExecutionImportFill]
+    bot_ids: Optional[List[str]] = None # 매칭 대상 봇 (키를 공유하는 봇들). None이면 전체
+
+class ExecutionImportResponse(BaseModel):
+    received: int
+    duplicates: int # 이미 기록된 Trade ID
+    imported: int
+    unmatched: List[str] = [] # 로컬 주문을 찾지 못한 Trade ID (수동 매매 등, 기록하지 않음)
+    orders: List[str] = [] # 체결이 새로 기록된 로컬 주문 ID
+    rematched: int = 0 # FIFO 재매칭으로 잔여 수량/실현 손익이 바뀐 기존 체결 수
+    sessions: int = 0 # 요약을 다시 계산한 세션 수
+
+class ExecutionCursorResponse(BaseModel):
+    last_execution_at: Optional[datetime] = None # 마지막으로 기록된 체결 시각
+    oldest_unresolved_at: Optional[datetime] = None # 가장 오래된 PENDING/SENT 주문 시각
+
+class BotTransitionRequest(BaseModel):
+    expected_status: Optional[str] = None # 현재 상태가 이 값일 때만 전이 (None이면 무조건)
+    new_status: str
+    message: Optional[str] = None # None이면 기존 status_message 유지
+
+class BotTransitionResponse(BaseModel):
+    ok: bool # 전이 성공 여부 (expected_status 불일치 시 False)
+    bot_id: str
+    status: str # 요청 처리 후 현재 상태
+
+class BotStatusTransitionResponse(BaseModel):
+    bot_id: str
+    from_status: Optional[str] = None
+    to_status: str
+    message: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class LedgerOp(BaseModel):
+    op: str # create_local_order | update_order_status | record_execution
+    payload: Dict[str, Any]
+
+class LedgerBatchRequest(BaseModel):
+    ops: List[LedgerOp]
+
+class LedgerBatchResponse(BaseModel):
+    applied: int # 앞에서부터 반영(또는 멱등 처리)된 작업 수
+    error: Optional[Dict[str, Any]] = None # 중단된 작업의 {"index", "status_code", "detail"}
+
 # DB 엔티티를 Pydantic 모델로 변환하는 헬퍼 함수
 def bot_to_pydantic(bot: Bot) -> BotResponse:
     config = bot.get_config()
@@ -204,6 +283,7 @@ def bot_to_pydantic(bot: Bot) -> BotResponse:
         status_message=bot.status_message,
         global_settings=config.get("global_settings", {}),
         pipeline=config.get("pipeline", {}),
+        config_version=bot.config_version or 1,
         created_at=bot.created_at,
         updated_at=bot.updated_at
     )
@@ -128,3 +128,183 @@ def test_pnl_aggregation():
     assert len(s_detail["orders"]) >= 2
     
     assert active_session_summary.get("total_pnl") == 50.0
+
+def test_unresolved_orders_and_idempotent_execution():
+    bot_id = client.post("/bots", json={"name": "ReconBot"}).json()["id"]
+    client.post(f"/bots/{bot_id}/start")
+
+    sent = client.post("/orders", json={"bot_id": bot_id, "symbol": "BTC/USDT", "side": "BUY", "quantity": 1.0}).json()
+    done = client.post("/orders", json={"bot_id": bot_id, "symbol": "BTC/USDT", "side": "BUY", "quantity": 1.0}).json()
+    client.put(f"/orders/{sent['id']}/status", json={"status": "SENT", "exchange_order_id": "ex-1"})
+    client.put(f"/orders/{done['id']}/status", json={"status": "FILLED"})
+
+    unresolved = client.get("/orders", params={"status": "PENDING,SENT"}).json()
+    assert [o["id"] for o in unresolved] == [sent["id"]]
+    assert unresolved[0]["exchange_order_id"] == "ex-1"
+
+    # 같은 Trade ID를 두 번 기록해도 한 번만 반영되어야 함
+    execution = {
+        "local_order_id": sent["id"],
+        "symbol": "BTC/USDT", "side": "BUY", "price": 100.0, "quantity": 1.0, "quote_qty": 100.0,
+        "exchange_trade_id": "t-late", "exchange_order_id": "ex-1", "fee": 0, "fee_asset": "USDT",
+        "timestamp": "2024-01-01T10:00:00"
+    }
+    assert client.post("/executions", json=execution).status_code == 200
+    retry = client.post("/executions", json=execution)
+    assert retry.status_code == 200
+    assert retry.json()["duplicate"] is True
+
+def test_client_supplied_order_id_is_idempotent():
+    bot_id = client.post("/bots", json={"name": "OutboxBot"}).json()["id"]
+    client.post(f"/bots/{bot_id}/start")
+
+    order = {"id": "0190f0b2-0000-7000-8000-000000000001", "bot_id": bot_id,
+             "symbol": "BTC/USDT", "side": "BUY", "quantity": 1.0}
+    first = client.post("/orders", json=order)
+    assert first.status_code == 200
+    assert first.json()["id"] == order["id"]
+
+    # 아웃박스 재전달: 같은 ID로 다시 생성해도 기존 주문을 반환하고 새로 만들지 않음
+    client.put(f"/orders/{order['id']}/status", json={"status": "SENT"})
+    retry = client.post("/orders", json=order)
+    assert retry.status_code == 200
+    assert retry.json()["status"] == "SENT"
+    assert len(client.get("/orders", params={"bot_id": bot_id}).json()) == 1
+
+def test_ledger_batch_replay_is_idempotent():
+    bot_id = client.post("/bots", json={"name": "BatchBot"}).json()["id"]
+    client.post(f"/bots/{bot_id}/start")
+
+    order_id = "0190f0b2-0000-7000-8000-000000000002"
+    ops = [
+        {"op": "create_local_order", "payload": {"id": order_id, "bot_id": bot_id, "symbol": "BTC/USDT",
+                                                 "side": "BUY", "quantity": 1.0, "reason": "test"}},
+        {"op": "update_order_status", "payload": {"local_order_id": order_id, "status": "SENT", "exchange_order_id": "ex-9"}},
+        {"op": "record_execution", "payload": {
+            "local_order_id": order_id, "symbol": "BTC/USDT", "side": "BUY", "price": 100.0, "quantity": 1.0,
+            "quote_qty": 100.0, "exchange_trade_id": "t-batch", "exchange_order_id": "ex-9", "fee": 0,
+            "fee_asset": "USDT", "timestamp": "2024-01-01T10:00:00"}},
+        {"op": "update_order_status", "payload": {"local_order_id": order_id, "status": "FILLED"}},
+    ]
+    assert client.post("/ledger/batch", json={"ops": ops}).json() == {"applied": 4, "error": None}
+
+    # 같은 배치를 재전달해도 중복 기록되지 않고, 확정된 상태(FILLED)가 SENT로 되돌아가지 않음
+    assert client.post("/ledger/batch", json={"ops": ops}).json()["applied"] == 4
+    order = client.get("/orders", params={"bot_id": bot_id}).json()
+    assert len(order) == 1 and order[0]["status"] == "FILLED"
+    assert client.post("/executions", json=ops[2]["payload"]).json()["duplicate"] is True
+
+    # 실패한 작업에서 멈추고 그 앞까지의 반영 수와 오류를 반환
+    result = client.post("/ledger/batch", json={"ops": [
+        {"op": "update_order_status", "payload": {"local_order_id": order_id, "status": "FILLED"}},
+        {"op": "update_order_status", "payload": {"local_order_id": "missing", "status": "SENT"}},
+    ]}).json()
+    assert result["applied"] == 1
+    assert result["error"]["index"] == 1 and result["error"]["status_code"] == 404
+
+def test_status_transition_compare_and_set():
+    bot = client.post("/bots", json={"name": "CasBot", "global_settings": {"exchange": "k1"}}).json()
+    bot_id = bot["id"]
+
+    ok = client.post(f"/bots/{bot_id}/transition",
+                     json={"expected_status": "STOPPED", "new_status": "BOOTING", "message": "booting"}).json()
+    assert ok == {"ok": True, "bot_id": bot_id, "status": "BOOTING"}
+
+    # 기대 상태 불일치 -> 변경 없이 현재 상태를 반환
+    stale = client.post(f"/bots/{bot_id}/transition",
+                        json={"expected_status": "STOPPED", "new_status": "RUNNING"}).json()
+    assert stale["ok"] is False and stale["status"] == "BOOTING"
+
+    # 무조건 전이, message 생략 시 기존 메시지 유지, 설정은 그대로
+    assert client.post(f"/bots/{bot_id}/transition", json={"new_status": "RUNNING"}).json()["ok"] is True
+    current = client.get(f"/bots/{bot_id}").json()
+    assert current["status"] == "RUNNING"
+    assert current["status_message"] == "booting"
+    assert current["global_settings"] == {"exchange": "k1"}
+
+    history = client.get(f"/bots/{bot_id}/transitions").json()
+    assert [(h["from_status"], h["to_status"]) for h in history] == [(None, "RUNNING"), ("STOPPED", "BOOTING")]
+
+    assert client.post("/bots/missing/transition", json={"new_status": "RUNNING"}).status_code == 404
+
+def test_runner_session_start_resume_and_cache():
+    bot_id = client.post("/bots", json={"name": "SessionCacheBot", "status": "BOOTING"}).json()["id"]
+
+    # 러너 부팅: 상태는 BOOTING 유지, 세션 발급
+    session = client.post(f"/bots/{bot_id}/start", params={"status": "BOOTING"}).json()
+    assert client.get(f"/bots/{bot_id}").json()["status"] == "BOOTING"
+
+    # 세션 ID 없이 생성된 주문도 캐시된 활성 세션에 연결
+    order = client.post("/orders", json={"bot_id": bot_id, "symbol": "BTC/USDT", "side": "BUY", "quantity": 1.0}).json()
+    assert order["session_id"] == session["id"]
+
+    # 서비스 재시작 후 재개: 활성 세션을 닫지 않고 그대로 사용
+    resumed = client.post(f"/bots/{bot_id}/start", params={"status": "BOOTING", "resume": "true"}).json()
+    assert resumed["id"] == session["id"]
+
+    # 정지 시 캐시 무효화 -> 이후 주문은 새 (긴급) 세션에 연결
+    client.post(f"/bots/{bot_id}/stop")
+    late = client.post("/orders", json={"bot_id": bot_id, "symbol": "BTC/USDT", "side": "SELL", "quantity": 1.0}).json()
+    assert late["session_id"] != session["id"]
+
+def test_config_version_bumps_only_on_config_change():
+    pipeline = {"strategy": {"id": "test_trading_v1", "params": {"hold_duration": 60}}}
+    bot = client.post("/bots", json={"name": "CfgBot", "pipeline": pipeline}).json()
+    assert bot["config_version"] == 1
+
+    # 이름/상태만 바뀌면 설정 리비전은 그대로
+    same = client.put(f"/bots/{bot['id']}", json={"name": "Renamed", "status": "RUNNING", "pipeline": pipeline}).json()
+    assert same["config_version"] == 1
+
+    pipeline["strategy"]["params"]["hold_duration"] = 120
+    changed = client.put(f"/bots/{bot['id']}", json={"name": "Renamed", "status": "RUNNING", "pipeline": pipeline}).json()
+    assert changed["config_version"] == 2
+    assert client.get("/bots").json()[0]["config_version"] == 2
+
+def test_execution_import_fills_gaps_and_rematches_fifo():
+    bot_id = client.post("/bots", json={"name": "ImportBot"}).json()["id"]
+    session = client.post(f"/bots/{bot_id}/start").json()
+
+    buy = client.post("/orders", json={"bot_id": bot_id, "symbol": "BTC/USDT", "side": "BUY", "quantity": 1.0}).json()
+    sell = client.post("/orders", json={"bot_id": bot_id, "symbol": "BTC/USDT", "side": "SELL", "quantity": 1.0}).json()
+    pending = client.post("/orders", json={"bot_id": bot_id, "symbol": "BTC/USDT", "side": "BUY", "quantity": 0.5}).json()
+    client.put(f"/orders/{buy['id']}/status", json={"status": "SENT", "exchange_order_id": "ex-1"})
+    client.put(f"/orders/{sell['id']}/status", json={"status": "SENT", "exchange_order_id": "ex-2"})
+
+    # 크래시로 BUY 체결은 빠지고 SELL 체결만 기록됨 -> 매칭할 BUY가 없어 손익 0
+    sell_fill = {"symbol": "BTC/USDT", "side": "SELL", "price": 120.0, "quantity": 1.0, "quote_qty": 120.0,
+                 "exchange_trade_id": "t-s1", "exchange_order_id": "ex-2", "fee": 0.1, "fee_asset": "USDT",
+                 "timestamp": "2024-01-01T10:05:00"}
+    assert client.post("/executions", json={**sell_fill, "local_order_id": sell["id"]}).json()["realized_pnl"] == 0.0
+
+    cursor = client.get("/executions/cursor", params={"symbol": "BTC/USDT", "bot_ids": bot_id}).json()
+    assert cursor["last_execution_at"] == "2024-01-01T10:05:00"
+    assert cursor["oldest_unresolved_at"] is not None
+
+    fills = [
+        {"symbol": "BTC/USDT", "side": "buy", "price": 100.0, "quantity": 1.0, "exchange_trade_id": "t-b1",
+         "exchange_order_id": "ex-1", "fee": 0.1, "fee_asset": "USDT", "timestamp": "2024-01-01T10:00:00Z"},
+        sell_fill,
+        # clientOrderId로만 찾을 수 있는 PENDING 주문의 체결 (이후 매도보다 나중)
+        {"symbol": "BTC/USDT", "side": "buy", "price": 130.0, "quantity": 0.5, "exchange_trade_id": "t-b2",
+         "exchange_order_id": "ex-3", "client_order_id": pending["id"], "timestamp": "2024-01-01T10:10:00"},
+        # 봇 주문이 아닌 체결 (수동 매매)
+        {"symbol": "BTC/USDT", "side": "sell", "price": 125.0, "quantity": 2.0, "exchange_trade_id": "t-x",
+         "exchange_order_id": "ex-999", "timestamp": "2024-01-01T10:06:00"},
+    ]
+    report = client.post("/executions/import", json={"fills": fills, "bot_ids": [bot_id]}).json()
+    assert (report["received"], report["duplicates"], report["imported"]) == (4, 1, 2)
+    assert report["unmatched"] == ["t-x"]
+    assert report["orders"] == sorted([buy["id"], pending["id"]])
+    assert report["rematched"] == 1  # 기존 SELL의 손익이 빠졌던 BUY와 다시 매칭됨
+
+    assert client.get(f"/bots/{bot_id}/stats").json()["total_pnl"] == 20.0
+    summary = client.get(f"/sessions/{session['id']}").json()["summary"]
+    assert (summary["total_pnl"], summary["trade_count"], summary["win_count"]) == (20.0, 1, 1)
+    assert abs(summary["total_fee"] - 0.2) < 1e-9
+    unresolved = {o["id"]: o for o in client.get("/orders", params={"bot_id": bot_id}).json()}
+    assert unresolved[pending["id"]]["exchange_order_id"] == "ex-3"
+
+    # 같은 목록을 다시 보내도 변경 없음 (Trade ID 기준 멱등)
+    again = client.post("/executions/import", json={"fills": fills, "bot_ids": [bot_id]}).json()
+    assert (again["imported"], again["duplicates"], again["rematched"]) == (0, 3, 0)
@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 기본 계산 파라미터: 불균형 레벨 수, 누적 depth 범위(미드 대비 %), 벽 판정 배수(레벨 수량 / 중앙값)
+DEFAULT_IMBALANCE_LEVELS = (1, 5, 10, 20)
+DEFAULT_DEPTH_PCTS = (0.1, 0.5, 1.0)
+DEFAULT_WALL_RATIO = 5.0
+MAX_WALLS = 5
+
+
+def _side_array(levels: Sequence[Sequence[Any]]) -> np.ndarray:
+    """[[price, amount], ...] -> (n, 2) float64 배열. 수량이 없는 레벨은 제외합니다."""
+    rows = [(lv[0], lv[1]) for lv in levels if lv[0] is not None and lv[1] is not None]
+    return np.array(rows, dtype=np.float64).reshape(-1, 2)
+
+
+def _imbalance(bid_qty: np.ndarray, ask_qty: np.ndarray, levels: Sequence[int]) -> Dict[str, Optional[float]]:
+    """상위 n레벨 수량 기준 (bid - ask) / (bid + ask). 범위는 [-1, 1]."""
+    bid_cum = np.concatenate(([0.0], np.cumsum(bid_qty)))
+    ask_cum = np.concatenate(([0.0], np.cumsum(ask_qty)))
+    out = {}
+    for n in levels:
+        b, a = bid_cum[min(n, len(bid_qty))], ask_cum[min(n, len(ask_qty))]
+        out[str(n)] = float((b - a) / (b + a)) if b + a > 0 else None
+    return out
+
+
+def _depth_within(bids: np.ndarray, asks: np.ndarray, mid: float, pcts: Sequence[float]) -> Dict[str, Dict[str, float]]:
+    """미드 ±x% 이내의 누적 수량/금액."""
+    bid_notional = bids[:, 0] * bids[:, 1]
+    ask_notional = asks[:, 0] * asks[:, 1]
+    out = {}
+    for pct in pcts:
+        in_bid = bids[:, 0] >= mid * (1 - pct / 100.0)
+        in_ask = asks[:, 0] <= mid * (1 + pct / 100.0)
+        out[f"{pct:g}"] = {
+            "bid_amount": float(bids[in_bid, 1].sum()),
+            "ask_amount": float(asks[in_ask, 1].sum()),
+            "bid_quote": float(bid_notional[in_bid].sum()),
+            "ask_quote": float(ask_notional[in_ask].sum()),
+        }
+    return out
+
+
+def _walls(side: np.ndarray, mid: float, ratio: float) -> List[Dict[str, float]]:
+    """수량이 해당 면 중앙값의 ratio배 이상인 레벨 (수량 큰 순, 최대 MAX_WALLS개)."""
+    if len(side) == 0:
+        return []
+    qty = side[:, 1]
+    idx = np.nonzero(qty >= np.median(qty) * ratio)[0]
+    idx = idx[np.argsort(-qty[idx], kind="stable")][:MAX_WALLS]
+    return [
+        {"price": float(side[i, 0]), "amount": float(qty[i]), "distance_pct": float(abs(side[i, 0] / mid - 1.0) * 100)}
+        for i in idx
+    ]
+
+
+def _impact(side: np.ndarray, size: float, mid: float) -> Dict[str, Any]:
+    """size(기본 자산 수량)를 시장가로 체결할 때의 평균가와 미드 대비 비용."""
+    qty, notional = side[:, 1], side[:, 0] * side[:, 1]
+    cum_qty = np.cumsum(qty)
+    full = int(np.searchsorted(cum_qty, size, side="left"))  # 완전히 소진되는 레벨 수
+    if full >= len(side):
+        filled, cost = float(cum_qty[-1]) if len(side) else 0.0, float(notional.sum())
+        last_price = float(side[-1, 0]) if len(side) else None
+    else:
+        before_qty = float(cum_qty[full - 1]) if full > 0 else 0.0
+        before_cost = float(notional[:full].sum())
+        filled = size
+        cost = before_cost + (size - before_qty) * float(side[full, 0])
+        last_price = float(side[full, 0])
+    avg = cost / filled if filled > 0 else None
+    return {
+        "filled": filled,
+        "fully_filled": filled >= size,
+        "avg_price": avg,
+        "worst_price": last_price,
+        "cost_quote": cost,
+        "impact_bps": abs(avg / mid - 1.0) * 10_000 if avg is not None else None,
+    }
+
+
+def compute_book_features(
+    bids: Sequence[Sequence[Any]],
+    asks: Sequence[Sequence[Any]],
+    levels: Sequence[int] = DEFAULT_IMBALANCE_LEVELS,
+    pcts: Sequence[float] = DEFAULT_DEPTH_PCTS,
+    wall_ratio: float = DEFAULT_WALL_RATIO,
+    size: Optional[float] = None,
+) -> Dict[str, Any]:
+    """오더북 배열에서 파생 지표를 계산합니다. 호가가 한쪽이라도 비어 있으면 ValueError."""
+    bid_arr, ask_arr = _side_array(bids), _side_array(asks)
+    if len(bid_arr) == 0 or len(ask_arr) == 0:
+        raise ValueError("Order book side is empty")
+
+    best_bid, bid_qty = bid_arr[0]
+    best_ask, ask_qty = ask_arr[0]
+    mid = (best_bid + best_ask) / 2.0
+    top_qty = bid_qty + ask_qty
+    features = {
+        "best_bid": float(best_bid),
+        "best_ask": float(best_ask),
+        "mid": float(mid),
+        "spread": float(best_ask - best_bid),
+        # 상대편 수량으로 가중한 가격: 매수 잔량이 많을수록 ask 쪽으로 치우칩니다.
+        "microprice": float((best_bid * ask_qty + best_ask * bid_qty) / top_qty) if top_qty > 0 else float(mid),
+        "imbalance": _imbalance(bid_arr[:, 1], ask_arr[:, 1], levels),
+        "depth": _depth_within(bid_arr, ask_arr, mid, pcts),
+        "walls": {"bids": _walls(bid_arr, mid, wall_ratio), "asks": _walls(ask_arr, mid, wall_ratio)},
+    }
+    if size is not None:
+        features["impact"] = {
+            "size": size,
+            "buy": _impact(ask_arr, size, mid),
+            "sell": _impact(bid_arr, size, mid),
+        }
+    return features
+
+
+def book_version(ob: Dict[str, Any]) -> Optional[Any]:
+    """오더북 버전: 거래소 업데이트 ID(nonce) 우선, 없으면 타임스탬프. 둘 다 없으면 None (캐시 안 함)."""
+    nonce = ob.get("nonce")
+    return nonce if nonce is not None else ob.get("timestamp")
+
+
+class BookFeatureCache:
+    """
+    (거래소, 심볼, 오더북 버전, 호가 레벨 수, 계산 파라미터) 단위 결과 캐시 (LRU).
+    같은 버전의 오더북을 여러 클라이언트가 요청해도 계산은 1회입니다.
+    같은 버전이라도 조회 depth(limit)가 다르면 누적 depth/충격 비용이 달라지므로 레벨 수를 키에 포함합니다.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, exchange_id: str, symbol: str, ob: Dict[str, Any], **params) -> Dict[str, Any]:
+        version = book_version(ob)
+        bids, asks = ob.get("bids") or [], ob.get("asks") or []
+        key = (exchange_id, symbol, version, len(bids), len(asks),
+               tuple(sorted((k, tuple(v) if isinstance(v, (list, tuple)) else v) for k, v in params.items())))
+        if version is not None and key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        self.misses += 1
+        features = compute_book_features(bids, asks, **params)
+        features["version"] = version
+        if version is not None:
+            self._entries[key] = features
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return features
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
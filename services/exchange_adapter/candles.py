@@ -0,0 +1,368 @@
+import asyncio
+import bisect
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# 지원 타임프레임 (ms). 체결 -> 1s -> 1m -> 5m -> 1h 순서로 증분 롤업합니다.
+TIMEFRAMES: Dict[str, int] = {"1s": 1_000, "1m": 60_000, "5m": 300_000, "1h": 3_600_000}
+ROLLUP_CHAIN = ("1s", "1m", "5m", "1h")
+
+# 봉 포맷: CCXT OHLCV와 동일한 [timestamp(ms), open, high, low, close, volume]
+Candle = List[float]
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _merge_into(target: Candle, candle: Candle):
+    """시간순으로 뒤에 오는 candle을 target에 합칩니다 (open/timestamp는 유지)."""
+    target[2] = max(target[2], candle[2])
+    target[3] = min(target[3], candle[3])
+    target[4] = candle[4]
+    target[5] += candle[5]
+
+
+class CandleSeries:
+    """
+    한 (심볼, 타임프레임)의 봉 시계열.
+
+    - 마감 봉은 timestamp 리스트와 나란히 보관하여 구간 조회를 bisect로 처리합니다.
+    - 진행 중인 봉(current)은 하위 타임프레임의 마감 봉을 합쳐 갱신됩니다.
+    - covered_from 이후의 버킷은 메모리에 빠짐없이 있음을 뜻합니다 (None이면 보장 없음).
+    """
+
+    def __init__(self, timeframe: str, max_candles: int):
+        self.timeframe = timeframe
+        self.period = TIMEFRAMES[timeframe]
+        self.max_candles = max_candles
+        self.times: List[int] = []
+        self.rows: List[Candle] = []
+        self.current: Optional[Candle] = None
+        self.covered_from: Optional[int] = None
+
+    def bucket(self, ts: int) -> int:
+        return ts - ts % self.period
+
+    def add(self, candle: Candle) -> Optional[Candle]:
+        """
+        하위 봉(또는 체결)을 반영합니다. 새 버킷이 시작되어 마감된 봉이 있으면 반환합니다.
+        이미 마감된 버킷에 늦게 도착한 값은 버립니다.
+        """
+        start = self.bucket(int(candle[0]))
+        current = self.current
+        if current is not None and start == current[0]:
+            _merge_into(current, candle)
+            return None
+        if current is not None and start < current[0]:
+            return None
+        self.current = [start, candle[1], candle[2], candle[3], candle[4], candle[5]]
+        if current is not None:
+            self._append(current)
+        return current
+
+    def _append(self, candle: Candle):
+        if self.times and candle[0] <= self.times[-1]:
+            return
+        self.times.append(int(candle[0]))
+        self.rows.append(candle)
+        self._trim()
+
+    def _trim(self):
+        # 매번 앞에서 지우지 않고 25% 초과분이 쌓이면 한 번에 잘라냅니다 (분할 상환 O(1)).
+        excess = len(self.rows) - self.max_candles
+        if excess > self.max_candles // 4:
+            del self.times[:excess]
+            del self.rows[:excess]
+            if self.covered_from is not None:
+                self.covered_from = max(self.covered_from, self.times[0])
+
+    def upsert(self, rows: List[Candle]):
+        """마감 봉을 timestamp 기준으로 병합합니다 (같은 버킷은 교체)."""
+        merged = dict(zip(self.times, self.rows))
+        for row in rows:
+            merged[int(row[0])] = [int(row[0])] + [float(x) for x in row[1:6]]
+        self.times = sorted(merged)
+        self.rows = [merged[ts] for ts in self.times]
+        excess = len(self.rows) - self.max_candles
+        if excess > 0:
+            del self.times[:excess]
+            del self.rows[:excess]
+            if self.covered_from is not None:
+                self.covered_from = max(self.covered_from, self.times[0])
+
+    def window(self, since: int, until: int) -> List[Candle]:
+        lo = bisect.bisect_left(self.times, since)
+        hi = bisect.bisect_right(self.times, until)
+        return self.rows[lo:hi]
+
+
+@dataclass
+class SymbolCandles:
+    series: Dict[str, CandleSeries]
+    live: bool = False
+    last_trade_ts: int = -1
+    last_trade_ids: Set[str] = field(default_factory=set)  # last_trade_ts와 같은 시각의 체결 ID (중복 제거용)
+
+
+class CandleStore:
+    """
+    (거래소, 심볼) 단위 멀티 타임프레임 봉 캐시.
+
+    - ingest_trades(): 체결을 1s 봉에 반영하고, 마감된 봉을 상위 타임프레임으로 증분 롤업합니다.
+      체결당 O(1)이며 상위 봉은 하위 봉이 마감될 때만 갱신됩니다.
+    - merge_history(): fetch_ohlcv 결과로 과거 구간과 스트림 공백을 채웁니다.
+    - window(): 메모리에서 구간을 잘라 반환합니다 (진행 중인 봉 포함).
+    - 타임프레임당 max_candles개, 심볼은 max_symbols개(LRU)까지만 보관합니다.
+    """
+
+    def __init__(self, max_candles: int = 1500, max_symbols: int = 64, clock: Callable[[], int] = _now_ms):
+        self.max_candles = max_candles
+        self.max_symbols = max_symbols
+        self.clock = clock
+        self._symbols: "OrderedDict[Tuple[str, str], SymbolCandles]" = OrderedDict()
+        self._metrics: Dict[str, int] = {"trades_ingested": 0, "trades_duplicate": 0,
+                                         "history_rows_merged": 0, "symbols_evicted": 0}
+
+    def metrics(self) -> Dict[str, int]:
+        return {**self._metrics, "symbols": len(self._symbols)}
+
+    def _get(self, exchange_id: str, symbol: str) -> SymbolCandles:
+        key = (exchange_id, symbol)
+        entry = self._symbols.get(key)
+        if entry is None:
+            entry = SymbolCandles(series={tf: CandleSeries(tf, self.max_candles) for tf in ROLLUP_CHAIN})
+            self._symbols[key] = entry
+            while len(self._symbols) > self.max_symbols:
+                self._symbols.popitem(last=False)
+                self._metrics["symbols_evicted"] += 1
+        else:
+            self._symbols.move_to_end(key)
+        return entry
+
+    def drop(self, exchange_id: str, symbol: str):
+        self._symbols.pop((exchange_id, symbol), None)
+
+    def is_live(self, exchange_id: str, symbol: str) -> bool:
+        entry = self._symbols.get((exchange_id, symbol))
+        return bool(entry and entry.live)
+
+    def mark_live(self, exchange_id: str, symbol: str, first_trade_ts: int):
+        """스트림이 (재)연결되었습니다. 첫 체결 다음 버킷부터 메모리가 완전합니다."""
+        entry = self._get(exchange_id, symbol)
+        entry.live = True
+        for series in entry.series.values():
+            series.covered_from = series.bucket(first_trade_ts) + series.period
+
+    def mark_gap(self, exchange_id: str, symbol: str):
+        """스트림이 끊겼습니다. 다시 연결될 때까지 메모리 구간을 신뢰하지 않습니다."""
+        entry = self._symbols.get((exchange_id, symbol))
+        if entry is None:
+            return
+        entry.live = False
+        for series in entry.series.values():
+            series.covered_from = None
+
+    def ingest_trades(self, exchange_id: str, symbol: str, trades: List[Dict[str, Any]]) -> int:
+        """체결(CCXT trade 또는 /market/trades 포맷)을 반영합니다. 새로 반영한 체결 수를 반환합니다."""
+        entry = self._get(exchange_id, symbol)
+        base, *higher = [entry.series[tf] for tf in ROLLUP_CHAIN]
+        accepted = 0
+        for trade in trades:
+            ts, price, amount = trade.get("timestamp"), trade.get("price"), trade.get("amount")
+            if ts is None or price is None:
+                continue
+            trade_id = str(trade.get("id"))
+            # 재연결 시 CCXT 캐시가 이전 체결을 다시 돌려주므로 시각/ID로 걸러냅니다.
+            if ts < entry.last_trade_ts or (ts == entry.last_trade_ts and trade_id in entry.last_trade_ids):
+                self._metrics["trades_duplicate"] += 1
+                continue
+            if ts > entry.last_trade_ts:
+                entry.last_trade_ts = ts
+                entry.last_trade_ids = set()
+            entry.last_trade_ids.add(trade_id)
+
+            price = float(price)
+            closed = base.add([ts, price, price, price, price, float(amount or 0.0)])
+            # 하위 봉이 마감될 때만 상위 봉으로 롤업합니다.
+            for series in higher:
+                if closed is None:
+                    break
+                closed = series.add(list(closed))
+            accepted += 1
+        self._metrics["trades_ingested"] += accepted
+        return accepted
+
+    def missing_range(self, exchange_id: str, symbol: str, timeframe: str, since: int) -> Optional[Tuple[int, int]]:
+        """[since, 현재] 중 메모리에 없는 구간 (start, end)을 반환합니다. 모두 있으면 None."""
+        series = self._get(exchange_id, symbol).series[timeframe]
+        start = series.bucket(since)
+        if series.covered_from is None:
+            return start, self.clock()
+        if start >= series.covered_from:
+            return None
+        return start, series.covered_from
+
+    def merge_history(self, exchange_id: str, symbol: str, timeframe: str, rows: List[Candle], since: int):
+        """
+        fetch_ohlcv 결과를 병합합니다.
+        거래소에서 아직 진행 중인 봉과 스트림이 완전히 본 구간(covered_from 이후)은 메모리 값을 우선합니다.
+        받은 봉이 covered_from까지 이어지면 완전 구간을 since까지 넓힙니다.
+        """
+        entry = self._get(exchange_id, symbol)
+        series = entry.series[timeframe]
+        now, cut = self.clock(), series.covered_from
+        accepted = [
+            row for row in rows
+            if row[0] + series.period <= now and (cut is None or row[0] < cut)
+        ]
+        if not accepted:
+            return
+        series.upsert(accepted)
+        self._metrics["history_rows_merged"] += len(accepted)
+        if not entry.live and series.current is not None and series.current[0] <= accepted[-1][0]:
+            series.current = None  # 스트림이 없는 동안 멈춰 있던 봉
+        if cut is not None and rows[-1][0] + series.period >= cut:
+            series.covered_from = max(series.bucket(since), series.times[0])
+
+    def _live_candles(self, entry: SymbolCandles, timeframe: str) -> List[Candle]:
+        """
+        timeframe 기준의 진행 중인 봉. 자기 current와 아직 롤업되지 않은 하위 타임프레임의 current를
+        오래된 것부터 합칩니다. 하위 봉이 이미 다음 버킷에 있으면 봉 두 개가 될 수 있습니다.
+        """
+        period = TIMEFRAMES[timeframe]
+        chain = ROLLUP_CHAIN[:ROLLUP_CHAIN.index(timeframe) + 1]
+        out: List[Candle] = []
+        for tf in reversed(chain):
+            candle = entry.series[tf].current
+            if candle is None:
+                continue
+            start = candle[0] - candle[0] % period
+            if out and start == out[-1][0]:
+                _merge_into(out[-1], candle)
+            elif not out or start > out[-1][0]:
+                out.append([start] + list(candle[1:]))
+        return out
+
+    def window(self, exchange_id: str, symbol: str, timeframe: str, since: int,
+               until: Optional[int] = None, limit: int = 500) -> List[Candle]:
+        """[since, until] 구간의 봉 (오래된 것부터, 최대 limit개 — 넘치면 최근 것 우선)."""
+        entry = self._get(exchange_id, symbol)
+        series = entry.series[timeframe]
+        until = self.clock() if until is None else until
+        candles = list(series.window(since, until))
+        last = candles[-1][0] if candles else (series.times[-1] if series.times else -1)
+        for candle in self._live_candles(entry, timeframe):
+            if since <= candle[0] <= until and candle[0] > last:
+                candles.append(candle)
+        return candles[-limit:] if limit > 0 else candles
+
+
+@dataclass
+class TradeFeed:
+    key_id: str
+    exchange_id: str
+    symbol: str
+    last_used: float = field(default_factory=time.monotonic)
+    task: Optional[asyncio.Task] = None
+
+
+class CandleFeedManager:
+    """
+    심볼 단위 공개 체결 스트림(CCXT Pro watch_trades) 관리자. 받은 체결을 CandleStore에 반영합니다.
+
+    - 키(key_id)당 스트림 클라이언트 하나로 여러 심볼을 구독합니다.
+    - 끊기면 CandleStore에 공백을 표시하고 지수 백오프로 재연결합니다
+      (공백 구간은 다음 /market/candles 요청 시 fetch_ohlcv로 채워집니다).
+    - idle_ttl_sec 동안 요청이 없거나 max_feeds를 넘으면 가장 오래 쓰지 않은 구독부터 정리합니다.
+    """
+
+    def __init__(
+        self,
+        store: CandleStore,
+        credentials_loader: Callable[[str], Awaitable[Dict[str, Any]]],
+        stream_factory: Callable[[str, str, str], Awaitable[Any]],
+        reconnect_backoff: tuple = (1.0, 60.0),
+        idle_ttl_sec: float = 600.0,
+        max_feeds: int = 64,
+    ):
+        self.store = store
+        self.credentials_loader = credentials_loader
+        self.stream_factory = stream_factory
+        self.reconnect_backoff = reconnect_backoff
+        self.idle_ttl_sec = idle_ttl_sec
+        self.max_feeds = max_feeds
+        self._feeds: Dict[Tuple[str, str], TradeFeed] = {}
+        self._clients: Dict[str, Any] = {}
+        self._client_locks: Dict[str, asyncio.Lock] = {}
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {"exchange": f.exchange_id, "symbol": f.symbol, "live": self.store.is_live(f.exchange_id, f.symbol)}
+            for f in self._feeds.values()
+        ]
+
+    async def ensure(self, key_id: str, exchange_id: str, symbol: str):
+        """(거래소, 심볼)의 체결 구독을 보장합니다 (멱등, 연결은 백그라운드에서 진행)."""
+        feed = self._feeds.get((exchange_id, symbol))
+        if feed is not None and feed.task is not None and not feed.task.done():
+            feed.last_used = time.monotonic()
+            return
+        feed = TradeFeed(key_id=key_id, exchange_id=exchange_id, symbol=symbol)
+        feed.task = asyncio.create_task(self._run(feed))
+        self._feeds[(exchange_id, symbol)] = feed
+        await self._evict()
+
+    async def _evict(self):
+        now = time.monotonic()
+        by_age = sorted(self._feeds.values(), key=lambda f: f.last_used)
+        overflow = len(by_age) - self.max_feeds
+        for i, feed in enumerate(by_age):
+            if i < overflow or now - feed.last_used > self.idle_ttl_sec:
+                await self._stop(feed)
+
+    async def _stop(self, feed: TradeFeed):
+        self._feeds.pop((feed.exchange_id, feed.symbol), None)
+        if feed.task is not None:
+            feed.task.cancel()
+            await asyncio.gather(feed.task, return_exceptions=True)
+        self.store.drop(feed.exchange_id, feed.symbol)
+
+    async def _client(self, key_id: str):
+        lock = self._client_locks.setdefault(key_id, asyncio.Lock())
+        async with lock:
+            if key_id not in self._clients:
+                creds = await self.credentials_loader(key_id)
+                self._clients[key_id] = await self.stream_factory(
+                    creds["exchange"], creds["publicKey"], creds["secretKey"]
+                )
+        return self._clients[key_id]
+
+    async def _run(self, feed: TradeFeed):
+        base, cap = self.reconnect_backoff
+        failures = 0
+        while True:
+            try:
+                exchange = await self._client(feed.key_id)
+                trades = await exchange.watch_trades(feed.symbol)
+                if trades and not self.store.is_live(feed.exchange_id, feed.symbol):
+                    self.store.mark_live(feed.exchange_id, feed.symbol, min(t["timestamp"] for t in trades))
+                self.store.ingest_trades(feed.exchange_id, feed.symbol, trades or [])
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                delay = min(base * (2 ** (failures - 1)), cap)
+                print(f"[WARN] Trade stream error for {feed.exchange_id} {feed.symbol}: {e}. Reconnecting in {delay:.1f}s")
+                self.store.mark_gap(feed.exchange_id, feed.symbol)
+                await asyncio.sleep(delay)
+
+    async def close_all(self):
+        for feed in list(self._feeds.values()):
+            await self._stop(feed)
+        for exchange in self._clients.values():
+            await exchange.close()
+        self._clients = {}
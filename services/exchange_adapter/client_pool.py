@@ -0,0 +1,130 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import ccxt.async_support as ccxt
+import httpx
+from fastapi import HTTPException
+
+from services.exchange_adapter.governor import RateLimitGovernor, Priority, weight_of
+
+
+async def fetch_credentials(auth_service_url: str, key_id: str) -> Dict[str, Any]:
+    """AuthService에서 복호화된 키를 가져옵니다. (내부 네트워크 전용)"""
+    async with httpx.AsyncClient() as client:
+        try:
+            resp = await client.get(f"{auth_service_url}/internal/keys/{key_id}/secret")
+        except httpx.RequestError as exc:
+            raise HTTPException(status_code=503, detail=f"AuthService unavailable: {exc}")
+    if resp.status_code != 200:
+        raise HTTPException(status_code=resp.status_code, detail="Failed to retrieve key")
+    return resp.json()
+
+
+@dataclass
+class PooledClient:
+    key_id: str
+    exchange_id: str
+    exchange: Any
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class ExchangeClientPool:
+    """
+    키(key_id) 단위로 자격 증명 + 마켓 정보가 로드된 CCXT 클라이언트를 재사용하는 풀.
+
+    요청마다 반복되던 AuthService 조회, 클라이언트 생성, load_markets()를
+    TTL 동안 한 번으로 줄입니다.
+
+    교체(TTL 만료/무효화)된 클라이언트는 진행 중인 요청이 끝날 수 있도록 retire_grace_sec 뒤에 닫습니다.
+    """
+
+    def __init__(
+        self,
+        auth_service_url: str,
+        client_factory: Callable[[str, str, str], Awaitable[Any]],
+        governor: Optional[RateLimitGovernor] = None,
+        ttl_sec: float = 300.0,
+        retire_grace_sec: float = 60.0,
+    ):
+        self.auth_service_url = auth_service_url
+        self.client_factory = client_factory
+        self.governor = governor
+        self.ttl_sec = ttl_sec
+        self.retire_grace_sec = retire_grace_sec
+        self._clients: Dict[str, PooledClient] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._retiring: Dict[asyncio.Task, PooledClient] = {}
+
+    async def _fetch_credentials(self, key_id: str) -> Dict[str, Any]:
+        return await fetch_credentials(self.auth_service_url, key_id)
+
+    async def get(self, key_id: str) -> PooledClient:
+        entry = self._clients.get(key_id)
+        if entry and time.monotonic() - entry.created_at < self.ttl_sec:
+            return entry
+
+        lock = self._locks.setdefault(key_id, asyncio.Lock())
+        async with lock:
+            entry = self._clients.get(key_id)
+            if entry and time.monotonic() - entry.created_at < self.ttl_sec:
+                return entry
+
+            creds = await self._fetch_credentials(key_id)
+            exchange_id = creds["exchange"]
+            exchange = await self.client_factory(exchange_id, creds["publicKey"], creds["secretKey"])
+            try:
+                if self.governor:
+                    async with self.governor.throttle(exchange_id, key_id, weight_of("load_markets"),
+                                                      Priority.ACCOUNT, exchange=exchange):
+                        await exchange.load_markets()
+                else:
+                    await exchange.load_markets()
+            except Exception:
+                await exchange.close()
+                raise
+
+            stale = self._clients.get(key_id)
+            self._clients[key_id] = PooledClient(key_id=key_id, exchange_id=exchange_id, exchange=exchange)
+            if stale:
+                self._retire(stale)
+            print(f"[INFO] Pooled {exchange_id} client ready for key {key_id}.")
+            return self._clients[key_id]
+
+    def _retire(self, entry: PooledClient):
+        """교체된 클라이언트를 유예 시간 뒤에 닫습니다 (같은 클라이언트로 진행 중인 요청 보호)."""
+        async def close_later():
+            await asyncio.sleep(self.retire_grace_sec)
+            await entry.exchange.close()
+
+        task = asyncio.create_task(close_later())
+        self._retiring[task] = entry
+        task.add_done_callback(lambda t: self._retiring.pop(t, None))
+
+    async def invalidate(self, key_id: str, entry: Optional[PooledClient] = None):
+        """키의 클라이언트를 풀에서 제거합니다. entry를 주면 그 클라이언트가 아직 현재 클라이언트일 때만 제거합니다."""
+        current = self._clients.get(key_id)
+        if current is None or (entry is not None and current is not entry):
+            return
+        del self._clients[key_id]
+        self._retire(current)
+
+    async def report_error(self, pooled: PooledClient, exc: Exception):
+        """
+        요청 실패를 알립니다. 인증 오류(키 교체/폐기)나 네트워크 오류(연결/세션 손상)이면 다음 요청에서
+        자격 증명과 클라이언트를 새로 만들도록 무효화합니다. 레이트 리밋(429/418)은 governor가 처리합니다.
+        """
+        if isinstance(exc, ccxt.DDoSProtection):
+            return
+        if isinstance(exc, (ccxt.AuthenticationError, ccxt.NetworkError)):
+            print(f"[WARN] Invalidating pooled client for key {pooled.key_id}: {type(exc).__name__}")
+            await self.invalidate(pooled.key_id, pooled)
+
+    async def close_all(self):
+        for key_id in list(self._clients.keys()):
+            entry = self._clients.pop(key_id)
+            await entry.exchange.close()
+        for task, entry in list(self._retiring.items()):
+            task.cancel()
+            await entry.exchange.close()
@@ -0,0 +1,307 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Dict, Optional, Tuple
+
+import ccxt.async_support as ccxt
+from fastapi import HTTPException
+
+
+class Priority(IntEnum):
+    """요청 우선순위. 값이 작을수록 먼저 처리됩니다."""
+    ORDER = 0        # 주문 생성/취소
+    ACCOUNT = 1      # 잔고/주문 조회
+    MARKET_DATA = 2  # 시세/호가/체결
+
+
+# 거래소별 한도. weight_per_min은 IP 단위(모든 키 공유), orders_per_10s는 계정(키) 단위.
+EXCHANGE_LIMITS: Dict[str, Dict[str, float]] = {
+    "binance": {"weight_per_min": 6000, "orders_per_10s": 50},
+}
+DEFAULT_LIMITS = {"weight_per_min": 1200, "orders_per_10s": 10}
+
+# CCXT 호출별 요청 가중치 (Binance Spot 기준 근사치)
+CALL_WEIGHTS: Dict[str, int] = {
+    "load_markets": 20,
+    "fetch_ticker": 2,
+    "fetch_bids_asks": 2,
+    "fetch_tickers": 80,
+    "fetch_trades": 25,
+    "fetch_ohlcv": 2,
+    "fetch_balance": 20,
+    "fetch_order": 4,
+    "fetch_orders": 20,
+    "fetch_my_trades": 20,
+    "create_order": 1,
+    "cancel_order": 1,
+}
+
+# 우선순위별 예약분: 낮은 우선순위 요청은 버킷에 이 비율만큼의 여유를 남겨야 합니다.
+PRIORITY_RESERVE_RATIO = {
+    Priority.ORDER: 0.0,
+    Priority.ACCOUNT: 0.1,
+    Priority.MARKET_DATA: 0.2,
+}
+
+# 429 / 418 수신 시 지수 백오프 기본값과 상한 (초)
+BACKOFF_429 = (1.0, 60.0)
+BACKOFF_418 = (120.0, 3600.0)
+
+
+def depth_weight(limit: int) -> int:
+    """오더북 조회 가중치는 limit에 따라 달라집니다."""
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+def weight_of(*calls: str) -> int:
+    return sum(CALL_WEIGHTS.get(c, 1) for c in calls)
+
+
+class TokenBucket:
+    """연속 리필 방식의 토큰 버킷."""
+
+    def __init__(self, capacity: float, refill_per_sec: float, clock=time.monotonic):
+        self.capacity = float(capacity)
+        self.refill_per_sec = float(refill_per_sec)
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_sec)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def wait_time(self, weight: float, reserve: float = 0.0) -> float:
+        """weight만큼 소비하면서 reserve를 남기려면 기다려야 하는 시간(초)."""
+        self._refill()
+        deficit = (weight + reserve) - self._tokens
+        if deficit <= 0:
+            return 0.0
+        if weight + reserve > self.capacity:
+            # 예약분 때문에 영원히 불가능한 경우 예약 없이 가득 찰 때까지 기다립니다.
+            deficit = weight - self._tokens
+            if deficit <= 0:
+                return 0.0
+        return deficit / self.refill_per_sec
+
+    def take(self, weight: float):
+        self._refill()
+        self._tokens -= weight
+
+    def drain(self):
+        self._refill()
+        self._tokens = min(self._tokens, 0.0)
+
+    def sync_used(self, used: float):
+        """거래소가 알려준 사용량으로 잔여 토큰을 보정합니다 (더 보수적인 쪽으로만)."""
+        self._refill()
+        self._tokens = min(self._tokens, self.capacity - used)
+
+
+@dataclass
+class _BackoffState:
+    until: float = 0.0
+    strikes: int = 0
+
+
+class RateLimited(HTTPException):
+    """Governor 예산 초과 또는 거래소 429/418 응답을 나타냅니다 (HTTP 429)."""
+
+    def __init__(self, detail: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(status_code=429, detail=detail, headers=headers)
+
+
+class RateLimitGovernor:
+    """
+    거래소(IP) 단위 / 키(계정) 단위로 공유되는 중앙 토큰 버킷 Governor.
+
+    - 모든 봇의 요청이 같은 버킷을 통과하므로 Fleet 전체가 거래소 한도를 넘지 않습니다.
+    - 주문(ORDER)은 시세(MARKET_DATA)보다 우선하며, 시세 요청은 예약분을 침범하지 못합니다.
+    - 429/418 응답 시 거래소 단위로 지수 백오프를 적용합니다.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None, clock=time.monotonic):
+        self.limits = limits if limits is not None else EXCHANGE_LIMITS
+        self._clock = clock
+        self._weight_buckets: Dict[str, TokenBucket] = {}
+        self._order_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._backoff: Dict[str, _BackoffState] = {}
+        # 거래소 가중치 버킷을 기다리는 요청 수 (우선순위별). 키 단위 주문 버킷만 기다리는 요청은 세지 않습니다.
+        self._waiting: Dict[str, Dict[Priority, int]] = {}
+
+    def _limits_for(self, exchange_id: str) -> Dict[str, float]:
+        return self.limits.get(exchange_id, DEFAULT_LIMITS)
+
+    def weight_bucket(self, exchange_id: str) -> TokenBucket:
+        bucket = self._weight_buckets.get(exchange_id)
+        if bucket is None:
+            cap = self._limits_for(exchange_id)["weight_per_min"]
+            bucket = TokenBucket(cap, cap / 60.0, self._clock)
+            self._weight_buckets[exchange_id] = bucket
+        return bucket
+
+    def order_bucket(self, exchange_id: str, key_id: str) -> TokenBucket:
+        k = (exchange_id, key_id)
+        bucket = self._order_buckets.get(k)
+        if bucket is None:
+            cap = self._limits_for(exchange_id)["orders_per_10s"]
+            bucket = TokenBucket(cap, cap / 10.0, self._clock)
+            self._order_buckets[k] = bucket
+        return bucket
+
+    def backoff_remaining(self, exchange_id: str) -> float:
+        state = self._backoff.get(exchange_id)
+        if not state:
+            return 0.0
+        return max(0.0, state.until - self._clock())
+
+    def _higher_priority_waiting(self, exchange_id: str, priority: Priority) -> bool:
+        waiting = self._waiting.get(exchange_id) or {}
+        return any(count > 0 for p, count in waiting.items() if p < priority)
+
+    async def acquire(
+        self,
+        exchange_id: str,
+        key_id: str,
+        weight: int,
+        priority: Priority = Priority.MARKET_DATA,
+        orders: int = 0,
+        max_wait: float = 10.0,
+    ):
+        """
+        예산이 확보될 때까지 대기한 뒤 가중치를 차감합니다.
+        max_wait 안에 확보하지 못하면 RateLimited를 발생시킵니다.
+        """
+        weights = self.weight_bucket(exchange_id)
+        order_bucket = self.order_bucket(exchange_id, key_id) if orders else None
+        reserve = weights.capacity * PRIORITY_RESERVE_RATIO[priority]
+        deadline = self._clock() + max_wait
+
+        waiting = self._waiting.setdefault(exchange_id, {})
+        counted = False
+        try:
+            while True:
+                wait = self.backoff_remaining(exchange_id)
+                if wait <= 0:
+                    if self._higher_priority_waiting(exchange_id, priority):
+                        wait = 0.05
+                    else:
+                        weight_wait = weights.wait_time(weight, reserve)
+                        order_wait = order_bucket.wait_time(orders) if order_bucket is not None else 0.0
+                        if weight_wait <= 0 and order_wait <= 0:
+                            weights.take(weight)
+                            if order_bucket is not None:
+                                order_bucket.take(orders)
+                            return
+                        # 같은 가중치 버킷을 두고 경쟁할 때만 낮은 우선순위 요청이 양보합니다.
+                        if (weight_wait > 0) != counted:
+                            counted = weight_wait > 0
+                            waiting[priority] = waiting.get(priority, 0) + (1 if counted else -1)
+                        wait = max(weight_wait, order_wait)
+
+                if self._clock() + wait > deadline:
+                    raise RateLimited(
+                        f"Rate limit budget exhausted for {exchange_id} (priority={priority.name})",
+                        headers=self.headers(exchange_id, key_id, retry_after=wait),
+                    )
+                await asyncio.sleep(min(max(wait, 0.01), 1.0))
+        finally:
+            if counted:
+                waiting[priority] -= 1
+
+    def record_success(self, exchange_id: str):
+        state = self._backoff.get(exchange_id)
+        if state and state.strikes and self._clock() >= state.until:
+            state.strikes -= 1
+
+    def record_rate_limited(self, exchange_id: str, status_code: int, retry_after: Optional[float] = None) -> float:
+        """429/418 수신 시 백오프를 설정하고 적용된 지연(초)을 반환합니다."""
+        state = self._backoff.setdefault(exchange_id, _BackoffState())
+        state.strikes += 1
+        base, cap = BACKOFF_418 if status_code == 418 else BACKOFF_429
+        delay = retry_after if retry_after else min(base * (2 ** (state.strikes - 1)), cap)
+        state.until = max(state.until, self._clock() + delay)
+        # 거래소가 한도 초과를 알렸으므로 로컬 예산도 비웁니다.
+        self.weight_bucket(exchange_id).drain()
+        print(f"[WARN] {exchange_id} returned {status_code}. Backing off for {delay:.1f}s (strikes={state.strikes})")
+        return delay
+
+    def observe_headers(self, exchange_id: str, headers: Optional[Dict[str, Any]]):
+        """거래소 응답 헤더(x-mbx-used-weight-1m 등)로 실제 사용량을 동기화합니다."""
+        if not headers:
+            return
+        for k, v in headers.items():
+            if str(k).lower() == "x-mbx-used-weight-1m":
+                try:
+                    self.weight_bucket(exchange_id).sync_used(float(v))
+                except (TypeError, ValueError):
+                    pass
+                return
+
+    def headers(self, exchange_id: str, key_id: str, retry_after: Optional[float] = None) -> Dict[str, str]:
+        """클라이언트에 전달할 잔여 예산 헤더."""
+        weights = self.weight_bucket(exchange_id)
+        orders = self.order_bucket(exchange_id, key_id)
+        result = {
+            "X-RateLimit-Limit": str(int(weights.capacity)),
+            "X-RateLimit-Remaining": str(max(0, int(weights.available))),
+            "X-RateLimit-Order-Limit": str(int(orders.capacity)),
+            "X-RateLimit-Order-Remaining": str(max(0, int(orders.available))),
+        }
+        wait = max(retry_after or 0.0, self.backoff_remaining(exchange_id))
+        if wait > 0:
+            result["Retry-After"] = str(int(wait) + 1)
+        return result
+
+    @asynccontextmanager
+    async def throttle(
+        self,
+        exchange_id: str,
+        key_id: str,
+        weight: int,
+        priority: Priority = Priority.MARKET_DATA,
+        orders: int = 0,
+        exchange=None,
+        max_wait: float = 10.0,
+    ):
+        """
+        acquire() + 결과 관찰을 묶은 컨텍스트 매니저.
+        블록 안에서 발생한 CCXT 429/418 예외는 백오프로 기록된 뒤 RateLimited로 변환됩니다.
+        """
+        await self.acquire(exchange_id, key_id, weight, priority, orders, max_wait)
+        try:
+            yield
+        except ccxt.DDoSProtection as e:
+            # CCXT: 429 -> RateLimitExceeded, 418 -> DDoSProtection
+            status_code = 429 if isinstance(e, ccxt.RateLimitExceeded) else 418
+            retry_after = None
+            if exchange is not None:
+                for k, v in (exchange.last_response_headers or {}).items():
+                    if str(k).lower() == "retry-after":
+                        try:
+                            retry_after = float(v)
+                        except (TypeError, ValueError):
+                            pass
+            delay = self.record_rate_limited(exchange_id, status_code, retry_after)
+            raise RateLimited(str(e), headers=self.headers(exchange_id, key_id, retry_after=delay))
+        else:
+            self.record_success(exchange_id)
+        finally:
+            if exchange is not None:
+                self.observe_headers(exchange_id, exchange.last_response_headers)
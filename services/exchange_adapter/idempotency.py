@@ -0,0 +1,79 @@
+import asyncio
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# 주문 요청 상태
+IN_FLIGHT = "IN_FLIGHT"  # 거래소로 전송 중이거나 결과를 모름 (타임아웃 등)
+COMPLETED = "COMPLETED"  # 거래소가 주문을 접수함 -> 응답 저장
+REJECTED = "REJECTED"    # 거래소가 명시적으로 거절함 -> 오류 저장
+
+
+class IdempotencyStore:
+    """
+    clientOrderId 단위 주문 멱등성 테이블 (SQLite).
+
+    같은 (key_id, client_order_id)로 재시도된 주문은 거래소로 다시 보내지 않고
+    최초 결과를 그대로 반환합니다. 어댑터가 재시작되어도 유지되도록 파일에 저장합니다.
+    """
+
+    def __init__(self, db_path: str = ":memory:", ttl_sec: float = 86400.0):
+        self.ttl_sec = ttl_sec
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS order_requests (
+                key_id TEXT NOT NULL,
+                client_order_id TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                state TEXT NOT NULL,
+                response_json TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (key_id, client_order_id)
+            )
+            """
+        )
+        self._conn.commit()
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def lock(self, key_id: str, client_order_id: str) -> asyncio.Lock:
+        """같은 clientOrderId의 동시 재시도를 직렬화하기 위한 락."""
+        return self._locks.setdefault((key_id, client_order_id), asyncio.Lock())
+
+    def get(self, key_id: str, client_order_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT symbol, state, response_json FROM order_requests WHERE key_id = ? AND client_order_id = ?",
+            (key_id, client_order_id),
+        ).fetchone()
+        if row is None:
+            return None
+        symbol, state, response_json = row
+        return {
+            "symbol": symbol,
+            "state": state,
+            "response": json.loads(response_json) if response_json else None,
+        }
+
+    def begin(self, key_id: str, client_order_id: str, symbol: str):
+        self._purge()
+        self._conn.execute(
+            "INSERT OR IGNORE INTO order_requests (key_id, client_order_id, symbol, state, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key_id, client_order_id, symbol, IN_FLIGHT, time.time()),
+        )
+        self._conn.commit()
+
+    def finish(self, key_id: str, client_order_id: str, state: str, response: Dict[str, Any]):
+        self._conn.execute(
+            "UPDATE order_requests SET state = ?, response_json = ? WHERE key_id = ? AND client_order_id = ?",
+            (state, json.dumps(response, default=str), key_id, client_order_id),
+        )
+        self._conn.commit()
+        self._locks.pop((key_id, client_order_id), None)
+
+    def _purge(self):
+        self._conn.execute("DELETE FROM order_requests WHERE created_at < ?", (time.time() - self.ttl_sec,))
+
+    def close(self):
+        self._conn.close()
@@ -1,14 +1,31 @@
 import ccxt.async_support as ccxt
-from fastapi import FastAPI, HTTPException
+import ccxt.pro as ccxtpro
+from fastapi import FastAPI, HTTPException, Response
+import asyncio
 import os
 import httpx
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-
-app = FastAPI(title="Exchange Adapter Service", version="1.0.0")
+from services.exchange_adapter.governor import RateLimitGovernor, Priority, weight_of, depth_weight
+from services.exchange_adapter.client_pool import ExchangeClientPool, fetch_credentials
+from services.exchange_adapter.user_stream import UserStreamManager, normalize_fill
+from services.exchange_adapter.idempotency import IdempotencyStore, COMPLETED, REJECTED
+from services.exchange_adapter.candles import CandleStore, CandleFeedManager, TIMEFRAMES
+from services.exchange_adapter.book_features import (
+    BookFeatureCache, DEFAULT_DEPTH_PCTS, DEFAULT_IMBALANCE_LEVELS, DEFAULT_WALL_RATIO,
+)
 
 # AuthService URL (내부 도커 네트워크)
 AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://auth-service:8000")
+# User Data Stream 이벤트(체결/잔고)를 푸시할 ExecutionService URL
+EXECUTION_SERVICE_URL = os.getenv("EXECUTION_SERVICE_URL", "http://execution-service:8000")
+
+# 모든 봇/요청이 공유하는 거래소 단위 Rate Limit Governor
+governor = RateLimitGovernor()
+
+# clientOrderId 단위 주문 멱등성 테이블 (재시작 후에도 유지하려면 파일 경로 지정)
+idempotency = IdempotencyStore(os.getenv("IDEMPOTENCY_DB_PATH", ":memory:"))
 
 class AssetBalance(BaseModel):
     asset: str
@@ -29,7 +46,9 @@ async def get_exchange_client(exchange_id: str, api_key: str, secret: str):
     exchange = exchange_class({
         'apiKey': api_key,
         'secret': secret,
-        'enableRateLimit': True,
+        # 요청마다 새 클라이언트가 생성되어 CCXT 내장 throttler는 효과가 없으므로,
+        # 속도 제어는 중앙 governor가 전담합니다.
+        'enableRateLimit': False,
         'options': {
             'adjustForTimeDifference': True, # 서버 시간과 로컬 시간 동기화 유지
             'defaultType': 'spot' 
@@ -37,8 +56,54 @@ async def get_exchange_client(exchange_id: str, api_key: str, secret: str):
     })
     return exchange
 
+async def get_stream_client(exchange_id: str, api_key: str, secret: str):
+    # User Data Stream용 CCXT Pro(WebSocket) 클라이언트
+    if not hasattr(ccxtpro, exchange_id):
+        raise HTTPException(status_code=400, detail=f"User data stream not supported: {exchange_id}")
+
+    exchange_class = getattr(ccxtpro, exchange_id)
+    return exchange_class({
+        'apiKey': api_key,
+        'secret': secret,
+        'options': {
+            'adjustForTimeDifference': True,
+            'defaultType': 'spot'
+        }
+    })
+
+# 키 단위 CCXT 클라이언트 풀 (시세 조회용)
+client_pool = ExchangeClientPool(AUTH_SERVICE_URL, get_exchange_client, governor=governor)
+
+# 키 단위 User Data Stream (체결/잔고 이벤트 -> ExecutionService 푸시)
+user_streams = UserStreamManager(
+    credentials_loader=lambda key_id: fetch_credentials(AUTH_SERVICE_URL, key_id),
+    stream_factory=get_stream_client,
+    sink_url=f"{EXECUTION_SERVICE_URL}/events/user-stream",
+)
+
+# 심볼/타임프레임 단위 봉 캐시 (공개 체결 스트림으로 갱신, 과거 구간은 fetch_ohlcv로 보충)
+candle_store = CandleStore(max_candles=int(os.getenv("CANDLE_CACHE_SIZE", "1500")))
+candle_feeds = CandleFeedManager(
+    candle_store,
+    credentials_loader=lambda key_id: fetch_credentials(AUTH_SERVICE_URL, key_id),
+    stream_factory=get_stream_client,
+)
+
+# 오더북 버전 단위 파생 지표 캐시 (/market/book-features)
+book_features = BookFeatureCache(max_entries=int(os.getenv("BOOK_FEATURE_CACHE_SIZE", "512")))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await candle_feeds.close_all()
+    await user_streams.close_all()
+    await client_pool.close_all()
+    idempotency.close()
+
+app = FastAPI(title="Exchange Adapter Service", version="1.0.0", lifespan=lifespan)
+
 @app.get("/balance/{key_id}", response_model=AccountBalance)
-async def get_balance(key_id: str):
+async def get_balance(key_id: str, response: Response):
     # 1. Get Credentials from AuthService
     async with httpx.AsyncClient() as client:
         try:
@@ -70,12 +135,14 @@ async def get_balance(key_id: str):
     try:
         # 3. 연결 및 시간 동기화 확인
         # load_markets()가 'adjustForTimeDifference' 옵션을 통해 시간 동기화를 수행함
-        await exchange.load_markets() 
-        print(f"[정보] {exchange_id} 연결 성공. 시간 동기화 완료.")
-
-        # 4. 잔고 조회
-        print(f"[INFO] Fetching balance for key {key_id}...")
-        balance = await exchange.fetch_balance()
+        async with governor.throttle(exchange_id, key_id, weight_of("load_markets", "fetch_balance"),
+                                     Priority.ACCOUNT, exchange=exchange):
+            await exchange.load_markets() 
+            print(f"[정보] {exchange_id} 연결 성공. 시간 동기화 완료.")
+
+            # 4. 잔고 조회
+            print(f"[INFO] Fetching balance for key {key_id}...")
+            balance = await exchange.fetch_balance()
         #print(f"[DEBUG] Raw Balance for key {key_id}: {balance}")
         
         # 5. Normalize & Calculate Value
@@ -104,7 +171,9 @@ async def get_balance(key_id: str):
             if symbols_to_fetch:
                 try:
                     print(f"[INFO] Fetching tickers for: {symbols_to_fetch}")
-                    tickers = await exchange.fetch_tickers(symbols_to_fetch)
+                    async with governor.throttle(exchange_id, key_id, weight_of("fetch_tickers"),
+                                                 Priority.MARKET_DATA, exchange=exchange):
+                        tickers = await exchange.fetch_tickers(symbols_to_fetch)
                     for symbol, ticker in tickers.items():
                         # Extract base currency from symbol (e.g. BTC from BTC/USDT)
                         base_currency = symbol.split('/')[0]
@@ -135,8 +204,11 @@ async def get_balance(key_id: str):
                     usdtValue=val 
                 ))
         
+        response.headers.update(governor.headers(exchange_id, key_id))
         return AccountBalance(totalUsdtValue=total_usdt, assets=assets)
 
+    except HTTPException:
+        raise
     except Exception as e:
         import datetime
         print(f"[ERROR] Time: {datetime.datetime.now()} | Exchange Error: {exchange_id} {str(e)}")
@@ -153,154 +225,785 @@ class OrderRequest(BaseModel):
     amount: float
     order_type: str = 'market'
     price: Optional[float] = None
+    client_order_id: Optional[str] = None # 로컬 주문 ID (멱등 키, 거래소 clientOrderId로 전달)
 
-@app.get("/market/depth")
-async def get_depth(key_id: str, symbol: str, limit: int = 50):
-    # 1. 자격 증명 조회 (거래소 라우팅 용도)
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(f"{AUTH_SERVICE_URL}/internal/keys/{key_id}/secret")
-            if resp.status_code != 200:
-                raise HTTPException(status_code=resp.status_code, detail="Failed to retrieve key")
-            creds = resp.json()
-        except Exception as e:
-            raise HTTPException(status_code=503, detail=str(e))
+class BatchOrderItem(BaseModel):
+    side: str
+    amount: float
+    order_type: str = 'limit'
+    price: Optional[float] = None
+    client_order_id: Optional[str] = None
 
-    exchange_id = creds["exchange"]
-    exchange = await get_exchange_client(exchange_id, creds["publicKey"], creds["secretKey"])
+class BatchOrderRequest(BaseModel):
+    key_id: str
+    symbol: str
+    orders: List[BatchOrderItem]
 
+class CancelOrdersRequest(BaseModel):
+    key_id: str
+    symbol: str
+    order_ids: List[str]
+
+def _normalize_depth(symbol: str, ob: Dict[str, Any]) -> Dict[str, Any]:
+    bids = ob.get("bids") or []
+    asks = ob.get("asks") or []
+
+    best_bid = float(bids[0][0]) if bids else None
+    best_ask = float(asks[0][0]) if asks else None
+
+    return {
+        "symbol": symbol,
+        "timestamp": ob.get("timestamp"),
+        "best_bid": best_bid,
+        "best_ask": best_ask,
+        "bids": bids,
+        "asks": asks,
+    }
+
+
+def _normalize_top_of_book(symbol: str, book_ticker: Dict[str, Any]) -> Dict[str, Any]:
+    # Depth와 동일한 포맷을 유지하되 레벨은 최우선 호가 1개만 포함합니다.
+    bid, ask = book_ticker.get("bid"), book_ticker.get("ask")
+    best_bid = float(bid) if bid is not None else None
+    best_ask = float(ask) if ask is not None else None
+
+    return {
+        "symbol": symbol,
+        "timestamp": book_ticker.get("timestamp"),
+        "best_bid": best_bid,
+        "best_ask": best_ask,
+        "bids": [[best_bid, book_ticker.get("bidVolume")]] if best_bid is not None else [],
+        "asks": [[best_ask, book_ticker.get("askVolume")]] if best_ask is not None else [],
+    }
+
+
+DEPTH_MODES = ("full", "top")
+
+
+def _depth_request_weight(limit: int, mode: str) -> int:
+    return weight_of("fetch_bids_asks") if mode == "top" else depth_weight(limit)
+
+
+async def _fetch_depth(exchange, symbol: str, limit: int, mode: str) -> Dict[str, Any]:
+    """
+    mode='full': limit 레벨의 오더북.
+    mode='top': 거래소 book-ticker(최우선 호가) 엔드포인트 기반의 경량 조회.
+    """
+    if mode == "top":
+        if exchange.has.get("fetchBidsAsks"):
+            book_tickers = await exchange.fetch_bids_asks([symbol])
+            return _normalize_top_of_book(symbol, book_tickers.get(symbol) or {})
+        # book-ticker 미지원 거래소는 최소 depth로 대체합니다.
+        ob = await exchange.fetch_order_book(symbol, limit=5)
+        depth = _normalize_depth(symbol, ob)
+        depth["bids"], depth["asks"] = depth["bids"][:1], depth["asks"][:1]
+        return depth
+    ob = await exchange.fetch_order_book(symbol, limit=limit)
+    return _normalize_depth(symbol, ob)
+
+
+def _parse_trade_cursor(since: Optional[str]):
+    """
+    since 커서를 해석합니다.
+    - "id:<trade_id>": 해당 체결 ID 이후(초과)의 체결만 반환
+    - "<ms>" 또는 "ts:<ms>": 해당 시각(ms) 이후의 체결만 반환
+    반환: (trade_id, timestamp_ms)
+    """
+    if not since:
+        return None, None
+    if since.startswith("id:"):
+        return since[3:], None
+    if since.startswith("ts:"):
+        since = since[3:]
     try:
-        await exchange.load_markets()
-        ob = await exchange.fetch_order_book(symbol, limit=limit)
-        bids = ob.get("bids") or []
-        asks = ob.get("asks") or []
+        return None, int(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid since cursor: {since}")
 
-        best_bid = float(bids[0][0]) if bids else None
-        best_ask = float(asks[0][0]) if asks else None
 
-        return {
-            "symbol": symbol,
-            "timestamp": ob.get("timestamp"),
-            "best_bid": best_bid,
-            "best_ask": best_ask,
-            "bids": bids,
-            "asks": asks,
+def _trade_id_after(trade_id: Any, cursor_id: str) -> bool:
+    try:
+        return int(trade_id) > int(cursor_id)
+    except (TypeError, ValueError):
+        return str(trade_id) > cursor_id
+
+
+async def _fetch_trades(exchange, symbol: str, limit: int, since: Optional[str]) -> Dict[str, Any]:
+    cursor_id, cursor_ts = _parse_trade_cursor(since)
+
+    params = {}
+    if cursor_id is not None and exchange.id == "binance":
+        # Binance aggTrades는 fromId(포함)를 지원하므로 서버 측에서 걸러냅니다.
+        try:
+            params["fromId"] = int(cursor_id) + 1
+        except ValueError:
+            pass
+    trades = await exchange.fetch_trades(symbol, since=cursor_ts, limit=limit, params=params)
+
+    # 거래소가 커서를 지원하지 않는 경우를 대비해 로컬에서도 한 번 더 필터링합니다.
+    if cursor_id is not None:
+        trades = [t for t in trades or [] if _trade_id_after(t.get("id"), cursor_id)]
+    elif cursor_ts is not None:
+        trades = [t for t in trades or [] if (t.get("timestamp") or 0) >= cursor_ts]
+
+    result = _normalize_trades(symbol, trades)
+    last = result["trades"][-1] if result["trades"] else None
+    result["next_cursor"] = f"id:{last['id']}" if last and last.get("id") is not None else since
+    return result
+
+
+def _normalize_trades(symbol: str, trades: List[Dict[str, Any]]) -> Dict[str, Any]:
+    normalized = []
+    for t in trades or []:
+        side = t.get("side")
+        if side is not None:
+            side = side.lower()
+        normalized.append(
+            {
+                "id": t.get("id"),
+                "timestamp": t.get("timestamp"),
+                "price": t.get("price"),
+                "amount": t.get("amount"),
+                "side": side,
+            }
+        )
+
+    return {"symbol": symbol, "trades": normalized}
+
+
+def _normalize_ticker(exchange, symbol: str, ticker: Dict[str, Any]) -> Dict[str, Any]:
+    # 제약조건(Limits) 추출
+    market = exchange.market(symbol)
+    min_notional = market.get('limits', {}).get('cost', {}).get('min')
+    min_amount = market.get('limits', {}).get('amount', {}).get('min')
+
+    return {
+        "symbol": symbol, 
+        "price": ticker['last'],
+        "limits": {
+            "min_notional": min_notional,
+            "min_amount": min_amount
         }
+    }
+
+
+@app.get("/market/depth")
+async def get_depth(key_id: str, symbol: str, response: Response, limit: int = 50, mode: str = "full"):
+    if mode not in DEPTH_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported depth mode: {mode}")
+
+    # 풀링된 클라이언트 사용 (자격 증명 조회 및 load_markets는 TTL 동안 1회)
+    pooled = await client_pool.get(key_id)
+    exchange = pooled.exchange
+
+    try:
+        async with governor.throttle(pooled.exchange_id, key_id, _depth_request_weight(limit, mode),
+                                     Priority.MARKET_DATA, exchange=exchange):
+            depth = await _fetch_depth(exchange, symbol, limit, mode)
+
+        response.headers.update(governor.headers(pooled.exchange_id, key_id))
+        return depth
+    except HTTPException:
+        raise
     except Exception as e:
+        await client_pool.report_error(pooled, e)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await exchange.close()
 
 
-@app.get("/market/trades")
-async def get_trades(key_id: str, symbol: str, limit: int = 100) -> Dict[str, Any]:
-    # 1. 자격 증명 조회 (거래소 라우팅 용도)
-    async with httpx.AsyncClient() as client:
+def _parse_number_list(raw: Optional[str], default, cast, name: str):
+    if raw is None:
+        return default
+    try:
+        values = tuple(cast(v) for v in raw.split(",") if v.strip())
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {raw}")
+    if not values or any(v <= 0 for v in values):
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {raw}")
+    return values
+
+
+@app.get("/market/book-features")
+async def get_book_features(
+    key_id: str,
+    symbol: str,
+    response: Response,
+    limit: int = 100,
+    levels: Optional[str] = None,
+    pcts: Optional[str] = None,
+    wall_ratio: float = DEFAULT_WALL_RATIO,
+    size: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    오더북 파생 지표(레벨별 불균형, 마이크로프라이스, ±x% 누적 depth, 유동성 벽, size 시장가 충격 비용)를
+    서버에서 계산하여 반환합니다. 결과는 오더북 버전 단위로 캐시됩니다.
+    """
+    level_list = _parse_number_list(levels, DEFAULT_IMBALANCE_LEVELS, int, "levels")
+    pct_list = _parse_number_list(pcts, DEFAULT_DEPTH_PCTS, float, "pcts")
+    if wall_ratio <= 0 or (size is not None and size <= 0):
+        raise HTTPException(status_code=400, detail="wall_ratio and size must be positive")
+
+    pooled = await client_pool.get(key_id)
+    exchange = pooled.exchange
+
+    try:
+        async with governor.throttle(pooled.exchange_id, key_id, depth_weight(limit),
+                                     Priority.MARKET_DATA, exchange=exchange):
+            ob = await exchange.fetch_order_book(symbol, limit=limit)
+
         try:
-            resp = await client.get(f"{AUTH_SERVICE_URL}/internal/keys/{key_id}/secret")
-            if resp.status_code != 200:
-                raise HTTPException(status_code=resp.status_code, detail="Failed to retrieve key")
-            creds = resp.json()
-        except Exception as e:
+            features = book_features.get_or_compute(
+                pooled.exchange_id, symbol, ob, levels=level_list, pcts=pct_list, wall_ratio=wall_ratio, size=size,
+            )
+        except ValueError as e:
             raise HTTPException(status_code=503, detail=str(e))
 
-    exchange_id = creds["exchange"]
-    exchange = await get_exchange_client(exchange_id, creds["publicKey"], creds["secretKey"])
+        response.headers.update(governor.headers(pooled.exchange_id, key_id))
+        return {"symbol": symbol, "timestamp": ob.get("timestamp"), **features}
+    except HTTPException:
+        raise
+    except Exception as e:
+        await client_pool.report_error(pooled, e)
+        raise HTTPException(status_code=500, detail=str(e))
 
-    try:
-        await exchange.load_markets()
-        trades = await exchange.fetch_trades(symbol, limit=limit)
-
-        normalized = []
-        for t in trades or []:
-            side = t.get("side")
-            if side is not None:
-                side = side.lower()
-            normalized.append(
-                {
-                    "timestamp": t.get("timestamp"),
-                    "price": t.get("price"),
-                    "amount": t.get("amount"),
-                    "side": side,
-                }
-            )
 
-        return {"symbol": symbol, "trades": normalized}
+@app.get("/market/trades")
+async def get_trades(
+    key_id: str, symbol: str, response: Response, limit: int = 100, since: Optional[str] = None
+) -> Dict[str, Any]:
+    pooled = await client_pool.get(key_id)
+    exchange = pooled.exchange
+
+    try:
+        async with governor.throttle(pooled.exchange_id, key_id, weight_of("fetch_trades"),
+                                     Priority.MARKET_DATA, exchange=exchange):
+            trades = await _fetch_trades(exchange, symbol, limit, since)
+
+        response.headers.update(governor.headers(pooled.exchange_id, key_id))
+        return trades
+    except HTTPException:
+        raise
     except Exception as e:
+        await client_pool.report_error(pooled, e)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await exchange.close()
 
-@app.get("/market/ticker")
-async def get_ticker(key_id: str, symbol: str):    # 거래소 컨텍스트를 파악하기 위해 key_id 필요
-    # 1. 자격 증명 조회 (주로 거래소 라우팅 용도)
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(f"{AUTH_SERVICE_URL}/internal/keys/{key_id}/secret")
-            if resp.status_code != 200:
-                raise HTTPException(status_code=resp.status_code, detail="Failed to retrieve key")
-            creds = resp.json()
-        except Exception as e:
-             raise HTTPException(status_code=503, detail=str(e))
 
-    exchange_id = creds['exchange']
-    exchange = await get_exchange_client(exchange_id, creds['publicKey'], creds['secretKey'])
+@app.get("/market/ticker")
+async def get_ticker(key_id: str, symbol: str, response: Response):    # 거래소 컨텍스트를 파악하기 위해 key_id 필요
+    # 마켓 정보(Limits)는 풀링된 클라이언트에 이미 로드되어 있음
+    pooled = await client_pool.get(key_id)
+    exchange = pooled.exchange
     
     try:
-        # 마켓 정보를 로드하여 제약조건(Limits) 확인
-        await exchange.load_markets()
-        ticker = await exchange.fetch_ticker(symbol)
-        
-        # 제약조건(Limits) 추출
-        market = exchange.market(symbol)
-        min_notional = market.get('limits', {}).get('cost', {}).get('min')
-        min_amount = market.get('limits', {}).get('amount', {}).get('min')
+        async with governor.throttle(pooled.exchange_id, key_id, weight_of("fetch_ticker"),
+                                     Priority.MARKET_DATA, exchange=exchange):
+            ticker = await exchange.fetch_ticker(symbol)
+
+        response.headers.update(governor.headers(pooled.exchange_id, key_id))
+        return _normalize_ticker(exchange, symbol, ticker)
+    except HTTPException:
+        raise
+    except Exception as e:
+        await client_pool.report_error(pooled, e)
+        raise HTTPException(status_code=500, detail=str(e))
 
+
+# fetch_ohlcv 한 번에 받을 최대 봉 수와 한 요청에서 허용하는 최대 페이지 수
+OHLCV_PAGE_LIMIT = 1000
+OHLCV_MAX_PAGES = 5
+
+
+def _ohlcv_pages(timeframe: str, start: int, end: int) -> int:
+    count = max(1, -(-(end - start) // TIMEFRAMES[timeframe]))
+    return min(OHLCV_MAX_PAGES, -(-count // OHLCV_PAGE_LIMIT))
+
+
+async def _fetch_ohlcv_range(exchange, symbol: str, timeframe: str, start: int, end: int) -> List[List[float]]:
+    """[start, end) 구간의 봉을 페이지 단위로 가져옵니다 (최대 OHLCV_MAX_PAGES 페이지)."""
+    rows: List[List[float]] = []
+    since = start
+    for _ in range(_ohlcv_pages(timeframe, start, end)):
+        page = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=OHLCV_PAGE_LIMIT)
+        page = [r for r in page or [] if r[0] >= since]
+        if not page:
+            break
+        rows.extend(page)
+        since = page[-1][0] + TIMEFRAMES[timeframe]
+        if since >= end:
+            break
+    return rows
+
+
+@app.get("/market/candles")
+async def get_candles(
+    key_id: str,
+    symbol: str,
+    response: Response,
+    timeframe: str = "1m",
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    limit: int = 500,
+) -> Dict[str, Any]:
+    """
+    메모리 캐시에서 봉을 반환합니다. 첫 요청 시 해당 심볼의 체결 스트림 구독을 시작하고,
+    메모리에 없는 과거 구간/스트림 공백만 fetch_ohlcv로 채웁니다.
+    """
+    if timeframe not in TIMEFRAMES:
+        raise HTTPException(status_code=400, detail=f"Unsupported timeframe: {timeframe}")
+    limit = max(1, min(limit, candle_store.max_candles))
+
+    pooled = await client_pool.get(key_id)
+    exchange = pooled.exchange
+    exchange_id = pooled.exchange_id
+
+    try:
+        await candle_feeds.ensure(key_id, exchange_id, symbol)
+        period = TIMEFRAMES[timeframe]
+        if since is None:
+            since = (until if until is not None else candle_store.clock()) - limit * period
+
+        source = "memory"
+        missing = candle_store.missing_range(exchange_id, symbol, timeframe, since)
+        if missing is not None and timeframe in (getattr(exchange, "timeframes", None) or {}):
+            start, end = missing
+            async with governor.throttle(exchange_id, key_id,
+                                         weight_of("fetch_ohlcv") * _ohlcv_pages(timeframe, start, end),
+                                         Priority.MARKET_DATA, exchange=exchange):
+                rows = await _fetch_ohlcv_range(exchange, symbol, timeframe, start, end)
+            candle_store.merge_history(exchange_id, symbol, timeframe, rows, since)
+            source = "backfill"
+
+        response.headers.update(governor.headers(exchange_id, key_id))
         return {
-            "symbol": symbol, 
-            "price": ticker['last'],
-            "limits": {
-                "min_notional": min_notional,
-                "min_amount": min_amount
-            }
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "candles": candle_store.window(exchange_id, symbol, timeframe, since, until, limit),
+            "source": source,
+            "live": candle_store.is_live(exchange_id, symbol),
         }
+    except HTTPException:
+        raise
     except Exception as e:
+        await client_pool.report_error(pooled, e)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await exchange.close()
 
-@app.post("/order")
-async def place_order(order: OrderRequest):
-    # 1. Get Credentials
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(f"{AUTH_SERVICE_URL}/internal/keys/{order.key_id}/secret")
-            if resp.status_code != 200:
-                raise HTTPException(status_code=resp.status_code, detail="Failed to retrieve key")
-            creds = resp.json()
-        except Exception as e:
-             raise HTTPException(status_code=503, detail=str(e))
 
-    exchange_id = creds['exchange']
-    exchange = await get_exchange_client(exchange_id, creds['publicKey'], creds['secretKey'])
+SNAPSHOT_COMPONENTS = ("ticker", "depth", "trades")
+
+
+@app.get("/market/snapshot")
+async def get_snapshot(
+    key_id: str,
+    symbols: str,
+    response: Response,
+    components: str = ",".join(SNAPSHOT_COMPONENTS),
+    depth_limit: int = 50,
+    trades_limit: int = 100,
+    depth_mode: str = "full",
+    trades_since: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    여러 심볼의 ticker / depth / trades를 하나의 풀링된 클라이언트에서 동시에 조회하여
+    단일 타임스탬프의 일관된 스냅샷으로 반환합니다.
+    symbols, components는 콤마(,)로 구분합니다.
+    depth_mode, trades_since는 /market/depth의 mode, /market/trades의 since와 동일합니다.
+    체결 커서는 심볼마다 다르므로 trades_since는 심볼 1개를 조회할 때만 받습니다.
+    """
+    symbol_list = [s.strip() for s in symbols.split(",") if s.strip()]
+    component_list = [c.strip() for c in components.split(",") if c.strip()]
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="symbols is required")
+    unknown = [c for c in component_list if c not in SNAPSHOT_COMPONENTS]
+    if unknown or not component_list:
+        raise HTTPException(status_code=400, detail=f"Unsupported components: {unknown}")
+    if depth_mode not in DEPTH_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported depth mode: {depth_mode}")
+    if trades_since is not None and len(symbol_list) > 1:
+        raise HTTPException(status_code=400, detail="trades_since requires a single symbol")
+
+    pooled = await client_pool.get(key_id)
+    exchange = pooled.exchange
+
+    fetchers = {
+        "ticker": lambda sym: exchange.fetch_ticker(sym),
+        "depth": lambda sym: _fetch_depth(exchange, sym, depth_limit, depth_mode),
+        "trades": lambda sym: _fetch_trades(exchange, sym, trades_limit, trades_since),
+    }
+    per_symbol_weight = sum(
+        _depth_request_weight(depth_limit, depth_mode) if c == "depth" else weight_of(f"fetch_{c}")
+        for c in component_list
+    )
+
+    jobs = [(sym, comp) for sym in symbol_list for comp in component_list]
+    try:
+        async with governor.throttle(pooled.exchange_id, key_id, per_symbol_weight * len(symbol_list),
+                                     Priority.MARKET_DATA, exchange=exchange):
+            results = await asyncio.gather(
+                *(fetchers[comp](sym) for sym, comp in jobs), return_exceptions=True
+            )
+            # 동시 조회 중 하나라도 429/418이면 governor 백오프가 적용되도록 다시 발생시킵니다.
+            for r in results:
+                if isinstance(r, ccxt.DDoSProtection):
+                    raise r
+    except HTTPException:
+        raise
+    except Exception as e:
+        await client_pool.report_error(pooled, e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    snapshot: Dict[str, Dict[str, Any]] = {sym: {} for sym in symbol_list}
+    errors: Dict[str, str] = {}
+    for (sym, comp), result in zip(jobs, results):
+        if isinstance(result, Exception):
+            errors[f"{sym}:{comp}"] = str(result)
+            snapshot[sym][comp] = None
+            await client_pool.report_error(pooled, result)
+        elif comp == "ticker":
+            snapshot[sym][comp] = _normalize_ticker(exchange, sym, result)
+        else:
+            # depth / trades는 _fetch_* 헬퍼에서 이미 정규화됨
+            snapshot[sym][comp] = result
+
+    response.headers.update(governor.headers(pooled.exchange_id, key_id))
+    return {
+        "timestamp": exchange.milliseconds(),
+        "components": component_list,
+        "symbols": snapshot,
+        "errors": errors,
+    }
+
+
+def _normalize_order(order: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": str(order.get("id")),
+        "client_order_id": order.get("clientOrderId"),
+        "status": order.get("status"),  # open, closed, canceled, expired, rejected
+        "side": (order.get("side") or "").lower(),
+        "amount": order.get("amount"),
+        "filled": order.get("filled"),
+        "average": order.get("average"),
+        "timestamp": order.get("timestamp"),
+    }
+
+
+async def _fetch_account_activity(exchange, symbol: str, since: Optional[int], limit: int,
+                                  include_trades: bool = True) -> Dict[str, Any]:
+    """
+    주문 목록과 내 체결 목록을 심볼 단위로 한 번에 조회합니다 (주문 건별 fetch_order 대신).
+    include_trades=False면 주문만 조회합니다. 주문은 오래된 순이며, 페이지가 가득 차면 next_since(마지막 주문 시각)를
+    함께 반환합니다.
+    """
+    if include_trades:
+        orders, trades = await asyncio.gather(
+            exchange.fetch_orders(symbol, since=since, limit=limit),
+            exchange.fetch_my_trades(symbol, since=since, limit=limit),
+        )
+    else:
+        orders, trades = await exchange.fetch_orders(symbol, since=since, limit=limit), []
+    normalized = sorted((_normalize_order(o) for o in orders or []), key=lambda o: o["timestamp"] or 0)
+    return {
+        "symbol": symbol,
+        "orders": normalized,
+        "trades": [normalize_fill(t) for t in trades or []],
+        "next_since": normalized[-1]["timestamp"] if normalized and len(normalized) >= limit else None,
+    }
+
+
+@app.get("/account/orders")
+async def get_account_orders(
+    key_id: str, symbol: str, response: Response, since: Optional[int] = None, limit: int = 500,
+    trades: bool = True,
+) -> Dict[str, Any]:
+    """
+    since(ms) 이후의 주문 상태와 내 체결 내역을 함께 반환합니다.
+    ExecutionService의 주문 대사(Reconciliation) 워커가 키/심볼 단위로 묶어 호출합니다.
+    trades=false면 주문만 조회하며 fetch_my_trades 가중치를 차감하지 않습니다 (그리드 체결 확인 등).
+    """
+    pooled = await client_pool.get(key_id)
+    exchange = pooled.exchange
+    weight = weight_of("fetch_orders", "fetch_my_trades") if trades else weight_of("fetch_orders")
+
+    try:
+        async with governor.throttle(pooled.exchange_id, key_id, weight, Priority.ACCOUNT, exchange=exchange):
+            activity = await _fetch_account_activity(exchange, symbol, since, limit, include_trades=trades)
+
+        response.headers.update(governor.headers(pooled.exchange_id, key_id))
+        return activity
+    except HTTPException:
+        raise
+    except Exception as e:
+        await client_pool.report_error(pooled, e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _fetch_trade_page(exchange, symbol: str, since: Optional[int], limit: int) -> Dict[str, Any]:
+    """내 체결 1페이지. 페이지가 가득 차면 다음 페이지 조회 위치(next_since)를 함께 반환합니다."""
+    trades = await exchange.fetch_my_trades(symbol, since=since, limit=limit)
+    fills = sorted((normalize_fill(t) for t in trades or []), key=lambda f: f["timestamp"] or 0)
+    return {
+        "symbol": symbol,
+        "trades": fills,
+        "next_since": fills[-1]["timestamp"] if fills and len(fills) >= limit else None,
+    }
+
+
+@app.get("/account/trades")
+async def get_account_trades(
+    key_id: str, symbol: str, response: Response, since: Optional[int] = None, limit: int = 1000
+) -> Dict[str, Any]:
+    """
+    since(ms) 이후 내 체결 1페이지 (오래된 순, 표준 체결 포맷).
+    ExecutionService 부팅 대사가 페이지 단위로 이어서 조회합니다. 페이지가 가득 차면 next_since(마지막 체결 시각)를
+    반환하며, 같은 시각의 체결이 겹칠 수 있으므로 호출자가 Trade ID로 중복을 제거합니다.
+    """
+    pooled = await client_pool.get(key_id)
+    exchange = pooled.exchange
+
+    try:
+        async with governor.throttle(pooled.exchange_id, key_id, weight_of("fetch_my_trades"),
+                                     Priority.ACCOUNT, exchange=exchange):
+            page = await _fetch_trade_page(exchange, symbol, since, limit)
+
+        response.headers.update(governor.headers(pooled.exchange_id, key_id))
+        return page
+    except HTTPException:
+        raise
+    except Exception as e:
+        await client_pool.report_error(pooled, e)
+        raise HTTPException(status_code=500, detail=str(e))
 
+
+@app.post("/streams/{key_id}")
+async def subscribe_user_stream(key_id: str) -> Dict[str, Any]:
+    """
+    키의 User Data Stream 구독을 시작합니다 (멱등).
+    이후 체결/잔고/연결 상태 이벤트가 ExecutionService의 /events/user-stream으로 푸시됩니다.
+    """
     try:
-        # 2. 주문 실행
-        print(f"[정보] {order.symbol} {order.side} 주문 실행 (수량: {order.amount})")
-        # CCXT create_order 시그니처: (symbol, type, side, amount, price=None, params={})
-        result = await exchange.create_order(
+        return await user_streams.subscribe(key_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/streams/{key_id}")
+def get_user_stream(key_id: str) -> Dict[str, Any]:
+    return user_streams.status(key_id)
+
+
+@app.delete("/streams/{key_id}")
+async def unsubscribe_user_stream(key_id: str):
+    await user_streams.unsubscribe(key_id)
+    return {"ok": True}
+
+
+def _order_response(result: Dict[str, Any]) -> Dict[str, Any]:
+    # 즉시 체결되지 않은 주문(open 등)은 그대로 전달하여 대사 워커가 추적하도록 합니다.
+    ccxt_status = result.get('status')
+    status = "filled" if ccxt_status in (None, "closed") else ccxt_status
+    return {
+        "status": status,
+        "order_id": result['id'],
+        "client_order_id": result.get('clientOrderId'),
+        "details": result,
+    }
+
+
+async def _submit_order(exchange, exchange_id: str, order: OrderRequest) -> Dict[str, Any]:
+    print(f"[정보] {order.symbol} {order.side} 주문 실행 (수량: {order.amount}, clientOrderId: {order.client_order_id})")
+    params = {"clientOrderId": order.client_order_id} if order.client_order_id else {}
+    # CCXT create_order 시그니처: (symbol, type, side, amount, price=None, params={})
+    # 주문은 최우선 순위이며, 계정 단위 주문 수 한도(orders)도 함께 차감합니다.
+    async with governor.throttle(exchange_id, order.key_id, weight_of("create_order"),
+                                 Priority.ORDER, orders=1, exchange=exchange, max_wait=30.0):
+        return await exchange.create_order(
             symbol=order.symbol,
             type=order.order_type,
             side=order.side,
             amount=order.amount,
-            price=order.price
+            price=order.price,
+            params=params
         )
-        return {"status": "filled", "order_id": result['id'], "details": result}
+
+
+async def _find_order_by_client_id(exchange, exchange_id: str, key_id: str, symbol: str,
+                                   client_order_id: str) -> Optional[Dict[str, Any]]:
+    """clientOrderId로 거래소 주문을 조회합니다. 없으면 None."""
+    async with governor.throttle(exchange_id, key_id, weight_of("fetch_order"),
+                                 Priority.ORDER, exchange=exchange, max_wait=30.0):
+        try:
+            return await exchange.fetch_order(None, symbol, params={"clientOrderId": client_order_id})
+        except ccxt.OrderNotFound:
+            return None
+
+
+async def _place_idempotent_order(exchange, exchange_id: str, order: OrderRequest) -> Dict[str, Any]:
+    """
+    clientOrderId 기준 멱등 주문.
+    - 이미 완료/거절된 요청: 저장된 결과를 그대로 반환 (거래소 재전송 없음).
+    - 결과를 모르는 요청(이전 시도 타임아웃 등): 거래소에서 clientOrderId로 먼저 찾아보고, 없을 때만 재전송.
+    """
+    key_id, client_order_id = order.key_id, order.client_order_id
+    async with idempotency.lock(key_id, client_order_id):
+        record = idempotency.get(key_id, client_order_id)
+        if record and record["state"] == COMPLETED:
+            print(f"[INFO] Idempotent replay for clientOrderId {client_order_id}")
+            return record["response"]
+        if record and record["state"] == REJECTED:
+            raise HTTPException(status_code=500, detail=record["response"]["detail"])
+
+        if record:
+            found = await _find_order_by_client_id(exchange, exchange_id, key_id, order.symbol, client_order_id)
+            if found:
+                result = _order_response(found)
+                idempotency.finish(key_id, client_order_id, COMPLETED, result)
+                return result
+        else:
+            idempotency.begin(key_id, client_order_id, order.symbol)
+
+        try:
+            created = await _submit_order(exchange, exchange_id, order)
+        except ccxt.DuplicateOrderId:
+            # 앞선 시도가 접수되었지만 조회에 늦게 반영된 경우
+            found = await _find_order_by_client_id(exchange, exchange_id, key_id, order.symbol, client_order_id)
+            if not found:
+                raise
+            created = found
+        except ccxt.NetworkError as e:
+            # 거래소가 접수했는지 알 수 없음 -> IN_FLIGHT 유지, 같은 clientOrderId로 재시도하면 조회 후 처리
+            raise HTTPException(status_code=504, detail=f"Order outcome unknown: {e}")
+        except ccxt.ExchangeError as e:
+            idempotency.finish(key_id, client_order_id, REJECTED, {"detail": str(e)})
+            raise
+
+        result = _order_response(created)
+        idempotency.finish(key_id, client_order_id, COMPLETED, result)
+        return result
+
+
+@app.post("/order")
+async def place_order(order: OrderRequest, response: Response):
+    # 풀링된 클라이언트 사용: 요청마다 새 클라이언트를 만들면 create_order가 암묵적으로
+    # load_markets(exchangeInfo)를 호출하여 governor가 모르는 가중치가 매번 소비됩니다.
+    pooled = await client_pool.get(order.key_id)
+    exchange, exchange_id = pooled.exchange, pooled.exchange_id
+
+    try:
+        # 주문 실행 (clientOrderId가 있으면 멱등 경로)
+        if order.client_order_id:
+            result = await _place_idempotent_order(exchange, exchange_id, order)
+        else:
+            result = _order_response(await _submit_order(exchange, exchange_id, order))
+        response.headers.update(governor.headers(exchange_id, order.key_id))
+        return result
+    except HTTPException:
+        raise
+    except ccxt.NetworkError as e:
+        print(f"[ERROR] Order outcome unknown: {e}")
+        await client_pool.report_error(pooled, e)
+        raise HTTPException(status_code=504, detail=f"Order outcome unknown: {e}")
     except Exception as e:
         print(f"[ERROR] Order Failed: {e}")
+        await client_pool.report_error(pooled, e)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await exchange.close()
+
+
+async def _place_batch_item(exchange, exchange_id: str, order: OrderRequest) -> Dict[str, Any]:
+    """배치 주문의 한 건. 실패도 예외 대신 항목 결과로 반환합니다."""
+    try:
+        if order.client_order_id:
+            return await _place_idempotent_order(exchange, exchange_id, order)
+        return _order_response(await _submit_order(exchange, exchange_id, order))
+    except HTTPException as e:
+        status = "unknown" if e.status_code == 504 else "failed"
+        return {"status": status, "client_order_id": order.client_order_id, "error": e.detail}
+    except ccxt.NetworkError as e:
+        return {"status": "unknown", "client_order_id": order.client_order_id, "error": str(e)}
+    except Exception as e:
+        return {"status": "failed", "client_order_id": order.client_order_id, "error": str(e)}
+
+
+@app.post("/orders/batch")
+async def place_orders(batch: BatchOrderRequest, response: Response) -> Dict[str, Any]:
+    """
+    같은 키/심볼의 주문 여러 건을 한 번의 왕복으로 접수합니다 (그리드 지정가 주문 등).
+    각 주문은 /order와 같은 멱등 경로로 동시에 전송되며, governor의 주문 수 한도는 건별로 차감됩니다.
+    결과는 요청 순서대로 반환하고, 일부 실패는 항목의 status(failed/unknown)로 표시합니다.
+    """
+    pooled = await client_pool.get(batch.key_id)
+    orders = [
+        OrderRequest(key_id=batch.key_id, symbol=batch.symbol, side=item.side, amount=item.amount,
+                     order_type=item.order_type, price=item.price, client_order_id=item.client_order_id)
+        for item in batch.orders
+    ]
+    results = await asyncio.gather(*(_place_batch_item(pooled.exchange, pooled.exchange_id, o) for o in orders))
+    response.headers.update(governor.headers(pooled.exchange_id, batch.key_id))
+    return {"symbol": batch.symbol, "results": list(results)}
+
+
+async def _cancel_one(exchange, exchange_id: str, key_id: str, symbol: str, order_id: str) -> Dict[str, Any]:
+    try:
+        async with governor.throttle(exchange_id, key_id, weight_of("cancel_order"),
+                                     Priority.ORDER, exchange=exchange, max_wait=30.0):
+            await exchange.cancel_order(order_id, symbol)
+        return {"order_id": order_id, "status": "canceled"}
+    except ccxt.OrderNotFound:
+        # 이미 체결/취소된 주문
+        return {"order_id": order_id, "status": "not_found"}
+    except Exception as e:
+        return {"order_id": order_id, "status": "failed", "error": str(e)}
+
+
+@app.post("/orders/cancel")
+async def cancel_orders(request: CancelOrdersRequest, response: Response) -> Dict[str, Any]:
+    """
+    주문 여러 건을 한 번의 왕복으로 취소합니다.
+    거래소가 일괄 취소(cancelOrders)를 지원하면 한 번에, 아니면 건별 취소를 동시에 전송합니다.
+    """
+    pooled = await client_pool.get(request.key_id)
+    exchange = pooled.exchange
+    if not request.order_ids:
+        return {"symbol": request.symbol, "results": []}
+
+    if (getattr(exchange, "has", None) or {}).get("cancelOrders"):
+        try:
+            async with governor.throttle(pooled.exchange_id, request.key_id, weight_of("cancel_order"),
+                                         Priority.ORDER, exchange=exchange, max_wait=30.0):
+                await exchange.cancel_orders(request.order_ids, request.symbol)
+            results = [{"order_id": oid, "status": "canceled"} for oid in request.order_ids]
+        except Exception as e:
+            print(f"[WARN] Batch cancel failed, falling back to per-order cancel: {e}")
+            results = None
+    else:
+        results = None
+    if results is None:
+        results = await asyncio.gather(*(
+            _cancel_one(exchange, pooled.exchange_id, request.key_id, request.symbol, oid)
+            for oid in request.order_ids
+        ))
+
+    response.headers.update(governor.headers(pooled.exchange_id, request.key_id))
+    return {"symbol": request.symbol, "results": list(results)}
+
+
+@app.get("/order/by-client-id")
+async def get_order_by_client_id(key_id: str, symbol: str, client_order_id: str, response: Response):
+    """
+    clientOrderId(로컬 주문 ID)로 거래소 주문을 조회합니다 (결과를 모르는 주문의 복구 경로).
+    응답은 POST /order와 같은 포맷이며, 없으면 404.
+    """
+    pooled = await client_pool.get(key_id)
+    try:
+        found = await _find_order_by_client_id(pooled.exchange, pooled.exchange_id, key_id, symbol, client_order_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        await client_pool.report_error(pooled, e)
+        raise HTTPException(status_code=500, detail=str(e))
+    if not found:
+        raise HTTPException(status_code=404, detail="Order not found")
+    response.headers.update(governor.headers(pooled.exchange_id, key_id))
+    return _order_response(found)
 
 @app.get("/health")
 def health_check():
@@ -0,0 +1,87 @@
+import random
+import unittest
+
+from services.exchange_adapter.book_features import BookFeatureCache, compute_book_features
+
+BIDS = [[99.0, 1.0], [98.5, 2.0], [98.0, 30.0], [97.0, 1.0]]
+ASKS = [[101.0, 3.0], [101.5, 1.0], [102.0, 1.0], [103.0, 2.0]]
+
+
+def _naive_impact(levels, size):
+    left, cost = size, 0.0
+    for price, qty in levels:
+        take = min(left, qty)
+        cost += take * price
+        left -= take
+        if left <= 0:
+            break
+    return cost / (size - left)
+
+
+class TestBookFeatures(unittest.TestCase):
+    def test_features_on_known_book(self):
+        f = compute_book_features(BIDS, ASKS, levels=(1, 2, 10), pcts=(1.0, 2.5), size=4.5)
+        self.assertEqual(f["mid"], 100.0)
+        self.assertAlmostEqual(f["microprice"], (99.0 * 3.0 + 101.0 * 1.0) / 4.0)
+        self.assertAlmostEqual(f["imbalance"]["1"], (1 - 3) / 4)
+        self.assertAlmostEqual(f["imbalance"]["2"], (3 - 4) / 7)
+        self.assertAlmostEqual(f["imbalance"]["10"], (34 - 7) / 41)  # 레벨 수가 부족하면 전체
+        self.assertEqual(f["depth"]["1"]["bid_amount"], 1.0)  # 99.0 이상
+        self.assertEqual(f["depth"]["2.5"]["ask_amount"], 5.0)  # 102.5 이하
+        [wall] = f["walls"]["bids"]
+        self.assertEqual((wall["price"], wall["amount"]), (98.0, 30.0))
+        self.assertAlmostEqual(wall["distance_pct"], 2.0)
+        self.assertEqual(f["walls"]["asks"], [])
+
+        buy = f["impact"]["buy"]
+        self.assertAlmostEqual(buy["avg_price"], (3 * 101.0 + 1 * 101.5 + 0.5 * 102.0) / 4.5)
+        self.assertEqual(buy["worst_price"], 102.0)
+        self.assertTrue(buy["fully_filled"])
+
+    def test_impact_matches_level_walk(self):
+        rng = random.Random(7)
+        bids = [[100.0 - i * 0.1, rng.uniform(0.1, 3.0)] for i in range(200)]
+        asks = [[100.1 + i * 0.1, rng.uniform(0.1, 3.0)] for i in range(200)]
+        for _ in range(50):
+            size = rng.uniform(0.05, 100.0)
+            f = compute_book_features(bids, asks, size=size)
+            self.assertAlmostEqual(f["impact"]["buy"]["avg_price"], _naive_impact(asks, size))
+            self.assertAlmostEqual(f["impact"]["sell"]["avg_price"], _naive_impact(bids, size))
+
+        # 호가를 모두 소진해도 부족하면 부분 체결로 표시
+        huge = compute_book_features(bids, asks, size=10_000.0)["impact"]["buy"]
+        self.assertFalse(huge["fully_filled"])
+        self.assertAlmostEqual(huge["filled"], sum(q for _, q in asks))
+
+    def test_empty_side_rejected(self):
+        with self.assertRaises(ValueError):
+            compute_book_features(BIDS, [])
+
+
+class TestBookFeatureCache(unittest.TestCase):
+    def test_cached_per_book_version(self):
+        cache = BookFeatureCache(max_entries=2)
+        ob = {"nonce": 10, "timestamp": 1, "bids": BIDS, "asks": ASKS}
+        first = cache.get_or_compute("binance", "BTC/USDT", ob, size=1.0)
+        self.assertIs(cache.get_or_compute("binance", "BTC/USDT", ob, size=1.0), first)
+        self.assertIsNot(cache.get_or_compute("binance", "BTC/USDT", ob, size=2.0), first)  # 다른 파라미터
+        cache.get_or_compute("binance", "BTC/USDT", {**ob, "nonce": 11})  # 새 버전
+        self.assertEqual(cache.metrics(), {"entries": 2, "hits": 1, "misses": 3})
+
+        # 버전이 없는 오더북은 캐시하지 않음
+        cache.get_or_compute("binance", "BTC/USDT", {"bids": BIDS, "asks": ASKS})
+        cache.get_or_compute("binance", "BTC/USDT", {"bids": BIDS, "asks": ASKS})
+        self.assertEqual(cache.metrics()["misses"], 5)
+
+    def test_depth_limit_is_part_of_key(self):
+        cache = BookFeatureCache()
+        deep = cache.get_or_compute("binance", "BTC/USDT", {"nonce": 10, "bids": BIDS, "asks": ASKS}, size=5.0)
+        shallow = cache.get_or_compute("binance", "BTC/USDT", {"nonce": 10, "bids": BIDS[:2], "asks": ASKS[:2]},
+                                       size=5.0)  # 같은 버전, 더 작은 limit
+        self.assertTrue(deep["impact"]["buy"]["fully_filled"])
+        self.assertFalse(shallow["impact"]["buy"]["fully_filled"])
+        self.assertEqual(cache.metrics(), {"entries": 2, "hits": 0, "misses": 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import random
+import unittest
+
+from services.exchange_adapter.candles import CandleStore, TIMEFRAMES
+from services.exchange_adapter.main import _fetch_ohlcv_range
+
+EX, SYM = "binance", "BTC/USDT"
+
+
+def _trades(n=5000, start=0, step_ms=1_700, seed=3):
+    rng = random.Random(seed)
+    price, out = 100.0, []
+    for i in range(n):
+        price += rng.uniform(-0.5, 0.5)
+        out.append({"id": str(i), "timestamp": start + i * step_ms, "price": round(price, 2), "amount": rng.uniform(0.1, 2)})
+    return out
+
+
+def _reference(trades, period):
+    """체결에서 바로 계산한 봉 (검증용)."""
+    buckets = {}
+    for t in trades:
+        ts = t["timestamp"] - t["timestamp"] % period
+        c = buckets.get(ts)
+        if c is None:
+            buckets[ts] = [ts, t["price"], t["price"], t["price"], t["price"], t["amount"]]
+        else:
+            c[2], c[3], c[4] = max(c[2], t["price"]), min(c[3], t["price"]), t["price"]
+            c[5] += t["amount"]
+    return [buckets[k] for k in sorted(buckets)]
+
+
+class TestCandleStore(unittest.TestCase):
+    def assertCandlesEqual(self, got, expected):
+        self.assertEqual([c[0] for c in got], [c[0] for c in expected])
+        for g, e in zip(got, expected):
+            for x, y in zip(g[1:], e[1:]):
+                self.assertAlmostEqual(x, y, places=9)
+
+    def test_rollups_match_direct_aggregation(self):
+        trades = _trades()
+        now = trades[-1]["timestamp"] + 1
+        store = CandleStore(max_candles=10_000, clock=lambda: now)
+        # 스트림처럼 겹치는 배치로 전달해도 중복 반영되지 않음
+        for i in range(0, len(trades), 40):
+            store.ingest_trades(EX, SYM, trades[max(0, i - 10):i + 40])
+        self.assertEqual(store.metrics()["trades_ingested"], len(trades))
+
+        for tf, period in TIMEFRAMES.items():
+            got = store.window(EX, SYM, tf, since=0, limit=10_000)
+            self.assertCandlesEqual(got, _reference(trades, period))
+
+    def test_history_fills_gap_until_stream_coverage(self):
+        now = 10 * 60_000 + 5_000
+        store = CandleStore(clock=lambda: now)
+        store.mark_live(EX, SYM, 7 * 60_000 + 500)
+        store.ingest_trades(EX, SYM, [{"id": "1", "timestamp": 8 * 60_000, "price": 10.0, "amount": 1.0},
+                                      {"id": "2", "timestamp": 10 * 60_000, "price": 11.0, "amount": 1.0}])
+        self.assertEqual(store.missing_range(EX, SYM, "1m", 5 * 60_000), (5 * 60_000, 8 * 60_000))
+        self.assertIsNone(store.missing_range(EX, SYM, "1m", 8 * 60_000))
+
+        history = [[m * 60_000, 1.0, 2.0, 0.5, 1.5, 3.0] for m in range(5, 11)]
+        store.merge_history(EX, SYM, "1m", history, 5 * 60_000)
+        self.assertIsNone(store.missing_range(EX, SYM, "1m", 5 * 60_000))
+
+        candles = store.window(EX, SYM, "1m", since=5 * 60_000)
+        self.assertEqual([c[0] // 60_000 for c in candles], [5, 6, 7, 8, 10])
+        self.assertEqual(candles[3][4], 10.0)  # 스트림이 완전히 본 봉은 메모리 값 유지
+        self.assertEqual(candles[-1][4], 11.0)  # 진행 중인 봉
+
+        store.mark_gap(EX, SYM)
+        self.assertEqual(store.missing_range(EX, SYM, "1m", 9 * 60_000), (9 * 60_000, now))
+
+    def test_cache_is_bounded(self):
+        trades = _trades(n=3000, step_ms=1_000)
+        store = CandleStore(max_candles=100, max_symbols=2, clock=lambda: 10 ** 12)
+        store.ingest_trades(EX, SYM, trades)
+        self.assertLessEqual(len(store.window(EX, SYM, "1s", since=0, limit=10_000)), 126)
+        self.assertEqual(len(store.window(EX, SYM, "1s", since=0, limit=50)), 50)
+
+        store.ingest_trades(EX, "ETH/USDT", trades[:1])
+        store.ingest_trades(EX, "SOL/USDT", trades[:1])
+        self.assertEqual(store.metrics()["symbols"], 2)
+        self.assertFalse(store.window(EX, SYM, "1s", since=0))
+
+
+class FakeOHLCVExchange:
+    def __init__(self, end):
+        self.end = end
+        self.calls = []
+
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.calls.append(since)
+        return [[ts, 1.0, 1.0, 1.0, 1.0, 1.0] for ts in range(since, min(self.end, since + limit * 1_000), 1_000)]
+
+
+class TestFetchOHLCVRange(unittest.IsolatedAsyncioTestCase):
+    async def test_pages_until_end(self):
+        exchange = FakeOHLCVExchange(end=2_500_000)
+        rows = await _fetch_ohlcv_range(exchange, SYM, "1s", 0, 2_500_000)
+        self.assertEqual(exchange.calls, [0, 1_000_000, 2_000_000])
+        self.assertEqual(len(rows), 2_500)
+
+
+if __name__ == '__main__':
+    unittest.main()
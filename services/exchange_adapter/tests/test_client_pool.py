@@ -0,0 +1,63 @@
+import unittest
+import asyncio
+import ccxt.async_support as ccxt
+from services.exchange_adapter.client_pool import ExchangeClientPool
+
+
+class FakeExchange:
+    def __init__(self):
+        self.closed = False
+
+    async def load_markets(self):
+        return {}
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePool(ExchangeClientPool):
+    async def _fetch_credentials(self, key_id):
+        return {"exchange": "binance", "publicKey": "pk", "secretKey": "sk"}
+
+
+async def _factory(exchange_id, public_key, secret_key):
+    return FakeExchange()
+
+
+class TestExchangeClientPool(unittest.IsolatedAsyncioTestCase):
+    async def test_expired_client_closes_after_grace(self):
+        pool = FakePool("http://auth", _factory, ttl_sec=0.0, retire_grace_sec=0.05)
+        first = await pool.get("k1")
+        second = await pool.get("k1")
+
+        self.assertIsNot(first, second)
+        # 진행 중인 요청이 first.exchange를 계속 쓸 수 있어야 함
+        self.assertFalse(first.exchange.closed)
+        await asyncio.sleep(0.1)
+        self.assertTrue(first.exchange.closed)
+        self.assertFalse(second.exchange.closed)
+        await pool.close_all()
+        self.assertTrue(second.exchange.closed)
+
+    async def test_auth_and_network_errors_invalidate(self):
+        pool = FakePool("http://auth", _factory, retire_grace_sec=0.0)
+        pooled = await pool.get("k1")
+
+        await pool.report_error(pooled, ccxt.RateLimitExceeded("429"))
+        await pool.report_error(pooled, ValueError("bad symbol"))
+        self.assertIs(await pool.get("k1"), pooled)
+
+        await pool.report_error(pooled, ccxt.AuthenticationError("invalid api key"))
+        fresh = await pool.get("k1")
+        self.assertIsNot(fresh, pooled)
+
+        # 이미 교체된 클라이언트의 늦은 오류는 새 클라이언트를 무효화하지 않음
+        await pool.report_error(pooled, ccxt.NetworkError("reset"))
+        self.assertIs(await pool.get("k1"), fresh)
+        await pool.report_error(fresh, ccxt.RequestTimeout("timeout"))
+        self.assertIsNot(await pool.get("k1"), fresh)
+        await pool.close_all()
+
+
+if __name__ == "__main__":
+    unittest.main()
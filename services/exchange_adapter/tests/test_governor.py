@@ -0,0 +1,104 @@
+import unittest
+import asyncio
+import ccxt.async_support as ccxt
+from services.exchange_adapter.governor import (
+    RateLimitGovernor, RateLimited, Priority, TokenBucket, depth_weight,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_refill_and_wait_time(self):
+        clock = FakeClock()
+        bucket = TokenBucket(capacity=60, refill_per_sec=1, clock=clock)
+        bucket.take(60)
+        self.assertEqual(bucket.wait_time(10), 10.0)
+        clock.now = 10
+        self.assertEqual(bucket.wait_time(10), 0.0)
+
+    def test_sync_used_only_lowers(self):
+        bucket = TokenBucket(capacity=100, refill_per_sec=1, clock=FakeClock())
+        bucket.sync_used(70)
+        self.assertEqual(bucket.available, 30)
+        bucket.sync_used(10)
+        self.assertEqual(bucket.available, 30)
+
+    def test_depth_weight(self):
+        self.assertEqual(depth_weight(50), 5)
+        self.assertEqual(depth_weight(1000), 50)
+
+
+class TestRateLimitGovernor(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.governor = RateLimitGovernor(
+            limits={"binance": {"weight_per_min": 100, "orders_per_10s": 2}}, clock=self.clock
+        )
+
+    async def test_shared_budget_across_keys(self):
+        await self.governor.acquire("binance", "key-a", 40)
+        await self.governor.acquire("binance", "key-b", 40)
+        headers = self.governor.headers("binance", "key-a")
+        self.assertEqual(headers["X-RateLimit-Remaining"], "20")
+
+    async def test_market_data_cannot_use_order_reserve(self):
+        await self.governor.acquire("binance", "k", 75)
+        # 남은 25 중 20은 주문 예약분이므로 시세 요청(10)은 거절됩니다.
+        with self.assertRaises(RateLimited):
+            await self.governor.acquire("binance", "k", 10, Priority.MARKET_DATA, max_wait=0)
+        await self.governor.acquire("binance", "k", 1, Priority.ORDER, orders=1, max_wait=0)
+
+    async def test_order_count_per_key(self):
+        for _ in range(2):
+            await self.governor.acquire("binance", "k", 1, Priority.ORDER, orders=1, max_wait=0)
+        with self.assertRaises(RateLimited):
+            await self.governor.acquire("binance", "k", 1, Priority.ORDER, orders=1, max_wait=0)
+        # 다른 키의 주문 수 한도는 독립적입니다.
+        await self.governor.acquire("binance", "other", 1, Priority.ORDER, orders=1, max_wait=0)
+
+    async def test_priority_yield_only_for_weight_bucket(self):
+        for _ in range(2):
+            await self.governor.acquire("binance", "k1", 1, Priority.ORDER, orders=1, max_wait=0)
+        # k1의 주문 버킷을 기다리는 주문은 다른 키의 시세/계정 요청을 막지 않습니다.
+        order = asyncio.create_task(self.governor.acquire("binance", "k1", 1, Priority.ORDER, orders=1, max_wait=60))
+        await asyncio.sleep(0)
+        await self.governor.acquire("binance", "k2", 5, Priority.MARKET_DATA, max_wait=0)
+        await self.governor.acquire("binance", "k2", 5, Priority.ACCOUNT, max_wait=0)
+        order.cancel()
+
+        # 가중치 버킷을 기다리는 주문에는 양보합니다.
+        self.governor.weight_bucket("binance").drain()
+        order = asyncio.create_task(self.governor.acquire("binance", "k2", 1, Priority.ORDER, max_wait=60))
+        await asyncio.sleep(0)
+        self.clock.now += 60
+        with self.assertRaises(RateLimited):
+            await self.governor.acquire("binance", "k3", 5, Priority.MARKET_DATA, max_wait=0)
+        order.cancel()
+
+    async def test_backoff_on_429_and_418(self):
+        delay = self.governor.record_rate_limited("binance", 429)
+        self.assertEqual(delay, 1.0)
+        self.assertEqual(self.governor.record_rate_limited("binance", 429), 2.0)
+        self.assertGreaterEqual(self.governor.record_rate_limited("binance", 418), 120.0)
+        headers = self.governor.headers("binance", "k")
+        self.assertIn("Retry-After", headers)
+        with self.assertRaises(RateLimited):
+            await self.governor.acquire("binance", "k", 1, Priority.ORDER, max_wait=5)
+
+    async def test_throttle_converts_ccxt_rate_limit(self):
+        with self.assertRaises(RateLimited) as ctx:
+            async with self.governor.throttle("binance", "k", 1):
+                raise ccxt.RateLimitExceeded("binance 429 Too Many Requests")
+        self.assertEqual(ctx.exception.status_code, 429)
+        self.assertGreater(self.governor.backoff_remaining("binance"), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
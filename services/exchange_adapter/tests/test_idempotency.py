@@ -0,0 +1,73 @@
+import unittest
+import ccxt.async_support as ccxt
+from fastapi import HTTPException
+import services.exchange_adapter.main as adapter_main
+from services.exchange_adapter.main import OrderRequest, _place_idempotent_order
+from services.exchange_adapter.idempotency import IdempotencyStore, IN_FLIGHT
+
+
+class FakeOrderExchange:
+    """첫 주문 요청은 접수되지만 응답이 타임아웃되는 거래소."""
+
+    def __init__(self, timeout_first=True, reject=False):
+        self.last_response_headers = {}
+        self.timeout_first = timeout_first
+        self.reject = reject
+        self.orders = {}
+        self.create_calls = 0
+
+    async def create_order(self, symbol, type, side, amount, price=None, params={}):
+        self.create_calls += 1
+        if self.reject:
+            raise ccxt.InsufficientFunds("Account has insufficient balance")
+        cid = params["clientOrderId"]
+        self.orders[cid] = {"id": f"ex-{len(self.orders) + 1}", "clientOrderId": cid, "status": "closed"}
+        if self.timeout_first and self.create_calls == 1:
+            raise ccxt.RequestTimeout("binance POST https://api.binance.com/api/v3/order timed out")
+        return self.orders[cid]
+
+    async def fetch_order(self, id, symbol, params={}):
+        order = self.orders.get(params["clientOrderId"])
+        if order is None:
+            raise ccxt.OrderNotFound("Order does not exist")
+        return order
+
+
+class TestIdempotentOrder(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.store = IdempotencyStore(":memory:")
+        self._orig = adapter_main.idempotency
+        adapter_main.idempotency = self.store
+        self.order = OrderRequest(key_id="k", symbol="BTC/USDT", side="buy", amount=1.0, client_order_id="lo-1")
+
+    def tearDown(self):
+        adapter_main.idempotency = self._orig
+        self.store.close()
+
+    async def test_timeout_then_retry_recovers_without_resending(self):
+        exchange = FakeOrderExchange()
+        with self.assertRaises(HTTPException) as ctx:
+            await _place_idempotent_order(exchange, "binance", self.order)
+        self.assertEqual(ctx.exception.status_code, 504)
+        self.assertEqual(self.store.get("k", "lo-1")["state"], IN_FLIGHT)
+
+        result = await _place_idempotent_order(exchange, "binance", self.order)
+        self.assertEqual(result["order_id"], "ex-1")
+        self.assertEqual(exchange.create_calls, 1)
+
+        # 이후 재시도는 저장된 결과를 그대로 반환
+        again = await _place_idempotent_order(exchange, "binance", self.order)
+        self.assertEqual(again, result)
+        self.assertEqual(exchange.create_calls, 1)
+
+    async def test_rejection_is_replayed(self):
+        exchange = FakeOrderExchange(timeout_first=False, reject=True)
+        with self.assertRaises(ccxt.InsufficientFunds):
+            await _place_idempotent_order(exchange, "binance", self.order)
+        with self.assertRaises(HTTPException):
+            await _place_idempotent_order(exchange, "binance", self.order)
+        self.assertEqual(exchange.create_calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
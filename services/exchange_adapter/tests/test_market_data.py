@@ -0,0 +1,121 @@
+import unittest
+from fastapi.testclient import TestClient
+
+from services.exchange_adapter.main import app, _fetch_trades, _fetch_depth, _fetch_account_activity, _fetch_trade_page
+
+
+class FakeExchange:
+    id = "fake"
+
+    def __init__(self, trades=None, book_tickers=None, has_bids_asks=True):
+        self._trades = trades or []
+        self._book_tickers = book_tickers or {}
+        self.has = {"fetchBidsAsks": has_bids_asks}
+        self.calls = []
+
+    async def fetch_trades(self, symbol, since=None, limit=None, params={}):
+        self.calls.append(("fetch_trades", since, limit, params))
+        return self._trades
+
+    async def fetch_bids_asks(self, symbols):
+        self.calls.append(("fetch_bids_asks", symbols))
+        return self._book_tickers
+
+    async def fetch_order_book(self, symbol, limit=None):
+        self.calls.append(("fetch_order_book", limit))
+        return {"timestamp": 1, "bids": [[99.0, 1.0], [98.0, 2.0]], "asks": [[101.0, 1.0], [102.0, 2.0]]}
+
+
+def _trade(tid, ts):
+    return {"id": str(tid), "timestamp": ts, "price": 100.0, "amount": 1.0, "side": "BUY"}
+
+
+class TestTradeCursor(unittest.IsolatedAsyncioTestCase):
+    async def test_id_cursor_returns_only_new_trades(self):
+        exchange = FakeExchange(trades=[_trade(1, 1000), _trade(2, 2000), _trade(3, 3000)])
+        result = await _fetch_trades(exchange, "BTC/USDT", 100, "id:2")
+        self.assertEqual([t["id"] for t in result["trades"]], ["3"])
+        self.assertEqual(result["next_cursor"], "id:3")
+
+    async def test_timestamp_cursor(self):
+        exchange = FakeExchange(trades=[_trade(1, 1000), _trade(2, 2000)])
+        result = await _fetch_trades(exchange, "BTC/USDT", 100, "1500")
+        self.assertEqual(exchange.calls[0][1], 1500)
+        self.assertEqual([t["id"] for t in result["trades"]], ["2"])
+
+    async def test_no_new_trades_keeps_cursor(self):
+        exchange = FakeExchange(trades=[_trade(5, 1000)])
+        result = await _fetch_trades(exchange, "BTC/USDT", 100, "id:5")
+        self.assertEqual(result["trades"], [])
+        self.assertEqual(result["next_cursor"], "id:5")
+
+
+class TestTopOfBook(unittest.IsolatedAsyncioTestCase):
+    async def test_top_mode_uses_book_ticker(self):
+        exchange = FakeExchange(book_tickers={
+            "BTC/USDT": {"bid": 99.5, "ask": 100.5, "bidVolume": 3.0, "askVolume": 4.0, "timestamp": None}
+        })
+        depth = await _fetch_depth(exchange, "BTC/USDT", 50, "top")
+        self.assertEqual(exchange.calls, [("fetch_bids_asks", ["BTC/USDT"])])
+        self.assertEqual(depth["best_bid"], 99.5)
+        self.assertEqual(depth["asks"], [[100.5, 4.0]])
+
+    async def test_top_mode_fallback_without_book_ticker(self):
+        exchange = FakeExchange(has_bids_asks=False)
+        depth = await _fetch_depth(exchange, "BTC/USDT", 50, "top")
+        self.assertEqual(exchange.calls, [("fetch_order_book", 5)])
+        self.assertEqual(depth["bids"], [[99.0, 1.0]])
+        self.assertEqual(depth["best_ask"], 101.0)
+
+
+class FakeAccountExchange:
+    async def fetch_orders(self, symbol, since=None, limit=None):
+        return [{"id": 11, "clientOrderId": "lo-1", "status": "closed", "side": "BUY",
+                 "amount": 1.0, "filled": 1.0, "average": 100.0, "timestamp": 1000}]
+
+    async def fetch_my_trades(self, symbol, since=None, limit=None):
+        return [{"id": 7, "order": 11, "timestamp": 1001, "side": "buy", "price": 100.0,
+                 "amount": 1.0, "cost": 100.0, "fee": {"cost": 0.1, "currency": "USDT"}}]
+
+
+class TestAccountActivity(unittest.IsolatedAsyncioTestCase):
+    async def test_orders_and_trades_are_normalized(self):
+        result = await _fetch_account_activity(FakeAccountExchange(), "BTC/USDT", 900, 500)
+        self.assertEqual(result["orders"][0]["id"], "11")
+        self.assertEqual(result["orders"][0]["client_order_id"], "lo-1")
+        self.assertEqual(result["trades"][0]["order_id"], "11")
+        self.assertEqual(result["trades"][0]["fee_asset"], "USDT")
+
+    async def test_orders_only_page(self):
+        class OrdersOnlyExchange(FakeAccountExchange):
+            async def fetch_my_trades(self, symbol, since=None, limit=None):
+                raise AssertionError("trades must not be fetched")
+
+        result = await _fetch_account_activity(OrdersOnlyExchange(), "BTC/USDT", 900, 1, include_trades=False)
+        self.assertEqual(result["trades"], [])
+        self.assertEqual(result["next_since"], 1000)  # 페이지가 가득 참
+
+    async def test_trade_page_cursor(self):
+        class PagedExchange:
+            async def fetch_my_trades(self, symbol, since=None, limit=None):
+                trades = [{"id": i, "order": 11, "timestamp": 1000 + i, "side": "sell", "price": 100.0, "amount": 0.1}
+                          for i in range(5)]
+                return [t for t in reversed(trades) if t["timestamp"] >= since][:limit]
+
+        full = await _fetch_trade_page(PagedExchange(), "BTC/USDT", 1000, 3)
+        self.assertEqual([t["id"] for t in full["trades"]], ["2", "3", "4"])  # 오래된 순
+        self.assertEqual(full["next_since"], 1004)
+        last = await _fetch_trade_page(PagedExchange(), "BTC/USDT", 1003, 3)
+        self.assertIsNone(last["next_since"])
+
+
+
+class TestSnapshotValidation(unittest.TestCase):
+    def test_trade_cursor_rejected_for_multiple_symbols(self):
+        # 체결 커서(trade id)는 심볼마다 다르므로 여러 심볼에 하나의 커서를 적용할 수 없음
+        resp = TestClient(app).get("/market/snapshot", params={
+            "key_id": "k", "symbols": "BTC/USDT,ETH/USDT", "trades_since": "id:5"})
+        self.assertEqual(resp.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
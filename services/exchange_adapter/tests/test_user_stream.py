@@ -0,0 +1,82 @@
+import unittest
+import asyncio
+from services.exchange_adapter.user_stream import UserStreamManager, normalize_fill
+
+
+class FakeWsClient:
+    def __init__(self):
+        self.connected = asyncio.get_running_loop().create_future()
+        self.connected.set_result("wss://fake")
+
+    def closed(self):
+        return False
+
+
+class FakeStreamExchange:
+    def __init__(self, trades):
+        self._trades = list(trades)
+        self.clients = {}
+        self.closed = False
+
+    async def watch_my_trades(self):
+        self.clients["user"] = FakeWsClient()
+        if self._trades:
+            return [self._trades.pop(0)]
+        await asyncio.sleep(3600)
+
+    async def watch_balance(self):
+        await asyncio.sleep(3600)
+
+    async def close(self):
+        self.closed = True
+
+
+class TestUserStreamManager(unittest.IsolatedAsyncioTestCase):
+    async def test_fills_and_status_are_pushed(self):
+        trade = {"id": 7, "order": 11, "timestamp": 1000, "side": "buy", "price": 100.0, "amount": 1.0,
+                 "cost": 100.0, "fee": {"cost": 0.1, "currency": "USDT"},
+                 "info": {"c": "lo-1", "X": "FILLED"}}
+        exchange = FakeStreamExchange([trade])
+        created = []
+
+        async def factory(exchange_id, api_key, secret):
+            created.append(exchange_id)
+            return exchange
+
+        async def creds(key_id):
+            return {"exchange": "binance", "publicKey": "p", "secretKey": "s"}
+
+        manager = UserStreamManager(creds, factory, "http://sink", monitor_interval_sec=0.01)
+        pushed = []
+
+        async def fake_push(event):
+            pushed.append(event)
+            return True
+
+        manager._push = fake_push
+
+        await manager.subscribe("key-1")
+        await manager.subscribe("key-1")  # 멱등
+        for _ in range(50):
+            if manager.status("key-1")["connected"] and manager.status("key-1")["fills_pushed"]:
+                break
+            await asyncio.sleep(0.01)
+
+        self.assertEqual(created, ["binance"])
+        fills = [e for e in pushed if e["type"] == "fills"]
+        self.assertEqual(fills[0]["fills"][0]["client_order_id"], "lo-1")
+        self.assertEqual(fills[0]["fills"][0]["order_status"], "filled")
+        self.assertIn({"key_id": "key-1", "type": "status", "connected": True}, pushed)
+
+        await manager.close_all()
+        self.assertTrue(exchange.closed)
+        self.assertFalse(manager.status("key-1")["subscribed"])
+
+    def test_rest_trade_has_no_stream_fields(self):
+        fill = normalize_fill({"id": 1, "order": 2, "side": "sell", "info": {}})
+        self.assertEqual(fill["order_id"], "2")
+        self.assertIsNone(fill["order_status"])
+
+
+if __name__ == '__main__':
+    unittest.main()
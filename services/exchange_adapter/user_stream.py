@@ -0,0 +1,195 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+
+def normalize_fill(trade: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    CCXT 내 체결(my trade)을 표준 포맷으로 변환합니다.
+    REST(fetch_my_trades)와 User Data Stream(watch_my_trades) 모두 같은 포맷을 사용합니다.
+    """
+    fee = trade.get("fee") or {}
+    info = trade.get("info") or {}
+    # Binance executionReport: c = clientOrderId, X = 주문 상태 (PARTIALLY_FILLED / FILLED)
+    order_status = info.get("X")
+    return {
+        "id": str(trade.get("id")),
+        "order_id": str(trade.get("order")),
+        "client_order_id": info.get("c"),
+        "order_status": order_status.lower() if isinstance(order_status, str) else None,
+        "timestamp": trade.get("timestamp"),
+        "side": (trade.get("side") or "").lower(),
+        "price": trade.get("price"),
+        "amount": trade.get("amount"),
+        "cost": trade.get("cost"),
+        "fee": fee.get("cost") or 0.0,
+        "fee_asset": fee.get("currency"),
+    }
+
+
+def normalize_balance_update(balance: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    free = balance.get("free") or {}
+    used = balance.get("used") or {}
+    return {
+        asset: {"free": float(free.get(asset) or 0.0), "locked": float(used.get(asset) or 0.0)}
+        for asset in set(free) | set(used)
+    }
+
+
+@dataclass
+class UserStream:
+    key_id: str
+    exchange_id: str
+    exchange: Any
+    connected: bool = False
+    last_event_at: Optional[float] = None
+    fills_pushed: int = 0
+    tasks: List[asyncio.Task] = field(default_factory=list)
+
+
+class UserStreamManager:
+    """
+    키(key_id) 단위 User Data Stream(WebSocket) 관리자.
+
+    - 체결(execution report)과 잔고 변경을 구독하여 ExecutionService로 즉시 푸시합니다.
+    - 연결이 끊기면 지수 백오프로 재연결하며, 연결 상태 변화도 함께 푸시합니다.
+    - 푸시에 실패한 이벤트는 ExecutionService의 주문 대사 워커가 REST로 보완합니다.
+    """
+
+    def __init__(
+        self,
+        credentials_loader: Callable[[str], Awaitable[Dict[str, Any]]],
+        stream_factory: Callable[[str, str, str], Awaitable[Any]],
+        sink_url: str,
+        push_retries: int = 3,
+        reconnect_backoff: tuple = (1.0, 60.0),
+        monitor_interval_sec: float = 1.0,
+    ):
+        self.credentials_loader = credentials_loader
+        self.stream_factory = stream_factory
+        self.sink_url = sink_url
+        self.push_retries = push_retries
+        self.reconnect_backoff = reconnect_backoff
+        self.monitor_interval_sec = monitor_interval_sec
+        self._streams: Dict[str, UserStream] = {}
+        self._lock = asyncio.Lock()
+        self._http: Optional[httpx.AsyncClient] = None
+
+    def status(self, key_id: str) -> Dict[str, Any]:
+        stream = self._streams.get(key_id)
+        if stream is None:
+            return {"key_id": key_id, "subscribed": False, "connected": False}
+        return {
+            "key_id": key_id,
+            "subscribed": True,
+            "connected": stream.connected,
+            "last_event_at": stream.last_event_at,
+            "fills_pushed": stream.fills_pushed,
+        }
+
+    async def subscribe(self, key_id: str) -> Dict[str, Any]:
+        """구독을 시작합니다. 이미 구독 중이면 현재 상태만 반환합니다 (멱등)."""
+        async with self._lock:
+            if key_id not in self._streams:
+                creds = await self.credentials_loader(key_id)
+                exchange = await self.stream_factory(creds["exchange"], creds["publicKey"], creds["secretKey"])
+                stream = UserStream(key_id=key_id, exchange_id=creds["exchange"], exchange=exchange)
+                stream.tasks = [
+                    asyncio.create_task(self._run(stream, self._watch_fills)),
+                    asyncio.create_task(self._run(stream, self._watch_balance)),
+                    asyncio.create_task(self._monitor(stream)),
+                ]
+                self._streams[key_id] = stream
+                print(f"[INFO] User data stream subscribed for key {key_id} ({stream.exchange_id}).")
+        return self.status(key_id)
+
+    async def unsubscribe(self, key_id: str):
+        async with self._lock:
+            stream = self._streams.pop(key_id, None)
+        if stream is None:
+            return
+        for task in stream.tasks:
+            task.cancel()
+        await asyncio.gather(*stream.tasks, return_exceptions=True)
+        await stream.exchange.close()
+        print(f"[INFO] User data stream closed for key {key_id}.")
+
+    async def close_all(self):
+        for key_id in list(self._streams.keys()):
+            await self.unsubscribe(key_id)
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _run(self, stream: UserStream, watcher: Callable[[UserStream], Awaitable[None]]):
+        base, cap = self.reconnect_backoff
+        failures = 0
+        while True:
+            try:
+                await watcher(stream)
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                delay = min(base * (2 ** (failures - 1)), cap)
+                print(f"[WARN] User data stream error for key {stream.key_id}: {e}. Reconnecting in {delay:.1f}s")
+                await self._set_connected(stream, False)
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _ws_connected(exchange) -> bool:
+        """CCXT Pro 클라이언트의 WebSocket 연결 중 하나라도 열려 있는지 확인합니다."""
+        for client in (getattr(exchange, "clients", None) or {}).values():
+            connected = getattr(client, "connected", None)
+            if connected is None or not connected.done() or connected.cancelled():
+                continue
+            if connected.exception() is None and not client.closed():
+                return True
+        return False
+
+    async def _monitor(self, stream: UserStream):
+        # 체결이 없어도 연결 상태를 알 수 있도록 소켓 상태를 주기적으로 확인합니다.
+        while True:
+            await self._set_connected(stream, self._ws_connected(stream.exchange))
+            await asyncio.sleep(self.monitor_interval_sec)
+
+    async def _watch_fills(self, stream: UserStream):
+        trades = await stream.exchange.watch_my_trades()
+        stream.last_event_at = time.time()
+        if not trades:
+            return
+        fills = [normalize_fill(t) for t in trades]
+        if await self._push({"key_id": stream.key_id, "type": "fills", "fills": fills}):
+            stream.fills_pushed += len(fills)
+
+    async def _watch_balance(self, stream: UserStream):
+        balance = await stream.exchange.watch_balance()
+        stream.last_event_at = time.time()
+        balances = normalize_balance_update(balance or {})
+        if balances:
+            await self._push({"key_id": stream.key_id, "type": "balance", "balances": balances})
+
+    async def _set_connected(self, stream: UserStream, connected: bool):
+        if stream.connected == connected:
+            return
+        stream.connected = connected
+        await self._push({"key_id": stream.key_id, "type": "status", "connected": connected})
+
+    async def _push(self, event: Dict[str, Any]) -> bool:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=5.0)
+        for attempt in range(self.push_retries):
+            try:
+                resp = await self._http.post(self.sink_url, json=event)
+                resp.raise_for_status()
+                return True
+            except Exception as e:
+                if attempt == self.push_retries - 1:
+                    print(f"[ERROR] Failed to push {event['type']} event for key {event['key_id']}: {e}")
+                    return False
+                await asyncio.sleep(0.2 * (2 ** attempt))
+        return False
@@ -1,12 +1,25 @@
+import asyncio
 import httpx
 import logging
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 logger = logging.getLogger("execution-service.adapter-client")
 
 ADAPTER_SERVICE_URL = os.getenv("ADAPTER_SERVICE_URL", "http://exchange-adapter:8000")
 
+# 결과를 알 수 없거나(504, 전송 오류) 일시적인(429, 502, 503) 주문 응답 -> 같은 clientOrderId로 재시도
+RETRYABLE_ORDER_STATUS = {429, 502, 503, 504}
+
+
+def _retry_delay(resp: Optional[httpx.Response], attempt: int) -> float:
+    if resp is not None and resp.headers.get("Retry-After"):
+        try:
+            return min(float(resp.headers["Retry-After"]), 10.0)
+        except ValueError:
+            pass
+    return 0.5 * (2 ** attempt)
+
 class AdapterClient:
     async def get_balance(self, key_id: str) -> Dict[str, Any]:
         """
@@ -39,37 +52,141 @@ class AdapterClient:
                 logger.error(f"Failed to fetch ticker: {e}")
                 return None
         
-    async def place_order(self, key_id: str, symbol: str, side: str, amount: float, order_type: str = 'market', price: float = None) -> Dict[str, Any]:
+    async def place_order(self, key_id: str, symbol: str, side: str, amount: float, order_type: str = 'market',
+                          price: float = None, client_order_id: Optional[str] = None,
+                          max_attempts: int = 4) -> Dict[str, Any]:
         """
         어댑터를 통해 주문을 실행합니다.
+        client_order_id(로컬 주문 ID)가 있으면 어댑터가 멱등하게 처리하므로, 타임아웃 등 결과를 알 수 없는
+        실패는 같은 ID로 재시도합니다. 끝내 결과를 모르면 {"status": "unknown"}을 반환합니다.
         """
+        payload = {
+            "key_id": key_id,
+            "symbol": symbol,
+            "side": side,
+            "amount": amount,
+            "order_type": order_type,
+            "price": price,
+            "client_order_id": client_order_id
+        }
+        attempts = max_attempts if client_order_id else 1
+        last_error = None
         async with httpx.AsyncClient() as client:
-             try:
-                payload = {
-                    "key_id": key_id,
-                    "symbol": symbol,
-                    "side": side,
-                    "amount": amount,
-                    "order_type": order_type,
-                    "price": price
-                }
-                resp = await client.post(f"{ADAPTER_SERVICE_URL}/order", json=payload)
+            for attempt in range(attempts):
+                try:
+                    resp = await client.post(f"{ADAPTER_SERVICE_URL}/order", json=payload)
+                    if resp.status_code in RETRYABLE_ORDER_STATUS and attempt < attempts - 1:
+                        last_error = f"HTTP {resp.status_code}: {resp.text}"
+                        logger.warning(f"주문 재시도 {attempt + 1}/{attempts - 1} ({client_order_id}): {last_error}")
+                        await asyncio.sleep(_retry_delay(resp, attempt))
+                        continue
+                    resp.raise_for_status()
+                    return resp.json()
+                except httpx.TransportError as e:
+                    # 요청이 어댑터/거래소에 도달했는지 알 수 없음
+                    last_error = str(e) or e.__class__.__name__
+                    if attempt < attempts - 1:
+                        logger.warning(f"주문 재시도 {attempt + 1}/{attempts - 1} ({client_order_id}): {last_error}")
+                        await asyncio.sleep(_retry_delay(None, attempt))
+                        continue
+                except httpx.HTTPStatusError as e:
+                    if e.response.status_code in RETRYABLE_ORDER_STATUS:
+                        last_error = f"HTTP {e.response.status_code}: {e.response.text}"
+                        break
+                    logger.error(f"Failed to place order: {e}")
+                    return {"status": "error", "error": str(e)}
+                except Exception as e:
+                    logger.error(f"Failed to place order: {e}")
+                    return {"status": "error", "error": str(e)}
+
+        if not client_order_id:
+            logger.error(f"Failed to place order: {last_error}")
+            return {"status": "error", "error": last_error}
+        logger.error(f"주문 결과 불명 ({client_order_id}): {last_error}")
+        return {"status": "unknown", "client_order_id": client_order_id, "error": last_error}
+
+    async def place_orders(self, key_id: str, symbol: str, orders: List[Dict[str, Any]],
+                           max_attempts: int = 4) -> List[Dict[str, Any]]:
+        """
+        같은 키/심볼의 주문 여러 건을 한 번의 요청으로 실행합니다 (POST /orders/batch).
+        orders: [{"side", "amount", "order_type", "price", "client_order_id"}, ...]
+        각 주문은 clientOrderId로 멱등 처리되므로 결과를 알 수 없는 실패는 배치 전체를 재시도합니다.
+        반환: 요청 순서대로의 주문 결과 (place_order와 같은 포맷, 끝내 실패하면 status unknown/error).
+        """
+        payload = {"key_id": key_id, "symbol": symbol, "orders": orders}
+        last_error = None
+        async with httpx.AsyncClient() as client:
+            for attempt in range(max_attempts):
+                try:
+                    resp = await client.post(f"{ADAPTER_SERVICE_URL}/orders/batch", json=payload)
+                    if resp.status_code in RETRYABLE_ORDER_STATUS and attempt < max_attempts - 1:
+                        last_error = f"HTTP {resp.status_code}: {resp.text}"
+                        await asyncio.sleep(_retry_delay(resp, attempt))
+                        continue
+                    resp.raise_for_status()
+                    return resp.json()["results"]
+                except httpx.TransportError as e:
+                    last_error = str(e) or e.__class__.__name__
+                    if attempt < max_attempts - 1:
+                        logger.warning(f"배치 주문 재시도 {attempt + 1}/{max_attempts - 1}: {last_error}")
+                        await asyncio.sleep(_retry_delay(None, attempt))
+                        continue
+                except Exception as e:
+                    last_error = str(e)
+                    break
+
+        logger.error(f"Failed to place batch orders: {last_error}")
+        return [
+            {"status": "unknown" if o.get("client_order_id") else "error",
+             "client_order_id": o.get("client_order_id"), "error": last_error}
+            for o in orders
+        ]
+
+    async def cancel_orders(self, key_id: str, symbol: str, order_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        거래소 주문 여러 건을 한 번의 요청으로 취소합니다 (POST /orders/cancel).
+        반환: [{"order_id", "status": canceled|not_found|failed}, ...]
+        """
+        async with httpx.AsyncClient() as client:
+            try:
+                resp = await client.post(
+                    f"{ADAPTER_SERVICE_URL}/orders/cancel",
+                    json={"key_id": key_id, "symbol": symbol, "order_ids": order_ids},
+                )
+                resp.raise_for_status()
+                return resp.json()["results"]
+            except Exception as e:
+                logger.error(f"Failed to cancel orders: {e}")
+                return [{"order_id": oid, "status": "failed", "error": str(e)} for oid in order_ids]
+
+    async def get_order_by_client_id(self, key_id: str, symbol: str, client_order_id: str) -> Optional[Dict[str, Any]]:
+        """
+        clientOrderId(로컬 주문 ID)로 거래소 주문을 조회합니다. POST /order와 같은 포맷, 없으면 None.
+        """
+        async with httpx.AsyncClient() as client:
+            try:
+                resp = await client.get(
+                    f"{ADAPTER_SERVICE_URL}/order/by-client-id",
+                    params={"key_id": key_id, "symbol": symbol, "client_order_id": client_order_id},
+                )
+                if resp.status_code == 404:
+                    return None
                 resp.raise_for_status()
                 return resp.json()
-             except Exception as e:
-                 logger.error(f"Failed to place order: {e}")
-                 # Return error dict or raise
-                 return {"status": "error", "error": str(e)}
+            except Exception as e:
+                logger.error(f"Failed to look up order by client id: {e}")
+                return None
 
-    async def get_depth(self, key_id: str, symbol: str, limit: int = 50) -> Optional[Dict[str, Any]]:
+    async def get_depth(self, key_id: str, symbol: str, limit: int = 50, mode: str = "full") -> Optional[Dict[str, Any]]:
         """
         어댑터를 통해 오더북(Depth)을 조회합니다.
+        mode='top'이면 최우선 호가(book-ticker)만 조회합니다.
         """
         async with httpx.AsyncClient() as client:
             try:
                 resp = await client.get(
                     f"{ADAPTER_SERVICE_URL}/market/depth",
-                    params={"key_id": key_id, "symbol": symbol, "limit": limit},
+                    params={"key_id": key_id, "symbol": symbol, "limit": limit, "mode": mode},
                 )
                 resp.raise_for_status()
                 return resp.json()
@@ -77,18 +194,144 @@ class AdapterClient:
                 logger.error(f"Failed to fetch depth: {e}")
                 return None
 
-    async def get_trades(self, key_id: str, symbol: str, limit: int = 100) -> Optional[Dict[str, Any]]:
+    async def get_book_features(self, key_id: str, symbol: str, limit: int = 100,
+                                size: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        어댑터가 계산한 오더북 파생 지표(불균형, 마이크로프라이스, 누적 depth, 유동성 벽, 충격 비용)를 조회합니다.
+        원시 호가 레벨 대신 수백 바이트의 결과만 받습니다.
+        """
+        async with httpx.AsyncClient() as client:
+            try:
+                params = {"key_id": key_id, "symbol": symbol, "limit": limit}
+                if size is not None:
+                    params["size"] = size
+                resp = await client.get(f"{ADAPTER_SERVICE_URL}/market/book-features", params=params)
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                logger.error(f"Failed to fetch book features: {e}")
+                return None
+
+    async def get_trades(self, key_id: str, symbol: str, limit: int = 100, since: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         어댑터를 통해 최근 체결(Trades)을 조회합니다.
+        since 커서("id:<trade_id>" 또는 ms 타임스탬프)를 주면 그 이후의 새 체결만 반환합니다.
         """
         async with httpx.AsyncClient() as client:
             try:
+                params = {"key_id": key_id, "symbol": symbol, "limit": limit}
+                if since:
+                    params["since"] = since
                 resp = await client.get(
                     f"{ADAPTER_SERVICE_URL}/market/trades",
-                    params={"key_id": key_id, "symbol": symbol, "limit": limit},
+                    params=params,
                 )
                 resp.raise_for_status()
                 return resp.json()
             except Exception as e:
                 logger.error(f"Failed to fetch trades: {e}")
                 return None
+
+    async def get_snapshot(
+        self,
+        key_id: str,
+        symbols: List[str],
+        components: Optional[List[str]] = None,
+        depth_limit: int = 50,
+        trades_limit: int = 100,
+        depth_mode: str = "full",
+        trades_since: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        어댑터를 통해 여러 심볼의 ticker/depth/trades를 한 번의 요청으로 조회합니다.
+        반환: {"timestamp": ms, "components": [...], "symbols": {symbol: {component: ...}}, "errors": {...}}
+        """
+        async with httpx.AsyncClient() as client:
+            try:
+                params = {
+                    "key_id": key_id,
+                    "symbols": ",".join(symbols),
+                    "depth_limit": depth_limit,
+                    "trades_limit": trades_limit,
+                    "depth_mode": depth_mode,
+                }
+                if trades_since:
+                    params["trades_since"] = trades_since
+                if components:
+                    params["components"] = ",".join(components)
+                resp = await client.get(f"{ADAPTER_SERVICE_URL}/market/snapshot", params=params)
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                logger.error(f"Failed to fetch snapshot: {e}")
+                return None
+
+    async def get_candles(self, key_id: str, symbol: str, timeframe: str = "1m", since: Optional[int] = None,
+                          limit: int = 500) -> Optional[Dict[str, Any]]:
+        """
+        어댑터의 봉 캐시에서 since(ms) 이후의 봉을 조회합니다 (진행 중인 봉 포함).
+        반환: {"symbol": ..., "timeframe": ..., "candles": [[ts, o, h, l, c, v], ...], "source": ..., "live": ...}
+        """
+        async with httpx.AsyncClient() as client:
+            try:
+                params = {"key_id": key_id, "symbol": symbol, "timeframe": timeframe, "limit": limit}
+                if since is not None:
+                    params["since"] = since
+                resp = await client.get(f"{ADAPTER_SERVICE_URL}/market/candles", params=params)
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                logger.error(f"Failed to fetch candles: {e}")
+                return None
+
+    async def get_account_orders(self, key_id: str, symbol: str, since: Optional[int] = None, limit: int = 500,
+                                 include_trades: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        어댑터를 통해 since(ms) 이후의 주문 상태와 내 체결 내역을 함께 조회합니다.
+        include_trades=False면 주문만 조회합니다 (체결 조회 가중치 절약).
+        반환: {"symbol": ..., "orders": [...], "trades": [...], "next_since": ms | None}
+        """
+        async with httpx.AsyncClient() as client:
+            try:
+                params = {"key_id": key_id, "symbol": symbol, "limit": limit}
+                if not include_trades:
+                    params["trades"] = "false"
+                if since is not None:
+                    params["since"] = since
+                resp = await client.get(f"{ADAPTER_SERVICE_URL}/account/orders", params=params)
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                logger.error(f"Failed to fetch account orders: {e}")
+                return None
+
+    async def get_account_trades(self, key_id: str, symbol: str, since: Optional[int] = None, limit: int = 1000) -> Optional[Dict[str, Any]]:
+        """
+        어댑터를 통해 since(ms) 이후의 내 체결 1페이지를 조회합니다 (오래된 순).
+        반환: {"symbol": ..., "trades": [...], "next_since": ms | None}
+        """
+        async with httpx.AsyncClient() as client:
+            try:
+                params = {"key_id": key_id, "symbol": symbol, "limit": limit}
+                if since is not None:
+                    params["since"] = since
+                resp = await client.get(f"{ADAPTER_SERVICE_URL}/account/trades", params=params, timeout=30.0)
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                logger.error(f"Failed to fetch account trades: {e}")
+                return None
+
+    async def subscribe_user_stream(self, key_id: str) -> Optional[Dict[str, Any]]:
+        """
+        어댑터에 키의 User Data Stream 구독을 요청합니다 (멱등).
+        반환: {"key_id": ..., "subscribed": bool, "connected": bool, ...}
+        """
+        async with httpx.AsyncClient() as client:
+            try:
+                resp = await client.post(f"{ADAPTER_SERVICE_URL}/streams/{key_id}")
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                logger.error(f"Failed to subscribe user data stream: {e}")
+                return None
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("execution-service.balance-book")
+
+
+def split_symbol(symbol: str) -> Tuple[str, str]:
+    if "/" in symbol:
+        base, quote = symbol.split("/", 1)
+        return base, quote
+    return symbol, "USDT"
+
+
+class BalanceBook:
+    """
+    키(key_id) 단위 인프로세스 잔고 장부.
+
+    - 최초 조회 시 거래소 잔고로 한 번 시딩(Seed)합니다.
+    - 이후에는 LedgerAwareAdapter가 관측한 체결(Fill)로 증감합니다.
+    - 백그라운드 타이머(reconcile_all)가 주기적으로 거래소 잔고와 대사(Reconcile)합니다.
+
+    따라서 주문 수량 계산 시 네트워크 호출이 필요하지 않습니다.
+    """
+
+    def __init__(self, adapter_client, drift_tolerance: float = 1e-8):
+        self.adapter_client = adapter_client
+        self.drift_tolerance = drift_tolerance
+        self._balances: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._fill_seq: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._reconciled: Dict[str, int] = {}  # 키별 대사 성공 횟수 (동시 fresh 조회 합치기용)
+
+    def is_seeded(self, key_id: str) -> bool:
+        return key_id in self._balances
+
+    async def get_balance(self, key_id: str, fresh: bool = False) -> Dict[str, Any]:
+        """
+        어댑터의 /balance 응답과 같은 형태({"assets": [...]})로 잔고를 반환합니다.
+        fresh=True이면 거래소와 먼저 대사합니다.
+        """
+        if fresh or not self.is_seeded(key_id):
+            await self.reconcile(key_id, coalesce=True)
+        if not self.is_seeded(key_id):
+            return {}
+        return {
+            "assets": [
+                {"asset": asset, "free": v["free"], "locked": v["locked"]}
+                for asset, v in self._balances[key_id].items()
+            ]
+        }
+
+    def free(self, key_id: str, asset: str) -> float:
+        return self._balances.get(key_id, {}).get(asset, {}).get("free", 0.0)
+
+    def apply_fill(
+        self,
+        key_id: str,
+        symbol: str,
+        side: str,
+        quantity: float,
+        price: float,
+        fee: float = 0.0,
+        fee_asset: Optional[str] = None,
+    ):
+        """체결 1건을 장부에 반영합니다. 시딩 전이라면 무시합니다(다음 시딩에 포함됨)."""
+        book = self._balances.get(key_id)
+        self._fill_seq[key_id] = self._fill_seq.get(key_id, 0) + 1
+        if book is None:
+            return
+
+        base, quote = split_symbol(symbol)
+        quantity = float(quantity or 0.0)
+        notional = quantity * float(price or 0.0)
+        sign = 1.0 if side.upper() == "BUY" else -1.0
+
+        self._adjust(book, base, sign * quantity)
+        self._adjust(book, quote, -sign * notional)
+        if fee and fee_asset:
+            self._adjust(book, fee_asset, -float(fee))
+
+    def apply_balance_update(self, key_id: str, balances: Dict[str, Dict[str, float]]):
+        """User Data Stream의 잔고 변경 이벤트(자산별 절대값)를 반영합니다."""
+        book = self._balances.get(key_id)
+        self._fill_seq[key_id] = self._fill_seq.get(key_id, 0) + 1
+        if book is None:
+            return
+        for asset, v in balances.items():
+            book[asset] = {"free": float(v.get("free") or 0.0), "locked": float(v.get("locked") or 0.0)}
+
+    @staticmethod
+    def _adjust(book: Dict[str, Dict[str, float]], asset: str, delta: float):
+        entry = book.setdefault(asset, {"free": 0.0, "locked": 0.0})
+        entry["free"] = max(0.0, entry["free"] + delta)
+
+    async def reconcile(self, key_id: str, coalesce: bool = False) -> bool:
+        """
+        거래소 잔고로 장부를 교체합니다.
+        조회 도중 체결이 반영되었다면 조회 결과가 이미 낡았을 수 있으므로 교체하지 않습니다.
+        coalesce=True이면 락을 기다리는 동안 다른 호출이 대사를 마친 경우 그 결과를 사용합니다
+        (드레인 시 같은 키의 여러 봇이 동시에 fresh 잔고를 요청해도 거래소 조회는 1회).
+        """
+        lock = self._locks.setdefault(key_id, asyncio.Lock())
+        generation = self._reconciled.get(key_id, 0)
+        async with lock:
+            if coalesce and self._reconciled.get(key_id, 0) != generation:
+                return True
+            seq_before = self._fill_seq.get(key_id, 0)
+            balance = await self.adapter_client.get_balance(key_id)
+            if not balance or "assets" not in balance:
+                logger.warning(f"잔고 대사 실패 ({key_id}): 거래소 잔고를 가져오지 못했습니다.")
+                return False
+            if self.is_seeded(key_id) and self._fill_seq.get(key_id, 0) != seq_before:
+                logger.info(f"잔고 대사 건너뜀 ({key_id}): 조회 중 체결 발생.")
+                return False
+
+            fresh = {
+                a["asset"]: {"free": float(a.get("free") or 0.0), "locked": float(a.get("locked") or 0.0)}
+                for a in balance["assets"]
+            }
+            self._log_drift(key_id, fresh)
+            self._balances[key_id] = fresh
+            self._reconciled[key_id] = self._reconciled.get(key_id, 0) + 1
+            return True
+
+    def _log_drift(self, key_id: str, fresh: Dict[str, Dict[str, float]]):
+        local = self._balances.get(key_id)
+        if local is None:
+            return
+        for asset in set(local) | set(fresh):
+            ours = local.get(asset, {}).get("free", 0.0)
+            theirs = fresh.get(asset, {}).get("free", 0.0)
+            if abs(ours - theirs) > self.drift_tolerance:
+                logger.warning(f"잔고 드리프트 감지 ({key_id}/{asset}): 로컬={ours} 거래소={theirs}")
+
+    async def reconcile_all(self):
+        """스케줄러가 주기적으로 호출하는 백그라운드 대사 작업입니다."""
+        for key_id in list(self._balances.keys()):
+            try:
+                await self.reconcile(key_id)
+            except Exception as e:
+                logger.error(f"잔고 대사 중 오류 ({key_id}): {e}")
@@ -25,41 +25,46 @@ class BotClient:
             except httpx.HTTPStatusError as exc:
                 logger.error(f"BotService 요청 중 오류 응답 {exc.response.status_code}.")
                 return []
-    async def update_bot_status(self, bot_id: str, status: str, message: str = None):
+    async def update_bot_status(self, bot_id: str, status: str, message: str = None, expected_status: str = None):
         """
-        봇의 상태를 업데이트합니다. (READ -> MODIFY -> PUT 패턴)
-        BotService가 PATCH를 지원하지 않으므로, 전체 정보를 조회 후 상태만 변경하여 업데이트합니다.
+        봇의 상태를 전이합니다 (POST /bots/{id}/transition, 단일 조건부 UPDATE).
+        expected_status를 지정하면 현재 상태가 그 값일 때만 변경됩니다.
+        message가 None이면 기존 상태 메시지를 유지합니다.
+        성공 시 {"ok": True, ...}, 조건 불일치 시 {"ok": False, "status": 현재 상태}, 요청 실패 시 None을 반환합니다.
         """
         async with httpx.AsyncClient() as client:
             try:
-                # 1. 현재 봇 정보 조회
-                get_resp = await client.get(f"{BOT_SERVICE_URL}/bots/{bot_id}")
-                get_resp.raise_for_status()
-                bot_data = get_resp.json()
-
-                # 2. 업데이트 페이로드 구성 (BotUpdate 스키마에 맞춤)
-                # message가 있으면 덮어쓰고, 없으면 기존 메시지 유지 (또는 None)
-                new_message = message if message is not None else bot_data.get("status_message")
-                
-                payload = {
-                    "name": bot_data["name"],
-                    "status": status,
-                    "status_message": new_message,
-                    "global_settings": bot_data["global_settings"],
-                    "pipeline": bot_data["pipeline"]
-                }
+                payload = {"expected_status": expected_status, "new_status": status, "message": message}
+                resp = await client.post(f"{BOT_SERVICE_URL}/bots/{bot_id}/transition", json=payload)
+                resp.raise_for_status()
+                result = resp.json()
+                if result.get("ok"):
+                    logger.info(f"봇 {bot_id} 상태 업데이트 성공: {status}")
+                else:
+                    logger.warning(f"봇 {bot_id} 상태 전이 거부: {expected_status} -> {status} (현재: {result.get('status')})")
+                return result
 
-                # 3. PUT 요청 전송
-                put_resp = await client.put(f"{BOT_SERVICE_URL}/bots/{bot_id}", json=payload)
-                put_resp.raise_for_status()
-                
-                logger.info(f"봇 {bot_id} 상태 업데이트 성공: {status}")
-                return put_resp.json()
-                
             except Exception as e:
                 logger.error(f"봇 상태 업데이트 실패 ({bot_id} -> {status}): {e}")
                 return None
 
+    async def start_bot_session(self, bot_id: str, status: str = "BOOTING", resume: bool = False):
+        """
+        [BotService] 봇 세션을 시작하고 상태를 status로 변경합니다. (POST /bots/{id}/start)
+        반환된 세션 ID는 러너의 모든 원장 기록에 사용됩니다. resume=True이면 활성 세션을 이어서 사용합니다.
+        """
+        async with httpx.AsyncClient() as client:
+            try:
+                resp = await client.post(
+                    f"{BOT_SERVICE_URL}/bots/{bot_id}/start",
+                    params={"status": status, "resume": str(resume).lower()},
+                )
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                logger.error(f"세션 시작 요청 실패 ({bot_id}): {e}")
+                return None
+
     async def stop_bot_session(self, bot_id: str):
         """
         [BotService] 봇의 세션을 명시적으로 종료합니다. (POST /bots/{id}/stop)
@@ -75,7 +80,12 @@ class BotClient:
                 logger.error(f"세션 종료 요청 실패 ({bot_id}): {e}")
                 return None
 
-    async def create_local_order(self, bot_id, symbol, side, quantity, reason, timestamp):
+    async def create_local_order(self, bot_id, symbol, side, quantity, reason, timestamp, order_id=None,
+                                 session_id=None):
+        """
+        로컬 주문(PREPARE)을 생성합니다. order_id를 지정하면 그 ID로 생성하며,
+        이미 존재하는 ID면 BotService가 기존 주문을 그대로 반환합니다 (아웃박스 재전달에 안전).
+        """
         async with httpx.AsyncClient() as client:
             try:
                 payload = {
@@ -84,8 +94,12 @@ class BotClient:
                     "side": side,
                     "quantity": quantity,
                     "reason": reason,
-                    "timestamp": timestamp.isoformat() if timestamp else None
+                    "timestamp": timestamp.isoformat() if hasattr(timestamp, "isoformat") else timestamp
                 }
+                if order_id:
+                    payload["id"] = order_id
+                if session_id:
+                    payload["session_id"] = session_id
                 resp = await client.post(f"{BOT_SERVICE_URL}/orders", json=payload)
                 resp.raise_for_status()
                 return resp.json() # {"id": "...", "status": "..."} 반환
@@ -93,10 +107,48 @@ class BotClient:
                 logger.error(f"Failed to create local order: {e}")
                 return None
 
-    async def update_order_status(self, local_order_id, status):
+    async def get_bots(self):
+        """상태와 무관한 전체 봇 목록 (부팅 대사용). 실패하면 None."""
+        async with httpx.AsyncClient() as client:
+            try:
+                resp = await client.get(f"{BOT_SERVICE_URL}/bots", params={"limit": 10000})
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                logger.error(f"Failed to fetch bots: {e}")
+                return None
+
+    async def get_bot(self, bot_id: str):
         async with httpx.AsyncClient() as client:
             try:
-                resp = await client.put(f"{BOT_SERVICE_URL}/orders/{local_order_id}/status", json={"status": status})
+                resp = await client.get(f"{BOT_SERVICE_URL}/bots/{bot_id}")
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                logger.error(f"Failed to fetch bot {bot_id}: {e}")
+                return None
+
+    async def get_unresolved_orders(self, statuses=("PENDING", "SENT"), limit: int = 500):
+        """거래소 결과가 아직 원장에 확정되지 않은 로컬 주문 목록 (오래된 순)."""
+        async with httpx.AsyncClient() as client:
+            try:
+                resp = await client.get(
+                    f"{BOT_SERVICE_URL}/orders",
+                    params={"status": ",".join(statuses), "limit": limit},
+                )
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                logger.error(f"Failed to fetch unresolved orders: {e}")
+                return None
+
+    async def update_order_status(self, local_order_id, status, exchange_order_id=None):
+        async with httpx.AsyncClient() as client:
+            try:
+                payload = {"status": status}
+                if exchange_order_id:
+                    payload["exchange_order_id"] = exchange_order_id
+                resp = await client.put(f"{BOT_SERVICE_URL}/orders/{local_order_id}/status", json=payload)
                 resp.raise_for_status()
                 return resp.json()
             except Exception as e:
@@ -117,3 +169,49 @@ class BotClient:
             except Exception as e:
                 logger.error(f"Failed to record execution: {e}")
                 return False
+
+    async def apply_ledger_batch(self, ops):
+        """
+        원장 작업 배치를 순서대로 반영합니다 (POST /ledger/batch).
+        {"applied": n, "error": {...} | None}를 반환하며, 전송 자체가 실패하면 None을 반환합니다.
+        """
+        async with httpx.AsyncClient() as client:
+            try:
+                resp = await client.post(f"{BOT_SERVICE_URL}/ledger/batch", json={"ops": ops}, timeout=30.0)
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                logger.error(f"Failed to apply ledger batch ({len(ops)} ops): {e}")
+                return None
+
+    async def get_execution_cursor(self, symbol: str, bot_ids):
+        """봇들의 심볼 기준 마지막 체결 시각 / 가장 오래된 미해결 주문 시각 (GET /executions/cursor)."""
+        async with httpx.AsyncClient() as client:
+            try:
+                resp = await client.get(
+                    f"{BOT_SERVICE_URL}/executions/cursor",
+                    params={"symbol": symbol, "bot_ids": ",".join(bot_ids)},
+                )
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                logger.error(f"Failed to fetch execution cursor ({symbol}): {e}")
+                return None
+
+    async def import_executions(self, fills, bot_ids=None):
+        """
+        거래소 체결 목록 중 원장에 없는 체결을 일괄 기록합니다 (POST /executions/import, 단일 트랜잭션).
+        보고서({"received", "duplicates", "imported", "unmatched", ...})를 반환하며, 실패하면 None.
+        """
+        async with httpx.AsyncClient() as client:
+            try:
+                resp = await client.post(
+                    f"{BOT_SERVICE_URL}/executions/import",
+                    json={"fills": fills, "bot_ids": bot_ids},
+                    timeout=120.0,
+                )
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                logger.error(f"Failed to import executions ({len(fills)} fills): {e}")
+                return None
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("execution-service.checkpoint_store")
+
+
+class CheckpointStore:
+    """
+    봇 단위 전략 상태 체크포인트 저장소 (SQLite, 봇당 최신 1건).
+
+    - save()는 메모리의 최신 체크포인트만 교체하고 즉시 반환합니다 (틱 경로에서 I/O 없음).
+      백그라운드 writer가 쌓인 체크포인트를 스레드에서 한 트랜잭션으로 기록하므로,
+      기록 중에 같은 봇의 체크포인트가 여러 번 갱신되어도 마지막 것만 씁니다.
+    - load()는 아직 기록되지 않은 최신 체크포인트를 먼저 반환합니다.
+    - 체크포인트 레코드: 전략 ID/버전, 전략 상태 포맷 버전(state_version), 세션 ID,
+      봇별 단조 증가 seq, 전략 상태(payload, compact JSON).
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS strategy_checkpoints (
+                bot_id TEXT PRIMARY KEY,
+                strategy_id TEXT NOT NULL,
+                strategy_version TEXT,
+                state_version INTEGER NOT NULL,
+                session_id TEXT,
+                seq INTEGER NOT NULL,
+                payload_json TEXT NOT NULL,
+                saved_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._db_lock = threading.Lock()
+        self._dirty: Dict[str, Dict[str, Any]] = {}
+        self._seq: Dict[str, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._inflight: Dict[str, Dict[str, Any]] = {}  # 기록 중인 배치 (load()가 참조)
+        self._closed = False
+        self._metrics: Dict[str, Any] = {"saves_total": 0, "writes_total": 0, "write_batches_total": 0,
+                                         "last_write_duration_sec": 0.0}
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self._metrics, "dirty": len(self._dirty)}
+
+    def start(self):
+        if self._writer is None or self._writer.done():
+            self._wakeup = asyncio.Event()
+            self._writer = asyncio.create_task(self._write_loop())
+
+    def save(self, bot_id: str, strategy_id: str, strategy_version: Optional[str], state_version: int,
+             session_id: Optional[str], payload: Dict[str, Any]):
+        """최신 체크포인트를 예약합니다. 디스크 기록은 백그라운드 writer가 수행합니다."""
+        seq = self._seq.get(bot_id)
+        if seq is None:
+            current = self.load(bot_id)
+            seq = current["seq"] if current else 0
+        self._seq[bot_id] = seq + 1
+        self._dirty[bot_id] = {
+            "bot_id": bot_id,
+            "strategy_id": strategy_id,
+            "strategy_version": strategy_version,
+            "state_version": state_version,
+            "session_id": session_id,
+            "seq": seq + 1,
+            "payload": payload,
+            "saved_at": time.time(),
+        }
+        self._metrics["saves_total"] += 1
+        if self._closed:
+            return
+        try:
+            self.start()
+        except RuntimeError:
+            return  # 이벤트 루프 밖 (flush()가 동기 기록)
+        self._wakeup.set()
+
+    def load(self, bot_id: str) -> Optional[Dict[str, Any]]:
+        pending = self._dirty.get(bot_id) or self._inflight.get(bot_id)
+        if pending is not None:
+            return pending
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT strategy_id, strategy_version, state_version, session_id, seq, payload_json, saved_at "
+                "FROM strategy_checkpoints WHERE bot_id = ?",
+                (bot_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        strategy_id, strategy_version, state_version, session_id, seq, payload_json, saved_at = row
+        return {
+            "bot_id": bot_id,
+            "strategy_id": strategy_id,
+            "strategy_version": strategy_version,
+            "state_version": state_version,
+            "session_id": session_id,
+            "seq": seq,
+            "payload": json.loads(payload_json),
+            "saved_at": saved_at,
+        }
+
+    async def _write_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._dirty:
+                if self._closed:
+                    return
+                continue
+            self._inflight, self._dirty = self._dirty, {}
+            batch = list(self._inflight.values())
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, batch)
+            except Exception as e:
+                logger.error(f"체크포인트 기록 실패 ({len(batch)}건), 재시도 예정: {e}")
+                for record in batch:
+                    self._dirty.setdefault(record["bot_id"], record)
+                await asyncio.sleep(1.0)
+                self._wakeup.set()
+            finally:
+                self._inflight = {}
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        rows = [
+            (r["bot_id"], r["strategy_id"], r["strategy_version"], r["state_version"], r["session_id"], r["seq"],
+             json.dumps(r["payload"], separators=(",", ":"), default=str), r["saved_at"])
+            for r in batch
+        ]
+        with self._db_lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO strategy_checkpoints "
+                    "(bot_id, strategy_id, strategy_version, state_version, session_id, seq, payload_json, saved_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        self._metrics["writes_total"] += len(rows)
+        self._metrics["write_batches_total"] += 1
+        self._metrics["last_write_duration_sec"] = time.perf_counter() - started
+
+    async def flush(self, timeout: float = 5.0) -> bool:
+        """예약된 체크포인트가 모두 기록될 때까지 대기합니다. 시간 내 완료 여부를 반환합니다."""
+        deadline = time.monotonic() + timeout
+        while self._dirty or self._inflight:
+            if self._writer is None or self._writer.done():
+                if self._dirty:
+                    self._write(list(self._dirty.values()))
+                    self._dirty = {}
+                break
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    async def close(self, timeout: float = 5.0):
+        await self.flush(timeout)
+        self._closed = True
+        if self._writer is not None and not self._writer.done():
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._writer, timeout=1.0)
+            except asyncio.TimeoutError:
+                self._writer.cancel()
+        with self._db_lock:
+            self._conn.close()
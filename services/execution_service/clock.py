@@ -0,0 +1,96 @@
+import asyncio
+import heapq
+import os
+import time
+from typing import List, Optional, Tuple
+
+CLOCK_MODE = os.getenv("EXECUTION_CLOCK_MODE", "real")
+
+
+class RealClock:
+    """
+    실제 벽시계(Wall Clock) 기반 시계입니다. 운영 환경의 기본값입니다.
+    """
+    mode = "real"
+
+    def time(self) -> float:
+        return time.time()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    가상 시계 (Fast-Forward 모드).
+
+    sleep()은 실제로 대기하지 않고 가상 시간만 즉시 전진시킵니다.
+    보유 타이머, 쿨다운, time_stop_sec 등이 즉시 해소되므로
+    가속 시뮬레이션과 빠른 테스트에 사용합니다.
+    """
+    mode = "virtual"
+
+    def __init__(self, start: Optional[float] = None):
+        self._now = float(start) if start is not None else time.time()
+
+    def time(self) -> float:
+        return self._now
+
+    async def sleep(self, seconds: float):
+        if seconds > 0:
+            self._now += seconds
+        # 다른 태스크에 제어권을 양보하여 이벤트 루프가 굶지 않도록 합니다.
+        await asyncio.sleep(0)
+
+    def advance(self, seconds: float):
+        """외부 드라이버가 가상 시간을 직접 전진시킵니다."""
+        if seconds > 0:
+            self._now += seconds
+
+
+class StepClock(VirtualClock):
+    """
+    가상 시계 (Step 모드).
+
+    sleep()은 외부 드라이버가 advance()로 시간을 마감 시각 이후까지
+    전진시킬 때까지 블로킹됩니다. 틱 단위로 시뮬레이션을 제어할 때 사용합니다.
+    """
+    mode = "step"
+
+    def __init__(self, start: Optional[float] = None):
+        super().__init__(start)
+        self._sleepers: List[Tuple[float, int, asyncio.Future]] = []
+        self._seq = 0
+
+    async def sleep(self, seconds: float):
+        if seconds <= 0:
+            await asyncio.sleep(0)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._sleepers, (self._now + seconds, self._seq, fut))
+        await fut
+
+    def advance(self, seconds: float):
+        super().advance(seconds)
+        while self._sleepers and self._sleepers[0][0] <= self._now:
+            _, _, fut = heapq.heappop(self._sleepers)
+            if not fut.done():
+                fut.set_result(None)
+
+    @property
+    def pending_sleepers(self) -> int:
+        return len(self._sleepers)
+
+
+def create_clock(mode: Optional[str] = None):
+    """
+    모드 문자열(real | virtual | step)로 시계를 생성합니다.
+    지정하지 않으면 EXECUTION_CLOCK_MODE 환경 변수를 따릅니다.
+    """
+    mode = (mode or CLOCK_MODE).lower()
+    if mode == "virtual":
+        return VirtualClock()
+    if mode == "step":
+        return StepClock()
+    return RealClock()
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("execution-service.drain")
+
+# 배치가 끝내 전송되지 못한 주문의 결과 (LedgerAwareAdapter는 SENT로 남겨 대사 워커에 맡김)
+UNSENT = {"status": "unknown", "error": "drain deadline exceeded"}
+
+
+class OrderBatcher:
+    """
+    드레인 중 여러 러너의 청산 주문을 (키, 심볼) 단위로 모아 POST /orders/batch 1회로 보냅니다.
+
+    - 각 봇의 LedgerAwareAdapter가 PREPARE(로컬 주문 ID 발급)까지 마친 주문만 받습니다.
+      원장 기록(COMMIT)도 봇별 어댑터가 결과를 받아 그대로 수행하므로 봇 단위 귀속은 유지됩니다.
+    - 첫 주문 이후 window_sec 동안 들어온 주문을 한 배치로 묶고, max_batch에 도달하면 즉시 보냅니다.
+    - 체결되지 않은 주문은 봇 ID별로 기록하여 드레인 보고서/복구 큐에 남깁니다.
+    """
+
+    def __init__(self, adapter_client, window_sec: float = 0.05, max_batch: int = 50):
+        self.adapter_client = adapter_client
+        self.window_sec = window_sec
+        self.max_batch = max_batch
+        self._pending: Dict[Tuple[str, str], List[Tuple[str, Dict[str, Any], asyncio.Future]]] = {}
+        self._flushers: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.failed: Dict[str, List[Dict[str, Any]]] = {}
+        self._metrics = {"orders": 0, "batches": 0, "failed": 0}
+
+    async def submit(self, owner: str, key_id: str, symbol: str, order: Dict[str, Any]) -> Dict[str, Any]:
+        """주문 1건을 배치에 넣고 결과(place_order와 같은 포맷)를 기다립니다."""
+        key = (key_id, symbol)
+        future = asyncio.get_running_loop().create_future()
+        bucket = self._pending.setdefault(key, [])
+        bucket.append((owner, order, future))
+        self._metrics["orders"] += 1
+        if len(bucket) >= self.max_batch:
+            self._start_flush(key, delay=0.0)
+        elif key not in self._flushers:
+            self._start_flush(key, delay=self.window_sec)
+        result = await future
+        if result.get("status") != "filled":
+            self.failed.setdefault(owner, []).append({**order, "symbol": symbol, "result": result})
+            self._metrics["failed"] += 1
+        return result
+
+    def _start_flush(self, key: Tuple[str, str], delay: float):
+        previous = self._flushers.pop(key, None)
+        if previous is not None and delay == 0.0:
+            previous.cancel()
+        self._flushers[key] = asyncio.create_task(self._flush(key, delay))
+
+    async def _flush(self, key: Tuple[str, str], delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        if self._flushers.get(key) is asyncio.current_task():
+            del self._flushers[key]
+        items = self._pending.pop(key, [])
+        if not items:
+            return
+        self._metrics["batches"] += 1
+        key_id, symbol = key
+        try:
+            results = await self.adapter_client.place_orders(key_id, symbol, [order for _, order, _ in items])
+        except Exception as e:
+            logger.error(f"드레인 배치 주문 실패 ({key_id}/{symbol}, {len(items)}건): {e}")
+            results = [{"status": "unknown", "error": str(e)}] * len(items)
+        for (_, _, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+    def close(self):
+        """전송되지 않은 주문의 대기를 해제합니다 (드레인 마감)."""
+        for task in self._flushers.values():
+            task.cancel()
+        self._flushers.clear()
+        for items in self._pending.values():
+            for _, _, future in items:
+                if not future.done():
+                    future.set_result(dict(UNSENT))
+        self._pending.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        return dict(self._metrics)
+
+
+class RecoveryQueue:
+    """
+    드레인이 끝내지 못한 작업(마감 초과 러너, 체결되지 않은 청산 주문)을 보관하는 SQLite 큐.
+    종료 경로에서 호출되므로 동기 기록합니다. 운영자가 GET /recovery로 확인하고 처리 후 resolve합니다.
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS drain_recovery (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                bot_id TEXT NOT NULL,
+                reason TEXT NOT NULL,
+                payload_json TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                resolved_at REAL
+            )
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def enqueue(self, items: List[Dict[str, Any]]) -> int:
+        if not items:
+            return 0
+        now = time.time()
+        rows = [
+            (item["bot_id"], item["reason"], json.dumps(item, separators=(",", ":"), default=str), now)
+            for item in items
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO drain_recovery (bot_id, reason, payload_json, created_at) VALUES (?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def pending(self, limit: int = 500) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload_json, created_at FROM drain_recovery WHERE resolved_at IS NULL "
+                "ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [{"id": rid, **json.loads(payload), "created_at": created_at} for rid, payload, created_at in rows]
+
+    def resolve(self, item_id: int) -> bool:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE drain_recovery SET resolved_at = ? WHERE id = ? AND resolved_at IS NULL", (time.time(), item_id)
+            )
+        return cur.rowcount > 0
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            (pending,) = self._conn.execute(
+                "SELECT COUNT(*) FROM drain_recovery WHERE resolved_at IS NULL"
+            ).fetchone()
+        return {"pending": pending}
+
+    def close(self):
+        self._conn.close()
+
+
+class FleetDrainer:
+    """
+    종료/배포 전 모든 러너를 동시에 정지합니다 (전역 마감 시간 1개).
+
+    - drain(): 러너마다 on_stop(청산)을 동시에 실행하고, 청산 주문은 OrderBatcher로 키/심볼 단위 배치 전송합니다.
+      마감까지 끝나지 않은 러너와 체결되지 않은 청산 주문은 RecoveryQueue에 남깁니다.
+    - halt(): 청산 없이 루프만 멈춥니다 (봇은 RUNNING으로 남아 재시작 후 체크포인트로 재개).
+    """
+
+    def __init__(self, adapter_client, recovery_queue: RecoveryQueue, batch_window_sec: float = 0.05):
+        self.adapter_client = adapter_client
+        self.recovery_queue = recovery_queue
+        self.batch_window_sec = batch_window_sec
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    async def drain(self, runners: Dict[str, Any], deadline_sec: float) -> Dict[str, Any]:
+        started = time.perf_counter()
+        batcher = OrderBatcher(self.adapter_client, window_sec=self.batch_window_sec)
+        tasks = {
+            asyncio.create_task(runner.stop(timeout=deadline_sec, order_batcher=batcher)): bid
+            for bid, runner in runners.items()
+        }
+        done, not_done = await asyncio.wait(tasks, timeout=deadline_sec) if tasks else (set(), set())
+        batcher.close()
+        for task in not_done:
+            task.cancel()
+
+        recovery = []
+        for task, bid in tasks.items():
+            runner = runners[bid]
+            if task in not_done:
+                reason = "deadline"
+            elif task.exception() is not None:
+                reason = f"error: {task.exception()}"
+            elif task.result() is False:
+                reason = "stop_timeout"
+            elif bid in batcher.failed:
+                reason = "liquidation_not_filled"
+            else:
+                continue
+            recovery.append(self._recovery_item(runner, reason, batcher.failed.get(bid, [])))
+        self.recovery_queue.enqueue(recovery)
+
+        self.last_report = {
+            "mode": "drain",
+            "runners": len(tasks),
+            "stopped": len(tasks) - len(recovery),
+            "unfinished": [item["bot_id"] for item in recovery],
+            "orders": batcher.metrics(),
+            "duration_sec": round(time.perf_counter() - started, 3),
+        }
+        logger.info(f"드레인 완료: {self.last_report}")
+        return self.last_report
+
+    async def halt(self, runners: Dict[str, Any], deadline_sec: float) -> Dict[str, Any]:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(runner.halt(timeout=deadline_sec) for runner in runners.values()),
+                                       return_exceptions=True)
+        self.last_report = {
+            "mode": "resume",
+            "runners": len(results),
+            "stopped": sum(1 for r in results if r is True),
+            "unfinished": [bid for bid, r in zip(runners, results) if r is not True],
+            "duration_sec": round(time.perf_counter() - started, 3),
+        }
+        logger.info(f"러너 정지(재개 모드) 완료: {self.last_report}")
+        return self.last_report
+
+    @staticmethod
+    def _recovery_item(runner, reason: str, orders: List[Dict[str, Any]]) -> Dict[str, Any]:
+        config = runner.bot_config
+        strategy = runner.strategy_instance
+        return {
+            "bot_id": config["id"],
+            "name": config.get("name"),
+            "key_id": config.get("global_settings", {}).get("exchange"),
+            "symbol": config.get("global_settings", {}).get("symbol"),
+            "session_id": runner.session_id,
+            "strategy_id": runner.strategy_id,
+            "reason": reason,
+            "orders": orders,
+            "state": strategy.snapshot_state() if hasattr(strategy, "snapshot_state") else None,
+        }
@@ -4,9 +4,25 @@ import traceback
 from adapter_client import AdapterClient
 from bot_client import BotClient
 from ledger_adapter import LedgerAwareAdapter
-# Import strategies dynamically or statically
-from strategies.test_trading import TestTradingStrategy
-from strategies.orderflow_exhaustion_v1 import OrderflowExhaustionV1Strategy
+from clock import RealClock
+from strategy_registry import StrategyRegistry
+
+# 파이프라인에 전략이 없거나 레지스트리에 없는 전략일 때 사용하는 기본 전략
+DEFAULT_STRATEGY_ID = "test_trading_v1"
+
+
+def _strategy_node(config: dict) -> dict:
+    pipeline = config.get("pipeline", {}) if isinstance(config, dict) else {}
+    return pipeline.get("strategy", {}) if isinstance(pipeline, dict) else {}
+
+
+def _structure(config: dict) -> tuple:
+    """전략 파라미터를 제외한 설정 (거래소 키, 심볼, 전략 ID/버전 등). 이 부분이 바뀌면 재시작이 필요합니다."""
+    pipeline = config.get("pipeline", {})
+    if isinstance(pipeline, dict):
+        node = {k: v for k, v in (pipeline.get("strategy") or {}).items() if k != "params"}
+        pipeline = {**pipeline, "strategy": node}
+    return config.get("global_settings"), pipeline
 
 logger = logging.getLogger("execution-service.engine")
 
@@ -14,102 +30,334 @@ class BotRunner:
     """
     개별 봇의 실행 루프를 관리하는 클래스입니다.
     """
-    def __init__(self, bot_config: dict, adapter_client: AdapterClient, bot_client: BotClient):
+    def __init__(self, bot_config: dict, adapter_client: AdapterClient, bot_client: BotClient, clock=None,
+                 balance_book=None, fill_stream=None, ledger_outbox=None, strategy_registry=None,
+                 checkpoint_store=None, checkpoint_interval_sec: float = 30.0, orderflow_fleet=None,
+                 pipeline_graph=None, feature_store=None, risk_engine=None):
         self.bot_config = bot_config
         self.adapter_client = adapter_client
         self.bot_client = bot_client
+        # 전략/루프가 공유하는 시계 (real | virtual | step). 기본값은 실제 시계.
+        self.clock = clock or RealClock()
+        # 모든 러너가 공유하는 체결 기반 잔고 장부 (선택)
+        self.balance_book = balance_book
+        # User Data Stream 체결 처리기 (선택). 있으면 부팅 시 키 스트림을 구독합니다.
+        self.fill_stream = fill_stream
+        # 원장 쓰기 아웃박스 (선택). 있으면 주문 경로가 BotService 응답을 기다리지 않습니다.
+        self.ledger_outbox = ledger_outbox
+        # 전략 플러그인 레지스트리 (서비스 전체 공유). 전략 모듈은 첫 부팅 시점에 import됩니다.
+        self.strategy_registry = strategy_registry or StrategyRegistry()
+        # 전략 상태 체크포인트 저장소 (선택). 있으면 부팅 시 복원하고, 상태 전이 시와 주기적으로 저장합니다.
+        self.checkpoint_store = checkpoint_store
+        self.checkpoint_interval_sec = checkpoint_interval_sec
+        # orderflow_exhaustion_v1 배치 신호 평가기 (선택, 서비스 전체 공유)
+        self.orderflow_fleet = orderflow_fleet
+        # 파이프라인 노드 공유 그래프 (선택). 있으면 부팅 시 파이프라인을 컴파일하여 Trigger로 전략 실행을 결정합니다.
+        self.pipeline_graph = pipeline_graph
+        self.pipeline = None
+        # 심볼 단위 피처 저장소 (선택, 서비스 전체 공유). 있으면 context["features"]로 전략에 노출합니다.
+        self.feature_store = feature_store
+        # 사전 주문 리스크 게이트 (선택, 서비스 전체 공유). 킬 스위치는 모든 러너의 신규 주문을 막습니다.
+        self.risk_engine = risk_engine
+        self._last_checkpoint = None
+        self._last_checkpoint_at = 0.0
+        # BotService 세션 ID (부팅 시 발급, 모든 원장 기록에 사용)
+        self.session_id = None
         self.strategy_instance = None
+        self.strategy_id = None
+        self.strategy_version = None
+        # BotService 설정 리비전. 폴링 응답의 값과 비교하여 설정 변경을 감지합니다.
+        self.config_version = bot_config.get("config_version")
+        self._pending_config = None  # (new_config, changed_params): 다음 틱 전에 적용
+        self._rejected_config_version = None  # 전략이 제자리 적용을 거부한 리비전 (재시작으로 적용)
+        self.restarting = False
         self.task = None
+        self._context = None  # 실행 루프의 context (드레인 시 어댑터에 주문 배처를 연결)
         self.is_running = False
         self.stop_requested = False
 
     async def start(self):
         """봇 실행 루프를 시작합니다. 반드시 BOOTING 단계를 거칩니다."""
-        # 1. BOOTING 상태로 전이 (SSOT: BotService)
-        if self.bot_config.get('status') != 'BOOTING':
-             logger.info(f"{self.bot_config['name']} 상태를 BOOTING으로 변경 중")
-             await self.bot_client.update_bot_status(self.bot_config['id'], "BOOTING")
+        # 1. 세션 시작 + BOOTING 상태로 전이 (SSOT: BotService)
+        # 이미 RUNNING인 봇(서비스 재시작 후 재개)은 기존 활성 세션을 이어서 사용합니다.
+        logger.info(f"{self.bot_config['name']} 세션 시작 및 상태를 BOOTING으로 변경 중")
+        session = await self.bot_client.start_bot_session(
+            self.bot_config['id'], status="BOOTING", resume=self.bot_config.get('status') == 'RUNNING'
+        )
+        if session:
+            self.session_id = session.get("id")
+        elif self.bot_config.get('status') != 'BOOTING':
+            # 세션 시작 실패 시 상태만 전이 (세션은 BotService가 주문 시점에 결정)
+            await self.bot_client.update_bot_status(self.bot_config['id'], "BOOTING",
+                                                    expected_status=self.bot_config.get('status'))
 
         self.is_running = True
-        self._initialize_strategy()
+        try:
+            self._initialize_strategy()
+            self._compile_pipeline()
+        except ValueError as e:
+            # 전략 파라미터/파이프라인 검증 실패 (예: grid_v1의 상/하단 가격 누락, 알 수 없는 지표)
+            logger.error(f"{self.bot_config['name']}: 전략 설정 오류: {e}")
+            await self.bot_client.update_bot_status(self.bot_config['id'], "STOPPED", message=f"전략 설정 오류: {e}")
+            self.is_running = False
+            return
+        self._restore_checkpoint()
+
+        key_id = self.bot_config.get("global_settings", {}).get("exchange")
+        if self.fill_stream is not None and key_id:
+            if not await self.fill_stream.ensure_subscribed(key_id):
+                logger.warning(f"{self.bot_config['name']}: User Data Stream 미연결. 동기 주문 응답으로 체결을 기록합니다.")
         
         # 2. BOOTING 단계에서 초기 사이클 실행
         # 첫 번째 트레이딩 틱(예: 그리드 오픈)이 원장 기록([3/3] COMMIT)까지 
         # 완전히 완료되어야만 RUNNING 상태로 변경되도록 보장합니다.
         logger.info(f"{self.bot_config['name']}의 초기 부팅 사이클(동기화/매매 체크) 수행 중...")
         
-        ledger_adapter = LedgerAwareAdapter(
-            raw_adapter=self.adapter_client,
-            bot_client=self.bot_client,
-            bot_id=self.bot_config['id']
-        )
-        
-        context = {
-            "adapter": ledger_adapter, 
-            "bot_id": self.bot_config['id'],
-            "config": self.bot_config
-        }
+        context = self._build_context()
         
         try:
             if self.strategy_instance:
                 # 이 호출은 LedgerAwareAdapter.place_order가 [3/3] Commit을 마칠 때까지 블로킹됩니다.
-                await self.strategy_instance.execute(context)
+                # (아웃박스 사용 시에는 Commit이 로컬 아웃박스에 기록될 때까지)
+                await self._tick(context)
             
             # 부팅 시뮬레이션을 위한 추가 지연 (필요 시)
-            await asyncio.sleep(1)
+            await self.clock.sleep(1)
             
         except Exception as e:
             logger.error(f"{self.bot_config['name']} 부팅 사이클 중 치명적 오류 발생: {e}")
             await self.bot_client.update_bot_status(self.bot_config['id'], "STOPPED")
             self.is_running = False
+            self._release_pipeline()
             return
 
         # 3. RUNNING 상태로 최종 전이
         # execute()가 예외 없이 종료되었다는 것은 첫 번째 틱의 모든 원장 기록이 완료되었음을 의미합니다.
         logger.info(f"부팅 완료. {self.bot_config['name']} 상태를 RUNNING으로 변경합니다.")
-        await self.bot_client.update_bot_status(self.bot_config['id'], "RUNNING")
+        # 부팅 중 사용자가 정지를 요청했다면(STOPPING) 덮어쓰지 않도록 BOOTING일 때만 전이합니다.
+        await self.bot_client.update_bot_status(self.bot_config['id'], "RUNNING", expected_status="BOOTING")
         
         # 4. 백그라운드 루프로 전환
         self.task = asyncio.create_task(self._run_loop())
         logger.info(f"{self.bot_config['name']}의 BotRunner 루프가 시작되었습니다.")
 
-    async def stop(self):
-        """봇 루프를 안전하게 종료(Graceful Stop)합니다."""
+    async def stop(self, timeout: float = 15.0, order_batcher=None) -> bool:
+        """
+        봇 루프를 안전하게 종료(Graceful Stop)합니다. 전략 정리(on_stop)가 timeout 안에 끝났으면 True.
+        order_batcher가 주어지면(서비스 드레인) 청산 주문을 다른 러너의 주문과 묶어 배치로 전송합니다.
+        """
         # 1. 상태를 STOPPING으로 변경
         logger.info(f"{self.bot_config['name']} 상태를 STOPPING으로 변경 중")
         await self.bot_client.update_bot_status(self.bot_config['id'], "STOPPING")
+        if order_batcher is not None and self._context is not None:
+            self._context["adapter"].order_batcher = order_batcher
         
         # 2. 루프 종료 요청 (플래그 설정)
         self.stop_requested = True
         
         # 3. 루프가 종료될 때까지 대기
+        finished = True
         if self.task:
             try:
                 # 전략의 on_stop 실행 시간을 고려하여 타임아웃을 넉넉히 설정
-                await asyncio.wait_for(self.task, timeout=15.0) 
+                await asyncio.wait_for(self.task, timeout=timeout)
             except (asyncio.CancelledError, asyncio.TimeoutError):
                 logger.warning("종료 대기 중 타임아웃 또는 취소 발생. 강제 종료합니다.")
                 self.task.cancel()
+                finished = False
+        self._release_pipeline()
         
-        # 4. 최종적으로 세션 종료 및 STOPPED 상태 전이
+        # 4. 청산 주문 등 아웃박스에 남은 원장 기록을 먼저 전달합니다.
+        # (세션 종료 뒤에 주문이 도착하면 BotService가 긴급 세션을 새로 만들기 때문)
+        if self.ledger_outbox is not None:
+            await self.ledger_outbox.flush(timeout=10.0)
+
+        # 5. 최종적으로 세션 종료 및 STOPPED 상태 전이
         # update_bot_status 대신 stop_bot_session을 호출하여 세션까지 정리합니다.
         logger.info(f"{self.bot_config['name']}의 세션을 종료하고 상태를 STOPPED로 변경합니다.")
         await self.bot_client.stop_bot_session(self.bot_config['id'])
         
         logger.info(f"{self.bot_config['name']}의 BotRunner가 정지되었습니다.")
+        return finished
+
+    async def halt(self, timeout: float = 15.0) -> bool:
+        """
+        청산 없이 루프만 멈춥니다 (서비스 재시작 시 재개 모드). 진행 중인 틱은 끝까지 실행하고,
+        봇은 RUNNING으로 남아 재시작 후 체크포인트로 이어서 실행됩니다. timeout 안에 멈췄으면 True.
+        """
+        self.is_running = False
+        finished = True
+        if self.task:
+            try:
+                await asyncio.wait_for(self.task, timeout=timeout)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                logger.warning(f"{self.bot_config['name']}: 틱이 제한 시간 안에 끝나지 않아 취소합니다.")
+                self.task.cancel()
+                finished = False
+        self.checkpoint(force=True)
+        return finished
+
+    def _build_context(self) -> dict:
+        """전략에 전달할 실행 문맥(StrategyContext)을 구성합니다."""
+        ledger_adapter = LedgerAwareAdapter(
+            raw_adapter=self.adapter_client,
+            bot_client=self.bot_client,
+            bot_id=self.bot_config['id'],
+            clock=self.clock,
+            balance_book=self.balance_book,
+            fill_stream=self.fill_stream,
+            outbox=self.ledger_outbox,
+            session_id=self.session_id,
+            risk_engine=self.risk_engine,
+        )
+        return {
+            "adapter": ledger_adapter, 
+            "bot_id": self.bot_config['id'],
+            "session_id": self.session_id,
+            "config": self.bot_config,
+            "clock": self.clock,
+            "orderflow_fleet": self.orderflow_fleet,
+            # 같은 심볼의 시장 업데이트/피처를 모든 봇이 공유 (키 단위로 묶인 읽기 뷰)
+            "features": self.feature_store.view(ledger_adapter, self.bot_config.get("global_settings", {}).get("exchange"))
+            if self.feature_store is not None else None,
+            # 파이프라인 지표 값 (지표 id -> 값, Trigger 평가 시 갱신)과 Risk 단계 설정
+            "indicators": {},
+            "risk": dict((self.bot_config.get("pipeline") or {}).get("risk_management") or {}),
+        }
 
     def _initialize_strategy(self):
         """
-        Factory method to load the correct strategy class based on config.
+        파이프라인의 전략 (id, version)을 레지스트리에서 찾아 인스턴스를 생성합니다.
+        버전을 지정하지 않으면 부팅 시점의 최신 버전을 사용합니다.
         """
-        pipeline = self.bot_config.get("pipeline", {}) if isinstance(self.bot_config, dict) else {}
-        strategy_node = pipeline.get("strategy", {}) if isinstance(pipeline, dict) else {}
-        strategy_id = strategy_node.get("id")
+        strategy_node = _strategy_node(self.bot_config)
+        strategy_id = strategy_node.get("id") or DEFAULT_STRATEGY_ID
+        version = strategy_node.get("version")
 
-        if strategy_id == "orderflow_exhaustion_v1":
-            self.strategy_instance = OrderflowExhaustionV1Strategy(self.bot_config)
-        else:
-            self.strategy_instance = TestTradingStrategy(self.bot_config)
+        # 새로 배포된 전략 버전은 프로세스 재시작 없이 이후 부팅하는 봇부터 적용
+        self.strategy_registry.refresh()
+        try:
+            self.strategy_instance, entry = self.strategy_registry.create(strategy_id, self.bot_config, version=version)
+        except KeyError:
+            logger.warning(f"{self.bot_config['name']}: 등록되지 않은 전략 {strategy_id} (v{version or 'latest'}). "
+                           f"{DEFAULT_STRATEGY_ID}로 대체합니다.")
+            self.strategy_instance, entry = self.strategy_registry.create(DEFAULT_STRATEGY_ID, self.bot_config)
+        self.strategy_id, self.strategy_version = entry.id, entry.version
+        logger.info(f"{self.bot_config['name']}: 전략 {entry.id} v{entry.version} 초기화")
+
+    def _compile_pipeline(self):
+        """파이프라인을 공유 그래프에 컴파일합니다. 잘못된 정의는 ValueError."""
+        if self.pipeline_graph is None:
+            return
+        self.pipeline = self.pipeline_graph.compile(self.bot_config)
+        if not self.pipeline.trivial:
+            logger.info(f"{self.bot_config['name']}: 파이프라인 컴파일 완료 ({self.pipeline_graph.metrics()['nodes']}개 공유 노드)")
+
+    def _release_pipeline(self):
+        if self.pipeline is not None:
+            self.pipeline_graph.release(self.pipeline)
+            self.pipeline = None
+
+    async def _tick(self, context: dict):
+        """Trigger가 발화하면 Action(전략 execute)을 실행합니다. 파이프라인이 없으면 매 틱 실행합니다."""
+        if self.pipeline is not None:
+            if not await self.pipeline.should_run(context["adapter"], self.clock.time()):
+                return
+            context["indicators"] = self.pipeline.values()
+        await self.strategy_instance.execute(context)
+        self.checkpoint()
+
+    def _restore_checkpoint(self):
+        """
+        같은 전략 (id, 버전, 상태 포맷)과 같은 세션의 체크포인트가 있으면 전략 상태를 복원합니다.
+        서비스 재시작 후 RUNNING 봇이 기존 세션을 이어받을 때 포지션을 잃지 않기 위함입니다.
+        정지 후 새 세션으로 부팅하는 경우에는 복원하지 않습니다.
+        """
+        if self.checkpoint_store is None or not hasattr(self.strategy_instance, "restore_state"):
+            return
+        checkpoint = self.checkpoint_store.load(self.bot_config['id'])
+        if checkpoint is None:
+            return
+        expected = (self.strategy_id, self.strategy_version, getattr(self.strategy_instance, "STATE_VERSION", 0))
+        found = (checkpoint["strategy_id"], checkpoint["strategy_version"], checkpoint["state_version"])
+        if found != expected:
+            logger.warning(f"{self.bot_config['name']}: 체크포인트 전략/버전 불일치 {found} != {expected}. 복원하지 않습니다.")
+            return
+        if self.session_id and checkpoint["session_id"] and checkpoint["session_id"] != self.session_id:
+            logger.info(f"{self.bot_config['name']}: 이전 세션의 체크포인트는 복원하지 않습니다.")
+            return
+        self.strategy_instance.restore_state(checkpoint["payload"])
+        self._last_checkpoint = checkpoint["payload"]
+        self._last_checkpoint_at = self.clock.time()
+        logger.info(f"{self.bot_config['name']}: 체크포인트 #{checkpoint['seq']} 복원 완료")
+
+    def checkpoint(self, force: bool = False):
+        """
+        전략 상태를 체크포인트로 예약합니다 (디스크 기록은 저장소의 백그라운드 writer가 수행).
+        상태(state)가 전이되었으면 즉시, 그 밖의 변경은 checkpoint_interval_sec마다 저장합니다.
+        """
+        if self.checkpoint_store is None or not hasattr(self.strategy_instance, "snapshot_state"):
+            return
+        snapshot = self.strategy_instance.snapshot_state()
+        if not force:
+            if snapshot == self._last_checkpoint:
+                return
+            transitioned = self._last_checkpoint is None or snapshot.get("state") != self._last_checkpoint.get("state")
+            if not transitioned and self.clock.time() - self._last_checkpoint_at < self.checkpoint_interval_sec:
+                return
+        self.checkpoint_store.save(
+            self.bot_config['id'], self.strategy_id, self.strategy_version,
+            getattr(self.strategy_instance, "STATE_VERSION", 0), self.session_id, snapshot,
+        )
+        self._last_checkpoint = snapshot
+        self._last_checkpoint_at = self.clock.time()
+
+    def apply_config(self, new_config: dict) -> bool:
+        """
+        폴링한 봇 설정의 config_version이 바뀌었을 때 호출합니다.
+
+        전략 파라미터(`pipeline.strategy.params`)만 바뀌었고 전략이 `on_config_change` 훅을 지원하면
+        다음 틱 전에 제자리에서 적용하고 True를 반환합니다 (포지션 청산 없음).
+        그 밖의 변경(전략 ID/버전, global_settings의 거래소 키/심볼 등)은 재시작이 필요하므로 False를 반환합니다.
+        config_version은 전략이 변경을 받아들인 뒤에만 올라가며, 전략이 거부(ValueError)한 리비전은
+        다음 폴링에서 False를 반환하여 재시작으로 적용합니다.
+        """
+        version = new_config.get("config_version")
+        if version == self.config_version:
+            return True
+        if version == self._rejected_config_version:
+            return False
+        if self._pending_config is not None and self._pending_config[0].get("config_version") == version:
+            return True  # 이미 예약됨
+
+        if _structure(self.bot_config) != _structure(new_config) \
+                or not hasattr(self.strategy_instance, "on_config_change"):
+            return False
+
+        old_node, new_node = _strategy_node(self.bot_config), _strategy_node(new_config)
+        old_params, new_params = old_node.get("params") or {}, new_node.get("params") or {}
+        changed = {k for k in set(old_params) | set(new_params) if old_params.get(k) != new_params.get(k)}
+        self._pending_config = (new_config, changed)
+        return True
+
+    def _apply_pending_config(self):
+        """
+        예약된 설정 변경을 틱 사이에 전략에 적용합니다. 전략이 거부(ValueError)하면 기존 설정과 리비전을 유지하고,
+        해당 리비전은 다음 폴링에서 재시작으로 적용됩니다.
+        """
+        new_config, changed = self._pending_config
+        self._pending_config = None
+        try:
+            if changed:
+                self.strategy_instance.on_config_change(new_config, changed)
+        except ValueError as e:
+            logger.error(f"{self.bot_config['name']}: 설정 변경 거부 (v{new_config.get('config_version')}), "
+                         f"재시작으로 적용합니다: {e}")
+            self._rejected_config_version = new_config.get("config_version")
+            return
+        self.bot_config = new_config
+        self.config_version = new_config.get("config_version")
+        logger.info(f"{self.bot_config['name']}: 설정 v{self.config_version} 적용 (변경 파라미터: {sorted(changed)})")
 
     async def _run_loop(self):
         """
@@ -117,18 +365,8 @@ class BotRunner:
         """
         logger.info("Entering execution loop...")
         
-        ledger_adapter = LedgerAwareAdapter(
-            raw_adapter=self.adapter_client,
-            bot_client=self.bot_client,
-            bot_id=self.bot_config['id']
-        )
-        
         # Context 재사용
-        context = {
-            "adapter": ledger_adapter, 
-            "bot_id": self.bot_config['id'],
-            "config": self.bot_config
-        }
+        context = self._context = self._build_context()
         
         while self.is_running:
             try:
@@ -139,22 +377,27 @@ class BotRunner:
                         # Graceful Stop 로직 실행 (청산 등)
                         if hasattr(self.strategy_instance, 'on_stop'):
                             await self.strategy_instance.on_stop(context)
+                        self.checkpoint(force=True)
                     
                     self.is_running = False
                     break
 
+                if self._pending_config is not None:
+                    self._apply_pending_config()
+                    context["config"] = self.bot_config
+
                 # Execute Strategy Tick
                 if self.strategy_instance:
-                    await self.strategy_instance.execute(context)
+                    await self._tick(context)
                 
                 # Sleep interval (Check every 1s to respond to stop quickly)
                 for _ in range(5):
-                    if self.stop_requested: break
-                    await asyncio.sleep(1)
+                    if self.stop_requested or not self.is_running: break
+                    await self.clock.sleep(1)
                 
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Error in bot loop: {e}")
                 traceback.print_exc()
-                await asyncio.sleep(5) # Backoff on error
+                await self.clock.sleep(5) # Backoff on error
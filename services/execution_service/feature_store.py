@@ -0,0 +1,345 @@
+"""
+심볼 단위 마이크로구조 피처 저장소 (모든 러너 공유, context["features"]).
+
+- 시장 업데이트(스냅샷 1회: ticker + top-of-book + 새 체결)는 (키, 심볼)당 max_age_sec마다 한 번만 받습니다.
+  같은 심볼의 두 번째 전략은 같은 업데이트를 재사용하므로 추가 요청이 없습니다.
+- 피처는 (심볼, 피처 이름, 파라미터)로 식별되며 처음 읽힐 때 등록됩니다. 등록된 피처는 업데이트마다
+  한 번만 계산되고(상태가 있는 EMA 등도 모든 업데이트를 반영), 이후 읽기는 캐시 적중입니다.
+- 피처 값 이력은 고정 크기 float64 링 버퍼로 보관합니다.
+
+    features = context["features"]
+    if await features.refresh("BTC/USDT"):
+        ema = features.get("BTC/USDT", "spread_ema", alpha=0.2)
+        buy_q = features.get("BTC/USDT", "buy_quote", lookback_sec=10)
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from strategies.indicators import EMA
+from strategies.trade_cursor import trades_cursor_after
+
+logger = logging.getLogger("execution-service.feature-store")
+
+TRADE_WINDOW_SEC = 60  # 보관하는 체결 구간 (전략 lookback 최대값)
+SNAPSHOT_TRADES_LIMIT = 1000
+
+
+class RingBuffer:
+    """고정 크기 float64 링 버퍼. values()는 오래된 것부터 반환합니다."""
+
+    def __init__(self, capacity: int):
+        self._buf = np.full(capacity, np.nan)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def push(self, value: float):
+        self._buf[self._next] = value
+        self._next = (self._next + 1) % len(self._buf)
+        self._count = min(self._count + 1, len(self._buf))
+
+    def values(self, n: Optional[int] = None) -> np.ndarray:
+        n = self._count if n is None else min(n, self._count)
+        idx = (self._next - n + np.arange(n)) % len(self._buf)
+        return self._buf[idx]
+
+
+@dataclass
+class MarketUpdate:
+    """한 번의 시장 업데이트. 체결은 시각순 timestamp와 매수/매도 Quote 누적합(0에서 시작)으로 보관합니다."""
+    version: int
+    timestamp: float
+    ticker: Dict[str, Any]
+    best_bid: float
+    best_ask: float
+    trade_ts: np.ndarray
+    cum_buy: np.ndarray
+    cum_sell: np.ndarray
+
+    @property
+    def mid(self) -> float:
+        return (self.best_bid + self.best_ask) / 2.0
+
+    def trade_quote(self, lookback_sec: float) -> Tuple[float, float]:
+        """lookback 구간의 (매수 Quote, 매도 Quote)."""
+        cutoff_ms = int((self.timestamp - lookback_sec) * 1000)
+        start = int(np.searchsorted(self.trade_ts, cutoff_ms, side="left"))
+        return float(self.cum_buy[-1] - self.cum_buy[start]), float(self.cum_sell[-1] - self.cum_sell[start])
+
+
+# --- 피처 정의: update(market, update) -> 값. 상태가 있는 피처는 모든 업데이트에서 호출됩니다. ---
+
+class _Field:
+    def __init__(self, getter: Callable[[MarketUpdate], float]):
+        self.getter = getter
+
+    def update(self, market: "_Market", update: MarketUpdate) -> float:
+        return self.getter(update)
+
+
+class _SpreadEMA:
+    def __init__(self, alpha: float):
+        self.ema = EMA(alpha=float(alpha))
+
+    def update(self, market: "_Market", update: MarketUpdate) -> float:
+        return self.ema.update(update.best_ask - update.best_bid)
+
+
+class _MidChange:
+    """직전 업데이트 대비 미드 변화율 (첫 업데이트는 0)."""
+
+    def __init__(self):
+        self.last_mid: Optional[float] = None
+
+    def update(self, market: "_Market", update: MarketUpdate) -> float:
+        mid, last, self.last_mid = update.mid, self.last_mid, update.mid
+        return mid / last - 1.0 if last else 0.0
+
+
+class _TradeQuote:
+    def __init__(self, side: str, lookback_sec: float):
+        if not 0 < float(lookback_sec) <= TRADE_WINDOW_SEC:
+            raise ValueError(f"lookback_sec must be in (0, {TRADE_WINDOW_SEC}]")
+        self.index = 0 if side == "buy" else 1
+        self.lookback_sec = float(lookback_sec)
+
+    def update(self, market: "_Market", update: MarketUpdate) -> float:
+        return update.trade_quote(self.lookback_sec)[self.index]
+
+
+class _TradeImbalance(_TradeQuote):
+    """매수/매도 체결대금 비율 ((buy + 1e-9) / (sell + 1e-9))."""
+
+    def __init__(self, lookback_sec: float):
+        super().__init__("buy", lookback_sec)
+
+    def update(self, market: "_Market", update: MarketUpdate) -> float:
+        buy_q, sell_q = update.trade_quote(self.lookback_sec)
+        return (buy_q + 1e-9) / (sell_q + 1e-9)
+
+
+class _Extreme:
+    """window_sec 동안의 최고 매도호가(rolling_high) / 최저 매수호가(rolling_low). 스윕 고/저점 추정에 사용합니다."""
+
+    def __init__(self, kind: str, window_sec: float):
+        self.kind = kind
+        self.window_sec = float(window_sec)
+
+    def update(self, market: "_Market", update: MarketUpdate) -> float:
+        ts = market.times.values()
+        recent = ts >= update.timestamp - self.window_sec
+        if self.kind == "high":
+            return float(market.asks.values()[recent].max())
+        return float(market.bids.values()[recent].min())
+
+
+FEATURES: Dict[str, Callable[..., Any]] = {
+    "price": lambda: _Field(lambda u: float(u.ticker["price"])),
+    "best_bid": lambda: _Field(lambda u: u.best_bid),
+    "best_ask": lambda: _Field(lambda u: u.best_ask),
+    "mid": lambda: _Field(lambda u: u.mid),
+    "spread": lambda: _Field(lambda u: u.best_ask - u.best_bid),
+    "spread_ema": lambda alpha: _SpreadEMA(alpha),
+    "mid_change": lambda: _MidChange(),
+    "buy_quote": lambda lookback_sec: _TradeQuote("buy", lookback_sec),
+    "sell_quote": lambda lookback_sec: _TradeQuote("sell", lookback_sec),
+    "trade_imbalance": lambda lookback_sec: _TradeImbalance(lookback_sec),
+    "rolling_high": lambda window_sec: _Extreme("high", window_sec),
+    "rolling_low": lambda window_sec: _Extreme("low", window_sec),
+}
+
+
+@dataclass
+class _FeatureSlot:
+    feature: Any
+    history: RingBuffer
+    value: Any = None
+    version: int = -1
+
+
+@dataclass
+class _Market:
+    key_id: str
+    symbol: str
+    history: int
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    latest: Optional[MarketUpdate] = None
+    version: int = 0
+    updated_at: float = float("-inf")
+    trade_window: deque = field(default_factory=deque)
+    trades_cursor: Optional[str] = None
+    features: Dict[Tuple[str, tuple], _FeatureSlot] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.times = RingBuffer(self.history)
+        self.bids = RingBuffer(self.history)
+        self.asks = RingBuffer(self.history)
+
+
+class FeatureStore:
+    """(키, 심볼) 단위 시장 업데이트와 (심볼, 피처, 파라미터) 단위 피처 캐시."""
+
+    def __init__(self, max_age_sec: float = 1.0, history: int = 256, idle_ttl_sec: float = 300.0, clock=None):
+        self.max_age_sec = max_age_sec
+        self.history_size = history
+        self.idle_ttl_sec = idle_ttl_sec
+        self.clock = clock
+        self._markets: Dict[Tuple[str, str], _Market] = {}
+        self._stats = {"updates": 0, "update_reuses": 0, "feature_hits": 0, "feature_misses": 0, "computations": 0}
+
+    def _now(self) -> float:
+        return self.clock.time() if self.clock is not None else time.time()
+
+    def view(self, adapter, key_id: str) -> "FeatureView":
+        return FeatureView(self, adapter, key_id)
+
+    async def refresh(self, adapter, key_id: str, symbol: str) -> Optional[MarketUpdate]:
+        """최신 시장 업데이트를 반환합니다. max_age_sec 이내의 업데이트가 있으면 재사용합니다."""
+        now = self._now()
+        market = self._markets.get((key_id, symbol))
+        if market is None:
+            self._evict_idle(now)
+            market = self._markets[(key_id, symbol)] = _Market(key_id, symbol, self.history_size)
+        async with market.lock:
+            if market.latest is not None and now - market.updated_at <= self.max_age_sec:
+                self._stats["update_reuses"] += 1
+                return market.latest
+            update = await self._fetch(adapter, market, now)
+            if update is None:
+                return None
+            self._apply(market, update)
+            return update
+
+    async def _fetch(self, adapter, market: _Market, now: float) -> Optional[MarketUpdate]:
+        if market.trades_cursor and now - market.updated_at > TRADE_WINDOW_SEC:
+            market.trades_cursor = None
+            market.trade_window.clear()
+        snapshot = await adapter.get_snapshot(
+            market.key_id, [market.symbol], ["ticker", "depth", "trades"],
+            depth_limit=5, trades_limit=SNAPSHOT_TRADES_LIMIT, depth_mode="top", trades_since=market.trades_cursor,
+        )
+        data = ((snapshot or {}).get("symbols") or {}).get(market.symbol) or {}
+        ticker, depth, trades_resp = data.get("ticker"), data.get("depth"), data.get("trades")
+        if not ticker or "price" not in ticker or not depth or depth.get("best_bid") is None \
+                or depth.get("best_ask") is None or not trades_resp:
+            logger.warning(f"[{market.symbol}] Feature store snapshot incomplete; keeping previous update.")
+            return None
+
+        trades = trades_resp.get("trades") or []
+        next_cursor = trades_resp.get("next_cursor")
+        if next_cursor is None or market.trades_cursor is None:
+            # 커서 없이 받은 응답(최신 체결 목록)은 전체 목록으로 간주합니다.
+            market.trade_window.clear()
+        market.trade_window.extend(trades)
+        cutoff_ms = int((now - TRADE_WINDOW_SEC) * 1000)
+        market.trades_cursor = trades_cursor_after(trades, next_cursor, SNAPSHOT_TRADES_LIMIT, cutoff_ms)
+        while market.trade_window and (market.trade_window[0].get("timestamp") or 0) < cutoff_ms:
+            market.trade_window.popleft()
+
+        rows = [
+            (t["timestamp"], float(t["price"]) * float(t["amount"]), (t.get("side") or "").lower())
+            for t in market.trade_window
+            if t.get("timestamp") is not None and t.get("price") is not None and t.get("amount") is not None
+        ]
+        rows.sort(key=lambda r: r[0])
+        ts = np.array([r[0] for r in rows], dtype=np.float64)
+        buy = np.array([r[1] if r[2] == "buy" else 0.0 for r in rows])
+        sell = np.array([r[1] if r[2] == "sell" else 0.0 for r in rows])
+        return MarketUpdate(
+            version=market.version + 1, timestamp=now, ticker=ticker,
+            best_bid=float(depth["best_bid"]), best_ask=float(depth["best_ask"]), trade_ts=ts,
+            cum_buy=np.concatenate(([0.0], np.cumsum(buy))), cum_sell=np.concatenate(([0.0], np.cumsum(sell))),
+        )
+
+    def _apply(self, market: _Market, update: MarketUpdate):
+        """새 업데이트를 기록하고 등록된 피처를 모두 한 번씩 계산합니다."""
+        market.latest, market.version, market.updated_at = update, update.version, update.timestamp
+        market.times.push(update.timestamp)
+        market.bids.push(update.best_bid)
+        market.asks.push(update.best_ask)
+        self._stats["updates"] += 1
+        for slot in market.features.values():
+            self._compute(market, slot, update)
+
+    def _compute(self, market: _Market, slot: _FeatureSlot, update: MarketUpdate):
+        slot.value = slot.feature.update(market, update)
+        slot.version = update.version
+        slot.history.push(slot.value if slot.value is not None else np.nan)
+        self._stats["computations"] += 1
+
+    def _slot(self, key_id: str, symbol: str, name: str, params: Dict[str, Any]) -> Tuple[_Market, _FeatureSlot]:
+        market = self._markets.get((key_id, symbol))
+        if market is None or market.latest is None:
+            raise LookupError(f"No market update for {symbol}; call refresh() first")
+        key = (name, tuple(sorted(params.items())))
+        slot = market.features.get(key)
+        if slot is None:
+            factory = FEATURES.get(name)
+            if factory is None:
+                raise ValueError(f"Unknown feature: {name}")
+            try:
+                feature = factory(**params)
+            except TypeError as e:
+                raise ValueError(f"Invalid params for feature {name}: {e}") from e
+            slot = market.features[key] = _FeatureSlot(feature, RingBuffer(self.history_size))
+        return market, slot
+
+    def get(self, key_id: str, symbol: str, name: str, **params) -> Any:
+        """피처의 현재 값. 이번 업데이트에서 이미 계산되었으면 캐시 적중입니다."""
+        market, slot = self._slot(key_id, symbol, name, params)
+        if slot.version == market.version:
+            self._stats["feature_hits"] += 1
+        else:
+            self._stats["feature_misses"] += 1
+            self._compute(market, slot, market.latest)
+        return slot.value
+
+    def history(self, key_id: str, symbol: str, name: str, n: Optional[int] = None, **params) -> np.ndarray:
+        """피처 값 이력 (오래된 것부터, 등록 이후 업데이트마다 1개)."""
+        self.get(key_id, symbol, name, **params)
+        return self._slot(key_id, symbol, name, params)[1].history.values(n)
+
+    def _evict_idle(self, now: float):
+        for key in [k for k, m in self._markets.items() if now - m.updated_at > self.idle_ttl_sec and not m.lock.locked()
+                    and m.latest is not None]:
+            del self._markets[key]
+
+    def metrics(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        reads = stats["feature_hits"] + stats["feature_misses"]
+        stats.update(
+            markets=len(self._markets),
+            features=sum(len(m.features) for m in self._markets.values()),
+            feature_hit_ratio=round(stats["feature_hits"] / reads, 4) if reads else None,
+        )
+        return stats
+
+
+class FeatureView:
+    """러너별 어댑터/키에 묶인 FeatureStore 읽기 인터페이스 (context["features"])."""
+
+    def __init__(self, store: FeatureStore, adapter, key_id: str):
+        self.store = store
+        self.adapter = adapter
+        self.key_id = key_id
+
+    async def refresh(self, symbol: str) -> Optional[MarketUpdate]:
+        return await self.store.refresh(self.adapter, self.key_id, symbol)
+
+    async def ticker(self, symbol: str) -> Optional[Dict[str, Any]]:
+        update = await self.refresh(symbol)
+        return update.ticker if update is not None else None
+
+    def get(self, symbol: str, name: str, **params) -> Any:
+        return self.store.get(self.key_id, symbol, name, **params)
+
+    def history(self, symbol: str, name: str, n: Optional[int] = None, **params) -> np.ndarray:
+        return self.store.history(self.key_id, symbol, name, n, **params)
@@ -0,0 +1,160 @@
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from clock import RealClock
+
+logger = logging.getLogger("execution-service.fill-stream")
+
+# 더 이상 체결이 발생하지 않는 주문 상태 (어댑터 체결 이벤트의 order_status, 소문자)
+_TERMINAL_ORDER_STATUSES = ("filled", "canceled", "expired", "expired_in_match", "rejected")
+
+
+def execution_payload(local_order: Dict[str, Any], exchange_order_id: str, fill: Dict[str, Any]) -> Dict[str, Any]:
+    """어댑터 표준 체결 포맷(fill)을 BotService의 GlobalExecutionCreate 페이로드로 변환합니다."""
+    price = float(fill.get("price") or 0.0)
+    qty = float(fill.get("amount") or 0.0)
+    ts = fill.get("timestamp")
+    return {
+        "local_order_id": local_order["id"],
+        "exchange_trade_id": str(fill["id"]),
+        "exchange_order_id": str(exchange_order_id),
+        "order_list_id": None,
+        "symbol": local_order["symbol"],
+        "side": (fill.get("side") or local_order["side"]).upper(),
+        "price": price,
+        "quantity": qty,
+        "quote_qty": float(fill.get("cost") or price * qty),
+        "fee": float(fill.get("fee") or 0.0),
+        "fee_asset": fill.get("fee_asset"),
+        "timestamp": datetime.utcfromtimestamp(ts / 1000).isoformat() if ts else datetime.utcnow().isoformat(),
+    }
+
+
+class FillStream:
+    """
+    ExchangeAdapter의 User Data Stream이 푸시한 이벤트(체결/잔고/연결 상태)를 처리합니다.
+
+    - LedgerAwareAdapter가 주문 전송 후 (거래소 주문 ID -> 로컬 주문)을 등록하면,
+      해당 주문의 체결을 발생 즉시 원장에 기록합니다 (호가창에 걸려 있던 지정가 주문 포함).
+    - 등록보다 체결 이벤트가 먼저 도착하면 잠시 보관했다가 등록 시점에 반영합니다.
+    - 같은 Trade ID는 한 번만 반영합니다.
+    - 등록은 종료 상태(체결 완료/취소/만료/거부) 체결이나 취소 시 해제되며, 체결 이벤트 없이 끝난 주문에 대비해
+      최근 orders_capacity건만 보관합니다 (밀려난 주문은 대사 워커가 보완).
+    """
+
+    def __init__(self, bot_client, adapter_client, balance_book=None, clock=None,
+                 unmatched_ttl_sec: float = 120.0, seen_capacity: int = 10000, outbox=None, risk_engine=None,
+                 orders_capacity: int = 10000):
+        self.bot_client = bot_client
+        # 원장 쓰기는 아웃박스를 거쳐 LedgerAwareAdapter의 PREPARE 뒤에 순서대로 전달됩니다.
+        self.ledger = outbox if outbox is not None else bot_client
+        self.adapter_client = adapter_client
+        self.balance_book = balance_book
+        # 사전 주문 리스크 게이트 (포지션/일간 손익을 스트림 체결로 갱신)
+        self.risk_engine = risk_engine
+        self.clock = clock or RealClock()
+        self.unmatched_ttl_sec = unmatched_ttl_sec
+        self.seen_capacity = seen_capacity
+        self.orders_capacity = orders_capacity
+
+        self._live: Dict[str, bool] = {}
+        self._orders: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # exchange_order_id -> {"key_id", "local_order"}
+        self._unmatched: Dict[str, List[Tuple[float, str, Dict[str, Any]]]] = {}
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+
+    def is_live(self, key_id: str) -> bool:
+        return self._live.get(key_id, False)
+
+    async def ensure_subscribed(self, key_id: str) -> bool:
+        """어댑터에 키의 User Data Stream 구독을 요청합니다 (멱등). 연결 여부를 반환합니다."""
+        status = await self.adapter_client.subscribe_user_stream(key_id)
+        if status is None:
+            self._live[key_id] = False
+            return False
+        self._live[key_id] = bool(status.get("connected"))
+        return self._live[key_id]
+
+    async def refresh(self):
+        """어댑터 재시작 등으로 구독이 사라졌을 수 있으므로 주기적으로 다시 구독합니다."""
+        for key_id in list(self._live.keys()):
+            await self.ensure_subscribed(key_id)
+
+    async def register_order(self, key_id: str, exchange_order_id: str, local_order: Dict[str, Any]):
+        """거래소 주문 ID와 로컬 주문을 연결하고, 먼저 도착해 있던 체결을 반영합니다."""
+        exchange_order_id = str(exchange_order_id)
+        self._orders[exchange_order_id] = {"key_id": key_id, "local_order": local_order}
+        self._orders.move_to_end(exchange_order_id)
+        while len(self._orders) > self.orders_capacity:
+            self._orders.popitem(last=False)
+        for _, _, fill in self._unmatched.pop(exchange_order_id, []):
+            await self._commit(key_id, exchange_order_id, fill)
+
+    def forget_order(self, exchange_order_id: str):
+        """체결 없이 끝난 주문(취소 등)의 등록을 해제합니다."""
+        self._orders.pop(str(exchange_order_id), None)
+
+    async def handle_event(self, event: Dict[str, Any]):
+        key_id = event.get("key_id")
+        kind = event.get("type")
+        if kind == "status":
+            self._live[key_id] = bool(event.get("connected"))
+            logger.info(f"User Data Stream {key_id}: {'연결됨' if self._live[key_id] else '연결 끊김'}")
+        elif kind == "balance":
+            if self.balance_book is not None:
+                self.balance_book.apply_balance_update(key_id, event.get("balances") or {})
+        elif kind == "fills":
+            self._purge_unmatched()
+            for fill in event.get("fills") or []:
+                exchange_order_id = str(fill.get("order_id"))
+                if exchange_order_id in self._orders:
+                    await self._commit(key_id, exchange_order_id, fill)
+                else:
+                    self._unmatched.setdefault(exchange_order_id, []).append((self.clock.time(), key_id, fill))
+
+    def _purge_unmatched(self):
+        # 다른 시스템에서 낸 주문 등 끝내 등록되지 않는 체결은 버립니다 (원장 주문은 대사 워커가 보완).
+        cutoff = self.clock.time() - self.unmatched_ttl_sec
+        for exchange_order_id in list(self._unmatched.keys()):
+            fresh = [item for item in self._unmatched[exchange_order_id] if item[0] >= cutoff]
+            if fresh:
+                self._unmatched[exchange_order_id] = fresh
+            else:
+                del self._unmatched[exchange_order_id]
+
+    def _mark_seen(self, trade_id: str) -> bool:
+        if trade_id in self._seen:
+            return False
+        self._seen[trade_id] = None
+        if len(self._seen) > self.seen_capacity:
+            self._seen.popitem(last=False)
+        return True
+
+    async def _commit(self, key_id: str, exchange_order_id: str, fill: Dict[str, Any]):
+        entry = self._orders[exchange_order_id]
+        local_order = entry["local_order"]
+        if not self._mark_seen(str(fill["id"])):
+            return
+
+        payload = execution_payload(local_order, exchange_order_id, fill)
+        if self.risk_engine is not None:
+            self.risk_engine.on_execution(key_id, payload)
+        # 스트림이 살아 있으면 잔고 변경 이벤트(절대값)가 장부를 갱신하므로 체결 증감은 적용하지 않습니다.
+        if self.balance_book is not None and not self.is_live(key_id):
+            self.balance_book.apply_fill(
+                key_id=key_id, symbol=payload["symbol"], side=payload["side"],
+                quantity=payload["quantity"], price=payload["price"],
+                fee=payload["fee"], fee_asset=payload["fee_asset"],
+            )
+        await self.ledger.record_execution(payload)
+        logger.info(f"✅ [스트림] 원장 커밋(COMMIT): 체결 내역 기록됨 {payload['exchange_trade_id']}")
+
+        order_status = fill.get("order_status")
+        if order_status == "filled":
+            await self.ledger.update_order_status(local_order["id"], "FILLED", exchange_order_id=exchange_order_id)
+        if order_status in _TERMINAL_ORDER_STATUSES:
+            # 일부 체결 후 취소/만료된 주문의 최종 상태는 대사 워커가 확정합니다.
+            self._orders.pop(exchange_order_id, None)
+            if self.risk_engine is not None:
+                self.risk_engine.release(local_order["id"])
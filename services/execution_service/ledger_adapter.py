@@ -1,6 +1,9 @@
+import asyncio
 import logging
 from datetime import datetime
 
+from order_ids import uuid7
+
 logger = logging.getLogger("execution-service.ledger-adapter")
 
 class LedgerAwareAdapter:
@@ -12,62 +15,113 @@ class LedgerAwareAdapter:
     매매 주문과 체결 내역이 이중 원장(Double-Entry Ledger) 시스템에 
     누락 없이 기록되도록 보장해야 합니다.
     """
-    def __init__(self, raw_adapter, bot_client, bot_id):
+    def __init__(self, raw_adapter, bot_client, bot_id, clock=None, balance_book=None, fill_stream=None,
+                 outbox=None, session_id=None, risk_engine=None):
         self.adapter = raw_adapter
         self.bot_client = bot_client
+        # 원장 쓰기 경로: 아웃박스가 있으면 로컬에 기록 후 즉시 반환 (BotService 왕복 없음)
+        self.ledger = outbox if outbox is not None else bot_client
         self.bot_id = bot_id
+        # 러너 부팅 시 BotService에서 받은 세션 ID (로컬 주문에 기록 -> BotService의 세션 조회 생략)
+        self.session_id = session_id
+        self.clock = clock
+        # 체결 기반 로컬 잔고 장부 (없으면 매번 거래소 조회)
+        self.balance_book = balance_book
+        # User Data Stream 체결 처리기 (연결되어 있으면 동기 응답 대신 스트림으로 COMMIT)
+        self.fill_stream = fill_stream
+        # 사전 주문 리스크 게이트 (모든 러너 공유). 거부된 주문은 거래소로 보내지 않고 원장에 REJECTED로 기록합니다.
+        self.risk_engine = risk_engine
+        # 서비스 드레인 중 주문 배처 (설정되면 단건 주문도 다른 러너의 주문과 묶어 배치로 전송)
+        self.order_batcher = None
+
+    def _utcnow(self) -> datetime:
+        # 가상 시계가 주입된 경우 원장 타임스탬프도 가상 시간을 따릅니다.
+        if self.clock is not None:
+            return datetime.utcfromtimestamp(self.clock.time())
+        return datetime.utcnow()
 
     # Passthrough methods for read-only operations
-    async def get_balance(self, key_id):
+    async def get_balance(self, key_id, fresh=False):
+        """
+        잔고 조회. BalanceBook이 있으면 네트워크 호출 없이 로컬 장부에서 반환합니다.
+        fresh=True이면 거래소와 대사한 최신 잔고를 반환합니다 (청산 등 안전이 중요한 경로).
+        """
+        if self.balance_book is not None:
+            return await self.balance_book.get_balance(key_id, fresh=fresh)
         return await self.adapter.get_balance(key_id)
 
     async def get_ticker(self, key_id, symbol):
-        return await self.adapter.get_ticker(key_id, symbol)
+        ticker = await self.adapter.get_ticker(key_id, symbol)
+        if self.risk_engine is not None and ticker:
+            self.risk_engine.mark_price(key_id, symbol, ticker.get("price"))
+        return ticker
+
+    async def get_depth(self, key_id, symbol, limit=50, mode="full"):
+        return await self.adapter.get_depth(key_id, symbol, limit, mode)
+
+    async def get_book_features(self, key_id, symbol, limit=100, size=None):
+        return await self.adapter.get_book_features(key_id, symbol, limit, size)
+
+    async def get_trades(self, key_id, symbol, limit=100, since=None):
+        return await self.adapter.get_trades(key_id, symbol, limit, since)
+
+    async def get_snapshot(self, key_id, symbols, components=None, depth_limit=50, trades_limit=100,
+                           depth_mode="full", trades_since=None):
+        snapshot = await self.adapter.get_snapshot(key_id, symbols, components, depth_limit, trades_limit,
+                                                   depth_mode, trades_since)
+        if self.risk_engine is not None and snapshot:
+            for symbol, market in (snapshot.get("symbols") or {}).items():
+                self.risk_engine.mark_price(key_id, symbol, ((market or {}).get("ticker") or {}).get("price"))
+        return snapshot
 
-    async def get_depth(self, key_id, symbol, limit=50):
-        return await self.adapter.get_depth(key_id, symbol, limit)
+    async def get_candles(self, key_id, symbol, timeframe="1m", since=None, limit=500):
+        return await self.adapter.get_candles(key_id, symbol, timeframe, since, limit)
 
-    async def get_trades(self, key_id, symbol, limit=100):
-        return await self.adapter.get_trades(key_id, symbol, limit)
+    async def get_account_orders(self, key_id, symbol, since=None, limit=500):
+        return await self.adapter.get_account_orders(key_id, symbol, since, limit)
 
     # 트랜잭션 메서드 (매매 실행 및 기록)
     async def place_order(self, key_id, symbol, side, amount, order_type='market', price=None, reason="Strategy Signal"):
         """
         주문을 실행하고 전체 과정을 이중 원장(Double-Entry Ledger)에 기록합니다.
         단계: 1. 로컬 주문 생성(의도) -> 2. 거래소 주문 실행 -> 3. 체결 내역 기록(확정)
+
+        로컬 주문 ID(UUIDv7)는 여기서 발급합니다. 아웃박스를 쓰면 PREPARE 전달은 거래소 호출과
+        동시에 진행되고, COMMIT도 아웃박스에 기록된 순서대로 BotService에 전달됩니다.
         """
         logger.info(f"원장 트랜잭션 준비 중: {side} {amount} {symbol} (사유: {reason})")
 
+        # 0. RISK: 메모리 한도 검사 (거부 시 거래소 호출 없음). 통과하면 로컬 주문 ID로 미체결 노출을 잡습니다.
+        order_id = self._new_order_id()
+        rejected = await self._risk_check(key_id, symbol, side, amount, price, reason, order_ref=order_id)
+        if rejected is not None:
+            return rejected
+
         # 1. PREPARE: 로컬 주문 기록 (매매 의도 저장)
-        try:
-            local_order = await self.bot_client.create_local_order(
-                bot_id=self.bot_id,
-                symbol=symbol,
-                side=side.upper(),
-                quantity=amount,
-                reason=reason,
-                timestamp=datetime.utcnow()
-            )
-            
-            if not local_order:
-                raise Exception("로컬 주문 레코드 생성 실패")
-            
-            logger.info(f"✅ [1/3] 원장 준비(PREPARE): 로컬 주문 생성됨 (ID: {local_order['id']}, 상태: {local_order['status']})")
-            
-        except Exception as e:
-            logger.error(f"❌ 원장 준비 실패: {e}")
+        local_order = await self._prepare(symbol, side, amount, reason, order_id=order_id)
+        if local_order is None:
+            self._release_risk(order_id)
             return {"status": "failed", "reason": "Ledger Prepare Failed"}
 
         # 2. EXECUTE: 거래소 어댑터 호출 (실제 매매)
         try:
-            exchange_order = await self.adapter.place_order(
-                key_id=key_id,
-                symbol=symbol,
-                side=side,
-                amount=amount,
-                order_type=order_type,
-                price=price
-            )
+            if self.order_batcher is not None:
+                exchange_order = await self.order_batcher.submit(self.bot_id, key_id, symbol, {
+                    "side": side, "amount": amount, "order_type": order_type, "price": price,
+                    "client_order_id": local_order["id"],
+                })
+            else:
+                exchange_order = await self.adapter.place_order(
+                    key_id=key_id,
+                    symbol=symbol,
+                    side=side,
+                    amount=amount,
+                    order_type=order_type,
+                    price=price,
+                    # 로컬 주문 ID를 거래소 clientOrderId로 사용 -> 재시도가 중복 주문을 만들지 않음
+                    client_order_id=local_order["id"]
+                )
+            exchange_order = await self._recover_unknown(key_id, symbol, local_order, exchange_order)
             
             # [디버그] 응답 JSON 구조 파악을 위해 로우 데이터 로깅
             import json
@@ -83,9 +137,155 @@ class LedgerAwareAdapter:
         except Exception as e:
             logger.error(f"❌ 거래소 실행 실패: {e}")
             # 실행 실패 시 로컬 주문 상태를 FAILED로 업데이트
-            await self.bot_client.update_order_status(local_order["id"], "FAILED")
+            await self.ledger.update_order_status(local_order["id"], "FAILED")
+            self._release_risk(order_id)
             return {"status": "failed", "reason": str(e)}
 
+        return await self._commit(key_id, symbol, side, amount, local_order, exchange_order)
+
+    async def place_orders(self, key_id, symbol, orders, reason="Strategy Signal"):
+        """
+        같은 키/심볼의 주문 여러 건(그리드 지정가 주문 등)을 한 번의 어댑터 요청으로 실행합니다.
+        orders: [{"side", "amount", "price", "order_type"(기본 limit), "reason"(선택)}, ...]
+        원장 기록 단계는 place_order와 같으며(주문마다 PREPARE/COMMIT), 결과는 요청 순서대로 반환합니다.
+        """
+        logger.info(f"원장 배치 트랜잭션 준비 중: {len(orders)}건 {symbol} (사유: {reason})")
+        results = [{"status": "failed", "reason": "Ledger Prepare Failed"} for _ in orders]
+        order_ids = [self._new_order_id() for _ in orders]
+        accepted = []
+        for i, o in enumerate(orders):
+            # 통과한 주문은 바로 미체결 노출로 잡히므로 같은 배치의 다음 주문 검사에 반영됩니다.
+            rejected = await self._risk_check(key_id, symbol, o["side"], o["amount"], o.get("price"),
+                                              o.get("reason", reason), order_ref=order_ids[i])
+            if rejected is not None:
+                results[i] = rejected
+            else:
+                accepted.append(i)
+        prepared = await asyncio.gather(*(
+            self._prepare(symbol, orders[i]["side"], orders[i]["amount"], orders[i].get("reason", reason),
+                          order_id=order_ids[i])
+            for i in accepted
+        ))
+        for i, local in zip(accepted, prepared):
+            if local is None:
+                self._release_risk(order_ids[i])
+        batch = [(i, local) for i, local in zip(accepted, prepared) if local is not None]
+        if not batch:
+            return results
+
+        exchange_orders = await self.adapter.place_orders(key_id, symbol, [
+            {
+                "side": orders[i]["side"],
+                "amount": orders[i]["amount"],
+                "order_type": orders[i].get("order_type", "limit"),
+                "price": orders[i].get("price"),
+                "client_order_id": local["id"],
+            }
+            for i, local in batch
+        ])
+        for (i, local), exchange_order in zip(batch, exchange_orders):
+            exchange_order = await self._recover_unknown(key_id, symbol, local, exchange_order)
+            result = await self._commit(key_id, symbol, orders[i]["side"], orders[i]["amount"], local, exchange_order)
+            results[i] = {**result, "local_order_id": local["id"]}
+        logger.info(f"✅ 배치 주문 완료: {len(batch)}건 전송, 상태 {[r.get('status') for r in results]}")
+        return results
+
+    async def cancel_orders(self, key_id, symbol, orders):
+        """
+        호가창에 걸린 주문 여러 건을 한 번의 어댑터 요청으로 취소합니다.
+        orders: [(거래소 주문 ID, 로컬 주문 ID), ...]
+        취소된 주문은 원장에 CANCELED로 기록합니다. 거래소에 없는 주문(이미 체결 등)은 대사 워커에 맡깁니다.
+        """
+        if not orders:
+            return []
+        local_by_exchange_id = {str(exchange_id): local_id for exchange_id, local_id in orders}
+        results = await self.adapter.cancel_orders(key_id, symbol, list(local_by_exchange_id))
+        for r in results:
+            local_id = local_by_exchange_id.get(str(r.get("order_id")))
+            if r.get("status") == "canceled" and local_id:
+                await self.ledger.update_order_status(local_id, "CANCELED")
+                self._release_risk(local_id)
+            if r.get("status") == "canceled" and self.fill_stream is not None:
+                self.fill_stream.forget_order(r.get("order_id"))
+        logger.info(f"주문 취소 {len(orders)}건: {[r.get('status') for r in results]}")
+        return results
+
+    async def _risk_check(self, key_id, symbol, side, amount, price, reason, order_ref=None):
+        """
+        리스크 게이트 검사. 거부되면 원장에 REJECTED 주문으로 기록하고 결과를 반환합니다 (통과 시 None).
+        통과한 주문은 order_ref(로컬 주문 ID)로 리스크 엔진의 미체결 노출에 잡힙니다.
+        """
+        if self.risk_engine is None:
+            return None
+        if side.lower() == "sell" and self.balance_book is not None and not self.balance_book.is_seeded(key_id):
+            # 재시작 직후 보유분 청산: 리스크 게이트가 보유 수량을 알 수 있도록 잔고 장부를 먼저 시딩
+            await self.balance_book.get_balance(key_id)
+        decision = self.risk_engine.check(key_id, symbol, side, amount, price, order_ref=order_ref)
+        if decision.allowed:
+            return None
+        local_order = await self._prepare(symbol, side, amount, f"RISK_REJECTED[{decision.rule}] {reason}")
+        if local_order is not None:
+            await self.ledger.update_order_status(local_order["id"], "REJECTED")
+        logger.warning(f"⛔ 리스크 거부: {side} {amount} {symbol} ({decision.rule}: {decision.detail})")
+        return {
+            "status": "rejected",
+            "reason": f"{decision.rule}: {decision.detail}",
+            "local_order_id": local_order["id"] if local_order else None,
+        }
+
+    def _new_order_id(self):
+        return uuid7(self.clock.time() if self.clock is not None else None)
+
+    def _release_risk(self, local_order_id):
+        """끝난 주문의 미체결 노출을 리스크 엔진에서 해제합니다."""
+        if self.risk_engine is not None:
+            self.risk_engine.release(local_order_id)
+
+    async def _prepare(self, symbol, side, amount, reason, order_id=None):
+        """PREPARE: 로컬 주문을 기록합니다 (order_id가 없으면 새로 발급). 실패하면 None."""
+        try:
+            local_order = await self.ledger.create_local_order(
+                bot_id=self.bot_id,
+                symbol=symbol,
+                side=side.upper(),
+                quantity=amount,
+                reason=reason,
+                timestamp=self._utcnow(),
+                order_id=order_id or self._new_order_id(),
+                session_id=self.session_id
+            )
+            
+            if not local_order:
+                raise Exception("로컬 주문 레코드 생성 실패")
+            
+            logger.info(f"✅ [1/3] 원장 준비(PREPARE): 로컬 주문 생성됨 (ID: {local_order['id']}, 상태: {local_order['status']})")
+            return local_order
+            
+        except Exception as e:
+            logger.error(f"❌ 원장 준비 실패: {e}")
+            return None
+
+    async def _recover_unknown(self, key_id, symbol, local_order, exchange_order):
+        if exchange_order.get("status") == "unknown":
+            # 결과 불명(타임아웃 등): clientOrderId로 거래소 주문을 찾아 복구합니다.
+            recovered = await self.adapter.get_order_by_client_id(key_id, symbol, local_order["id"])
+            if recovered:
+                logger.info(f"🔁 clientOrderId로 주문 복구됨 (ID: {recovered.get('order_id')})")
+                return recovered
+        return exchange_order
+
+    async def _commit(self, key_id, symbol, side, amount, local_order, exchange_order):
+        """COMMIT: 거래소 응답에 따라 체결 내역/주문 상태를 원장에 기록합니다."""
+        # 3. COMMIT (스트림): User Data Stream이 연결되어 있으면 체결은 발생 즉시 스트림으로 기록됩니다.
+        # 동기 응답은 파싱하지 않고 거래소 주문 ID만 등록합니다 (호가창에 걸린 지정가 주문도 동일).
+        exchange_order_id = exchange_order.get("order_id") or exchange_order.get("id")
+        if (self.fill_stream is not None and self.fill_stream.is_live(key_id) and exchange_order_id
+                and exchange_order.get("status") not in ["error", "failed"]):
+            await self.ledger.update_order_status(local_order["id"], "SENT", exchange_order_id=str(exchange_order_id))
+            await self.fill_stream.register_order(key_id, str(exchange_order_id), local_order)
+            logger.info(f"✅ [3/3] 원장 커밋 위임: 체결은 User Data Stream으로 기록됩니다 (거래소 주문 ID: {exchange_order_id})")
+            return exchange_order
+
         # 3. COMMIT: 글로벌 체결 내역 기록 (멀티 Fill 지원)
         if exchange_order.get("status") == "filled":
             try:
@@ -106,7 +306,7 @@ class LedgerAwareAdapter:
                             # ms 단위를 ISO 포맷으로 변환
                             ts_iso = datetime.utcfromtimestamp(int(ts_val)/1000).isoformat()
                         else:
-                            ts_iso = datetime.utcnow().isoformat()
+                            ts_iso = self._utcnow().isoformat()
 
                         payload = {
                             "local_order_id": local_order["id"],
@@ -123,7 +323,8 @@ class LedgerAwareAdapter:
                             "timestamp": ts_iso
                         }
                         
-                        await self.bot_client.record_execution(payload)
+                        self._apply_fill(key_id, payload)
+                        await self.ledger.record_execution(payload)
                         logger.info(f"✅ [3/3] 원장 커밋(COMMIT): 체결 내역 기록됨 {payload['exchange_trade_id']}")
 
                 # Fallback: Fills가 없는 경우 (예: 시뮬레이션 환경, 일부 거래소)
@@ -141,20 +342,43 @@ class LedgerAwareAdapter:
                         "quote_qty": (exchange_order.get("cost") or 0.0),
                         "fee": exchange_order.get("fee", {}).get("cost", 0.0),
                         "fee_asset": exchange_order.get("fee", {}).get("currency"),
-                        "timestamp": datetime.utcnow().isoformat()
+                        "timestamp": self._utcnow().isoformat()
                     }
-                    await self.bot_client.record_execution(payload)
+                    self._apply_fill(key_id, payload)
+                    await self.ledger.record_execution(payload)
                     logger.info(f"✅ [3/3] 원장 커밋(COMMIT): 집계된 체결 내역 기록됨")
                 
-                await self.bot_client.update_order_status(local_order["id"], "FILLED")
+                await self.ledger.update_order_status(local_order["id"], "FILLED")
             
             except Exception as e:
                 logger.error(f"❌ 원장 커밋 실패 (심각한 오류): {e}")
+            self._release_risk(local_order["id"])
         elif exchange_order.get("status") in ["error", "failed"]:
-             await self.bot_client.update_order_status(local_order["id"], "FAILED")
+             await self.ledger.update_order_status(local_order["id"], "FAILED")
+             self._release_risk(local_order["id"])
              logger.error(f"❌ [3/3] 원장 업데이트: 주문 실행 실패 (상태: {exchange_order.get('status')})")
         else:
-             await self.bot_client.update_order_status(local_order["id"], "SENT")
+             # 거래소 주문 ID(결과 불명이면 clientOrderId)로 대사 워커(OrderReconciler)가 이후 체결을 추적합니다.
+             await self.ledger.update_order_status(
+                 local_order["id"], "SENT",
+                 exchange_order_id=str(exchange_order_id) if exchange_order_id else None,
+             )
              logger.warning(f"⚠️ [3/3] 원장 업데이트: 즉시 체결되지 않음 (상태: SENT)")
         
         return exchange_order
+
+    def _apply_fill(self, key_id, payload):
+        """체결 내역을 리스크 상태와 로컬 잔고 장부에 반영합니다. (원장 기록 성공 여부와 무관하게 실제 체결 기준)"""
+        if self.risk_engine is not None:
+            self.risk_engine.on_execution(key_id, payload)
+        if self.balance_book is None:
+            return
+        self.balance_book.apply_fill(
+            key_id=key_id,
+            symbol=payload["symbol"],
+            side=payload["side"],
+            quantity=payload["quantity"] or 0.0,
+            price=payload["price"] or 0.0,
+            fee=payload["fee"] or 0.0,
+            fee_asset=payload["fee_asset"],
+        )
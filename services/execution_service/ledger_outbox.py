@@ -0,0 +1,303 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("execution-service.ledger-outbox")
+
+# 아웃박스 작업 종류 (BotClient 메서드 / BotService /ledger/batch op와 1:1 대응)
+OP_CREATE_ORDER = "create_local_order"
+OP_UPDATE_STATUS = "update_order_status"
+OP_RECORD_EXECUTION = "record_execution"
+
+# 재시도해도 결과가 바뀌지 않는 오류 (일시적인 408/409/429 제외)
+RETRYABLE_CLIENT_ERRORS = {408, 409, 429}
+
+
+class LedgerOutbox:
+    """
+    원장(BotService) 쓰기 아웃박스. 모든 원장 변경을 로컬 저널에 먼저 기록합니다.
+
+    - create_local_order / update_order_status / record_execution을 BotClient와 같은 시그니처로 제공합니다.
+      호출은 저널(SQLite, append-only)에 기록되어 디스크에 fsync된 뒤 반환되며, BotService 응답은 기다리지 않습니다.
+    - 같은 이벤트 루프 회차에 들어온 기록은 한 트랜잭션(= fsync 1회)으로 묶습니다 (group commit).
+    - 백그라운드 드레이너가 저널 순서대로 최대 batch_size개씩 POST /ledger/batch로 전달하고,
+      반영된 위치(delivered_seq)까지 커서를 전진시킵니다. 실패하면 같은 위치부터 재시도합니다 (at-least-once).
+      BotService는 주문 ID / Trade ID 기준으로 멱등하므로 재전달되어도 안전합니다.
+    - 재시도해도 성공할 수 없는 작업(4xx)은 dead letter 테이블로 옮기고 다음 작업을 이어서 전달합니다.
+    """
+
+    def __init__(self, bot_client, db_path: str = ":memory:", batch_size: int = 200,
+                 retry_backoff: tuple = (0.5, 30.0), retention_sec: float = 86400.0):
+        self.bot_client = bot_client
+        self.batch_size = batch_size
+        self.retry_backoff = retry_backoff
+        # 전달 완료된 저널 항목의 보관 기간 (이후 컴팩션으로 삭제)
+        self.retention_sec = retention_sec
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS ledger_journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL,
+                payload_json TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ledger_dead_letters (
+                seq INTEGER PRIMARY KEY,
+                op TEXT NOT NULL,
+                payload_json TEXT NOT NULL,
+                error_json TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS outbox_state (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO outbox_state (name, value) VALUES ('delivered_seq', 0);
+            """
+        )
+        self._conn.commit()
+        self._delivered_seq = self._conn.execute(
+            "SELECT value FROM outbox_state WHERE name = 'delivered_seq'"
+        ).fetchone()[0]
+
+        self._buffer: List[Tuple[str, str, float, asyncio.Future]] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_compacted_at = 0.0
+        self._closed = False
+        self._metrics: Dict[str, Any] = {
+            "delivered_total": 0,
+            "batches_total": 0,
+            "retries_total": 0,
+            "dead_letters_total": 0,
+            "fsync_batches_total": 0,
+            "last_error": None,
+            "last_delivered_at": None,
+        }
+
+    # --- 원장 쓰기 API (BotClient 호환, 저널 기록 후 반환) ---
+
+    async def create_local_order(self, bot_id, symbol, side, quantity, reason, timestamp, order_id=None,
+                                 session_id=None):
+        if not order_id:
+            raise ValueError("아웃박스 PREPARE에는 실행 서비스가 발급한 order_id가 필요합니다.")
+        await self._append(OP_CREATE_ORDER, {
+            "id": order_id,
+            "bot_id": bot_id,
+            "symbol": symbol,
+            "side": side,
+            "quantity": quantity,
+            "reason": reason,
+            "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
+            "session_id": session_id,
+        })
+        return {"id": order_id, "bot_id": bot_id, "symbol": symbol, "side": side,
+                "quantity": quantity, "reason": reason, "status": "PENDING"}
+
+    async def update_order_status(self, local_order_id, status, exchange_order_id=None):
+        await self._append(OP_UPDATE_STATUS, {
+            "local_order_id": local_order_id,
+            "status": status,
+            "exchange_order_id": exchange_order_id,
+        })
+        return {"id": local_order_id, "status": status, "exchange_order_id": exchange_order_id}
+
+    async def record_execution(self, execution_data):
+        data = dict(execution_data)
+        if "timestamp" in data and isinstance(data["timestamp"], datetime):
+            data["timestamp"] = data["timestamp"].isoformat()
+        await self._append(OP_RECORD_EXECUTION, data)
+        return True
+
+    # --- 상태 / 수명 주기 ---
+
+    def pending(self) -> int:
+        committed = self._conn.execute(
+            "SELECT COUNT(*) FROM ledger_journal WHERE seq > ?", (self._delivered_seq,)
+        ).fetchone()[0]
+        return committed + len(self._buffer)
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        rows = self._conn.execute(
+            "SELECT seq, op, payload_json, error_json, created_at FROM ledger_dead_letters ORDER BY seq DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [
+            {"seq": seq, "op": op, "payload": json.loads(payload), "error": json.loads(error) if error else None,
+             "created_at": created_at}
+            for seq, op, payload, error, created_at in rows
+        ]
+
+    def metrics(self) -> Dict[str, Any]:
+        oldest = self._conn.execute(
+            "SELECT MIN(created_at) FROM ledger_journal WHERE seq > ?", (self._delivered_seq,)
+        ).fetchone()[0]
+        return {
+            **self._metrics,
+            "pending": self.pending(),
+            "delivered_seq": self._delivered_seq,
+            "oldest_pending_age_sec": (time.time() - oldest) if oldest else 0.0,
+        }
+
+    def start(self):
+        """드레이너 태스크를 시작합니다 (멱등). 재시작 전에 남아 있던 항목도 이어서 전달합니다."""
+        if self._task is not None and not self._task.done():
+            return
+        self._wake = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._task = asyncio.create_task(self._drain_loop())
+        self._wake.set()
+
+    async def flush(self, timeout: float = 10.0) -> bool:
+        """현재까지 기록된 항목이 모두 전달될 때까지 기다립니다. 시간 안에 비우면 True."""
+        if self.pending() == 0:
+            return True
+        self.start()
+        try:
+            await asyncio.wait_for(self._wait_empty(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"아웃박스 비우기 타임아웃: 미전달 {self.pending()}건 (재시작 후 이어서 전달됩니다)")
+            return False
+
+    async def close(self, timeout: float = 10.0):
+        await self.flush(timeout)
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._closed = True
+        if self._buffer:
+            self._commit_buffer()
+        self._conn.close()
+
+    # --- 저널 기록 (group commit) ---
+
+    async def _append(self, op: str, payload: Dict[str, Any]):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._buffer.append((op, json.dumps(payload, default=str), time.time(), fut))
+        if len(self._buffer) == 1:
+            # 같은 회차에 들어오는 기록을 모아 한 번에 커밋합니다.
+            loop.call_soon(self._commit_buffer)
+        await fut
+
+    def _commit_buffer(self):
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        try:
+            with self._conn:  # 한 트랜잭션 = fsync 1회
+                self._conn.executemany(
+                    "INSERT INTO ledger_journal (op, payload_json, created_at) VALUES (?, ?, ?)",
+                    [(op, payload, created_at) for op, payload, created_at, _ in batch],
+                )
+        except Exception as e:
+            logger.error(f"원장 아웃박스 기록 실패 ({len(batch)}건): {e}")
+            for *_, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        self._metrics["fsync_batches_total"] += 1
+        for *_, fut in batch:
+            if not fut.done():
+                fut.set_result(None)
+        if self._closed:
+            return
+        self.start()
+        self._idle.clear()
+        self._wake.set()
+
+    # --- 드레이너 ---
+
+    async def _wait_empty(self):
+        while self.pending() > 0:
+            self._idle.clear()
+            await self._idle.wait()
+
+    def _advance(self, seq: int):
+        self._delivered_seq = seq
+        with self._conn:
+            self._conn.execute("UPDATE outbox_state SET value = ? WHERE name = 'delivered_seq'", (seq,))
+
+    def _dead_letter(self, row: Tuple[int, str, str, float], error: Dict[str, Any]):
+        seq, op, payload_json, created_at = row
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ledger_dead_letters (seq, op, payload_json, error_json, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (seq, op, payload_json, json.dumps(error, default=str), created_at),
+            )
+            self._conn.execute("UPDATE outbox_state SET value = ? WHERE name = 'delivered_seq'", (seq,))
+        self._delivered_seq = seq
+        self._metrics["dead_letters_total"] += 1
+        logger.error(f"원장 아웃박스 작업을 dead letter로 이동 (#{seq} {op}): {error}")
+
+    def _compact(self):
+        # 전달이 끝난 저널은 보관 기간이 지나면 삭제합니다 (최대 1분에 1회).
+        now = time.time()
+        if now - self._last_compacted_at < 60.0:
+            return
+        self._last_compacted_at = now
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM ledger_journal WHERE seq <= ? AND created_at < ?",
+                (self._delivered_seq, now - self.retention_sec),
+            )
+
+    async def _drain_loop(self):
+        base, cap = self.retry_backoff
+        failures = 0
+        while True:
+            rows = self._conn.execute(
+                "SELECT seq, op, payload_json, created_at FROM ledger_journal WHERE seq > ? ORDER BY seq LIMIT ?",
+                (self._delivered_seq, self.batch_size),
+            ).fetchall()
+            if not rows:
+                self._compact()
+                self._idle.set()
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+
+            ops = [{"op": op, "payload": json.loads(payload_json)} for _, op, payload_json, _ in rows]
+            try:
+                result = await self.bot_client.apply_ledger_batch(ops)
+            except Exception as e:
+                result = None
+                self._metrics["last_error"] = str(e)
+
+            applied = min(int((result or {}).get("applied") or 0), len(rows))
+            if applied:
+                self._advance(rows[applied - 1][0])
+                self._metrics["delivered_total"] += applied
+                self._metrics["last_delivered_at"] = datetime.utcnow().isoformat()
+                failures = 0
+            self._metrics["batches_total"] += 1
+
+            error = (result or {}).get("error")
+            if result is not None and (error is None or applied >= len(rows)):
+                continue
+            if error:
+                self._metrics["last_error"] = error
+                status_code = int(error.get("status_code") or 500)
+                if 400 <= status_code < 500 and status_code not in RETRYABLE_CLIENT_ERRORS:
+                    # 재시도해도 성공할 수 없는 작업 -> 격리 후 다음 작업부터 이어서 전달
+                    self._dead_letter(rows[applied], error)
+                    continue
+
+            # 순서 보장을 위해 같은 위치부터 백오프 후 재시도합니다 (뒤 항목을 먼저 보내지 않음).
+            failures += 1
+            self._metrics["retries_total"] += 1
+            delay = min(base * (2 ** (failures - 1)), cap)
+            logger.warning(f"원장 아웃박스 전달 실패 (#{rows[applied][0]} 부터). {delay:.1f}s 후 재시도합니다.")
+            await asyncio.sleep(delay)
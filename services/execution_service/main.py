@@ -1,11 +1,26 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from typing import Any, Dict
 import logging
 from contextlib import asynccontextmanager
 import asyncio
+import os
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from bot_client import BotClient
 from adapter_client import AdapterClient
 from engine import BotRunner
+from clock import create_clock
+from balance_book import BalanceBook
+from reconciler import OrderReconciler
+from trade_reconciler import TradeReconciler
+from fill_stream import FillStream
+from ledger_outbox import LedgerOutbox
+from strategy_registry import StrategyRegistry
+from checkpoint_store import CheckpointStore
+from strategies.orderflow_fleet import OrderflowFleet
+from pipeline import PipelineGraph
+from feature_store import FeatureStore
+from risk_engine import RiskEngine, RiskLimits
+from drain import FleetDrainer, RecoveryQueue
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO)
@@ -15,12 +30,36 @@ logger = logging.getLogger("execution-service")
 scheduler = AsyncIOScheduler()
 bot_client = BotClient()
 adapter_client = AdapterClient()
+clock = create_clock() # EXECUTION_CLOCK_MODE (real | virtual | step)
+balance_book = BalanceBook(adapter_client) # 키 단위 체결 기반 잔고 장부
+risk_engine = RiskEngine(RiskLimits.from_env(), clock=clock, balance_book=balance_book) # 사전 주문 리스크 게이트 (RISK_* 한도, 킬 스위치)
+ledger_outbox = LedgerOutbox(bot_client, os.getenv("LEDGER_OUTBOX_PATH", ":memory:")) # 원장 쓰기 아웃박스 (순서 보장, at-least-once)
+fill_stream = FillStream(bot_client, adapter_client, balance_book=balance_book, clock=clock,
+                         outbox=ledger_outbox, risk_engine=risk_engine) # User Data Stream 체결 처리
+strategy_registry = StrategyRegistry() # 전략 플러그인 (id, version) 레지스트리, 지연 import
+checkpoint_store = CheckpointStore(os.getenv("CHECKPOINT_DB_PATH", ":memory:")) # 전략 상태 체크포인트 (재시작 시 복원)
+orderflow_fleet = OrderflowFleet(float(os.getenv("ORDERFLOW_FLEET_MAX_AGE_SEC", "1.0")), clock=clock) # 같은 심볼 orderflow 봇 배치 신호 평가
+pipeline_graph = PipelineGraph() # 봇 파이프라인 DAG 노드 공유 (데이터 소스/지표/조건)
+feature_store = FeatureStore(float(os.getenv("FEATURE_STORE_MAX_AGE_SEC", "1.0")), clock=clock) # 심볼 단위 시장 피처 공유
+order_reconciler = OrderReconciler(bot_client, adapter_client, balance_book=balance_book, clock=clock,
+                                   risk_engine=risk_engine)
+trade_reconciler = TradeReconciler(bot_client, adapter_client, clock=clock) # 부팅 시 거래소 체결 vs 원장 대사
+# 부팅 대사 마감 (0이면 부팅 대사 생략)
+BOOT_RECONCILE_TIMEOUT_SEC = float(os.getenv("BOOT_RECONCILE_TIMEOUT_SEC", "60"))
 active_runners = {} # bot_id -> BotRunner instance
+recovery_queue = RecoveryQueue(os.getenv("RECOVERY_DB_PATH", ":memory:")) # 드레인이 끝내지 못한 작업 (운영자 확인용)
+drainer = FleetDrainer(adapter_client, recovery_queue) # 전체 러너 동시 정지 (전역 마감 시간)
+# 종료 모드: resume(기본, 청산 없이 멈추고 재시작 후 재개) | drain(모든 봇 청산 후 STOPPED)
+SHUTDOWN_MODE = os.getenv("EXECUTION_SHUTDOWN_MODE", "resume")
+SHUTDOWN_DEADLINE_SEC = float(os.getenv("SHUTDOWN_DEADLINE_SEC", "20"))
+draining = False # 드레인 중에는 새 러너를 시작하지 않음
 
 async def poll_running_bots():
     """
     주기적으로 실행 중인 봇 목록을 동기화하는 작업입니다.
     """
+    if draining:
+        return
     try:
         runners_list = await bot_client.get_running_bots()
         active_ids = {bot['id'] for bot in runners_list}
@@ -30,6 +69,8 @@ async def poll_running_bots():
         # 주의: get_running_bots()는 클라이언트 내부 필터링을 통해 RUNNING, BOOTING, STOPPING을 모두 반환합니다.
         
         for bot in runners_list:
+            if draining:
+                return  # 폴링 도중 드레인이 시작됨: 더 이상 러너를 시작/변경하지 않음
             bid = bot['id']
             status = bot.get('status')
             
@@ -39,17 +80,36 @@ async def poll_running_bots():
             if bid not in active_runners:
                 if status in ['RUNNING', 'BOOTING']:
                     logger.info(f"새로운 봇 러너 시작: {bot['name']} ({bid}) [상태: {status}]")
-                    runner = BotRunner(bot, adapter_client, bot_client)
+                    runner = BotRunner(bot, adapter_client, bot_client, clock=clock, balance_book=balance_book,
+                                       fill_stream=fill_stream, ledger_outbox=ledger_outbox,
+                                       strategy_registry=strategy_registry, checkpoint_store=checkpoint_store,
+                                       orderflow_fleet=orderflow_fleet, pipeline_graph=pipeline_graph,
+                                       feature_store=feature_store, risk_engine=risk_engine)
                     await runner.start() # start() 내부에서 BOOTING -> RUNNING 처리
+                    if draining:
+                        # 부팅 중 드레인이 시작되어 드레인 대상에 포함되지 않았으므로 여기서 정지(청산 포함)합니다.
+                        logger.warning(f"드레인 중 부팅을 마친 러너를 정지합니다: {bid}")
+                        await runner.stop()
+                        return
                     active_runners[bid] = runner
                 elif status == 'STOPPING':
                      # 러너가 없는데 상태가 STOPPING인 경우 -> 고아(Zombie) 상태
                      # 서비스 재시작 등으로 인해 발생할 수 있음. 강제로 STOPPED로 리셋.
                      logger.warning(f"고아(Orphan) STOPPING 봇 발견: {bid}. STOPPED로 강제 리셋합니다.")
-                     await bot_client.update_bot_status(bid, "STOPPED", message="서비스 재시작으로 인한 상태 초기화")
+                     await bot_client.update_bot_status(bid, "STOPPED", message="서비스 재시작으로 인한 상태 초기화",
+                                                       expected_status="STOPPING")
             else:
                 # 이미 실행 중인 러너가 있는 경우. 중지가 필요한지 확인합니다.
                 # DB 상태가 STOPPING이면 러너의 stop()을 호출합니다.
+                runner = active_runners[bid]
+                if runner.restarting:
+                    continue
+                if status == 'RUNNING' and bot.get('config_version') != runner.config_version:
+                    # 설정 변경: 파라미터만 바뀌었으면 제자리 적용, 아니면 재시작
+                    if not runner.apply_config(bot):
+                        logger.info(f"{bid} 설정 v{bot.get('config_version')}은 재시작이 필요합니다. 봇을 재시작합니다.")
+                        asyncio.create_task(_restart(bid, runner))
+                    continue
                 if status == 'STOPPING':
                      runner = active_runners[bid]
                      if runner.is_running:
@@ -61,7 +121,7 @@ async def poll_running_bots():
         # 목록에서 완전히 사라진 봇(삭제되었거나 STOPPED로 변한 경우)은 로컬 러너도 정지해야 합니다.
         current_ids = list(active_runners.keys())
         for bid in current_ids:
-            if bid not in active_ids:
+            if bid not in active_ids and not active_runners[bid].restarting:
                  # 고아(Orphan) 봇입니다. 정지시킵니다.
                  logger.info(f"목록에서 사라진 봇(고아) 정지: {bid}")
                  runner = active_runners[bid]
@@ -70,27 +130,72 @@ async def poll_running_bots():
     except Exception as e:
         logger.error(f"폴링 루프 중 오류 발생: {e}")
 
+async def _restart(bid, runner):
+    """
+    실행 중 적용할 수 없는 설정 변경 시 러너를 정지(청산 포함)한 뒤 BOOTING으로 되돌립니다.
+    다음 폴링에서 새 설정으로 러너가 다시 부팅됩니다.
+    """
+    runner.restarting = True
+    await _stop_and_cleanup(bid, runner)
+    await bot_client.update_bot_status(bid, "BOOTING", message="설정 변경으로 재시작",
+                                       expected_status="STOPPED")
+
 async def _stop_and_cleanup(bid, runner):
     """러너를 정지하고 관리 딕셔너리에서 제거하는 헬퍼 함수입니다."""
     await runner.stop() # 여기서 RUNNING -> STOPPING -> STOPPED 전환을 처리함
     if bid in active_runners:
         del active_runners[bid]
 
+async def drain_runners(deadline_sec: float):
+    """모든 러너를 동시에 정지(청산 포함)합니다. 마감까지 끝나지 않은 작업은 복구 큐에 남깁니다."""
+    global draining
+    draining = True
+    report = await drainer.drain(dict(active_runners), deadline_sec)
+    active_runners.clear()
+    return report
+
 # --- Lifecycle ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
     logger.info("Starting Execution Service...")
     
+    # 재시작 전에 전달하지 못한 원장 기록부터 이어서 전달
+    ledger_outbox.start()
+    checkpoint_store.start()
+
+    # 크래시로 원장에 남지 못한 체결을 러너 시작 전에 거래소 기록에서 복구
+    if BOOT_RECONCILE_TIMEOUT_SEC > 0:
+        await ledger_outbox.flush(timeout=10.0)
+        try:
+            await asyncio.wait_for(trade_reconciler.run(), BOOT_RECONCILE_TIMEOUT_SEC)
+        except asyncio.TimeoutError:
+            logger.error(f"부팅 체결 대사가 {BOOT_RECONCILE_TIMEOUT_SEC}초 안에 끝나지 않아 중단합니다. "
+                         f"POST /reconciliation/trades로 다시 실행할 수 있습니다.")
+
     # Start Scheduler
     scheduler.add_job(poll_running_bots, 'interval', seconds=5)
+    # 로컬 잔고 장부를 거래소 잔고와 주기적으로 대사
+    scheduler.add_job(balance_book.reconcile_all, 'interval', seconds=60)
+    # PENDING / SENT로 남은 주문을 거래소 기록과 대사
+    scheduler.add_job(order_reconciler.run_once, 'interval', seconds=30)
+    # 어댑터 재시작 시 사라진 User Data Stream 구독 복구
+    scheduler.add_job(fill_stream.refresh, 'interval', seconds=60)
     scheduler.start()
     
     yield
     
     # Shutdown logic
-    logger.info("Shutting down Execution Service...")
+    logger.info(f"Shutting down Execution Service... (mode={SHUTDOWN_MODE})")
     scheduler.shutdown()
+    if SHUTDOWN_MODE == "drain":
+        await drain_runners(SHUTDOWN_DEADLINE_SEC)
+    else:
+        # 실행 중인 봇은 RUNNING으로 남아 재시작 후 재개되므로, 진행 중인 틱만 마치고 최신 전략 상태를 남겨둡니다.
+        await drainer.halt(active_runners, SHUTDOWN_DEADLINE_SEC)
+    await ledger_outbox.close(timeout=10.0)
+    await checkpoint_store.close(timeout=5.0)
+    recovery_queue.close()
 
 app = FastAPI(title="Execution Service", version="1.0.0", lifespan=lifespan)
 
@@ -99,7 +204,94 @@ app = FastAPI(title="Execution Service", version="1.0.0", lifespan=lifespan)
 def health_check():
     return {"status": "ok", "service": "execution-service"}
 
+@app.post("/events/user-stream")
+async def receive_user_stream_event(event: Dict[str, Any]):
+    """ExchangeAdapter가 푸시하는 User Data Stream 이벤트 (fills / balance / status)."""
+    await fill_stream.handle_event(event)
+    return {"ok": True}
+
+@app.get("/ledger/dead-letters")
+def get_ledger_dead_letters(limit: int = 100):
+    """BotService가 거부하여 원장 아웃박스에서 격리된 작업 (최신순)."""
+    return ledger_outbox.dead_letters(limit)
+
+@app.get("/strategies")
+def list_strategies():
+    """등록된 전략 메타데이터 (id, version, name, description, schema). TradingStrategyViewService가 조회합니다."""
+    return strategy_registry.list_metadata()
+
+@app.post("/strategies/reload")
+def reload_strategies():
+    """전략 디렉토리 / entry point를 다시 스캔합니다. 새 버전은 이후 부팅하는 봇부터 적용됩니다."""
+    changed = strategy_registry.refresh()
+    return {"registered": [{"id": sid, "version": version} for sid, version in changed]}
+
+@app.get("/risk")
+def get_risk():
+    """리스크 게이트 상태 (한도, 킬 스위치, 검사/거부 수)."""
+    return risk_engine.metrics()
+
+@app.post("/risk/kill-switch")
+def set_kill_switch(body: Dict[str, Any]):
+    """{"active": true, "reason": "..."} -> 모든 러너의 신규 주문 즉시 차단. {"active": false} -> 해제."""
+    if body.get("active", True):
+        risk_engine.engage_kill_switch(body.get("reason") or "manual")
+    else:
+        risk_engine.release_kill_switch()
+    return {"kill_switch": risk_engine.kill_switch, "running_bots": len(active_runners)}
+
+@app.put("/risk/limits")
+def update_risk_limits(body: Dict[str, Any]):
+    """전체 또는 키 단위(key_id) 한도 변경. 지정한 항목만 바뀌며 null은 해당 검사 해제."""
+    key_id = body.pop("key_id", None)
+    try:
+        limits = risk_engine.set_limits(key_id, **body)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"key_id": key_id, "limits": limits.__dict__}
+
+@app.post("/drain")
+async def drain(deadline_sec: float = SHUTDOWN_DEADLINE_SEC):
+    """배포 전 드레인: 새 러너 시작을 멈추고 모든 러너를 동시에 청산/정지합니다. 보고서를 반환합니다."""
+    return await drain_runners(deadline_sec)
+
+@app.get("/recovery")
+def get_recovery(limit: int = 500):
+    """드레인이 끝내지 못한 작업 (마감 초과 러너, 체결되지 않은 청산 주문)."""
+    return recovery_queue.pending(limit)
+
+@app.post("/recovery/{item_id}/resolve")
+def resolve_recovery(item_id: int):
+    if not recovery_queue.resolve(item_id):
+        raise HTTPException(status_code=404, detail="Recovery item not found")
+    return {"resolved": item_id}
+
+@app.post("/reconciliation/trades")
+async def reconcile_trades():
+    """거래소 체결 vs 원장 대사를 즉시 실행하고 (키, 심볼)별 보고서를 반환합니다 (부팅 시 자동 실행)."""
+    report = await trade_reconciler.run()
+    if report is None:
+        raise HTTPException(status_code=503, detail="BotService unavailable")
+    return report
+
+@app.get("/reconciliation/trades")
+def get_trade_reconciliation():
+    """마지막 체결 대사 보고서."""
+    return trade_reconciler.last_report
+
 @app.get("/status")
 def get_status():
-    # Placeholder for bot runner status
-    return {"running_bots": 0, "active_runners": []}
+    return {
+        "running_bots": len(active_runners),
+        "active_runners": list(active_runners.keys()),
+        "order_reconciliation": order_reconciler.metrics(),
+        "trade_reconciliation": trade_reconciler.metrics(),
+        "ledger_outbox": ledger_outbox.metrics(),
+        "strategy_checkpoints": checkpoint_store.metrics(),
+        "pipelines": pipeline_graph.metrics(),
+        "features": feature_store.metrics(),
+        "risk": risk_engine.metrics(),
+        "draining": draining,
+        "last_drain": drainer.last_report,
+        "recovery": recovery_queue.metrics(),
+    }
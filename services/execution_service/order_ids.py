@@ -0,0 +1,41 @@
+import os
+import threading
+import time
+import uuid
+from typing import Optional
+
+_lock = threading.Lock()
+_last_ms = -1
+_counter = 0
+
+
+def uuid7(now: Optional[float] = None) -> str:
+    """
+    시간 순서로 정렬되는 UUID (RFC 9562 UUIDv7) 문자열을 생성합니다.
+
+    상위 48비트는 Unix ms 타임스탬프이고, 같은 ms 안에서는 12비트 카운터를 증가시켜
+    한 프로세스에서 생성한 ID의 사전순 == 생성 순서를 보장합니다.
+    로컬 주문 ID(= 거래소 clientOrderId)로 사용하므로 BotService 왕복 없이 발급할 수 있습니다.
+    """
+    global _last_ms, _counter
+    ms = int((time.time() if now is None else now) * 1000)
+    with _lock:
+        if ms <= _last_ms:
+            # 같은 ms(또는 시계 역행): 직전 타임스탬프를 유지하고 카운터만 증가
+            ms = _last_ms
+            _counter += 1
+            if _counter > 0xFFF:
+                ms += 1
+                _counter = 0
+        else:
+            _counter = int.from_bytes(os.urandom(2), "big") & 0x7FF  # 상위 비트를 남겨 증가 여유 확보
+        _last_ms = ms
+        counter = _counter
+
+    rand_b = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (ms & ((1 << 48) - 1)) << 80
+    value |= 0x7 << 76          # version 7
+    value |= counter << 64      # rand_a (카운터)
+    value |= 0b10 << 62         # variant
+    value |= rand_b
+    return str(uuid.UUID(int=value))
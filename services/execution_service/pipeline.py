@@ -0,0 +1,410 @@
+"""
+봇 파이프라인(Data Source -> Trigger -> Risk -> Action) 컴파일러.
+
+봇 설정의 `pipeline` JSON을 실행 가능한 DAG로 컴파일합니다.
+
+    "pipeline": {
+      "data_source": {"frame": "1m"},
+      "indicators": [
+        {"id": "fast", "type": "EMA", "params": {"period": 12}},
+        {"id": "slow", "type": "EMA", "params": {"period": 26}},
+        {"id": "bb", "type": "BOLLINGER", "params": {"period": 20, "k": 2.0}, "input": "close"}
+      ],
+      "triggers": {"schedule": "ON_CANDLE_CLOSE",
+                   "conditions": [{"left": "fast", "op": "crosses_above", "right": "slow"},
+                                  {"left": "close", "op": "<", "right": "bb.upper"}]},
+      "risk_management": {"stop_loss": 0.05},
+      "strategy": {"id": "...", "params": {...}}
+    }
+
+- 노드는 정규화된 정의(종류, 파라미터, 입력 노드)를 키로 서비스 전체의 PipelineGraph에 한 번만 생성됩니다.
+  같은 (키, 심볼, 프레임)의 데이터 소스와 같은 정의의 지표/조건은 봇이 달라도(지표 id가 달라도) 공유됩니다.
+- 각 노드는 입력 노드의 version이 바뀌었을 때만 다시 계산되고, 값이 바뀌었을 때만 자기 version을 올립니다.
+  데이터 소스는 현재 봉이 마감될 시각까지 조회하지 않습니다.
+- Action은 봇의 전략(`execute`)이며, Trigger가 발화한 틱에만 실행됩니다.
+  지표/조건이 없고 schedule이 ALWAYS인 파이프라인(기존 봇)은 노드 없이 매 틱 실행됩니다.
+"""
+import asyncio
+import bisect
+import logging
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from strategies.indicators import ATR, EMA, RSI, VWAP, Bollinger, RollingZScore
+
+logger = logging.getLogger("execution-service.pipeline")
+
+# ExchangeAdapter /market/candles가 지원하는 타임프레임 (초)
+TIMEFRAMES = {"1s": 1, "1m": 60, "5m": 300, "1h": 3600}
+DEFAULT_FRAME = "1m"
+
+# 봉 행: [ts(ms), open, high, low, close, volume]
+FIELDS = {"open": 1, "high": 2, "low": 3, "close": 4, "volume": 5}
+
+# 지표 타입 -> (클래스, 입력 필드). 입력이 하나인 지표는 "input"으로 필드를 바꿀 수 있습니다.
+INDICATORS: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {
+    "EMA": (EMA, ("close",)),
+    "RSI": (RSI, ("close",)),
+    "BOLLINGER": (Bollinger, ("close",)),
+    "ZSCORE": (RollingZScore, ("close",)),
+    "ATR": (ATR, ("high", "low", "close")),
+    "VWAP": (VWAP, ("close", "volume")),
+}
+
+# 여러 값을 내는 지표의 참조 가능한 속성 (예: "bb.upper")
+INDICATOR_ATTRS = {"BOLLINGER": ("middle", "upper", "lower", "width")}
+
+SCHEDULES = ("ALWAYS", "ON_CANDLE_CLOSE")
+
+_COMPARE = {
+    ">": lambda l, r: l > r,
+    ">=": lambda l, r: l >= r,
+    "<": lambda l, r: l < r,
+    "<=": lambda l, r: l <= r,
+    "==": lambda l, r: l == r,
+    "!=": lambda l, r: l != r,
+}
+_CROSS = ("crosses_above", "crosses_below")
+
+HISTORY_CANDLES = 500  # 소스가 보관하는 마감 봉 수 (지표 워밍업 겸용)
+RETRY_SEC = 5.0  # 마감 봉을 아직 받지 못했을 때 재조회 간격 (프레임보다 짧으면 프레임 간격)
+CLOSE_GRACE_SEC = 1.0  # 봉 마감 후 어댑터 집계를 기다리는 시간
+
+
+def _freeze(value: Any) -> Any:
+    """노드 키에 쓸 수 있도록 dict/list를 정렬된 튜플로 바꿉니다."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class Node:
+    """DAG 노드. inputs의 version 조합이 마지막 계산 때와 다를 때만 compute()를 호출합니다."""
+
+    def __init__(self, key: tuple, inputs: Sequence["Node"] = ()):
+        self.key = key
+        self.inputs = list(inputs)
+        self.value: Any = None
+        self.version = 0
+        self.refs = 0
+        self.evaluations = 0
+        self._seen: Optional[tuple] = None
+
+    def compute(self) -> bool:
+        """입력으로 값을 다시 계산합니다. 값이 바뀌었으면 True."""
+        raise NotImplementedError
+
+
+class CandleSource(Node):
+    """(키, 심볼, 프레임)의 마감 봉. 현재 봉이 마감될 시각이 지나야 다시 조회합니다."""
+
+    def __init__(self, key: tuple, key_id: str, symbol: str, frame: str):
+        super().__init__(key)
+        self.key_id, self.symbol, self.frame = key_id, symbol, frame
+        self.period_ms = TIMEFRAMES[frame] * 1000
+        self.times: List[int] = []
+        self.rows: List[list] = []
+        self.next_poll = 0.0
+        self.fetches = 0
+        self._lock = asyncio.Lock()
+
+    async def poll(self, adapter, now: float):
+        if now < self.next_poll:
+            return
+        async with self._lock:
+            if now < self.next_poll:  # 대기 중 다른 봇이 이미 조회함
+                return
+            now_ms = int(now * 1000)
+            since = self.times[-1] + self.period_ms if self.times else None
+            resp = await adapter.get_candles(self.key_id, self.symbol, self.frame, since=since, limit=HISTORY_CANDLES)
+            self.fetches += 1
+
+            last = self.times[-1] if self.times else -1
+            closed = [list(row) for row in (resp or {}).get("candles") or []
+                      if row[0] > last and row[0] + self.period_ms <= now_ms]
+            if closed:
+                self.rows.extend(closed)
+                self.times.extend(row[0] for row in closed)
+                if len(self.rows) > HISTORY_CANDLES:
+                    del self.rows[:-HISTORY_CANDLES], self.times[:-HISTORY_CANDLES]
+                self.value = self.rows[-1]
+                self.version += 1
+
+            current_open = now_ms - now_ms % self.period_ms
+            if self.times and self.times[-1] >= current_open - self.period_ms:
+                self.next_poll = (current_open + self.period_ms) / 1000 + CLOSE_GRACE_SEC
+            else:
+                # 직전 봉을 아직 받지 못함 (조회 실패, 어댑터 집계 지연, 체결 없는 구간)
+                self.next_poll = now + min(RETRY_SEC, self.period_ms / 1000)
+
+    def since(self, ts: int) -> List[list]:
+        """ts 이후에 마감된 봉."""
+        return self.rows[bisect.bisect_right(self.times, ts):]
+
+    def compute(self) -> bool:
+        return False
+
+
+class IndicatorNode(Node):
+    """스트리밍 지표. 소스에 새로 마감된 봉만 warm_up으로 반영합니다 (warm_up 이어 붙이기 == update 반복)."""
+
+    def __init__(self, key: tuple, source: CandleSource, factory: Callable, params: dict, fields: Tuple[str, ...]):
+        super().__init__(key, [source])
+        self.indicator = factory(**params)
+        self.columns = [FIELDS[f] for f in fields]
+        self.consumed_ts = -1
+
+    def compute(self) -> bool:
+        source: CandleSource = self.inputs[0]
+        rows = source.since(self.consumed_ts)
+        if not rows:
+            return False
+        arr = np.asarray(rows, dtype=np.float64)
+        self.indicator.warm_up(*(arr[:, c] for c in self.columns))
+        self.consumed_ts = rows[-1][0]
+        self.value = self.indicator.value
+        return True
+
+
+class FieldNode(Node):
+    """마감 봉의 필드(close 등) 또는 지표 값의 속성(bb.upper 등)."""
+
+    def __init__(self, key: tuple, source: Node, getter: Callable[[Any], Any]):
+        super().__init__(key, [source])
+        self.getter = getter
+
+    def compute(self) -> bool:
+        raw = self.inputs[0].value
+        value = None if raw is None else self.getter(raw)
+        changed = value != self.value
+        self.value = value
+        return changed
+
+
+class ConditionNode(Node):
+    """좌/우 값 비교. crosses_above/below는 직전 입력 대비 부호 변화로 판단합니다."""
+
+    def __init__(self, key: tuple, op: str, left: Node, right: Optional[Node], constant: Optional[float]):
+        super().__init__(key, [n for n in (left, right) if n is not None])
+        self.op = op
+        self.left, self.right, self.constant = left, right, constant
+        self._prev_diff: Optional[float] = None
+        self.value = False
+
+    def compute(self) -> bool:
+        l = self.left.value
+        r = self.right.value if self.right is not None else self.constant
+        if l is None or r is None:
+            value = False
+        elif self.op in _CROSS:
+            diff = float(l) - float(r)
+            prev, self._prev_diff = self._prev_diff, diff
+            if prev is None:
+                value = False
+            elif self.op == "crosses_above":
+                value = prev <= 0.0 < diff
+            else:
+                value = prev >= 0.0 > diff
+        else:
+            value = bool(_COMPARE[self.op](l, r))
+        changed = value != self.value
+        self.value = value
+        # 교차는 발생한 업데이트에서만 참이므로 같은 값이어도 새 업데이트로 취급합니다.
+        return changed or (self.op in _CROSS and value)
+
+
+class CompiledPipeline:
+    """봇 하나의 컴파일 결과. 노드는 PipelineGraph가 소유하며 여러 파이프라인이 공유합니다."""
+
+    def __init__(self, graph: "PipelineGraph", name: str, schedule: str, source: Optional[CandleSource],
+                 conditions: List[ConditionNode], indicators: Dict[str, Node], risk: Dict[str, Any],
+                 nodes: List[Node]):
+        self.graph = graph
+        self.name = name
+        self.schedule = schedule
+        self.source = source
+        self.conditions = conditions
+        self.indicators = indicators
+        self.risk = risk
+        self.nodes = nodes  # 참조 카운트를 올린 노드 (release 시 반납)
+        self._roots = list(conditions) + list(indicators.values()) + ([source] if source is not None else [])
+        self._fired_version = 0
+
+    @property
+    def trivial(self) -> bool:
+        return not self._roots
+
+    async def should_run(self, adapter, now: float) -> bool:
+        """이번 틱에 Action(전략 execute)을 실행할지. 필요한 노드만 갱신합니다."""
+        if self.trivial:
+            return True
+        for node in self._roots:
+            await self.graph.refresh(node, adapter, now)
+        if self.schedule == "ON_CANDLE_CLOSE":
+            if self.source.version == self._fired_version:
+                return False
+            self._fired_version = self.source.version
+        return all(c.value for c in self.conditions)
+
+    def values(self) -> Dict[str, Any]:
+        """지표 id -> 현재 값 (context["indicators"])."""
+        return {name: node.value for name, node in self.indicators.items()}
+
+
+class PipelineGraph:
+    """
+    서비스 전체가 공유하는 파이프라인 노드 저장소 (common-subexpression sharing).
+    compile()은 노드를 정규화된 키로 찾아 재사용하고, release()는 참조가 0이 된 노드를 제거합니다.
+    """
+
+    def __init__(self):
+        self._nodes: Dict[tuple, Node] = {}
+        self._pipelines = 0
+
+    def _intern(self, key: tuple, factory: Callable[[], Node], owned: List[Node]) -> Node:
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = factory()
+        node.refs += 1
+        owned.append(node)
+        return node
+
+    def compile(self, bot_config: Dict[str, Any]) -> CompiledPipeline:
+        """봇 설정의 파이프라인을 컴파일합니다. 잘못된 정의는 ValueError."""
+        pipeline = bot_config.get("pipeline") or {}
+        gs = bot_config.get("global_settings") or {}
+        key_id, symbol = gs.get("exchange") or gs.get("account_id"), gs.get("symbol")
+        name = bot_config.get("name") or bot_config.get("id") or "bot"
+
+        triggers = pipeline.get("triggers") or {}
+        schedule = str(triggers.get("schedule") or "ALWAYS").upper()
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown trigger schedule: {schedule}")
+        indicator_specs = pipeline.get("indicators") or []
+        condition_specs = triggers.get("conditions") or []
+        if not isinstance(indicator_specs, list) or not isinstance(condition_specs, list):
+            raise ValueError("pipeline.indicators and triggers.conditions must be lists")
+
+        owned: List[Node] = []
+        source = None
+        if indicator_specs or condition_specs or schedule != "ALWAYS":
+            frame = (pipeline.get("data_source") or {}).get("frame") or DEFAULT_FRAME
+            if frame not in TIMEFRAMES:
+                raise ValueError(f"Unsupported data_source frame: {frame}")
+            if not key_id or not symbol:
+                raise ValueError("global_settings.exchange and symbol are required for data sources")
+            key = ("candles", key_id, symbol, frame)
+            source = self._intern(key, lambda: CandleSource(key, key_id, symbol, frame), owned)
+
+        try:
+            indicators = self._compile_indicators(indicator_specs, source, owned)
+            conditions = [self._compile_condition(spec, source, indicators, owned) for spec in condition_specs]
+        except ValueError:
+            self._release(owned)
+            raise
+
+        self._pipelines += 1
+        return CompiledPipeline(self, name, schedule, source, conditions, indicators,
+                                dict(pipeline.get("risk_management") or {}), owned)
+
+    def _compile_indicators(self, specs: List[dict], source: CandleSource, owned: List[Node]) -> Dict[str, Node]:
+        indicators: Dict[str, Node] = {}
+        for spec in specs:
+            ind_id = spec.get("id")
+            ind_type = str(spec.get("type") or "").upper()
+            if not ind_id or ind_id in indicators or ind_id in FIELDS:
+                raise ValueError(f"Indicator id missing, duplicated or reserved: {ind_id!r}")
+            if ind_type not in INDICATORS:
+                raise ValueError(f"Unknown indicator type: {spec.get('type')!r}")
+            factory, fields = INDICATORS[ind_type]
+            if len(fields) == 1:
+                fields = (spec.get("input") or fields[0],)
+            if any(f not in FIELDS for f in fields):
+                raise ValueError(f"Unknown indicator input: {spec.get('input')!r}")
+            params = dict(spec.get("params") or {})
+            try:
+                factory(**params)  # 파라미터 검증
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Invalid params for {ind_id} ({ind_type}): {e}") from e
+            key = ("indicator", ind_type, _freeze(params), fields, source.key)
+            indicators[ind_id] = self._intern(
+                key, lambda: IndicatorNode(key, source, factory, params, fields), owned
+            )
+        return indicators
+
+    def _compile_ref(self, ref: str, source: CandleSource, indicators: Dict[str, Node], owned: List[Node]) -> Node:
+        """조건의 피연산자 참조: 봉 필드(close) | 지표 id(fast) | 지표 속성(bb.upper)."""
+        if ref in FIELDS:
+            key = ("field", source.key, ref)
+            column = FIELDS[ref]
+            return self._intern(key, lambda: FieldNode(key, source, lambda row: row[column]), owned)
+        ind_id, _, attr = ref.partition(".")
+        if ind_id not in indicators:
+            raise ValueError(f"Unknown reference in trigger condition: {ref!r}")
+        node = indicators[ind_id]
+        if not attr:
+            return node
+        if attr not in INDICATOR_ATTRS.get(node.key[1], ()):
+            raise ValueError(f"Invalid attribute in reference: {ref!r}")
+        key = ("field", node.key, attr)
+        return self._intern(key, lambda: FieldNode(key, node, lambda value: getattr(value, attr)), owned)
+
+    def _compile_condition(self, spec: dict, source: CandleSource, indicators: Dict[str, Node],
+                           owned: List[Node]) -> ConditionNode:
+        op = spec.get("op")
+        if op not in _COMPARE and op not in _CROSS:
+            raise ValueError(f"Unknown condition operator: {op!r}")
+        left_ref, right_ref = spec.get("left"), spec.get("right")
+        if not isinstance(left_ref, str):
+            raise ValueError(f"Condition left operand must be a reference: {left_ref!r}")
+        left = self._compile_ref(left_ref, source, indicators, owned)
+        right, constant = None, None
+        if isinstance(right_ref, str):
+            right = self._compile_ref(right_ref, source, indicators, owned)
+        elif isinstance(right_ref, (int, float)) and not isinstance(right_ref, bool) and math.isfinite(right_ref):
+            constant = float(right_ref)
+        else:
+            raise ValueError(f"Condition right operand must be a reference or number: {right_ref!r}")
+        key = ("condition", op, left.key, right.key if right is not None else ("const", constant))
+        return self._intern(key, lambda: ConditionNode(key, op, left, right, constant), owned)
+
+    async def refresh(self, node: Node, adapter, now: float):
+        """node와 그 입력을 최신으로 만듭니다. 입력 version이 그대로면 계산하지 않습니다."""
+        if isinstance(node, CandleSource):
+            await node.poll(adapter, now)
+            return
+        for inp in node.inputs:
+            await self.refresh(inp, adapter, now)
+        seen = tuple(inp.version for inp in node.inputs)
+        if seen == node._seen:
+            return
+        node._seen = seen
+        node.evaluations += 1
+        if node.compute():
+            node.version += 1
+
+    def _release(self, nodes: List[Node]):
+        for node in nodes:
+            node.refs -= 1
+            if node.refs <= 0:
+                self._nodes.pop(node.key, None)
+
+    def release(self, compiled: CompiledPipeline):
+        """봇 정지 시 호출. 더 이상 참조되지 않는 노드를 제거합니다."""
+        self._release(compiled.nodes)
+        compiled.nodes = []
+        self._pipelines -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        nodes = list(self._nodes.values())
+        return {
+            "pipelines": self._pipelines,
+            "nodes": len(nodes),
+            "sources": sum(isinstance(n, CandleSource) for n in nodes),
+            "evaluations": sum(n.evaluations for n in nodes),
+            "fetches": sum(n.fetches for n in nodes if isinstance(n, CandleSource)),
+        }
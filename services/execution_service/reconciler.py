@@ -0,0 +1,229 @@
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from clock import RealClock
+from fill_stream import execution_payload
+
+logger = logging.getLogger("execution-service.reconciler")
+
+# 거래소(CCXT) 주문 상태 -> 로컬 주문 상태
+TERMINAL_STATUS_MAP = {
+    "closed": "FILLED",
+    "canceled": "CANCELED",
+    "expired": "CANCELED",
+    "rejected": "FAILED",
+}
+
+# 그룹당 주문 조회 페이지 크기와 최대 페이지 수
+ACTIVITY_PAGE_LIMIT = 500
+ACTIVITY_MAX_PAGES = 10
+
+
+class OrderReconciler:
+    """
+    PENDING / SENT 상태로 남은 로컬 주문을 거래소 기록과 대사하는 워커.
+
+    - 미해결 주문을 (key_id, symbol) 단위로 묶어 그룹 단위로 거래소를 조회합니다
+      (주문 건별 fetch_order 대신 fetch_orders + fetch_my_trades, next_since로 페이지 이동).
+    - 뒤늦게 발생한 체결은 Trade ID 기준으로 원장에 기록합니다. BotService가 같은 Trade ID를
+      중복 기록하지 않으므로 재시도해도 안전합니다.
+    - backlog / 지연(latency) 지표를 metrics()로 노출합니다.
+    """
+
+    def __init__(
+        self,
+        bot_client,
+        adapter_client,
+        balance_book=None,
+        clock=None,
+        pending_grace_sec: float = 30.0,
+        pending_expiry_sec: float = 3600.0,
+        lookback_margin_sec: float = 60.0,
+        risk_engine=None,
+    ):
+        self.bot_client = bot_client
+        self.adapter_client = adapter_client
+        self.balance_book = balance_book
+        # 사전 주문 리스크 게이트 (뒤늦게 발견된 체결도 포지션/일간 손익에 반영)
+        self.risk_engine = risk_engine
+        self.clock = clock or RealClock()
+        # 방금 생성되어 러너가 아직 처리 중인 PENDING 주문은 건드리지 않습니다.
+        self.pending_grace_sec = pending_grace_sec
+        # 이 시간이 지나도 거래소에 흔적이 없는 (거래소 주문 ID 없는) 주문은 FAILED로 확정합니다.
+        self.pending_expiry_sec = pending_expiry_sec
+        self.lookback_margin_sec = lookback_margin_sec
+
+        self._metrics: Dict[str, Any] = {
+            "backlog": 0,
+            "oldest_unresolved_age_sec": 0.0,
+            "last_run_at": None,
+            "last_run_duration_sec": 0.0,
+            "last_resolution_latency_sec": None,
+            "resolved_total": 0,
+            "fills_committed_total": 0,
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        return dict(self._metrics)
+
+    def _age_sec(self, order: Dict[str, Any]) -> float:
+        ts = order.get("timestamp")
+        if not ts:
+            return 0.0
+        placed = datetime.fromisoformat(ts) if isinstance(ts, str) else ts
+        now = datetime.utcfromtimestamp(self.clock.time())
+        return max(0.0, (now - placed).total_seconds())
+
+    async def _resolve_key_ids(self, orders: List[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+        key_ids: Dict[str, Optional[str]] = {}
+        for bot_id in {o["bot_id"] for o in orders}:
+            bot = await self.bot_client.get_bot(bot_id)
+            key_ids[bot_id] = (bot or {}).get("global_settings", {}).get("exchange")
+        return key_ids
+
+    async def run_once(self):
+        """미해결 주문 1회 대사. 스케줄러가 주기적으로 호출합니다."""
+        started = time.perf_counter()
+        orders = await self.bot_client.get_unresolved_orders()
+        if orders is None:
+            return
+
+        candidates = [
+            o for o in orders
+            if o.get("status") == "SENT" or self._age_sec(o) >= self.pending_grace_sec
+        ]
+        key_ids = await self._resolve_key_ids(candidates) if candidates else {}
+
+        groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        for order in candidates:
+            key_id = key_ids.get(order["bot_id"])
+            if not key_id:
+                logger.warning(f"주문 대사 건너뜀 ({order['id']}): 봇 {order['bot_id']}의 거래소 키를 찾을 수 없습니다.")
+                continue
+            groups[(key_id, order["symbol"])].append(order)
+
+        resolved_ids = set()
+        latencies = []
+        for (key_id, symbol), group in groups.items():
+            try:
+                done = await self._reconcile_group(key_id, symbol, group)
+            except Exception as e:
+                logger.error(f"주문 대사 중 오류 ({key_id}/{symbol}): {e}")
+                continue
+            for order in group:
+                if order["id"] in done:
+                    resolved_ids.add(order["id"])
+                    latencies.append(self._age_sec(order))
+
+        remaining = [o for o in orders if o["id"] not in resolved_ids]
+        self._metrics.update(
+            backlog=len(remaining),
+            oldest_unresolved_age_sec=max((self._age_sec(o) for o in remaining), default=0.0),
+            last_run_at=datetime.utcfromtimestamp(self.clock.time()).isoformat(),
+            last_run_duration_sec=time.perf_counter() - started,
+            resolved_total=self._metrics["resolved_total"] + len(resolved_ids),
+        )
+        if latencies:
+            self._metrics["last_resolution_latency_sec"] = max(latencies)
+        if resolved_ids or remaining:
+            logger.info(f"주문 대사 완료: 해결 {len(resolved_ids)}건, 잔여 backlog {len(remaining)}건")
+
+    async def _reconcile_group(self, key_id: str, symbol: str, group: List[Dict[str, Any]]) -> set:
+        """(key_id, symbol) 그룹을 그룹 단위 조회로 대사하고, 확정된 로컬 주문 ID 집합을 반환합니다."""
+        oldest_age = max(self._age_sec(o) for o in group)
+        since_ms = int((self.clock.time() - oldest_age - self.lookback_margin_sec) * 1000)
+        activity = await self._fetch_activity(key_id, symbol, since_ms, group)
+        if activity is None:
+            return set()
+
+        by_id = {str(o["id"]): o for o in activity["orders"]}
+        by_client_id = {o["client_order_id"]: o for o in activity["orders"] if o.get("client_order_id")}
+        trades_by_order: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for t in activity["trades"]:
+            trades_by_order[str(t["order_id"])].append(t)
+
+        resolved = set()
+        committed_fills = 0
+        for local in group:
+            exchange_order = None
+            if local.get("exchange_order_id"):
+                exchange_order = by_id.get(str(local["exchange_order_id"]))
+            if exchange_order is None:
+                # clientOrderId로 로컬 주문 ID를 전달한 경우 PENDING 주문도 찾을 수 있습니다.
+                exchange_order = by_client_id.get(local["id"])
+
+            if exchange_order is None:
+                # 거래소 주문 ID 없이 남은 주문(PENDING, 또는 결과 불명으로 SENT)은 만료 시 FAILED로 확정
+                if not local.get("exchange_order_id") and self._age_sec(local) >= self.pending_expiry_sec:
+                    await self.bot_client.update_order_status(local["id"], "FAILED")
+                    logger.warning(f"{local['status']} 주문 {local['id']}: 거래소에 흔적이 없어 FAILED로 확정합니다.")
+                    resolved.add(local["id"])
+                continue
+
+            trades = trades_by_order.get(exchange_order["id"], [])
+            recorded = 0
+            for trade in trades:
+                payload = execution_payload(local, exchange_order["id"], trade)
+                if self.risk_engine is not None:
+                    self.risk_engine.on_execution(key_id, payload)
+                if await self.bot_client.record_execution(payload):
+                    recorded += 1
+            committed_fills += recorded
+            if recorded < len(trades):
+                # 일부 기록 실패 -> 다음 회차에 재시도 (중복 Trade ID는 BotService가 무시)
+                continue
+
+            status = TERMINAL_STATUS_MAP.get(exchange_order.get("status"))
+            if status in ("CANCELED", "FAILED") and trades:
+                status = "FILLED"  # 부분 체결 후 취소된 경우 체결분은 유효
+            if status == "FILLED" and not trades:
+                logger.warning(f"주문 {local['id']}: 거래소는 체결 완료이나 체결 내역이 아직 조회되지 않았습니다.")
+                continue
+
+            if status:
+                await self.bot_client.update_order_status(local["id"], status, exchange_order_id=exchange_order["id"])
+                resolved.add(local["id"])
+            elif local["status"] == "PENDING":
+                # 거래소에 살아 있는 주문 -> SENT로 승격하고 거래소 주문 ID를 기록
+                await self.bot_client.update_order_status(local["id"], "SENT", exchange_order_id=exchange_order["id"])
+
+        self._metrics["fills_committed_total"] += committed_fills
+        if committed_fills and self.balance_book is not None:
+            # 늦게 들어온 체결은 로컬 장부에 반영된 적이 없으므로 거래소 잔고로 다시 맞춥니다.
+            await self.balance_book.reconcile(key_id)
+        if self.risk_engine is not None:
+            # 확정된 주문은 리스크 엔진의 미체결 노출에서 뺍니다.
+            for local_id in resolved:
+                self.risk_engine.release(local_id)
+        return resolved
+
+    async def _fetch_activity(self, key_id: str, symbol: str, since_ms: int,
+                              group: List[Dict[str, Any]]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """
+        since 이후 주문/체결을 next_since로 페이지를 넘기며 모읍니다. 그룹의 주문을 모두 찾으면 멈춥니다.
+        체결은 Trade ID로 중복을 제거합니다. 조회 실패 시 None.
+        """
+        wanted_ids = {str(o["exchange_order_id"]) for o in group if o.get("exchange_order_id")}
+        wanted_client_ids = {o["id"] for o in group if not o.get("exchange_order_id")}
+        orders: Dict[str, Dict[str, Any]] = {}
+        trades: Dict[str, Dict[str, Any]] = {}
+        cursor = since_ms
+        for _ in range(ACTIVITY_MAX_PAGES):
+            page = await self.adapter_client.get_account_orders(key_id, symbol, since=cursor,
+                                                                limit=ACTIVITY_PAGE_LIMIT)
+            if page is None:
+                return None
+            for o in page.get("orders") or []:
+                orders[str(o["id"])] = o
+            for t in page.get("trades") or []:
+                trades.setdefault(str(t["id"]), t)
+            next_since = page.get("next_since")
+            found_client_ids = {o.get("client_order_id") for o in orders.values()}
+            if next_since is None or (wanted_ids <= orders.keys() and wanted_client_ids <= found_client_ids):
+                break
+            # 같은 시각의 주문만으로 페이지가 가득 찼다면 1ms 전진
+            cursor = next_since if next_since > cursor else cursor + 1
+        return {"orders": list(orders.values()), "trades": list(trades.values())}
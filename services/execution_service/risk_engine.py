@@ -0,0 +1,290 @@
+import logging
+import os
+from collections import OrderedDict, deque
+from dataclasses import dataclass, fields, replace
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from balance_book import split_symbol
+from clock import RealClock
+
+logger = logging.getLogger("execution-service.risk-engine")
+
+
+@dataclass(frozen=True)
+class RiskLimits:
+    """키 단위 사전 주문 한도. None이면 해당 검사를 하지 않습니다."""
+    max_order_notional: Optional[float] = None     # 주문 1건 금액 (Quote)
+    max_position_notional: Optional[float] = None  # (키, 심볼) 순포지션 금액 (미체결 주문과 이번 주문 반영 후)
+    max_daily_loss: Optional[float] = None         # 키의 UTC 일간 실현 손실 (수수료 포함, 양수)
+    max_orders_per_min: Optional[int] = None       # 키의 최근 60초 주문 수
+
+    @classmethod
+    def from_env(cls) -> "RiskLimits":
+        def _num(name, cast=float):
+            raw = os.getenv(name)
+            return cast(raw) if raw not in (None, "") else None
+        return cls(
+            max_order_notional=_num("RISK_MAX_ORDER_NOTIONAL"),
+            max_position_notional=_num("RISK_MAX_POSITION_NOTIONAL"),
+            max_daily_loss=_num("RISK_MAX_DAILY_LOSS"),
+            max_orders_per_min=_num("RISK_MAX_ORDERS_PER_MIN", int),
+        )
+
+
+@dataclass
+class RiskDecision:
+    allowed: bool
+    rule: Optional[str] = None
+    detail: str = ""
+
+
+ALLOW = RiskDecision(True)
+
+
+@dataclass
+class _Position:
+    qty: float = 0.0        # 보유 포지션 (현물: 0 미만이 되지 않음)
+    avg_price: float = 0.0  # 평균 단가 (실현 손익 계산용)
+
+
+class RiskEngine:
+    """
+    인프로세스 사전 주문 리스크 게이트. 모든 러너의 LedgerAwareAdapter가 공유합니다.
+
+    - check()는 메모리 상태(포지션, 일간 손익, 주문 시각, 최근 가격)만 읽습니다 (네트워크/DB 없음).
+    - 상태는 체결(on_fill)로 갱신됩니다: 동기 응답, User Data Stream, 주문 대사 워커 경로 모두.
+    - 킬 스위치가 켜지면 모든 러너의 신규 주문을 즉시 거부합니다. 포지션을 줄이는 주문(청산)은
+      킬 스위치/금액/손실 한도와 무관하게 허용합니다 (주문 속도 한도는 적용).
+    - 현물 기준입니다: 포지션은 0 아래로 내려가지 않으며(추적 이전 보유분 매도는 포지션 0에서 멈춤), 청산은 보유 수량 이내의
+      매도뿐입니다. 포지션은 재시작 후 비어 있으므로, balance_book이 있으면 키가 실제 보유한 base 이내의 매도도 청산으로 봅니다.
+    - 통과한 주문은 체결/취소로 끝날 때까지 미체결 노출(reserve/release)로 잡혀 포지션 금액 한도와 청산 판정에 반영됩니다
+      (같은 배치의 앞선 주문 포함).
+    """
+
+    RATE_WINDOW_SEC = 60.0
+    SEEN_TRADES_CAPACITY = 10000
+
+    def __init__(self, limits: Optional[RiskLimits] = None, clock=None, balance_book=None):
+        self.limits = limits or RiskLimits()
+        self.clock = clock or RealClock()
+        self.balance_book = balance_book
+        self._key_limits: Dict[str, RiskLimits] = {}
+        self._positions: Dict[Tuple[str, str], _Position] = {}
+        # 미체결 주문 노출: (키, 심볼) -> {주문 ref(로컬 주문 ID): 부호 있는 잔량}
+        self._open_orders: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._open_order_keys: Dict[str, Tuple[str, str]] = {}
+        self._prices: Dict[Tuple[str, str], float] = {}
+        self._daily_pnl: Dict[str, float] = {}
+        self._pnl_day: Optional[str] = None
+        self._order_times: Dict[str, Deque[float]] = {}
+        self._seen_trades: "OrderedDict[str, None]" = OrderedDict()
+        self.kill_switch: Optional[Dict[str, Any]] = None
+        self._metrics: Dict[str, Any] = {"checks": 0, "rejections": 0, "rejections_by_rule": {}}
+
+    # --- 설정 ---
+    def limits_for(self, key_id: str) -> RiskLimits:
+        return self._key_limits.get(key_id, self.limits)
+
+    def set_limits(self, key_id: Optional[str] = None, **overrides) -> RiskLimits:
+        """전체(key_id=None) 또는 키 단위 한도를 변경합니다. 지정하지 않은 항목은 유지합니다."""
+        unknown = set(overrides) - {f.name for f in fields(RiskLimits)}
+        if unknown:
+            raise ValueError(f"Unknown risk limits: {sorted(unknown)}")
+        if key_id is None:
+            self.limits = replace(self.limits, **overrides)
+            return self.limits
+        self._key_limits[key_id] = replace(self.limits_for(key_id), **overrides)
+        return self._key_limits[key_id]
+
+    def engage_kill_switch(self, reason: str = "manual"):
+        self.kill_switch = {"reason": reason, "since": self.clock.time()}
+        logger.critical(f"🛑 킬 스위치 활성화: 모든 러너의 신규 주문을 거부합니다 (사유: {reason})")
+
+    def release_kill_switch(self):
+        if self.kill_switch is not None:
+            logger.warning(f"킬 스위치 해제 (사유였던 것: {self.kill_switch['reason']})")
+        self.kill_switch = None
+
+    # --- 상태 갱신 ---
+    def mark_price(self, key_id: str, symbol: str, price: Optional[float]):
+        """시세 조회 결과로 최근 가격을 갱신합니다 (시장가 주문 금액 추정용)."""
+        if price:
+            self._prices[(key_id, symbol)] = float(price)
+
+    def on_execution(self, key_id: str, payload: Dict[str, Any]):
+        """원장 체결 payload(record_execution 형식)를 반영합니다."""
+        self.on_fill(
+            key_id, payload["symbol"], payload["side"], payload.get("quantity"), payload.get("price"),
+            fee=payload.get("fee") or 0.0, fee_asset=payload.get("fee_asset"),
+            trade_id=f"{key_id}:{payload.get('exchange_trade_id')}", order_ref=payload.get("local_order_id"),
+        )
+
+    def on_fill(self, key_id: str, symbol: str, side: str, quantity: float, price: float,
+                fee: float = 0.0, fee_asset: Optional[str] = None, trade_id: Optional[str] = None,
+                order_ref: Optional[str] = None):
+        """
+        체결 1건을 포지션/일간 실현 손익과 주문 ref의 미체결 노출에 반영합니다. 같은 Trade ID는 한 번만 반영합니다.
+        추적 포지션을 넘는 매도(추적 이전 보유분)는 원가를 모르므로 포지션 0까지만 손익을 계산합니다.
+        """
+        quantity, price = float(quantity or 0.0), float(price or 0.0)
+        if quantity <= 0:
+            return
+        if trade_id is not None:
+            if trade_id in self._seen_trades:
+                return
+            self._seen_trades[trade_id] = None
+            if len(self._seen_trades) > self.SEEN_TRADES_CAPACITY:
+                self._seen_trades.popitem(last=False)
+        self.mark_price(key_id, symbol, price)
+        self._fill_open_order(order_ref, quantity)
+        pos = self._positions.setdefault((key_id, symbol), _Position())
+
+        realized = 0.0
+        if side.upper() == "BUY":
+            # 매수: 평균 단가 갱신
+            pos.avg_price = (pos.qty * pos.avg_price + quantity * price) / (pos.qty + quantity)
+            pos.qty += quantity
+        else:
+            closed = min(quantity, pos.qty)
+            realized = closed * (price - pos.avg_price)
+            pos.qty -= closed
+            if pos.qty <= 1e-12:
+                pos.qty, pos.avg_price = 0.0, 0.0
+
+        quote = symbol.split("/", 1)[1] if "/" in symbol else "USDT"
+        fee_quote = float(fee or 0.0) if fee_asset == quote else 0.0
+        self._add_pnl(key_id, realized - fee_quote)
+
+    def _day(self) -> str:
+        return datetime.utcfromtimestamp(self.clock.time()).strftime("%Y-%m-%d")
+
+    def _add_pnl(self, key_id: str, pnl: float):
+        day = self._day()
+        if day != self._pnl_day:
+            self._pnl_day, self._daily_pnl = day, {}
+        self._daily_pnl[key_id] = self._daily_pnl.get(key_id, 0.0) + pnl
+
+    def daily_pnl(self, key_id: str) -> float:
+        return self._daily_pnl.get(key_id, 0.0) if self._pnl_day == self._day() else 0.0
+
+    def position(self, key_id: str, symbol: str) -> float:
+        pos = self._positions.get((key_id, symbol))
+        return pos.qty if pos is not None else 0.0
+
+    def open_exposure(self, key_id: str, symbol: str) -> Tuple[float, float]:
+        """(키, 심볼)의 미체결 (매수 잔량, 매도 잔량)."""
+        buys = sells = 0.0
+        for remaining in self._open_orders.get((key_id, symbol), {}).values():
+            if remaining > 0:
+                buys += remaining
+            else:
+                sells -= remaining
+        return buys, sells
+
+    def reserve(self, key_id: str, symbol: str, order_ref: str, side: str, amount: float):
+        """통과한 주문을 체결/취소될 때까지 미체결 노출로 잡습니다."""
+        amount = float(amount or 0.0)
+        if not order_ref or amount <= 0:
+            return
+        self.release(order_ref)
+        self._open_orders.setdefault((key_id, symbol), {})[order_ref] = amount if side.upper() == "BUY" else -amount
+        self._open_order_keys[order_ref] = (key_id, symbol)
+
+    def release(self, order_ref: Optional[str]):
+        """주문이 끝나면(체결 완료/취소/실패) 남은 미체결 노출을 해제합니다."""
+        key = self._open_order_keys.pop(order_ref, None) if order_ref else None
+        if key is None:
+            return
+        orders = self._open_orders.get(key, {})
+        orders.pop(order_ref, None)
+        if not orders:
+            self._open_orders.pop(key, None)
+
+    def _fill_open_order(self, order_ref: Optional[str], quantity: float):
+        key = self._open_order_keys.get(order_ref) if order_ref else None
+        if key is None:
+            return
+        orders = self._open_orders[key]
+        remaining = orders[order_ref]
+        left = abs(remaining) - quantity
+        if left <= 1e-12:
+            self.release(order_ref)
+        else:
+            orders[order_ref] = left if remaining > 0 else -left
+
+    def holding(self, key_id: str, symbol: str) -> float:
+        """키가 보유한 base 수량 (잔고 장부 기준, 장부가 없거나 시딩 전이면 0)."""
+        if self.balance_book is None:
+            return 0.0
+        return self.balance_book.free(key_id, split_symbol(symbol)[0])
+
+    # --- 검사 ---
+    def check(self, key_id: str, symbol: str, side: str, amount: float, price: Optional[float] = None,
+              order_ref: Optional[str] = None) -> RiskDecision:
+        """
+        주문 1건을 검사합니다. 통과하면 주문 속도 카운트에 반영하고, order_ref가 있으면 미체결 노출로 잡습니다
+        (주문이 끝나면 release 또는 체결로 해제).
+        """
+        self._metrics["checks"] += 1
+        decision = self._evaluate(key_id, symbol, side, float(amount or 0.0), price)
+        if decision.allowed:
+            self._order_times.setdefault(key_id, deque()).append(self.clock.time())
+            self.reserve(key_id, symbol, order_ref, side, amount)
+        else:
+            self._metrics["rejections"] += 1
+            by_rule = self._metrics["rejections_by_rule"]
+            by_rule[decision.rule] = by_rule.get(decision.rule, 0) + 1
+            logger.warning(f"리스크 거부 ({key_id} {side} {amount} {symbol}): {decision.rule} - {decision.detail}")
+        return decision
+
+    def _evaluate(self, key_id: str, symbol: str, side: str, amount: float, price: Optional[float]) -> RiskDecision:
+        limits = self.limits_for(key_id)
+        pos = self.position(key_id, symbol)
+        signed = amount if side.upper() == "BUY" else -amount
+        open_buys, open_sells = self.open_exposure(key_id, symbol)
+        # 현물: 보유 수량(이미 걸린 매도 잔량 제외)을 넘지 않는 매도만 청산(포지션 축소)으로 봅니다.
+        held = pos
+        if self.balance_book is not None:
+            held = max(held, self.holding(key_id, symbol))
+        reducing = signed < 0 and amount <= held - open_sells + 1e-12
+
+        if limits.max_orders_per_min is not None:
+            times = self._order_times.setdefault(key_id, deque())
+            cutoff = self.clock.time() - self.RATE_WINDOW_SEC
+            while times and times[0] < cutoff:
+                times.popleft()
+            if len(times) >= limits.max_orders_per_min:
+                return RiskDecision(False, "order_rate", f"{len(times)} orders in last 60s")
+
+        if reducing:
+            return ALLOW
+        if self.kill_switch is not None:
+            return RiskDecision(False, "kill_switch", self.kill_switch["reason"])
+
+        if limits.max_daily_loss is not None and -self.daily_pnl(key_id) >= limits.max_daily_loss:
+            return RiskDecision(False, "daily_loss", f"daily pnl {self.daily_pnl(key_id):.4f}")
+
+        if limits.max_order_notional is None and limits.max_position_notional is None:
+            return ALLOW
+        ref_price = float(price) if price else self._prices.get((key_id, symbol))
+        if ref_price is None:
+            return RiskDecision(False, "no_price", "no reference price for notional limits")
+        notional = amount * ref_price
+        if limits.max_order_notional is not None and notional > limits.max_order_notional:
+            return RiskDecision(False, "order_notional", f"{notional:.4f} > {limits.max_order_notional}")
+        projected = pos + open_buys + signed if signed > 0 else pos - open_sells + signed
+        position_notional = abs(projected) * ref_price
+        if limits.max_position_notional is not None and position_notional > limits.max_position_notional:
+            return RiskDecision(False, "position_notional", f"{position_notional:.4f} > {limits.max_position_notional}")
+        return ALLOW
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self._metrics,
+            "rejections_by_rule": dict(self._metrics["rejections_by_rule"]),
+            "kill_switch": dict(self.kill_switch) if self.kill_switch else None,
+            "limits": self.limits.__dict__.copy(),
+            "positions": sum(1 for p in self._positions.values() if p.qty),
+            "open_orders": len(self._open_order_keys),
+        }
@@ -0,0 +1,449 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("execution-service.strategies.grid_v1")
+
+# 전략 레지스트리가 import 없이 읽는 메타데이터 (리터럴만 사용)
+STRATEGY = {
+    "id": "grid_v1",
+    "class": "GridV1Strategy",
+    "name": "클래식 그리드 (Classic Grid)",
+    "description": "설정된 구간 내에서 일정 간격으로 매수/매도 주문을 배치합니다.",
+    "version": "1.0.0",
+    "schema": {
+        "type": "object",
+        "properties": {
+            "upper_price": {"type": "number", "title": "상단 가격"},
+            "lower_price": {"type": "number", "title": "하단 가격"},
+            "grid_count": {"type": "integer", "minimum": 2, "maximum": 100, "title": "그리드 개수", "default": 10},
+            "allocation_ratio": {"type": "number", "minimum": 0.01, "maximum": 1.0, "default": 0.5, "title": "투자 비율(Quote 기준)"},
+            "quantity_precision": {"type": "integer", "minimum": 0, "maximum": 12, "default": 5, "title": "수량 반올림 자릿수"},
+            "price_precision": {"type": "integer", "minimum": 0, "maximum": 12, "default": 2, "title": "가격 반올림 자릿수"},
+            "sync_interval_sec": {"type": "integer", "minimum": 5, "maximum": 3600, "default": 60, "title": "전체 주문 대사 주기(초)"}
+        },
+        "required": ["upper_price", "lower_price", "grid_count"]
+    }
+}
+
+# 레벨별 주문 방향 / 상태 (int8 배열 값)
+NONE, BUY, SELL = 0, 1, -1
+EMPTY, OPEN = 0, 1
+
+# 레벨 배치를 바꾸는 파라미터 (변경 시 기존 주문을 취소하고 그리드를 다시 배치)
+_LAYOUT_PARAMS = ("upper_price", "lower_price", "grid_count", "price_precision")
+
+# 체결 확인용 주문 조회: 페이지 크기, 틱당 최대 페이지 수, 주문 시각 여유(로컬/거래소 시계 차이)
+_SYNC_PAGE_LIMIT = 500
+_SYNC_MAX_PAGES = 5
+_SYNC_OVERLAP_MS = 60_000
+
+
+@dataclass
+class _Params:
+    upper_price: float
+    lower_price: float
+    grid_count: int = 10
+    allocation_ratio: float = 0.5
+    quantity_precision: int = 5
+    price_precision: int = 2
+    sync_interval_sec: int = 60
+
+
+class GridV1Strategy:
+    """
+    Classic Grid - v1 (현물)
+
+    - [lower_price, upper_price]를 grid_count개 레벨로 나누고, 현재가 아래에는 매수, 위에는 매도 지정가 주문을 건다.
+    - 매수가 체결되면 한 칸 위에 매도, 매도가 체결되면 한 칸 아래에 매수를 다시 건다 (빈 레벨 하나가 현재가를 따라 이동).
+    - 레벨 가격/방향/상태/주문 ID를 레벨 인덱스로 정렬된 배열에 보관한다.
+      가격 갱신마다 직전 가격과 현재 가격 사이에서 교차한 레벨을 이진 탐색으로 찾고, 그 레벨에 걸린 주문이 있을 때만
+      주문 상태를 한 번에 조회한다. 새 주문/취소는 배치 요청 한 번으로 처리한다.
+      -> 틱당 요청: 시세 1회 + (교차 시) 주문 조회 1회 + (필요 시) 배치 주문 1회.
+    """
+
+    STATE_VERSION = 1
+    _CHECKPOINT_FIELDS = ("state", "qty", "inventory", "last_price", "started_at_ms", "last_sync")
+    _CHECKPOINT_ARRAYS = ("levels", "sides", "status", "order_ids", "local_ids", "placed_at")
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.params = self._parse_params(config)
+
+        gs = config.get("global_settings", {})
+        self.symbol = gs.get("symbol", "BTC/USDT")
+        self.key_id = gs.get("exchange") or gs.get("account_id")
+
+        self.state = "INIT"  # INIT | RUNNING | HALTED
+        self._layout()
+        self.qty = 0.0            # 레벨당 주문 수량 (base)
+        self.inventory = 0.0      # 그리드가 보유 중인 base 수량 (정지 시 청산 대상)
+        self.last_price: Optional[float] = None
+        self.started_at_ms: Optional[int] = None
+        self.last_sync = 0.0
+        self._rebuild = False
+        self._retry_at = 0.0
+
+        # BotRunner가 context["clock"]으로 주입하는 시계 (없으면 실제 시간 사용)
+        self.clock = None
+
+    def _layout(self):
+        """레벨 배열을 새로 만듭니다 (모든 레벨 비어 있음)."""
+        p = self.params
+        n = p.grid_count
+        self.levels = np.round(np.linspace(p.lower_price, p.upper_price, n), p.price_precision)
+        self.sides = np.zeros(n, dtype=np.int8)
+        self.status = np.zeros(n, dtype=np.int8)
+        self.order_ids = np.full(n, None, dtype=object)
+        self.local_ids = np.full(n, None, dtype=object)
+        self.placed_at = np.zeros(n, dtype=np.int64)  # 주문 접수 시각 (ms)
+
+    @staticmethod
+    def _parse_params(config: Dict[str, Any]) -> _Params:
+        """봇 설정의 전략 파라미터를 검증/변환합니다. 잘못된 값이면 ValueError."""
+        pipeline = config.get("pipeline", {})
+        strategy_node = pipeline.get("strategy", {}) if isinstance(pipeline, dict) else {}
+        params = strategy_node.get("params", {}) if strategy_node.get("id") == "grid_v1" else {}
+
+        if "upper_price" not in params or "lower_price" not in params:
+            raise ValueError("grid_v1 requires upper_price and lower_price")
+        parsed = _Params(
+            upper_price=float(params["upper_price"]),
+            lower_price=float(params["lower_price"]),
+            grid_count=int(params.get("grid_count", _Params.grid_count)),
+            allocation_ratio=float(params.get("allocation_ratio", _Params.allocation_ratio)),
+            quantity_precision=int(params.get("quantity_precision", _Params.quantity_precision)),
+            price_precision=int(params.get("price_precision", _Params.price_precision)),
+            sync_interval_sec=int(params.get("sync_interval_sec", _Params.sync_interval_sec)),
+        )
+        if not 0 < parsed.lower_price < parsed.upper_price:
+            raise ValueError("grid_v1 requires 0 < lower_price < upper_price")
+        if not 2 <= parsed.grid_count <= 100:
+            raise ValueError("grid_count must be between 2 and 100")
+        return parsed
+
+    def on_config_change(self, config: Dict[str, Any], changed_params: set):
+        """
+        실행 중 파라미터 변경 (BotRunner가 틱 사이에 호출).
+        레벨 배치가 바뀌면 다음 틱에 기존 주문을 일괄 취소하고 그리드를 다시 배치합니다.
+        """
+        self.params = self._parse_params(config)
+        self.config = config
+        if changed_params & set(_LAYOUT_PARAMS):
+            self._rebuild = True
+        logger.info(f"[{self.symbol}] 파라미터 변경 적용: {sorted(changed_params)} (재배치: {self._rebuild})")
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        state = {name: getattr(self, name) for name in self._CHECKPOINT_FIELDS}
+        state.update({name: getattr(self, name).tolist() for name in self._CHECKPOINT_ARRAYS})
+        return state
+
+    def restore_state(self, state: Dict[str, Any]):
+        if len(state.get("levels") or []) != self.params.grid_count:
+            logger.warning(f"[{self.symbol}] 체크포인트의 레벨 수가 달라 복원하지 않습니다.")
+            return
+        for name in self._CHECKPOINT_FIELDS:
+            if name in state:
+                setattr(self, name, state[name])
+        self.levels = np.asarray(state["levels"], dtype=np.float64)
+        self.sides = np.asarray(state["sides"], dtype=np.int8)
+        self.status = np.asarray(state["status"], dtype=np.int8)
+        self.order_ids = np.asarray(state["order_ids"], dtype=object)
+        self.local_ids = np.asarray(state["local_ids"], dtype=object)
+        # placed_at이 없는 이전 체크포인트는 그리드 시작 시각부터 조회
+        placed_at = state.get("placed_at") or [self.started_at_ms or 0] * self.params.grid_count
+        self.placed_at = np.asarray(placed_at, dtype=np.int64)
+        logger.info(f"[{self.symbol}] 체크포인트 복원: state={self.state}, open={int((self.status == OPEN).sum())}")
+
+    def _now(self) -> float:
+        return self.clock.time() if self.clock is not None else time.time()
+
+    def crossed_levels(self, prev_price: float, price: float) -> np.ndarray:
+        """prev_price와 price 사이(양 끝 포함)에 있는 레벨 인덱스. levels는 오름차순이므로 이진 탐색 두 번."""
+        lo, hi = min(prev_price, price), max(prev_price, price)
+        start = int(np.searchsorted(self.levels, lo, side="left"))
+        end = int(np.searchsorted(self.levels, hi, side="right"))
+        return np.arange(start, end)
+
+    async def execute(self, context: Dict[str, Any]):
+        adapter = context["adapter"]
+        self.clock = context.get("clock", self.clock)
+
+        if not self.key_id:
+            logger.error("Missing key_id (global_settings.exchange/account_id). Cannot trade.")
+            return
+        if self.state == "HALTED":
+            return
+
+        features = context.get("features")
+        if features is not None:
+            ticker = await features.ticker(self.symbol)
+        else:
+            ticker = await adapter.get_ticker(self.key_id, self.symbol)
+        if not ticker or "price" not in ticker:
+            logger.warning("Ticker unavailable; skipping tick.")
+            return
+        price = float(ticker["price"])
+        now = self._now()
+
+        if self._rebuild:
+            if not await self._cancel_all(adapter):
+                # 취소가 확인되지 않은 주문(이미 체결 등)은 상태를 조회해 반영합니다.
+                await self._sync_fills(adapter, price, now, force=True)
+            if (self.status == OPEN).any():
+                # 아직 걸려 있는 주문이 있으면 다음 틱에 다시 취소한 뒤 재배치합니다.
+                self.last_price = price
+                return
+            self._layout()
+            self.state, self._rebuild = "INIT", False
+
+        if self.state == "INIT":
+            await self._start_grid(adapter, price, ticker.get("limits") or {}, now)
+        else:
+            await self._sync_fills(adapter, price, now)
+            await self._place_missing(adapter, now)
+
+        self.last_price = price
+
+    async def _start_grid(self, adapter, price: float, limits: Dict[str, Any], now: float):
+        """
+        현재가 기준으로 레벨 방향을 정하고, 매도 레벨용 재고를 시장가로 확보한 뒤 전체 주문을 배치로 겁니다.
+        현재가에 가장 가까운 레벨은 비워 둡니다 (체결 시 반대 주문이 들어갈 자리).
+        """
+        gap = int(np.abs(self.levels - price).argmin())
+        index = np.arange(len(self.levels))
+        self.sides[:] = np.where(index < gap, BUY, np.where(index > gap, SELL, NONE))
+        self.status[:] = EMPTY
+        above = self.sides == SELL
+
+        qty = await self._calc_level_qty(adapter, limits)
+        if qty <= 0:
+            logger.error(f"[{self.symbol}] 그리드 주문 수량이 최소 주문 조건 미만입니다. 그리드를 중지합니다.")
+            self.state = "HALTED"
+            return
+        self.qty = qty
+
+        sell_count = int(above.sum())
+        need_inventory = round(qty * sell_count - self.inventory, self.params.quantity_precision)
+        if need_inventory > 0:
+            order = await adapter.place_order(
+                key_id=self.key_id,
+                symbol=self.symbol,
+                side="buy",
+                amount=need_inventory,
+                reason=f"Grid inventory for {sell_count} sell levels",
+            )
+            if order.get("status") != "filled":
+                logger.error(f"Grid inventory order not filled: {order}")
+                return  # 다음 틱에 다시 시도
+            self.inventory += need_inventory
+
+        self.started_at_ms = int(now * 1000)
+        self.last_sync = now
+        self.state = "RUNNING"
+        logger.info(f"[{self.config.get('name')}] Grid started: {len(self.levels)} levels, qty={qty}, price={price}")
+        await self._place_missing(adapter, now)
+
+    async def _calc_level_qty(self, adapter, limits: Dict[str, Any]) -> float:
+        balance = await adapter.get_balance(self.key_id)
+        _, quote = self._parse_symbol(self.symbol)
+        quote_free = 0.0
+        for a in balance.get("assets") or []:
+            if a.get("asset") == quote:
+                quote_free = float(a.get("free") or 0.0)
+                break
+
+        # 모든 레벨이 자기 가격에 한 번씩 체결된다고 보고 예산을 나눕니다.
+        budget = quote_free * self.params.allocation_ratio
+        qty = float(f"{budget / float(self.levels.sum()):.{self.params.quantity_precision}f}")
+        min_amount, min_notional = limits.get("min_amount"), limits.get("min_notional")
+        if qty <= 0 or (min_amount and qty < float(min_amount)):
+            return 0.0
+        if min_notional and qty * float(self.levels[0]) < float(min_notional):
+            return 0.0
+        return qty
+
+    async def _sync_fills(self, adapter, price: float, now: float, force: bool = False):
+        """
+        교차한 레벨에 걸린 주문이 있거나 대사 주기가 되면(force=True이면 항상) 주문 상태를 한 번에 조회하여
+        체결을 반영합니다.
+        """
+        open_mask = self.status == OPEN
+        if self.last_price is not None:
+            crossed = self.crossed_levels(self.last_price, price)
+            touched = bool(open_mask[crossed].any())
+        else:
+            touched = True
+        if not force and not touched and now - self.last_sync < self.params.sync_interval_sec:
+            return
+        if not open_mask.any():
+            return
+
+        open_idx = np.flatnonzero(open_mask)
+        since_ms = int(self.placed_at[open_idx].min()) - _SYNC_OVERLAP_MS
+        statuses = await self._fetch_order_statuses(adapter, since_ms, {str(self.order_ids[i]) for i in open_idx})
+        if statuses is None:
+            return
+        self.last_sync = now
+
+        filled: List[int] = []
+        for i in np.flatnonzero(open_mask):
+            status = statuses.get(str(self.order_ids[i]))
+            if status == "closed":
+                filled.append(int(i))
+            elif status in ("canceled", "expired", "rejected"):
+                # 외부에서 취소된 주문은 같은 방향으로 다시 겁니다.
+                self.status[i], self.order_ids[i], self.local_ids[i] = EMPTY, None, None
+        self._apply_fills(filled)
+
+    async def _fetch_order_statuses(self, adapter, since_ms: int, wanted: set) -> Optional[Dict[str, str]]:
+        """
+        가장 오래된 미체결 레벨의 주문 시각부터 주문 목록만(체결 내역 제외) 페이지 단위로 조회합니다.
+        추적 중인 주문을 모두 찾으면 멈춥니다. 조회 실패 시 None.
+        """
+        statuses: Dict[str, str] = {}
+        cursor = since_ms
+        for _ in range(_SYNC_MAX_PAGES):
+            page = await adapter.get_account_orders(
+                self.key_id, self.symbol, since=cursor, limit=_SYNC_PAGE_LIMIT, include_trades=False
+            )
+            if page is None:
+                return None
+            for o in page.get("orders") or []:
+                statuses[str(o.get("id"))] = o.get("status")
+            next_since = page.get("next_since")
+            if next_since is None or wanted <= statuses.keys():
+                break
+            # 같은 시각의 주문만으로 페이지가 가득 찼다면 1ms 전진
+            cursor = next_since if next_since > cursor else cursor + 1
+        return statuses
+
+    def _apply_fills(self, filled: List[int]):
+        """체결된 레벨을 비우고 인접 레벨에 반대 방향 주문을 예약합니다."""
+        n = len(self.levels)
+        sides = {i: int(self.sides[i]) for i in filled}
+        # 한 번에 여러 레벨이 체결되면 인접 레벨끼리 자리를 주고받으므로 먼저 모두 비운 뒤 반대 주문을 예약합니다.
+        for i in filled:
+            self.status[i], self.sides[i] = EMPTY, NONE
+            self.order_ids[i], self.local_ids[i] = None, None
+        for i, side in sides.items():
+            if side == BUY:
+                self.inventory += self.qty
+                target, counter = i + 1, SELL
+            else:
+                self.inventory = max(self.inventory - self.qty, 0.0)
+                target, counter = i - 1, BUY
+            if 0 <= target < n and self.status[target] == EMPTY:
+                self.sides[target] = counter
+            logger.info(f"[{self.symbol}] Grid level {i} {'BUY' if side == BUY else 'SELL'} filled @ {self.levels[i]}")
+
+    async def _place_missing(self, adapter, now: float):
+        """방향이 정해졌지만 주문이 없는 레벨을 배치 요청 한 번으로 겁니다."""
+        pending = np.flatnonzero((self.status == EMPTY) & (self.sides != NONE))
+        if len(pending) == 0 or now < self._retry_at:
+            return
+
+        orders = [
+            {
+                "side": "buy" if self.sides[i] == BUY else "sell",
+                "amount": self.qty,
+                "price": float(self.levels[i]),
+                "order_type": "limit",
+                "reason": f"Grid level {int(i)}",
+            }
+            for i in pending
+        ]
+        results = await adapter.place_orders(self.key_id, self.symbol, orders, reason="Grid rebalance")
+
+        filled, failed = [], 0
+        for i, result in zip(pending, results):
+            status = result.get("status")
+            order_id = result.get("order_id") or result.get("id")
+            if status == "filled":
+                self.status[i] = OPEN
+                filled.append(int(i))
+            elif status in ("failed", "error") or not order_id:
+                failed += 1
+            else:
+                self.status[i] = OPEN
+                self.order_ids[i] = str(order_id)
+                self.local_ids[i] = result.get("local_order_id")
+                self.placed_at[i] = int(now * 1000)
+        if failed:
+            logger.warning(f"[{self.symbol}] Grid orders failed: {failed}/{len(pending)}. Retrying later.")
+            self._retry_at = now + 30.0
+        self._apply_fills(filled)
+
+    async def _cancel_all(self, adapter) -> bool:
+        """
+        걸린 주문을 일괄 취소합니다. 취소가 확인된(canceled) 레벨만 비우고, 나머지(not_found = 이미 체결/취소,
+        failed)는 OPEN으로 남겨 주문 조회로 확인합니다. 모든 레벨이 비었으면 True.
+        """
+        open_idx = np.flatnonzero(self.status == OPEN)
+        if len(open_idx) == 0:
+            return True
+        results = await adapter.cancel_orders(
+            self.key_id, self.symbol, [(self.order_ids[i], self.local_ids[i]) for i in open_idx]
+        )
+        canceled = {str(r.get("order_id")) for r in results or [] if r.get("status") == "canceled"}
+        done = np.array([str(self.order_ids[i]) in canceled for i in open_idx], dtype=bool)
+        self.status[open_idx[done]] = EMPTY
+        self.order_ids[open_idx[done]] = None
+        self.local_ids[open_idx[done]] = None
+        remaining = len(open_idx) - int(done.sum())
+        if remaining:
+            logger.warning(f"[{self.symbol}] Grid cancel unconfirmed: {remaining}/{len(open_idx)} orders.")
+        return remaining == 0
+
+    async def on_stop(self, context: Dict[str, Any]):
+        """
+        걸려 있는 그리드 주문을 일괄 취소하고, 그리드가 보유한 base 재고를 시장가로 청산합니다 (Zero Position Policy).
+        """
+        adapter = context["adapter"]
+        self.clock = context.get("clock", self.clock)
+        logger.info(f"[{self.config.get('name')}] Stopping grid... cancelling open orders.")
+
+        try:
+            if not await self._cancel_all(adapter):
+                # 취소 전에 체결된 주문을 재고에 반영해야 청산 수량이 맞습니다.
+                await self._sync_fills(adapter, self.last_price or 0.0, self._now(), force=True)
+        except Exception as e:
+            logger.error(f"Error while cancelling grid orders: {e}")
+
+        if self.inventory > 0:
+            try:
+                base, _ = self._parse_symbol(self.symbol)
+                balance = await adapter.get_balance(self.key_id, fresh=True)
+                actual = 0.0
+                for asset in balance.get("assets", []):
+                    if asset["asset"] == base:
+                        actual = float(asset["free"])
+                        break
+                sell_qty = float(f"{min(actual, self.inventory):.{self.params.quantity_precision}f}")
+                if sell_qty > 0:
+                    order = await adapter.place_order(
+                        key_id=self.key_id,
+                        symbol=self.symbol,
+                        side="sell",
+                        amount=sell_qty,
+                        reason="Forced Stop Liquidation (Grid Inventory)",
+                    )
+                    if order.get("status") == "filled":
+                        self.inventory = 0.0
+                    else:
+                        logger.error(f"Grid inventory liquidation failed: {order}")
+            except Exception as e:
+                logger.error(f"Error during grid inventory liquidation: {e}")
+
+        self.state = "INIT"
+        self.sides[:] = NONE
+
+    @staticmethod
+    def _parse_symbol(symbol: str) -> Tuple[str, str]:
+        if "/" in symbol:
+            base, quote = symbol.split("/", 1)
+            return base, quote
+        return symbol, "USDT"
@@ -0,0 +1,328 @@
+"""
+전략 공용 스트리밍 지표 (EMA, Wilder RSI, Bollinger, ATR, VWAP, Rolling Z-Score).
+
+- update()는 O(1)이며, 값이 준비되기 전(워밍업 중)에는 None을 반환합니다.
+- warm_up()은 과거 데이터 배열을 NumPy로 한 번에 처리하여 마지막 상태만 만듭니다.
+  이후의 update()는 같은 데이터를 하나씩 update()한 결과와 동일합니다.
+- 상태는 스칼라 몇 개 또는 고정 크기 float64 링 버퍼뿐이라 봇 수백 개가 각자 들고 있어도 가볍습니다.
+"""
+import math
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+
+def _ewm_last(values: np.ndarray, alpha: float, seed: float) -> float:
+    """
+    seed에서 시작하여 values를 차례로 x_t = a*v + (1-a)*x_{t-1}로 반영한 마지막 값.
+    재귀를 가중합 하나로 풀어 계산합니다 (오래된 항의 가중치는 0으로 언더플로).
+    """
+    n = len(values)
+    if n == 0:
+        return seed
+    decay = 1.0 - alpha
+    weights = alpha * decay ** np.arange(n - 1, -1, -1, dtype=np.float64)
+    return float(decay ** n * seed + np.dot(weights, values))
+
+
+class EMA:
+    """지수 이동 평균. period를 주면 alpha = 2 / (period + 1). 첫 값으로 시작합니다."""
+
+    def __init__(self, period: Optional[int] = None, alpha: Optional[float] = None):
+        if alpha is None:
+            if not period or period < 1:
+                raise ValueError("EMA requires period >= 1 or alpha")
+            alpha = 2.0 / (period + 1)
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("EMA alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.value: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.value is not None
+
+    def update(self, x: float) -> float:
+        if self.value is None:
+            self.value = float(x)
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+    def warm_up(self, values: Sequence[float]) -> Optional[float]:
+        arr = np.asarray(values, dtype=np.float64)
+        if arr.size == 0:
+            return self.value
+        if self.value is None:
+            self.value, arr = float(arr[0]), arr[1:]
+        self.value = _ewm_last(arr, self.alpha, self.value)
+        return self.value
+
+
+class _WilderAverage:
+    """Wilder 평활 (alpha = 1/period). 첫 period개는 단순 평균으로 시작합니다."""
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("period must be >= 1")
+        self.period = period
+        self.value: Optional[float] = None
+        self._seed_sum = 0.0
+        self._seed_count = 0
+
+    def update(self, x: float) -> Optional[float]:
+        if self.value is not None:
+            self.value += (x - self.value) / self.period
+        else:
+            self._seed_sum += x
+            self._seed_count += 1
+            if self._seed_count == self.period:
+                self.value = self._seed_sum / self.period
+        return self.value
+
+    def warm_up(self, arr: np.ndarray):
+        if self.value is None:
+            need = self.period - self._seed_count
+            head, arr = arr[:need], arr[need:]
+            self._seed_sum += float(head.sum())
+            self._seed_count += len(head)
+            if self._seed_count < self.period:
+                return
+            self.value = self._seed_sum / self.period
+        self.value = _ewm_last(arr, 1.0 / self.period, self.value)
+
+
+class RSI:
+    """Wilder RSI (0~100). period+1개의 가격이 들어오면 값이 준비됩니다."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._gain = _WilderAverage(period)
+        self._loss = _WilderAverage(period)
+        self._prev: Optional[float] = None
+        self.value: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.value is not None
+
+    def _compute(self) -> Optional[float]:
+        gain, loss = self._gain.value, self._loss.value
+        if gain is None:
+            return None
+        if loss == 0.0:
+            return 100.0 if gain > 0.0 else 50.0
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+    def update(self, price: float) -> Optional[float]:
+        if self._prev is not None:
+            change = price - self._prev
+            self._gain.update(change if change > 0 else 0.0)
+            self._loss.update(-change if change < 0 else 0.0)
+            self.value = self._compute()
+        self._prev = float(price)
+        return self.value
+
+    def warm_up(self, prices: Sequence[float]) -> Optional[float]:
+        arr = np.asarray(prices, dtype=np.float64)
+        if arr.size == 0:
+            return self.value
+        if self._prev is not None:
+            arr = np.concatenate(([self._prev], arr))
+        changes = np.diff(arr)
+        self._gain.warm_up(np.clip(changes, 0.0, None))
+        self._loss.warm_up(np.clip(-changes, 0.0, None))
+        self._prev = float(arr[-1])
+        self.value = self._compute()
+        return self.value
+
+
+class _RollingWindow:
+    """고정 크기 링 버퍼 + 합/제곱합 (평균/표준편차 O(1)). 부동소수 누적 오차는 한 바퀴마다 재계산으로 제거합니다."""
+
+    def __init__(self, size: int):
+        if size < 2:
+            raise ValueError("window size must be >= 2")
+        self.size = size
+        self.buf = np.zeros(size, dtype=np.float64)
+        self.count = 0
+        self.pos = 0
+        self.sum = 0.0
+        self.sumsq = 0.0
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+    def push(self, x: float):
+        x = float(x)
+        old = self.buf[self.pos]
+        self.buf[self.pos] = x
+        self.pos = (self.pos + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+            self.sum += x
+            self.sumsq += x * x
+        elif self.pos == 0:
+            self.sum = float(self.buf.sum())
+            self.sumsq = float(np.dot(self.buf, self.buf))
+        else:
+            self.sum += x - old
+            self.sumsq += x * x - old * old
+
+    def extend(self, arr: np.ndarray):
+        tail = np.concatenate((self.values(), arr))[-self.size:]
+        self.count = len(tail)
+        self.buf[:self.count] = tail
+        self.pos = self.count % self.size
+        self.sum = float(tail.sum())
+        self.sumsq = float(np.dot(tail, tail))
+
+    def values(self) -> np.ndarray:
+        """오래된 것부터 정렬된 창의 값."""
+        if self.count < self.size:
+            return self.buf[:self.count].copy()
+        return np.roll(self.buf, -self.pos)
+
+    def mean_std(self):
+        mean = self.sum / self.count
+        var = max(self.sumsq / self.count - mean * mean, 0.0)
+        return mean, math.sqrt(var)
+
+
+class Bands(NamedTuple):
+    middle: float
+    upper: float
+    lower: float
+
+    @property
+    def width(self) -> float:
+        return (self.upper - self.lower) / self.middle if self.middle else 0.0
+
+
+class Bollinger:
+    """볼린저 밴드 (단순 이동 평균 ± k * 모표준편차). 창이 다 차면 값이 준비됩니다."""
+
+    def __init__(self, period: int = 20, k: float = 2.0):
+        self.k = k
+        self._window = _RollingWindow(period)
+        self.value: Optional[Bands] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.value is not None
+
+    def _compute(self) -> Optional[Bands]:
+        if not self._window.full:
+            return None
+        mean, std = self._window.mean_std()
+        return Bands(mean, mean + self.k * std, mean - self.k * std)
+
+    def update(self, price: float) -> Optional[Bands]:
+        self._window.push(price)
+        self.value = self._compute()
+        return self.value
+
+    def warm_up(self, prices: Sequence[float]) -> Optional[Bands]:
+        self._window.extend(np.asarray(prices, dtype=np.float64))
+        self.value = self._compute()
+        return self.value
+
+
+class RollingZScore:
+    """최근 period개 대비 현재 값의 z-score. 표준편차가 0이면 0."""
+
+    def __init__(self, period: int):
+        self._window = _RollingWindow(period)
+        self.value: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.value is not None
+
+    def _compute(self, x: float) -> Optional[float]:
+        if not self._window.full:
+            return None
+        mean, std = self._window.mean_std()
+        return (x - mean) / std if std > 0.0 else 0.0
+
+    def update(self, x: float) -> Optional[float]:
+        self._window.push(x)
+        self.value = self._compute(float(x))
+        return self.value
+
+    def warm_up(self, values: Sequence[float]) -> Optional[float]:
+        arr = np.asarray(values, dtype=np.float64)
+        if arr.size == 0:
+            return self.value
+        self._window.extend(arr)
+        self.value = self._compute(float(arr[-1]))
+        return self.value
+
+
+class ATR:
+    """Wilder ATR. True Range = max(고-저, |고-직전 종가|, |저-직전 종가|), 첫 봉은 고-저."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._avg = _WilderAverage(period)
+        self._prev_close: Optional[float] = None
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._avg.value
+
+    @property
+    def ready(self) -> bool:
+        return self._avg.value is not None
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        tr = high - low
+        if self._prev_close is not None:
+            tr = max(tr, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = float(close)
+        return self._avg.update(tr)
+
+    def warm_up(self, highs: Sequence[float], lows: Sequence[float], closes: Sequence[float]) -> Optional[float]:
+        h = np.asarray(highs, dtype=np.float64)
+        lo = np.asarray(lows, dtype=np.float64)
+        c = np.asarray(closes, dtype=np.float64)
+        if h.size == 0:
+            return self.value
+        prev = np.concatenate(([np.nan if self._prev_close is None else self._prev_close], c[:-1]))
+        tr = np.fmax(h - lo, np.fmax(np.abs(h - prev), np.abs(lo - prev)))  # fmax: 첫 봉의 NaN 무시
+        self._avg.warm_up(tr)
+        self._prev_close = float(c[-1])
+        return self.value
+
+
+class VWAP:
+    """거래량 가중 평균 가격 (누적). 세션/일 경계에서 reset()합니다."""
+
+    def __init__(self):
+        self.pv = 0.0
+        self.volume = 0.0
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.pv / self.volume if self.volume > 0.0 else None
+
+    @property
+    def ready(self) -> bool:
+        return self.volume > 0.0
+
+    def reset(self):
+        self.pv = 0.0
+        self.volume = 0.0
+
+    def update(self, price: float, volume: float) -> Optional[float]:
+        self.pv += price * volume
+        self.volume += volume
+        return self.value
+
+    def warm_up(self, prices: Sequence[float], volumes: Sequence[float]) -> Optional[float]:
+        p = np.asarray(prices, dtype=np.float64)
+        v = np.asarray(volumes, dtype=np.float64)
+        self.pv += float(np.dot(p, v))
+        self.volume += float(v.sum())
+        return self.value
@@ -1,15 +1,59 @@
 import logging
 import time
 import asyncio
+from collections import deque
 from dataclasses import dataclass
 from typing import Any, Dict, Optional, Tuple
 
+from .indicators import EMA
+from .trade_cursor import trades_cursor_after
+
 logger = logging.getLogger("execution-service.strategies.orderflow_exhaustion_v1")
 
+# 전략 레지스트리가 import 없이 읽는 메타데이터 (리터럴만 사용)
+STRATEGY = {
+    "id": "orderflow_exhaustion_v1",
+    "class": "OrderflowExhaustionV1Strategy",
+    "name": "오더플로우 고갈 역추세 (Orderflow Exhaustion Fade)",
+    "description": "탐욕/공포성 시장가 주문(체결 불균형) 이후, 더 못 가는 '흡수/고갈'이 확인되면 반대 방향으로 진입합니다. (현물 기반: SELL은 보유 base 자산 일부 매도 후 되돌림에서 재매수)",
+    "version": "1.0.0",
+    "schema": {
+        "type": "object",
+        "properties": {
+            "depth_limit": {"type": "integer", "minimum": 5, "maximum": 200, "default": 50, "title": "오더북 Depth Limit"},
+            "depth_mode": {"type": "string", "enum": ["top", "full"], "default": "top", "title": "오더북 조회 모드 (top=최우선 호가만)"},
+            "trades_limit": {"type": "integer", "minimum": 20, "maximum": 1000, "default": 200, "title": "최근 체결 조회 개수"},
+            "trades_lookback_sec": {"type": "integer", "minimum": 3, "maximum": 60, "default": 10, "title": "체결 집계 구간(초)"},
+
+            "delta_ratio_threshold": {"type": "number", "minimum": 1.2, "maximum": 10.0, "default": 2.5, "title": "체결 불균형 비율 임계값"},
+            "min_total_quote_volume": {"type": "number", "minimum": 0, "default": 50.0, "title": "최소 체결대금(Quote)"},
+
+            "spread_expand_ratio_threshold": {"type": "number", "minimum": 1.0, "maximum": 10.0, "default": 1.5, "title": "스프레드 확장 비율 임계값"},
+            "sweep_move_pct_threshold": {"type": "number", "minimum": 0.0, "maximum": 0.05, "default": 0.001, "title": "미드 가격 급변(%) 임계값"},
+            "confirm_absorption_ticks": {"type": "integer", "minimum": 1, "maximum": 10, "default": 2, "title": "흡수 확인 틱 수"},
+
+            "buy_allocation_ratio": {"type": "number", "minimum": 0.01, "maximum": 1.0, "default": 0.1, "title": "BUY 할당 비율(Quote 기준)"},
+            "sell_allocation_ratio": {"type": "number", "minimum": 0.01, "maximum": 1.0, "default": 0.1, "title": "SELL 할당 비율(Base 기준)"},
+            "quantity_precision": {"type": "integer", "minimum": 0, "maximum": 12, "default": 5, "title": "수량 반올림 자릿수"},
+
+            "take_profit_pct": {"type": "number", "minimum": 0.0, "maximum": 0.1, "default": 0.003, "title": "익절(%)"},
+            "stop_loss_pct": {"type": "number", "minimum": 0.0, "maximum": 0.1, "default": 0.004, "title": "손절(%)"},
+            "stop_buffer_pct": {"type": "number", "minimum": 0.0, "maximum": 0.05, "default": 0.001, "title": "스윕 고/저점 버퍼(%)"},
+            "time_stop_sec": {"type": "integer", "minimum": 10, "maximum": 3600, "default": 180, "title": "시간 청산(초)"},
+            "cooldown_sec": {"type": "integer", "minimum": 0, "maximum": 3600, "default": 120, "title": "쿨다운(초)"},
+
+            "spread_ema_alpha": {"type": "number", "minimum": 0.01, "maximum": 1.0, "default": 0.2, "title": "스프레드 EMA 알파"},
+            "spread_normalized_max_ratio": {"type": "number", "minimum": 1.0, "maximum": 5.0, "default": 1.2, "title": "스프레드 정상화 최대비율"}
+        },
+        "required": []
+    }
+}
+
 
 @dataclass
 class _Params:
     depth_limit: int = 50
+    depth_mode: str = "top"  # top: 최우선 호가만 (book-ticker) | full: depth_limit 레벨
     trades_limit: int = 200
     trades_lookback_sec: int = 10
 
@@ -43,15 +87,61 @@ class OrderflowExhaustionV1Strategy:
     - 현물(spot) 기반이므로, SELL 진입은 '보유한 base 자산을 일부 매도'하는 inventory-based 페이드로 동작한다.
     """
 
+    # 체크포인트로 저장/복원하는 상태 필드. 구성이 바뀌면 STATE_VERSION을 올려 이전 체크포인트를 무시합니다.
+    # (체결 lookback 윈도우/커서는 시장 데이터이므로 재시작 후 다시 채웁니다.)
+    STATE_VERSION = 1
+    _CHECKPOINT_FIELDS = (
+        "state", "cooldown_until", "last_mid", "spread_ema",
+        "last_signal_side", "absorption_count", "sweep_high", "sweep_low",
+        "position_side", "position_qty", "entry_price", "entry_time", "stop_price",
+    )
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
 
+        self.params = self._parse_params(config)
+
+        gs = config.get("global_settings", {})
+        self.symbol = gs.get("symbol", "BTC/USDT")
+        self.key_id = gs.get("exchange") or gs.get("account_id")
+
+        self.state = "FLAT"  # FLAT | WAIT_CONFIRM | IN_POSITION | COOLDOWN
+        self.cooldown_until = 0.0
+
+        self.last_mid: Optional[float] = None
+        self._spread_ema = EMA(alpha=self.params.spread_ema_alpha)
+
+        self.last_signal_side: Optional[str] = None  # BUY_PRESSURE | SELL_PRESSURE
+        self.absorption_count = 0
+        self.sweep_high: Optional[float] = None
+        self.sweep_low: Optional[float] = None
+
+        # since 커서로 받은 새 체결을 누적하는 lookback 윈도우
+        self._trade_window: deque = deque()
+        self._trades_cursor: Optional[str] = None
+        self._trades_fetched_at: float = 0.0
+
+        self.position_side: Optional[str] = None  # BUY or SELL (spot inventory sell)
+        self.position_qty: float = 0.0
+        self.entry_price: Optional[float] = None
+        self.entry_time: float = 0.0
+        self.stop_price: Optional[float] = None
+
+        # BotRunner가 context["clock"]으로 주입하는 시계 (없으면 실제 시간 사용)
+        self.clock = None
+        # context["orderflow_fleet"]이 있으면 신호 평가를 봇 전체 배치 평가기에 맡깁니다.
+        self._fleet = None
+
+    @staticmethod
+    def _parse_params(config: Dict[str, Any]) -> _Params:
+        """봇 설정의 전략 파라미터를 검증/변환합니다. 잘못된 값이면 ValueError."""
         pipeline = config.get("pipeline", {})
         strategy_node = pipeline.get("strategy", {}) if isinstance(pipeline, dict) else {}
         params = strategy_node.get("params", {}) if strategy_node.get("id") == "orderflow_exhaustion_v1" else {}
 
-        self.params = _Params(
+        return _Params(
             depth_limit=int(params.get("depth_limit", _Params.depth_limit)),
+            depth_mode=str(params.get("depth_mode", _Params.depth_mode)),
             trades_limit=int(params.get("trades_limit", _Params.trades_limit)),
             trades_lookback_sec=int(params.get("trades_lookback_sec", _Params.trades_lookback_sec)),
             delta_ratio_threshold=float(params.get("delta_ratio_threshold", _Params.delta_ratio_threshold)),
@@ -73,82 +163,98 @@ class OrderflowExhaustionV1Strategy:
             spread_normalized_max_ratio=float(params.get("spread_normalized_max_ratio", _Params.spread_normalized_max_ratio)),
         )
 
-        gs = config.get("global_settings", {})
-        self.symbol = gs.get("symbol", "BTC/USDT")
-        self.key_id = gs.get("exchange") or gs.get("account_id")
-
-        self.state = "FLAT"  # FLAT | WAIT_CONFIRM | IN_POSITION | COOLDOWN
-        self.cooldown_until = 0.0
-
-        self.last_mid: Optional[float] = None
-        self.spread_ema: Optional[float] = None
-
-        self.last_signal_side: Optional[str] = None  # BUY_PRESSURE | SELL_PRESSURE
-        self.absorption_count = 0
-        self.sweep_high: Optional[float] = None
-        self.sweep_low: Optional[float] = None
-
-        self.position_side: Optional[str] = None  # BUY or SELL (spot inventory sell)
-        self.position_qty: float = 0.0
-        self.entry_price: Optional[float] = None
-        self.entry_time: float = 0.0
-        self.stop_price: Optional[float] = None
+    def on_config_change(self, config: Dict[str, Any], changed_params: set):
+        """
+        실행 중 파라미터 변경 (BotRunner가 틱 사이에 호출). 포지션/신호 상태는 유지하고
+        다음 틱부터 새 임계값/할당 비율/청산 조건을 사용합니다.
+        """
+        self.params = self._parse_params(config)
+        self._spread_ema.alpha = self.params.spread_ema_alpha
+        self.config = config
+        if self._fleet is not None:
+            self._fleet.sync(self)
+        logger.info(f"[{self.symbol}] 파라미터 변경 적용: {sorted(changed_params)}")
+
+    @property
+    def spread_ema(self) -> Optional[float]:
+        return self._spread_ema.value
+
+    @spread_ema.setter
+    def spread_ema(self, value: Optional[float]):
+        self._spread_ema.value = value
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self._CHECKPOINT_FIELDS}
+
+    def restore_state(self, state: Dict[str, Any]):
+        for name in self._CHECKPOINT_FIELDS:
+            if name in state:
+                setattr(self, name, state[name])
+        if self._fleet is not None:
+            self._fleet.sync(self)
+        logger.info(f"[{self.symbol}] 체크포인트 복원: state={self.state}, position={self.position_side} {self.position_qty}")
+
+    def _now(self) -> float:
+        return self.clock.time() if self.clock is not None else time.time()
+
+    async def _sleep(self, seconds: float):
+        if self.clock is not None:
+            await self.clock.sleep(seconds)
+        else:
+            await asyncio.sleep(seconds)
 
     async def execute(self, context: Dict[str, Any]):
         adapter = context["adapter"]
+        self.clock = context.get("clock", self.clock)
 
         if not self.key_id:
             logger.error("Missing key_id (global_settings.exchange/account_id). Cannot trade.")
             return
 
-        now = time.time()
+        now = self._now()
+
+        fleet = context.get("orderflow_fleet")
+        if fleet is not None:
+            self._fleet = fleet
+            if self.state != "IN_POSITION":
+                await self._execute_in_fleet(fleet, adapter, now)
+                return
 
         if self.state == "COOLDOWN":
             if now < self.cooldown_until:
                 return
             self.state = "FLAT"
 
-        ticker = await adapter.get_ticker(self.key_id, self.symbol)
-        if not ticker or "price" not in ticker:
-            logger.warning("Ticker unavailable; skipping tick.")
+        features = context.get("features")
+        if features is not None:
+            market = await self._read_features(features)
+        else:
+            market = await self._read_snapshot(adapter, now)
+        if market is None:
             return
+        ticker, book = market
 
         price = float(ticker["price"])
         limits = ticker.get("limits") or {}
 
         if self.state == "IN_POSITION":
             await self._manage_position(adapter, price, now)
+            if fleet is not None and self.state != "IN_POSITION":
+                fleet.sync(self)
             return
 
-        depth = await adapter.get_depth(self.key_id, self.symbol, self.params.depth_limit)
-        trades_resp = await adapter.get_trades(self.key_id, self.symbol, self.params.trades_limit)
-        if not depth or not trades_resp:
-            logger.warning("Depth/Trades unavailable; skipping tick.")
-            return
-
-        best_bid, best_ask = depth.get("best_bid"), depth.get("best_ask")
-        if best_bid is None or best_ask is None:
-            logger.warning("Depth missing best_bid/best_ask; skipping tick.")
+        if book is None:
             return
-
-        best_bid = float(best_bid)
-        best_ask = float(best_ask)
+        best_bid, best_ask, buy_q, sell_q = book
         mid = (best_bid + best_ask) / 2.0
         spread = best_ask - best_bid
 
-        if self.spread_ema is None:
-            self.spread_ema = spread
-        else:
-            a = self.params.spread_ema_alpha
-            self.spread_ema = (a * spread) + ((1 - a) * self.spread_ema)
-
         spread_expand_ratio = spread / self.spread_ema if self.spread_ema and self.spread_ema > 0 else 1.0
 
         sweep_move_pct = 0.0
         if self.last_mid is not None and self.last_mid > 0:
             sweep_move_pct = abs(mid / self.last_mid - 1.0)
 
-        buy_q, sell_q = self._calc_trade_pressure(trades_resp, now)
         total_q = buy_q + sell_q
         if total_q < self.params.min_total_quote_volume:
             self.last_mid = mid
@@ -219,6 +325,103 @@ class OrderflowExhaustionV1Strategy:
 
         self.last_mid = mid
 
+    async def _read_snapshot(self, adapter, now: float) -> Optional[Tuple[Dict[str, Any], Optional[Tuple[float, ...]]]]:
+        """(ticker, (best_bid, best_ask, buy_q, sell_q)) 조회. 포지션 보유 중에는 ticker만 받습니다."""
+        # ticker/depth/trades를 한 번의 왕복(snapshot)으로 조회합니다.
+        # 포지션 보유 중에는 가격만 필요하므로 ticker만 요청합니다.
+        components = ["ticker"] if self.state == "IN_POSITION" else ["ticker", "depth", "trades"]
+
+        # 커서가 lookback보다 오래되면(포지션 보유 중 체결을 받지 않은 경우) 최신 체결부터 다시 받습니다.
+        if self._trades_cursor and now - self._trades_fetched_at > self.params.trades_lookback_sec:
+            self._trades_cursor = None
+            self._trade_window.clear()
+
+        snapshot = await adapter.get_snapshot(
+            self.key_id,
+            [self.symbol],
+            components,
+            depth_limit=self.params.depth_limit,
+            trades_limit=self.params.trades_limit,
+            depth_mode=self.params.depth_mode,
+            trades_since=self._trades_cursor,
+        )
+        market = ((snapshot or {}).get("symbols") or {}).get(self.symbol) or {}
+
+        ticker = market.get("ticker")
+        if not ticker or "price" not in ticker:
+            logger.warning("Ticker unavailable; skipping tick.")
+            return None
+        if self.state == "IN_POSITION":
+            return ticker, None
+
+        depth = market.get("depth")
+        trades_resp = market.get("trades")
+        if not depth or not trades_resp:
+            logger.warning("Depth/Trades unavailable; skipping tick.")
+            return ticker, None
+
+        trades_resp = self._merge_trades(trades_resp, now)
+
+        best_bid, best_ask = depth.get("best_bid"), depth.get("best_ask")
+        if best_bid is None or best_ask is None:
+            logger.warning("Depth missing best_bid/best_ask; skipping tick.")
+            return ticker, None
+
+        best_bid = float(best_bid)
+        best_ask = float(best_ask)
+        self._spread_ema.update(best_ask - best_bid)
+        buy_q, sell_q = self._calc_trade_pressure(trades_resp, now)
+        return ticker, (best_bid, best_ask, buy_q, sell_q)
+
+    async def _read_features(self, features) -> Optional[Tuple[Dict[str, Any], Optional[Tuple[float, ...]]]]:
+        """공유 피처 저장소에서 같은 값을 읽습니다. 같은 심볼의 다른 봇과 조회/계산을 공유합니다."""
+        update = await features.refresh(self.symbol)
+        if update is None:
+            logger.warning("Market features unavailable; skipping tick.")
+            return None
+        if self.state == "IN_POSITION":
+            return update.ticker, None
+        # 스프레드 EMA는 저장소가 업데이트마다 갱신하며, 체크포인트를 위해 봇에도 값을 옮겨 둡니다.
+        self.spread_ema = features.get(self.symbol, "spread_ema", alpha=self.params.spread_ema_alpha)
+        lookback = self.params.trades_lookback_sec
+        return update.ticker, (
+            update.best_bid,
+            update.best_ask,
+            features.get(self.symbol, "buy_quote", lookback_sec=lookback),
+            features.get(self.symbol, "sell_quote", lookback_sec=lookback),
+        )
+
+    async def _execute_in_fleet(self, fleet, adapter, now: float):
+        """배치 평가기가 계산한 신호 상태를 받아오고, 진입 액션이 나온 경우에만 주문합니다."""
+        entry = await fleet.evaluate(self, adapter, now)
+        if entry is None:
+            return
+        reason = (
+            "Greed: orderflow exhaustion (buy pressure absorbed)" if entry.side == "SELL"
+            else "Fear: orderflow exhaustion (sell pressure absorbed)"
+        )
+        await self._enter_contrarian(
+            adapter=adapter, entry_side=entry.side, price=entry.price, now=now, limits=entry.limits, reason=reason,
+        )
+        fleet.sync(self)
+
+    def _merge_trades(self, trades_resp: Dict[str, Any], now_sec: float) -> Dict[str, Any]:
+        """since 커서로 받은 새 체결을 윈도우에 누적하고 lookback 밖의 체결을 버립니다."""
+        trades = trades_resp.get("trades") or []
+        next_cursor = trades_resp.get("next_cursor")
+        if next_cursor is None or self._trades_cursor is None:
+            # 커서 없이 받은 응답(최신 체결 목록)이나 커서를 지원하지 않는 응답은 전체 목록으로 간주합니다.
+            self._trade_window.clear()
+        self._trade_window.extend(trades)
+        self._trades_fetched_at = now_sec
+
+        cutoff_ms = int((now_sec - self.params.trades_lookback_sec) * 1000)
+        self._trades_cursor = trades_cursor_after(trades, next_cursor, self.params.trades_limit, cutoff_ms)
+        while self._trade_window and (self._trade_window[0].get("timestamp") or 0) < cutoff_ms:
+            self._trade_window.popleft()
+
+        return {"trades": list(self._trade_window)}
+
     def _calc_trade_pressure(self, trades_resp: Dict[str, Any], now_sec: float) -> Tuple[float, float]:
         trades = trades_resp.get("trades") or []
         cutoff_ms = int((now_sec - self.params.trades_lookback_sec) * 1000)
@@ -376,7 +579,7 @@ class OrderflowExhaustionV1Strategy:
             logger.error(f"Exit order not filled: {order}")
             return
 
-        self._reset_to_flat(time.time())
+        self._reset_to_flat(self._now())
 
     async def on_stop(self, context: Dict[str, Any]):
         """
@@ -386,12 +589,16 @@ class OrderflowExhaustionV1Strategy:
         """
         logger.info(f"[{self.config.get('name')}] Stopping... Checking for open positions.")
         adapter = context["adapter"]
+        self.clock = context.get("clock", self.clock)
+        if self._fleet is not None:
+            self._fleet.unregister(self)
+            self._fleet = None
 
         # If we are not in a position (FLAT or COOLDOWN), we are good.
         # But we double-check the 'position_side' just in case.
         if self.position_side is None or self.state not in ["IN_POSITION"]:
             logger.info("State is not IN_POSITION. No active trade to close.")
-            self._reset_to_flat(time.time())
+            self._reset_to_flat(self._now())
             return
 
         # Case 1: We are LONG (Bought Base, waiting to Sell)
@@ -402,7 +609,7 @@ class OrderflowExhaustionV1Strategy:
             # Check actual balance to be safe
             try:
                 base, quote = self._parse_symbol(self.symbol)
-                balance_data = await adapter.get_balance(self.key_id)
+                balance_data = await adapter.get_balance(self.key_id, fresh=True)
                 actual_qty = 0.0
                 for asset in balance_data.get("assets", []):
                     if asset["asset"] == base:
@@ -433,7 +640,7 @@ class OrderflowExhaustionV1Strategy:
                         break
                     else:
                         logger.error(f"Liquidation failed: {order}. Retrying...")
-                        await asyncio.sleep(1)
+                        await self._sleep(1)
                 else:
                     logger.error("CRITICAL: Failed to liquidate LONG position after retries.")
 
@@ -450,7 +657,7 @@ class OrderflowExhaustionV1Strategy:
                 "We hold USDT, which is safe. Skipping forced buy-back."
             )
 
-        self._reset_to_flat(time.time())
+        self._reset_to_flat(self._now())
 
     def _reset_to_flat(self, now: float):
         self.state = "COOLDOWN"
@@ -0,0 +1,372 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .trade_cursor import trades_cursor_after
+
+logger = logging.getLogger("execution-service.strategies.orderflow_fleet")
+
+# 슬롯 상태 코드 (IN_POSITION 봇은 슬롯을 비활성화하고 러너가 직접 관리합니다)
+FLAT, WAIT_CONFIRM, COOLDOWN, ENTRY = 0, 1, 2, 3
+STATE_CODES = {"FLAT": FLAT, "WAIT_CONFIRM": WAIT_CONFIRM, "COOLDOWN": COOLDOWN}
+STATE_NAMES = {FLAT: "FLAT", WAIT_CONFIRM: "WAIT_CONFIRM", COOLDOWN: "COOLDOWN", ENTRY: "WAIT_CONFIRM"}
+
+# 신호 방향 코드
+BUY_PRESSURE, SELL_PRESSURE = 1, -1
+SIDE_CODES = {"BUY_PRESSURE": BUY_PRESSURE, "SELL_PRESSURE": SELL_PRESSURE}
+SIDE_NAMES = {BUY_PRESSURE: "BUY_PRESSURE", SELL_PRESSURE: "SELL_PRESSURE"}
+
+# 봇별 파라미터 배열 (전략 _Params 필드명과 동일)
+_PARAM_FIELDS = (
+    "trades_lookback_sec", "trades_limit", "delta_ratio_threshold", "min_total_quote_volume",
+    "spread_expand_ratio_threshold", "sweep_move_pct_threshold", "confirm_absorption_ticks",
+    "spread_ema_alpha", "spread_normalized_max_ratio",
+)
+
+
+@dataclass
+class FleetEntry:
+    """배치 평가가 특정 봇에 돌려주는 진입 액션. 주문/수량 계산은 봇(러너)이 직접 수행합니다."""
+    side: str  # BUY | SELL
+    price: float
+    limits: Dict[str, Any] = field(default_factory=dict)
+
+
+def _nan(value: Optional[float]) -> float:
+    return np.nan if value is None else float(value)
+
+
+def _opt(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+class _SymbolGroup:
+    """
+    같은 (키, 심볼)에서 orderflow_exhaustion_v1을 실행하는 봇들의 파라미터/상태를 struct-of-arrays로 보관합니다.
+    시장 업데이트(스냅샷) 1회마다 모든 활성 슬롯의 신호를 한 번의 NumPy 연산으로 계산합니다.
+    """
+
+    def __init__(self, key_id: str, symbol: str, capacity: int = 16):
+        self.key_id = key_id
+        self.symbol = symbol
+        self.lock = asyncio.Lock()
+        self.size = 0  # 사용한 적 있는 슬롯 수 (high watermark)
+        self.free: List[int] = []
+        self._alloc(capacity)
+
+        # 공유 시장 데이터 (since 커서로 누적하는 체결 윈도우, 가장 긴 lookback 기준)
+        self.trade_window: deque = deque()
+        self.trades_cursor: Optional[str] = None
+        self.trades_fetched_at = 0.0
+        self.version = 0  # 평가를 마친 시장 업데이트 수
+        self.updated_at = float("-inf")
+        self.price: Optional[float] = None
+        self.limits: Dict[str, Any] = {}
+
+    def _alloc(self, capacity: int):
+        old = self.size
+        params = {name: np.zeros(capacity) for name in _PARAM_FIELDS}
+        arrays = {
+            "active": np.zeros(capacity, dtype=bool),
+            "state": np.zeros(capacity, dtype=np.int8),
+            "cooldown_until": np.zeros(capacity),
+            "last_mid": np.full(capacity, np.nan),
+            "spread_ema": np.full(capacity, np.nan),
+            "side": np.zeros(capacity, dtype=np.int8),
+            "absorption": np.zeros(capacity, dtype=np.int32),
+            "sweep_high": np.full(capacity, np.nan),
+            "sweep_low": np.full(capacity, np.nan),
+            "action": np.zeros(capacity, dtype=np.int8),  # +1 BUY 진입 / -1 SELL 진입
+            "seen": np.full(capacity, -1, dtype=np.int64),  # 봇이 마지막으로 읽은 version
+        }
+        for name, arr in {**params, **arrays}.items():
+            if old:
+                arr[:old] = getattr(self, name)[:old]
+            setattr(self, name, arr)
+        self.capacity = capacity
+
+    def add(self) -> int:
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == self.capacity:
+                self._alloc(self.capacity * 2)
+            slot, self.size = self.size, self.size + 1
+        # 현재 업데이트는 새 봇을 포함하지 않았으므로 읽을 수 없음 (다음 업데이트부터 평가)
+        self.seen[slot] = self.version - 1
+        return slot
+
+    def remove(self, slot: int):
+        self.active[slot] = False
+        self.state[slot] = FLAT
+        self.action[slot] = 0
+        self.free.append(slot)
+
+    @property
+    def members(self) -> int:
+        return self.size - len(self.free)
+
+    def write(self, slot: int, strategy):
+        """봇의 파라미터와 신호 상태를 슬롯에 기록합니다. 포지션 보유 중이면 슬롯을 비활성화합니다."""
+        params = strategy.params
+        for name in _PARAM_FIELDS:
+            getattr(self, name)[slot] = getattr(params, name)
+        if self.state[slot] == ENTRY and strategy.state == "WAIT_CONFIRM":
+            return  # 봇이 아직 가져가지 않은 진입 액션은 유지 (파라미터만 갱신)
+        self.active[slot] = strategy.state in STATE_CODES
+        self.state[slot] = STATE_CODES.get(strategy.state, FLAT)
+        self.cooldown_until[slot] = strategy.cooldown_until
+        self.last_mid[slot] = _nan(strategy.last_mid)
+        self.spread_ema[slot] = _nan(strategy.spread_ema)
+        self.side[slot] = SIDE_CODES.get(strategy.last_signal_side, 0)
+        self.absorption[slot] = strategy.absorption_count
+        self.sweep_high[slot] = _nan(strategy.sweep_high)
+        self.sweep_low[slot] = _nan(strategy.sweep_low)
+        self.action[slot] = 0
+
+    def read(self, slot: int, strategy):
+        """슬롯의 신호 상태를 봇에 되돌려 씁니다 (체크포인트/로그가 최신 값을 보도록)."""
+        strategy.state = STATE_NAMES[int(self.state[slot])]
+        strategy.cooldown_until = float(self.cooldown_until[slot])
+        strategy.last_mid = _opt(self.last_mid[slot])
+        strategy.spread_ema = _opt(self.spread_ema[slot])
+        strategy.last_signal_side = SIDE_NAMES.get(int(self.side[slot]))
+        strategy.absorption_count = int(self.absorption[slot])
+        strategy.sweep_high = _opt(self.sweep_high[slot])
+        strategy.sweep_low = _opt(self.sweep_low[slot])
+        self.seen[slot] = self.version
+
+    def needs_update(self, slot: int, now: float, max_age_sec: float) -> bool:
+        return self.seen[slot] >= self.version or now - self.updated_at > max_age_sec
+
+    async def refresh(self, adapter, now: float) -> bool:
+        """스냅샷 1회로 시장 데이터를 갱신하고 모든 활성 슬롯을 평가합니다. 데이터가 없으면 False."""
+        live = self.active[:self.size]
+        lookback_sec = float(self.trades_lookback_sec[:self.size][live].max()) if live.any() else 0.0
+        trades_limit = int(self.trades_limit[:self.size][live].max()) if live.any() else 200
+
+        if self.trades_cursor and now - self.trades_fetched_at > lookback_sec:
+            self.trades_cursor = None
+            self.trade_window.clear()
+
+        # 신호는 최우선 호가만 사용하므로 depth는 항상 top 모드로 조회합니다.
+        snapshot = await adapter.get_snapshot(
+            self.key_id, [self.symbol], ["ticker", "depth", "trades"],
+            depth_limit=5, trades_limit=trades_limit, depth_mode="top", trades_since=self.trades_cursor,
+        )
+        market = ((snapshot or {}).get("symbols") or {}).get(self.symbol) or {}
+        ticker, depth, trades_resp = market.get("ticker"), market.get("depth"), market.get("trades")
+        if not ticker or "price" not in ticker or not depth or not trades_resp:
+            logger.warning(f"[{self.symbol}] Fleet snapshot incomplete; skipping update.")
+            return False
+        best_bid, best_ask = depth.get("best_bid"), depth.get("best_ask")
+        if best_bid is None or best_ask is None:
+            logger.warning(f"[{self.symbol}] Depth missing best_bid/best_ask; skipping update.")
+            return False
+
+        self.price = float(ticker["price"])
+        self.limits = ticker.get("limits") or {}
+        self._merge_trades(trades_resp, now, lookback_sec, trades_limit)
+        self.evaluate(float(best_bid), float(best_ask), self.price, now)
+        self.version += 1
+        self.updated_at = now
+        return True
+
+    def _merge_trades(self, trades_resp: Dict[str, Any], now: float, lookback_sec: float, trades_limit: int):
+        trades = trades_resp.get("trades") or []
+        next_cursor = trades_resp.get("next_cursor")
+        if next_cursor is None or self.trades_cursor is None:
+            # 커서 없이 받은 응답(최신 체결 목록)은 전체 목록으로 간주합니다.
+            self.trade_window.clear()
+        self.trade_window.extend(trades)
+        self.trades_fetched_at = now
+
+        cutoff_ms = int((now - lookback_sec) * 1000)
+        self.trades_cursor = trades_cursor_after(trades, next_cursor, trades_limit, cutoff_ms)
+        while self.trade_window and (self.trade_window[0].get("timestamp") or 0) < cutoff_ms:
+            self.trade_window.popleft()
+
+    def _trade_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """체결 윈도우 -> (시각순 timestamp, 누적 매수 Quote, 누적 매도 Quote). 누적합은 0에서 시작합니다."""
+        rows = [
+            (t["timestamp"], float(t["price"]) * float(t["amount"]), (t.get("side") or "").lower())
+            for t in self.trade_window
+            if t.get("timestamp") is not None and t.get("price") is not None and t.get("amount") is not None
+        ]
+        ts = np.fromiter((r[0] for r in rows), dtype=np.float64, count=len(rows))
+        quote = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+        is_buy = np.fromiter((r[2] == "buy" for r in rows), dtype=bool, count=len(rows))
+        is_sell = np.fromiter((r[2] == "sell" for r in rows), dtype=bool, count=len(rows))
+        order = np.argsort(ts, kind="stable")
+        ts, quote, is_buy, is_sell = ts[order], quote[order], is_buy[order], is_sell[order]
+        cum_buy = np.concatenate(([0.0], np.cumsum(np.where(is_buy, quote, 0.0))))
+        cum_sell = np.concatenate(([0.0], np.cumsum(np.where(is_sell, quote, 0.0))))
+        return ts, cum_buy, cum_sell
+
+    def evaluate(self, best_bid: float, best_ask: float, price: float, now: float):
+        """
+        한 번의 시장 업데이트로 모든 활성 슬롯의 상태 전이를 계산합니다.
+        OrderflowExhaustionV1Strategy.execute()의 신호 로직(FLAT/WAIT_CONFIRM)과 동일한 규칙입니다.
+        """
+        n = self.size
+        state = self.state[:n]
+        cooling = self.active[:n] & (state == COOLDOWN)
+        state[cooling & (now >= self.cooldown_until[:n])] = FLAT
+        idx = np.flatnonzero(self.active[:n] & ((state == FLAT) | (state == WAIT_CONFIRM)))
+        if idx.size == 0:
+            return
+
+        mid = (best_bid + best_ask) / 2.0
+        spread = best_ask - best_bid
+        st = state[idx]
+
+        ema = self.spread_ema[idx]
+        ema = np.where(np.isnan(ema), spread, ema + self.spread_ema_alpha[idx] * (spread - ema))
+        last_mid = self.last_mid[idx]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            spread_ratio = np.where(ema > 0, spread / ema, 1.0)
+            sweep_move = np.where(last_mid > 0, np.abs(mid / last_mid - 1.0), 0.0)
+
+        # 봇별 lookback 구간의 매수/매도 체결대금: 누적합 + 이진 탐색
+        ts, cum_buy, cum_sell = self._trade_arrays()
+        cutoff_ms = np.floor((now - self.trades_lookback_sec[idx]) * 1000)
+        start = np.searchsorted(ts, cutoff_ms, side="left")
+        buy_q = cum_buy[-1] - cum_buy[start]
+        sell_q = cum_sell[-1] - cum_sell[start]
+        enough = (buy_q + sell_q) >= self.min_total_quote_volume[idx]
+
+        buy_sell = (buy_q + 1e-9) / (sell_q + 1e-9)
+        sell_buy = (sell_q + 1e-9) / (buy_q + 1e-9)
+        delta = self.delta_ratio_threshold[idx]
+        pressured = (spread_ratio >= self.spread_expand_ratio_threshold[idx]) \
+            & (sweep_move >= self.sweep_move_pct_threshold[idx])
+
+        side = self.side[idx]
+        absorption = self.absorption[idx]
+        sweep_high = self.sweep_high[idx]
+        sweep_low = self.sweep_low[idx]
+        high_mark = max(best_ask, mid, price)
+        low_mark = min(best_bid, mid, price)
+        prev_high = np.nan_to_num(sweep_high, nan=0.0)
+        prev_low = np.where(np.isnan(sweep_low) | (sweep_low == 0), mid, sweep_low)
+
+        # FLAT -> WAIT_CONFIRM (스윕 감지)
+        flat = enough & (st == FLAT)
+        buy_hit = flat & pressured & (buy_sell >= delta)
+        sell_hit = flat & pressured & ~buy_hit & (sell_buy >= delta)
+        hit = buy_hit | sell_hit
+        st = np.where(hit, WAIT_CONFIRM, st)
+        side = np.where(buy_hit, BUY_PRESSURE, np.where(sell_hit, SELL_PRESSURE, side))
+        absorption = np.where(hit, 0, absorption)
+
+        # WAIT_CONFIRM: 흡수 확인 카운트
+        wait = enough & (self.state[idx] == WAIT_CONFIRM)
+        normalized = spread <= ema * self.spread_normalized_max_ratio[idx]
+        has_last = ~np.isnan(last_mid)
+        wait_buy = wait & (side == BUY_PRESSURE)
+        wait_sell = wait & (side == SELL_PRESSURE)
+        absorbed = np.where(
+            wait_buy,
+            normalized & has_last & (mid <= last_mid) & (buy_sell >= 1.0),
+            normalized & has_last & (mid >= last_mid) & (sell_buy >= 1.0),
+        )
+        counting = wait_buy | wait_sell
+        absorption = np.where(counting, np.where(absorbed, absorption + 1, np.maximum(absorption - 1, 0)), absorption)
+        confirmed = counting & (absorption >= self.confirm_absorption_ticks[idx])
+
+        self.sweep_high[idx] = np.where(buy_hit | wait_buy, np.maximum(prev_high, high_mark), sweep_high)
+        self.sweep_low[idx] = np.where(sell_hit | wait_sell, np.minimum(prev_low, low_mark), sweep_low)
+        self.state[idx] = np.where(confirmed, ENTRY, st)
+        # 매수 압력 흡수 -> SELL 진입, 매도 압력 흡수 -> BUY 진입
+        self.action[idx] = np.where(confirmed, np.where(wait_buy, -1, 1), 0)
+        self.side[idx] = side
+        self.absorption[idx] = absorption
+        self.spread_ema[idx] = ema
+        self.last_mid[idx] = mid
+
+        if hit.any() or confirmed.any():
+            logger.info(
+                f"[{self.symbol}] Fleet update: {int(buy_hit.sum())} buy / {int(sell_hit.sum())} sell pressure, "
+                f"{int(confirmed.sum())} entries ({idx.size} bots)"
+            )
+
+
+class OrderflowFleet:
+    """
+    orderflow_exhaustion_v1 봇 전체를 위한 배치 신호 평가기 (서비스 전체 공유, context["orderflow_fleet"]).
+
+    - 같은 (키, 심볼)의 봇들은 하나의 그룹으로 묶여 스냅샷 1회 + NumPy 연산 1회로 평가됩니다.
+      파라미터 조합 수와 무관하게 시장 업데이트당 비용이 거의 일정합니다.
+    - 업데이트는 봇이 이미 최신 업데이트를 읽었거나 업데이트가 max_age_sec보다 오래된 경우에만 새로 받습니다.
+    - 진입 액션만 해당 봇에 돌려주며, 수량 계산/주문/포지션 관리는 각 러너가 그대로 수행합니다.
+    """
+
+    def __init__(self, max_age_sec: float = 1.0, clock=None):
+        self.max_age_sec = max_age_sec
+        self.clock = clock
+        self._groups: Dict[Tuple[str, str], _SymbolGroup] = {}
+        self._slots: Dict[Any, Tuple[_SymbolGroup, int]] = {}  # 전략 인스턴스 -> (그룹, 슬롯)
+        self._updates = 0
+        self._evaluations = 0
+
+    def _now(self) -> float:
+        return self.clock.time() if self.clock is not None else time.time()
+
+    def sync(self, strategy):
+        """봇의 파라미터/상태를 배치 평가기에 반영합니다 (처음 호출 시 등록). 진입/청산/설정 변경 후 호출합니다."""
+        entry = self._slots.get(strategy)
+        if entry is None:
+            key = (strategy.key_id, strategy.symbol)
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _SymbolGroup(*key)
+            entry = self._slots[strategy] = (group, group.add())
+        group, slot = entry
+        group.write(slot, strategy)
+
+    def unregister(self, strategy):
+        entry = self._slots.pop(strategy, None)
+        if entry is None:
+            return
+        group, slot = entry
+        group.remove(slot)
+        if group.members == 0:
+            self._groups.pop((group.key_id, group.symbol), None)
+
+    async def evaluate(self, strategy, adapter, now: Optional[float] = None) -> Optional[FleetEntry]:
+        """
+        봇 한 틱 분의 신호 평가. 필요하면 그룹 전체를 새 시장 업데이트로 평가한 뒤
+        이 봇의 상태를 되돌려 쓰고, 진입 액션이 있으면 반환합니다.
+        """
+        if strategy not in self._slots:
+            self.sync(strategy)
+        group, slot = self._slots[strategy]
+        now = self._now() if now is None else now
+
+        async with group.lock:
+            waiting = group.state[slot] == COOLDOWN and now < group.cooldown_until[slot]
+            if not waiting and group.needs_update(slot, now, self.max_age_sec):
+                if await group.refresh(adapter, now):
+                    self._updates += 1
+                    self._evaluations += int(group.active[:group.size].sum())
+            group.read(slot, strategy)
+
+            action = int(group.action[slot])
+            if not action:
+                return None
+            group.action[slot] = 0
+            group.state[slot] = WAIT_CONFIRM
+            return FleetEntry(side="BUY" if action > 0 else "SELL", price=group.price, limits=group.limits)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "groups": len(self._groups),
+            "bots": len(self._slots),
+            "market_updates": self._updates,
+            "bot_evaluations": self._evaluations,
+        }
@@ -6,6 +6,24 @@ from datetime import datetime
 
 logger = logging.getLogger("execution-service.strategies.test_trading")
 
+# 전략 레지스트리가 import 없이 읽는 메타데이터 (리터럴만 사용)
+STRATEGY = {
+    "id": "test_trading_v1",
+    "class": "TestTradingStrategy",
+    "name": "테스트 트레이딩 (매수 & 매도 루프)",
+    "description": "교육용 전략: 지정된 비율만큼 매수 후 일정 시간 보유하다가 전량 매도합니다. 이를 반복합니다.",
+    "version": "1.0.0",
+    "schema": {
+        "type": "object",
+        "properties": {
+            "allocation_ratio": {"type": "number", "minimum": 0.1, "maximum": 1.0, "title": "매수 할당 비율 (0.1-1.0)"},
+            "hold_duration": {"type": "integer", "minimum": 10, "title": "보유 기간 (초)", "default": 60},
+            "loop_count": {"type": "integer", "default": 5, "title": "반복 횟수 (0=무한)"}
+        },
+        "required": ["allocation_ratio", "hold_duration"]
+    }
+}
+
 class TestTradingStrategy:
     """
     Test Trading Strategy:
@@ -14,6 +32,10 @@ class TestTradingStrategy:
     - Sells all
     - Repeats loop_count times
     """
+    # 체크포인트로 저장/복원하는 상태 필드 (구성이 바뀌면 STATE_VERSION 증가)
+    STATE_VERSION = 1
+    _CHECKPOINT_FIELDS = ("state", "loop_index", "hold_start_time", "bought_amount")
+
     def __init__(self, config):
         self.config = config
         self.state = "INIT" # INIT, HOLDING, SOLD, FINISHED
@@ -44,9 +66,7 @@ class TestTradingStrategy:
                     break
         
         # Defaults
-        self.allocation = float(self.params.get("allocation_ratio", 0.1))
-        self.hold_duration = int(self.params.get("hold_duration", 60))
-        self.loop_count = int(self.params.get("loop_count", 5))
+        self._apply_params(self.params)
         self.symbol = config.get("global_settings", {}).get("symbol", "BTC/USDT")
         
         # We need the key_id to trade.
@@ -62,6 +82,43 @@ class TestTradingStrategy:
         self.key_id = gs.get("exchange") or gs.get("account_id")
         print(f"DEBUG: Resolved key_id: {self.key_id}", flush=True)
 
+        # BotRunner가 context["clock"]으로 주입하는 시계 (없으면 실제 시간 사용)
+        self.clock = None
+
+    def _now(self):
+        return self.clock.time() if self.clock is not None else time.time()
+
+    async def _sleep(self, seconds):
+        if self.clock is not None:
+            await self.clock.sleep(seconds)
+        else:
+            await asyncio.sleep(seconds)
+
+
+    def _apply_params(self, params):
+        allocation = float(params.get("allocation_ratio", 0.1))
+        hold_duration = int(params.get("hold_duration", 60))
+        loop_count = int(params.get("loop_count", 5))
+        self.params = params
+        self.allocation, self.hold_duration, self.loop_count = allocation, hold_duration, loop_count
+
+    def snapshot_state(self):
+        return {name: getattr(self, name) for name in self._CHECKPOINT_FIELDS}
+
+    def restore_state(self, state):
+        for name in self._CHECKPOINT_FIELDS:
+            if name in state:
+                setattr(self, name, state[name])
+        logger.info(f"[{self.config.get('name')}] Restored checkpoint: {self.snapshot_state()}")
+
+    def on_config_change(self, config, changed_params):
+        """
+        실행 중 파라미터 변경 (BotRunner가 틱 사이에 호출).
+        진행 중인 루프 상태(state, loop_index, 보유 수량)는 유지하고, 보유 기간/반복 횟수/다음 매수 비율만 바뀝니다.
+        """
+        self._apply_params(config.get("pipeline", {}).get("strategy", {}).get("params", {}))
+        self.config = config
+        logger.info(f"[{config.get('name')}] Params updated: {sorted(changed_params)}")
 
     async def execute(self, context):
         """
@@ -69,6 +126,7 @@ class TestTradingStrategy:
         context: Contains adapter_client, bot_config, etc.
         """
         adapter = context["adapter"]
+        self.clock = context.get("clock", self.clock)
         
         if not self.key_id:
             logger.error("Missing key_id (account_id) in bot config. Cannot trade.")
@@ -138,7 +196,7 @@ class TestTradingStrategy:
             
             if order.get("status") == "filled":
                  self.bought_amount = quantity
-                 self.hold_start_time = time.time()
+                 self.hold_start_time = self._now()
                  self.state = "HOLDING"
                  logger.info(f"Buy Filled! Holding for {self.hold_duration}s...")
             else:
@@ -148,7 +206,7 @@ class TestTradingStrategy:
 
         # 2. HOLDING -> SELL
         elif self.state == "HOLDING":
-            elapsed = time.time() - self.hold_start_time
+            elapsed = self._now() - self.hold_start_time
             if elapsed >= self.hold_duration:
                 logger.info(f"Hold time ({elapsed:.1f}s) elapsed. Selling...")
                 
@@ -178,13 +236,14 @@ class TestTradingStrategy:
         """
         logger.info(f"[{self.config['name']}] Stopping... Checking for open positions.")
         adapter = context["adapter"]
+        self.clock = context.get("clock", self.clock)
         
         # 1. Check ACTUAL Balance from Exchange (Source of Truth)
         # Don't rely solely on self.bought_amount
         try:
             # Parse Base Asset from Symbol (e.g., BTC/USDT -> BTC)
             base_asset = self.symbol.split('/')[0]
-            balance_data = await adapter.get_balance(self.key_id)
+            balance_data = await adapter.get_balance(self.key_id, fresh=True)
             actual_qty = 0.0
             
             for asset in balance_data.get("assets", []):
@@ -245,7 +304,7 @@ class TestTradingStrategy:
                 logger.error(f"Error during liquidation attempt: {e}")
             
             retry_count += 1
-            await asyncio.sleep(2) # Wait before retry
+            await self._sleep(2) # Wait before retry
             
             # Re-check balance update if possible (Optional, but safe)
             # For simplicity, we assume failure means we still have the position or partial fill.
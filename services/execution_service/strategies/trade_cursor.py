@@ -0,0 +1,18 @@
+from typing import Any, Dict, List, Optional
+
+
+def trades_cursor_after(trades: List[Dict[str, Any]], next_cursor: Optional[str], limit: int,
+                        cutoff_ms: int) -> Optional[str]:
+    """
+    다음 틱에 보낼 체결 since 커서. 커서가 실시간을 따라가지 못하면 None(최신 체결부터 다시 조회)을 반환합니다.
+
+    - 페이지가 가득 참: 커서 조회(Binance fromId)는 커서 이후 '가장 오래된' limit건을 주므로,
+      틱당 체결이 limit보다 많으면 커서가 매 틱 더 뒤처집니다.
+    - 받은 가장 최근 체결도 lookback 밖: 커서가 이미 윈도우보다 뒤에 있습니다.
+    """
+    if len(trades) >= limit:
+        return None
+    newest = max((t.get("timestamp") or 0 for t in trades), default=None)
+    if newest is not None and newest < cutoff_ms:
+        return None
+    return next_cursor
@@ -0,0 +1,229 @@
+import ast
+import importlib
+import logging
+import os
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("execution-service.strategy_registry")
+
+STRATEGIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "strategies")
+STRATEGIES_PACKAGE = "strategies"
+# 외부 패키지가 전략을 제공할 때 사용하는 entry point 그룹 (값: "module:ClassName")
+ENTRY_POINT_GROUP = "r4r0.strategies"
+# 전략 모듈이 선언하는 메타데이터 변수명 (리터럴 dict여야 import 없이 읽을 수 있음)
+METADATA_NAME = "STRATEGY"
+
+
+def _version_key(version: str) -> Tuple:
+    """"1.10.0" > "1.9.2" 처럼 숫자 단위로 비교하기 위한 정렬 키."""
+    parts = []
+    for part in str(version).split("."):
+        parts.append((0, int(part), "") if part.isdigit() else (1, 0, part))
+    return tuple(parts)
+
+
+@dataclass
+class StrategyEntry:
+    id: str
+    version: str
+    class_name: str
+    source: str                     # "file" | "entry_point"
+    module: str                     # import 경로
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    path: Optional[str] = None
+    mtime: Optional[float] = None
+    cls: Optional[type] = None      # 최초 생성 시점에 import
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            **self.metadata,
+            "id": self.id,
+            "version": self.version,
+            "source": self.source,
+            "loaded": self.cls is not None,
+        }
+
+
+class StrategyRegistry:
+    """
+    (전략 ID, 버전) 단위의 전략 플러그인 레지스트리.
+
+    - `strategies/*.py`의 모듈 수준 `STRATEGY` 메타데이터를 AST로만 읽어 등록하고,
+      실제 모듈 import는 해당 전략으로 봇을 처음 부팅할 때 수행합니다.
+    - `r4r0.strategies` entry point로 설치된 외부 전략도 같은 방식으로 등록합니다.
+    - refresh()는 파일 mtime이 바뀐 모듈만 다시 읽습니다. 새 버전은 이후 부팅하는 봇부터
+      적용되고, 이미 실행 중인 봇은 생성 당시의 클래스 객체를 그대로 사용합니다.
+    """
+
+    def __init__(self, strategies_dir: str = STRATEGIES_DIR, package: str = STRATEGIES_PACKAGE,
+                 entry_point_group: Optional[str] = ENTRY_POINT_GROUP):
+        self.strategies_dir = strategies_dir
+        self.package = package
+        self.entry_point_group = entry_point_group
+        self._entries: Dict[Tuple[str, str], StrategyEntry] = {}
+        self._file_mtimes: Dict[str, float] = {}
+        self._module_mtimes: Dict[str, float] = {}  # import 시점의 파일 mtime
+        self._lock = threading.Lock()
+        self.refresh()
+
+    # --- Discovery ---
+    def refresh(self) -> List[Tuple[str, str]]:
+        """전략 디렉토리/entry point를 다시 스캔하고, 새로 등록(또는 갱신)된 (id, version) 목록을 반환합니다."""
+        with self._lock:
+            changed = self._scan_files()
+            changed += self._scan_entry_points()
+        if changed:
+            importlib.invalidate_caches()  # 새로 추가된 파일을 import 경로에서 찾을 수 있도록
+        for key in changed:
+            logger.info(f"전략 등록: {key[0]} v{key[1]}")
+        return changed
+
+    def _scan_files(self) -> List[Tuple[str, str]]:
+        changed = []
+        try:
+            names = sorted(os.listdir(self.strategies_dir))
+        except FileNotFoundError:
+            return changed
+
+        seen = set()
+        for name in names:
+            if not name.endswith(".py") or name.startswith("_"):
+                continue
+            path = os.path.join(self.strategies_dir, name)
+            seen.add(path)
+            mtime = os.path.getmtime(path)
+            if self._file_mtimes.get(path) == mtime:
+                continue
+            self._file_mtimes[path] = mtime
+
+            metadata = self._read_metadata(path)
+            # 같은 파일에서 왔지만 아직 로드되지 않은 이전 항목은 더 이상 import할 수 없으므로 제거
+            for key, entry in list(self._entries.items()):
+                if entry.path == path and entry.cls is None:
+                    del self._entries[key]
+            if metadata is None:
+                continue
+
+            key = (metadata["id"], metadata["version"])
+            self._entries[key] = StrategyEntry(
+                id=metadata["id"],
+                version=metadata["version"],
+                class_name=metadata["class"],
+                source="file",
+                module=f"{self.package}.{name[:-3]}",
+                metadata={k: v for k, v in metadata.items() if k != "class"},
+                path=path,
+                mtime=mtime,
+            )
+            changed.append(key)
+
+        for path in set(self._file_mtimes) - seen:
+            # 삭제된 파일: 이미 로드된 클래스는 실행 중인 봇을 위해 남겨둡니다.
+            del self._file_mtimes[path]
+            for key, entry in list(self._entries.items()):
+                if entry.path == path and entry.cls is None:
+                    del self._entries[key]
+        return changed
+
+    @staticmethod
+    def _read_metadata(path: str) -> Optional[Dict[str, Any]]:
+        """모듈을 실행하지 않고 `STRATEGY = {...}` 리터럴만 읽습니다."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError) as e:
+            logger.error(f"전략 모듈 파싱 실패 ({path}): {e}")
+            return None
+
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and any(
+                isinstance(t, ast.Name) and t.id == METADATA_NAME for t in node.targets
+            ):
+                try:
+                    metadata = ast.literal_eval(node.value)
+                except ValueError:
+                    logger.error(f"{path}: {METADATA_NAME}는 리터럴 dict여야 합니다.")
+                    return None
+                if not all(metadata.get(k) for k in ("id", "version", "class")):
+                    logger.error(f"{path}: {METADATA_NAME}에 id / version / class가 필요합니다.")
+                    return None
+                metadata["version"] = str(metadata["version"])
+                return metadata
+        return None
+
+    def _scan_entry_points(self) -> List[Tuple[str, str]]:
+        if not self.entry_point_group:
+            return []
+        try:
+            from importlib.metadata import entry_points
+            eps = entry_points()
+            group = eps.select(group=self.entry_point_group) if hasattr(eps, "select") \
+                else eps.get(self.entry_point_group, [])
+        except Exception as e:
+            logger.warning(f"전략 entry point 조회 실패: {e}")
+            return []
+
+        changed = []
+        for ep in group:
+            module, _, class_name = ep.value.partition(":")
+            dist = getattr(ep, "dist", None)
+            version = str(getattr(dist, "version", None) or "0")
+            key = (ep.name, version)
+            if key in self._entries:
+                continue
+            self._entries[key] = StrategyEntry(
+                id=ep.name, version=version, class_name=class_name.strip(), source="entry_point",
+                module=module.strip(), metadata={"name": ep.name},
+            )
+            changed.append(key)
+        return changed
+
+    # --- Lookup ---
+    def versions(self, strategy_id: str) -> List[str]:
+        return sorted((v for (sid, v) in self._entries if sid == strategy_id), key=_version_key)
+
+    def resolve(self, strategy_id: str, version: Optional[str] = None) -> StrategyEntry:
+        """버전을 지정하지 않으면 가장 높은 버전을 반환합니다. 없으면 KeyError."""
+        if version is None:
+            versions = self.versions(strategy_id)
+            if not versions:
+                raise KeyError(strategy_id)
+            version = versions[-1]
+        entry = self._entries.get((strategy_id, str(version)))
+        if entry is None:
+            raise KeyError(f"{strategy_id} v{version}")
+        return entry
+
+    def load(self, entry: StrategyEntry) -> type:
+        """전략 클래스를 (필요하면) import합니다. 파일이 바뀐 모듈은 reload합니다."""
+        with self._lock:
+            if entry.cls is not None:
+                return entry.cls
+            already_imported = entry.module in sys.modules
+            module = importlib.import_module(entry.module)
+            if entry.source == "file":
+                loaded_mtime = self._module_mtimes.get(entry.module)
+                stale = (loaded_mtime is not None and loaded_mtime != entry.mtime) \
+                    or getattr(module, METADATA_NAME, {}).get("version") != entry.version
+                if already_imported and stale:
+                    # 이전 내용으로 import된 모듈 -> 디스크의 새 버전으로 다시 로드
+                    module = importlib.reload(module)
+                self._module_mtimes[entry.module] = entry.mtime
+            entry.cls = getattr(module, entry.class_name)
+            if entry.source == "entry_point":
+                entry.metadata.update(getattr(entry.cls, METADATA_NAME, None) or {})
+                entry.metadata.pop("class", None)
+            logger.info(f"전략 로드: {entry.id} v{entry.version} ({entry.module}.{entry.class_name})")
+            return entry.cls
+
+    def create(self, strategy_id: str, config: Dict[str, Any], version: Optional[str] = None):
+        """(strategy_id, version) 전략 인스턴스를 생성합니다."""
+        entry = self.resolve(strategy_id, version)
+        return self.load(entry)(config), entry
+
+    def list_metadata(self) -> List[Dict[str, Any]]:
+        entries = sorted(self._entries.values(), key=lambda e: (e.id, _version_key(e.version)))
+        return [e.describe() for e in entries]
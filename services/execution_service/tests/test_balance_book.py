@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import AsyncMock
+import asyncio
+import sys
+import os
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from balance_book import BalanceBook
+from ledger_adapter import LedgerAwareAdapter
+
+
+class TestBalanceBook(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.adapter_client = AsyncMock()
+        self.adapter_client.get_balance.return_value = {
+            "assets": [{"asset": "USDT", "free": 1000.0, "locked": 0.0}]
+        }
+        self.book = BalanceBook(self.adapter_client)
+
+    async def test_seeds_once(self):
+        await self.book.get_balance("k")
+        await self.book.get_balance("k")
+        self.assertEqual(self.adapter_client.get_balance.await_count, 1)
+
+    async def test_fills_update_balances(self):
+        await self.book.get_balance("k")
+        self.book.apply_fill("k", "BTC/USDT", "BUY", 0.5, 100.0, fee=0.001, fee_asset="BTC")
+        self.assertAlmostEqual(self.book.free("k", "BTC"), 0.499)
+        self.assertAlmostEqual(self.book.free("k", "USDT"), 950.0)
+
+        self.book.apply_fill("k", "BTC/USDT", "SELL", 0.499, 110.0)
+        self.assertAlmostEqual(self.book.free("k", "BTC"), 0.0)
+        self.assertAlmostEqual(self.book.free("k", "USDT"), 950.0 + 0.499 * 110.0)
+
+    async def test_concurrent_fresh_reads_share_one_fetch(self):
+        await self.book.get_balance("k")
+        self.adapter_client.get_balance.reset_mock()
+
+        async def slow_balance(key_id):
+            await asyncio.sleep(0.01)
+            return {"assets": [{"asset": "USDT", "free": 900.0, "locked": 0.0}]}
+        self.adapter_client.get_balance.side_effect = slow_balance
+
+        results = await asyncio.gather(*(self.book.get_balance("k", fresh=True) for _ in range(20)))
+        # 첫 호출의 조회를 기다린 나머지 호출은 그 결과를 사용 (최대 2회: 진행 중 조회 + 대기 후 1회)
+        self.assertLessEqual(self.adapter_client.get_balance.await_count, 2)
+        self.assertTrue(all(r["assets"][0]["free"] == 900.0 for r in results))
+
+    async def test_reconcile_skipped_when_fill_arrives_mid_fetch(self):
+        await self.book.get_balance("k")
+
+        async def slow_balance(key_id):
+            self.book.apply_fill("k", "BTC/USDT", "BUY", 1.0, 100.0)
+            return {"assets": [{"asset": "USDT", "free": 1000.0, "locked": 0.0}]}
+
+        self.adapter_client.get_balance.side_effect = slow_balance
+        self.assertFalse(await self.book.reconcile("k"))
+        self.assertAlmostEqual(self.book.free("k", "BTC"), 1.0)
+
+    async def test_ledger_adapter_sizes_orders_without_network(self):
+        bot_client = AsyncMock()
+        bot_client.create_local_order.return_value = {"id": "lo-1", "status": "PENDING"}
+        self.adapter_client.place_order.return_value = {
+            "status": "filled", "id": "ex-1",
+            "details": {"info": {"side": "BUY", "fills": [
+                {"price": "100.0", "qty": "1.0", "commission": "0", "commissionAsset": "BNB", "tradeId": 7}
+            ]}},
+        }
+        ledger = LedgerAwareAdapter(self.adapter_client, bot_client, "bot-1", balance_book=self.book)
+
+        await ledger.get_balance("k")
+        await ledger.place_order("k", "BTC/USDT", "buy", 1.0)
+        balance = await ledger.get_balance("k")
+
+        self.assertEqual(self.adapter_client.get_balance.await_count, 1)
+        free = {a["asset"]: a["free"] for a in balance["assets"]}
+        self.assertAlmostEqual(free["BTC"], 1.0)
+        self.assertAlmostEqual(free["USDT"], 900.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
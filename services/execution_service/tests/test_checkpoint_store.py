@@ -0,0 +1,94 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import AsyncMock
+
+# checkpoint_store.py는 서비스 디렉토리 기준의 flat import를 사용하므로 sys.path에 추가합니다.
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from checkpoint_store import CheckpointStore
+from clock import VirtualClock
+from engine import BotRunner
+
+
+def _config():
+    return {
+        "id": "bot-1",
+        "name": "bot",
+        "status": "RUNNING",
+        "global_settings": {"exchange": "k1", "symbol": "BTC/USDT"},
+        "pipeline": {"strategy": {"id": "orderflow_exhaustion_v1", "params": {}}},
+    }
+
+
+class TestCheckpointStore(unittest.IsolatedAsyncioTestCase):
+    async def test_latest_checkpoint_wins_and_survives_reopen(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "checkpoints.db")
+            store = CheckpointStore(path)
+            for qty in (0.1, 0.2, 0.3):
+                store.save("bot-1", "s", "1.0.0", 1, "sess-1", {"position_qty": qty})
+            # 기록 전에도 최신 체크포인트를 읽을 수 있음
+            self.assertEqual(store.load("bot-1")["payload"], {"position_qty": 0.3})
+            self.assertTrue(await store.flush(timeout=1.0))
+            # 연속 저장은 한 번의 기록으로 합쳐짐
+            self.assertEqual(store.metrics()["write_batches_total"], 1)
+            await store.close()
+
+            reopened = CheckpointStore(path)
+            checkpoint = reopened.load("bot-1")
+            self.assertEqual((checkpoint["seq"], checkpoint["payload"]), (3, {"position_qty": 0.3}))
+            reopened.save("bot-1", "s", "1.0.0", 1, "sess-1", {"position_qty": 0.0})
+            self.assertEqual(reopened.load("bot-1")["seq"], 4)
+            await reopened.close()
+
+
+class TestRunnerCheckpoint(unittest.IsolatedAsyncioTestCase):
+    def _runner(self, store, session_id="sess-1"):
+        runner = BotRunner(_config(), AsyncMock(), AsyncMock(), clock=VirtualClock(start=0.0),
+                           checkpoint_store=store, checkpoint_interval_sec=30.0)
+        runner.session_id = session_id
+        runner._initialize_strategy()
+        runner._restore_checkpoint()
+        return runner
+
+    async def test_restart_restores_open_position(self):
+        store = CheckpointStore()
+        first = self._runner(store)
+        strategy = first.strategy_instance
+        strategy.state, strategy.position_side, strategy.position_qty = "IN_POSITION", "BUY", 0.25
+        strategy.entry_price, strategy.stop_price = 100.0, 99.0
+        first.checkpoint()  # 상태 전이 -> 즉시 저장
+        self.assertTrue(await store.flush(timeout=1.0))
+
+        restored = self._runner(store).strategy_instance
+        self.assertEqual((restored.state, restored.position_side, restored.position_qty), ("IN_POSITION", "BUY", 0.25))
+        self.assertEqual((restored.entry_price, restored.stop_price), (100.0, 99.0))
+
+        # 정지 후 새 세션으로 부팅하면 복원하지 않음
+        fresh = self._runner(store, session_id="sess-2").strategy_instance
+        self.assertEqual((fresh.state, fresh.position_qty), ("FLAT", 0.0))
+        await store.close()
+
+    async def test_non_transition_changes_are_saved_periodically(self):
+        store = CheckpointStore()
+        runner = self._runner(store)
+        runner.checkpoint()
+        runner.strategy_instance.spread_ema = 1.5
+        runner.checkpoint()
+        self.assertIsNone(store.load("bot-1")["payload"]["spread_ema"])
+
+        await runner.clock.sleep(30)
+        runner.checkpoint()
+        self.assertEqual(store.load("bot-1")["payload"]["spread_ema"], 1.5)
+        self.assertEqual(store.metrics()["saves_total"], 2)
+        await asyncio.sleep(0)
+        await store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import AsyncMock
+import asyncio
+import sys
+import os
+import time
+
+# engine.py는 서비스 디렉토리 기준의 flat import를 사용하므로 sys.path에 추가합니다.
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from clock import RealClock, VirtualClock, StepClock, create_clock
+from engine import BotRunner
+
+
+class TestClocks(unittest.IsolatedAsyncioTestCase):
+    async def test_virtual_sleep_is_instant(self):
+        clock = VirtualClock(start=1000.0)
+        started = time.perf_counter()
+        await clock.sleep(3600)
+        self.assertEqual(clock.time(), 4600.0)
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+    async def test_step_clock_blocks_until_advanced(self):
+        clock = StepClock(start=0.0)
+        task = asyncio.create_task(clock.sleep(10))
+        await asyncio.sleep(0)
+        self.assertEqual(clock.pending_sleepers, 1)
+
+        clock.advance(5)
+        await asyncio.sleep(0)
+        self.assertFalse(task.done())
+
+        clock.advance(5)
+        await asyncio.sleep(0)
+        self.assertTrue(task.done())
+        self.assertEqual(clock.time(), 10.0)
+
+    def test_create_clock(self):
+        self.assertIsInstance(create_clock("real"), RealClock)
+        self.assertIsInstance(create_clock("virtual"), VirtualClock)
+        self.assertIsInstance(create_clock("step"), StepClock)
+
+
+class TestVirtualTimeScenario(unittest.IsolatedAsyncioTestCase):
+    async def test_three_hour_test_trading_scenario(self):
+        """3시간짜리 TestTradingStrategy 시나리오가 가상 시계로 즉시 완료되어야 합니다."""
+        config = {
+            "id": "bot-1",
+            "name": "virtual_bot",
+            "status": "RUNNING",
+            "global_settings": {"symbol": "BTC/USDT", "exchange": "test_key"},
+            "pipeline": {
+                "strategy": {
+                    "id": "test_trading_v1",
+                    "params": {"allocation_ratio": 0.1, "hold_duration": 3600, "loop_count": 3},
+                }
+            },
+        }
+
+        adapter_client = AsyncMock()
+        adapter_client.get_balance.return_value = {"assets": [{"asset": "USDT", "free": 1000.0}]}
+        adapter_client.get_ticker.return_value = {"price": 100.0, "limits": {}}
+        adapter_client.place_order.return_value = {"status": "filled", "id": "ex-1", "details": {"info": {}}}
+
+        bot_client = AsyncMock()
+        bot_client.create_local_order.return_value = {"id": "lo-1", "status": "PENDING"}
+
+        clock = VirtualClock(start=0.0)
+        runner = BotRunner(config, adapter_client, bot_client, clock=clock)
+        runner._initialize_strategy()
+        runner.is_running = True
+
+        started = time.perf_counter()
+        task = asyncio.create_task(runner._run_loop())
+        while runner.strategy_instance.state != "FINISHED":
+            await asyncio.sleep(0)
+        runner.stop_requested = True
+        await task
+
+        self.assertGreaterEqual(clock.time(), 3 * 3600)
+        self.assertEqual(runner.strategy_instance.loop_index, 3)
+        # BUY 3회 + SELL 3회
+        self.assertEqual(adapter_client.place_order.await_count, 6)
+        self.assertLess(time.perf_counter() - started, 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import copy
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock
+
+# engine.py는 서비스 디렉토리 기준의 flat import를 사용하므로 sys.path에 추가합니다.
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from engine import BotRunner
+
+
+def _config(strategy_id="test_trading_v1", params=None, version=1):
+    return {
+        "id": "bot-1",
+        "name": "bot",
+        "status": "RUNNING",
+        "config_version": version,
+        "global_settings": {"exchange": "k1", "symbol": "BTC/USDT"},
+        "pipeline": {"strategy": {"id": strategy_id, "params": params or {"hold_duration": 60}}},
+    }
+
+
+class TestConfigHotApply(unittest.TestCase):
+    def _runner(self, config):
+        runner = BotRunner(config, AsyncMock(), AsyncMock())
+        runner._initialize_strategy()
+        return runner
+
+    def test_param_change_applies_in_place(self):
+        runner = self._runner(_config())
+        strategy = runner.strategy_instance
+        strategy.state, strategy.bought_amount = "HOLDING", 0.5
+
+        new = _config(params={"hold_duration": 120, "loop_count": 2}, version=2)
+        self.assertTrue(runner.apply_config(new))
+        self.assertEqual(strategy.hold_duration, 60)  # 틱 사이에 적용될 때까지 대기
+        runner._apply_pending_config()
+
+        self.assertIs(runner.strategy_instance, strategy)
+        self.assertEqual((strategy.hold_duration, strategy.loop_count), (120, 2))
+        self.assertEqual((strategy.state, strategy.bought_amount), ("HOLDING", 0.5))
+        self.assertEqual((runner.config_version, runner.bot_config), (2, new))
+
+        self.assertTrue(runner.apply_config(copy.deepcopy(new)))  # 같은 리비전은 무시
+        self.assertIsNone(runner._pending_config)
+
+    def test_structural_change_requires_restart(self):
+        runner = self._runner(_config())
+
+        moved = _config(version=2)
+        moved["global_settings"]["symbol"] = "ETH/USDT"
+        self.assertFalse(runner.apply_config(moved))
+        self.assertFalse(runner.apply_config(_config("orderflow_exhaustion_v1", version=2)))
+        self.assertEqual(runner.config_version, 1)
+
+    def test_invalid_params_keep_previous_config_and_restart(self):
+        runner = self._runner(_config())
+        invalid = _config(params={"hold_duration": "soon"}, version=2)
+        self.assertTrue(runner.apply_config(invalid))
+        self.assertEqual(runner.config_version, 1)  # 전략이 받아들이기 전에는 리비전 유지
+        runner._apply_pending_config()
+
+        self.assertEqual(runner.strategy_instance.hold_duration, 60)
+        self.assertEqual(runner.bot_config["config_version"], 1)
+        self.assertEqual(runner.config_version, 1)
+        self.assertFalse(runner.apply_config(copy.deepcopy(invalid)))  # 다음 폴링: 재시작으로 적용
+
+    def test_orderflow_keeps_position_on_param_change(self):
+        runner = self._runner(_config("orderflow_exhaustion_v1", {"take_profit_pct": 0.003}))
+        strategy = runner.strategy_instance
+        strategy.state, strategy.position_qty, strategy.entry_price = "IN_POSITION", 0.01, 100.0
+
+        self.assertTrue(runner.apply_config(_config("orderflow_exhaustion_v1", {"take_profit_pct": 0.01}, 2)))
+        runner._apply_pending_config()
+
+        self.assertEqual(strategy.params.take_profit_pct, 0.01)
+        self.assertEqual((strategy.state, strategy.position_qty, strategy.entry_price), ("IN_POSITION", 0.01, 100.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
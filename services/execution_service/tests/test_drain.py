@@ -0,0 +1,167 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, patch
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from drain import FleetDrainer, OrderBatcher, RecoveryQueue
+from ledger_adapter import LedgerAwareAdapter
+
+
+class FakeRunner:
+    """on_stop에서 보유 수량을 시장가 매도하는 러너 (BotRunner.stop/halt와 같은 시그니처)."""
+
+    def __init__(self, bot_id, key_id, symbol, ledger, hang=False):
+        self.bot_config = {"id": bot_id, "name": bot_id, "global_settings": {"exchange": key_id, "symbol": symbol}}
+        self.session_id = f"s-{bot_id}"
+        self.strategy_id = "st-1"
+        self.strategy_instance = None
+        self.ledger = ledger
+        self.hang = hang
+        self.halted = False
+
+    async def stop(self, timeout=15.0, order_batcher=None):
+        if self.hang:
+            await asyncio.sleep(60)
+        self.ledger.order_batcher = order_batcher
+        await self.ledger.place_order(self.bot_config["global_settings"]["exchange"],
+                                      self.bot_config["global_settings"]["symbol"], "sell", 1.0)
+        return True
+
+    async def halt(self, timeout=15.0):
+        if self.hang:
+            return False
+        self.halted = True
+        return True
+
+
+class TestFleetDrainer(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.raw = AsyncMock()
+        self.raw.place_orders.side_effect = lambda key_id, symbol, orders: [
+            {"status": "filled", "id": o["client_order_id"], "details": {}} for o in orders
+        ]
+        self.bot_client = AsyncMock()
+        self.bot_client.create_local_order.side_effect = lambda **kw: {"id": f"lo-{id(kw)}", "status": "PENDING"}
+        self.queue = RecoveryQueue()
+        self.drainer = FleetDrainer(self.raw, self.queue, batch_window_sec=0.01)
+
+    def tearDown(self):
+        self.queue.close()
+
+    def _runners(self, count, **kwargs):
+        runners = {}
+        for i in range(count):
+            key_id = "k1" if i % 2 else "k2"
+            ledger = LedgerAwareAdapter(self.raw, self.bot_client, f"bot-{i}")
+            runners[f"bot-{i}"] = FakeRunner(f"bot-{i}", key_id, "BTC/USDT", ledger, **kwargs)
+        return runners
+
+    async def test_liquidations_batched_per_key_and_symbol(self):
+        report = await self.drainer.drain(self._runners(40), deadline_sec=2.0)
+
+        self.assertEqual(report["stopped"], 40)
+        self.assertEqual(report["unfinished"], [])
+        self.assertEqual(self.raw.place_orders.await_count, 2)  # 키 2개 x 심볼 1개
+        self.raw.place_order.assert_not_awaited()
+        self.assertEqual(report["orders"], {"orders": 40, "batches": 2, "failed": 0})
+        self.assertEqual(self.queue.metrics(), {"pending": 0})
+
+    async def test_deadline_sends_unfinished_runner_to_recovery(self):
+        runners = self._runners(4)
+        runners["bot-slow"] = FakeRunner("bot-slow", "k1", "ETH/USDT",
+                                         LedgerAwareAdapter(self.raw, self.bot_client, "bot-slow"), hang=True)
+
+        report = await self.drainer.drain(runners, deadline_sec=0.2)
+
+        self.assertLess(report["duration_sec"], 1.0)  # 전역 마감 1개 (러너별 누적 아님)
+        self.assertEqual(report["unfinished"], ["bot-slow"])
+        [item] = self.queue.pending()
+        self.assertEqual((item["bot_id"], item["reason"], item["symbol"]), ("bot-slow", "deadline", "ETH/USDT"))
+        self.assertTrue(self.queue.resolve(item["id"]))
+        self.assertFalse(self.queue.resolve(item["id"]))
+        self.assertEqual(self.queue.pending(), [])
+
+    async def test_unfilled_liquidation_recorded(self):
+        self.raw.place_orders.side_effect = lambda key_id, symbol, orders: [
+            {"status": "failed", "error": "insufficient balance"} for _ in orders
+        ]
+        report = await self.drainer.drain(self._runners(2), deadline_sec=2.0)
+
+        self.assertEqual(sorted(report["unfinished"]), ["bot-0", "bot-1"])
+        reasons = {item["reason"] for item in self.queue.pending()}
+        self.assertEqual(reasons, {"liquidation_not_filled"})
+        self.assertEqual(self.queue.pending()[0]["orders"][0]["side"], "sell")
+
+    async def test_halt_mode_stops_without_orders(self):
+        runners = self._runners(3)
+        report = await self.drainer.halt(runners, deadline_sec=1.0)
+
+        self.assertEqual((report["mode"], report["stopped"]), ("resume", 3))
+        self.assertTrue(all(r.halted for r in runners.values()))
+        self.raw.place_orders.assert_not_awaited()
+
+
+class TestOrderBatcher(unittest.IsolatedAsyncioTestCase):
+    async def test_close_releases_unsent_orders(self):
+        client = AsyncMock()
+        batcher = OrderBatcher(client, window_sec=10.0)
+        pending = asyncio.create_task(batcher.submit("bot-1", "k", "BTC/USDT", {"side": "sell", "amount": 1.0}))
+        await asyncio.sleep(0)
+        batcher.close()
+
+        result = await pending
+        self.assertEqual(result["status"], "unknown")
+        client.place_orders.assert_not_awaited()
+        self.assertIn("bot-1", batcher.failed)
+
+
+
+class TestPollDuringDrain(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        import main
+        self.main = main
+        self.started = []
+
+        test = self
+
+        class StartingRunner:
+            """start() 도중 드레인이 시작되는 러너."""
+            def __init__(self, bot, *args, **kwargs):
+                self.bot = bot
+                self.stop = AsyncMock(return_value=True)
+                test.started.append(self)
+
+            async def start(self):
+                await test.main.drain_runners(1.0)
+
+        self.patches = [
+            patch.object(main, "BotRunner", StartingRunner),
+            patch.object(main.bot_client, "get_running_bots", AsyncMock(return_value=[
+                {"id": "bot-1", "name": "b1", "status": "BOOTING"},
+                {"id": "bot-2", "name": "b2", "status": "BOOTING"},
+            ])),
+        ]
+        for p in self.patches:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.main.draining = False
+        self.main.active_runners.clear()
+
+    async def test_runner_started_during_drain_is_stopped(self):
+        await self.main.poll_running_bots()
+
+        self.assertEqual(len(self.started), 1)  # 드레인 이후 다른 봇은 시작하지 않음
+        self.started[0].stop.assert_awaited_once()
+        self.assertEqual(self.main.active_runners, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import unittest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from feature_store import SNAPSHOT_TRADES_LIMIT, FeatureStore
+from strategies.indicators import EMA
+from services.execution_service.tests.test_orderflow_fleet import FakeClock, ReplayAdapter, SYMBOL, _market, _strategy
+
+
+class TestFeatureStore(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.adapter = ReplayAdapter()
+        self.store = FeatureStore(max_age_sec=0.5, history=8, clock=self.clock)
+        self.features = self.store.view(self.adapter, "k1")
+
+    async def test_features_match_direct_computation(self):
+        ema = EMA(alpha=0.3)
+        for now, snapshot in _market(rounds=30):
+            self.clock.now, self.adapter.snapshot = now, snapshot
+            await self.features.refresh(SYMBOL)
+            market = snapshot["symbols"][SYMBOL]
+            spread = market["depth"]["best_ask"] - market["depth"]["best_bid"]
+            ema.update(spread)
+            buy_q = sum(t["price"] * t["amount"] for t in market["trades"]["trades"]
+                        if t["side"] == "buy" and t["timestamp"] >= (now - 10) * 1000)
+
+            self.assertAlmostEqual(self.features.get(SYMBOL, "spread"), spread)
+            self.assertAlmostEqual(self.features.get(SYMBOL, "spread_ema", alpha=0.3), ema.value)
+            self.assertAlmostEqual(self.features.get(SYMBOL, "buy_quote", lookback_sec=10), buy_q)
+
+        history = self.features.history(SYMBOL, "spread_ema", alpha=0.3)
+        self.assertEqual(len(history), 8)  # 링 버퍼 크기만큼만 보관
+        self.assertAlmostEqual(history[-1], ema.value)
+
+    async def test_second_strategy_on_symbol_is_free(self):
+        bots = [_strategy({}), _strategy({"delta_ratio_threshold": 3.0})]
+        context = {"adapter": self.adapter, "clock": self.clock, "features": self.features}
+        market = _market(rounds=5)
+        for now, snapshot in market:
+            self.clock.now, self.adapter.snapshot = now, snapshot
+            for bot in bots:
+                await bot.execute(context)
+
+        metrics = self.store.metrics()
+        self.assertEqual(self.adapter.snapshot_calls, len(market))
+        self.assertEqual(metrics["updates"], len(market))
+        self.assertEqual(metrics["update_reuses"], len(market))
+        # 같은 피처(spread_ema/buy_quote/sell_quote)는 업데이트당 한 번만 계산됨
+        self.assertEqual(metrics["computations"], 3 * len(market))
+        self.assertGreaterEqual(metrics["feature_hit_ratio"], 0.5)
+
+    async def test_invalid_reads(self):
+        with self.assertRaises(LookupError):
+            self.features.get(SYMBOL, "mid")
+        self.clock.now, self.adapter.snapshot = _market(rounds=1)[0]
+        await self.features.refresh(SYMBOL)
+        with self.assertRaises(ValueError):
+            self.features.get(SYMBOL, "vwap")
+        with self.assertRaises(ValueError):
+            self.features.get(SYMBOL, "buy_quote", lookback_sec=600)
+        with self.assertRaises(ValueError):
+            self.features.get(SYMBOL, "spread_ema")
+        self.assertEqual(list(self.features.history(SYMBOL, "mid_change")), [0.0])
+
+    async def test_full_trade_page_drops_cursor(self):
+        sent = []
+
+        class CursorAdapter(ReplayAdapter):
+            async def get_snapshot(self, *args, trades_since=None, **kwargs):
+                sent.append(trades_since)
+                return await super().get_snapshot(*args, **kwargs)
+
+        self.features = self.store.view(CursorAdapter(), "k1")
+        self.adapter = self.features.adapter
+        now, snapshot = _market(rounds=1)[0]
+        trades = [{"id": str(i), "timestamp": int(now * 1000) - 500, "side": "buy", "price": 1.0, "amount": 1.0}
+                  for i in range(SNAPSHOT_TRADES_LIMIT)]
+        snapshot["symbols"][SYMBOL]["trades"] = {"trades": trades, "next_cursor": f"id:{len(trades) - 1}"}
+        for tick in range(2):
+            self.clock.now, self.adapter.snapshot = now + tick, snapshot
+            await self.features.refresh(SYMBOL)
+        self.assertEqual(sent, [None, None])  # 가득 찬 페이지 뒤에는 최신 체결부터 다시 조회
+
+
+if __name__ == '__main__':
+    unittest.main()
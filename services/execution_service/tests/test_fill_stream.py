@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import AsyncMock
+import sys
+import os
+
+# fill_stream.py는 서비스 디렉토리 기준의 flat import를 사용하므로 sys.path에 추가합니다.
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from clock import VirtualClock
+from fill_stream import FillStream
+from ledger_adapter import LedgerAwareAdapter
+
+
+def _fill(tid, order_id="11", status="partially_filled", amount=0.5):
+    return {"id": tid, "order_id": order_id, "client_order_id": None, "order_status": status,
+            "timestamp": 1704067200000, "side": "buy", "price": 100.0, "amount": amount,
+            "cost": 100.0 * amount, "fee": 0.0, "fee_asset": "USDT"}
+
+
+class TestFillStream(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.bot_client = AsyncMock()
+        self.adapter_client = AsyncMock()
+        self.adapter_client.subscribe_user_stream.return_value = {"connected": True}
+        self.clock = VirtualClock(start=1000.0)
+        self.stream = FillStream(self.bot_client, self.adapter_client, clock=self.clock)
+        self.local_order = {"id": "lo-1", "symbol": "BTC/USDT", "side": "BUY"}
+
+    async def test_fill_before_registration_is_buffered(self):
+        await self.stream.handle_event({"key_id": "k", "type": "fills", "fills": [_fill("t1")]})
+        self.bot_client.record_execution.assert_not_awaited()
+
+        await self.stream.register_order("k", "11", self.local_order)
+        self.bot_client.record_execution.assert_awaited_once()
+        payload = self.bot_client.record_execution.await_args.args[0]
+        self.assertEqual(payload["local_order_id"], "lo-1")
+        self.assertEqual(payload["exchange_trade_id"], "t1")
+
+    async def test_duplicate_trade_ignored_and_final_fill_marks_filled(self):
+        await self.stream.register_order("k", "11", self.local_order)
+        event = {"key_id": "k", "type": "fills", "fills": [_fill("t1"), _fill("t2", status="filled")]}
+        await self.stream.handle_event(event)
+        await self.stream.handle_event(event)
+
+        self.assertEqual(self.bot_client.record_execution.await_count, 2)
+        self.bot_client.update_order_status.assert_awaited_once_with("lo-1", "FILLED", exchange_order_id="11")
+
+    async def test_registrations_released_on_terminal_status_and_bounded(self):
+        await self.stream.register_order("k", "11", self.local_order)
+        await self.stream.register_order("k", "12", self.local_order)
+        await self.stream.handle_event({"key_id": "k", "type": "fills", "fills": [
+            _fill("t1", order_id="11", status="canceled"), _fill("t2", order_id="12", status="expired"),
+        ]})
+        self.assertEqual(len(self.stream._orders), 0)
+        self.bot_client.update_order_status.assert_not_awaited()  # 최종 상태는 대사 워커가 확정
+
+        stream = FillStream(self.bot_client, self.adapter_client, clock=self.clock, orders_capacity=2)
+        for oid in ("21", "22", "23"):
+            await stream.register_order("k", oid, self.local_order)
+        self.assertEqual(list(stream._orders), ["22", "23"])
+        stream.forget_order("23")
+        self.assertEqual(list(stream._orders), ["22"])
+
+    async def test_unmatched_fills_expire(self):
+        await self.stream.handle_event({"key_id": "k", "type": "fills", "fills": [_fill("t1", order_id="99")]})
+        self.clock.advance(300)
+        await self.stream.handle_event({"key_id": "k", "type": "fills", "fills": []})
+        await self.stream.register_order("k", "99", self.local_order)
+        self.bot_client.record_execution.assert_not_awaited()
+
+    async def test_ledger_adapter_delegates_commit_when_stream_live(self):
+        await self.stream.ensure_subscribed("k")
+        self.bot_client.create_local_order.return_value = {"id": "lo-1", "status": "PENDING",
+                                                           "symbol": "BTC/USDT", "side": "BUY"}
+        raw = AsyncMock()
+        raw.place_order.return_value = {"status": "open", "order_id": "11", "details": {}}
+        adapter = LedgerAwareAdapter(raw, self.bot_client, "bot-1", fill_stream=self.stream)
+
+        await adapter.place_order("k", "BTC/USDT", "buy", 1.0, order_type="limit", price=100.0)
+        self.bot_client.update_order_status.assert_awaited_once_with("lo-1", "SENT", exchange_order_id="11")
+
+        await self.stream.handle_event({"key_id": "k", "type": "fills", "fills": [_fill("t1", status="filled", amount=1.0)]})
+        self.bot_client.record_execution.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import itertools
+import time
+import unittest
+
+import numpy as np
+
+from services.execution_service.strategies.grid_v1 import BUY, EMPTY, NONE, OPEN, SELL, GridV1Strategy
+
+
+class FakeGridAdapter:
+    """그리드 테스트용 어댑터: 지정가 주문을 메모리에 보관하고 호출 수를 기록합니다."""
+
+    def __init__(self, price=105.0, quote=10_000.0):
+        self.price = price
+        self.quote = quote
+        self.orders = {}
+        self.calls = []
+        self._ids = itertools.count(1)
+        self._ts = itertools.count(int(time.time() * 1000))
+        self.cancel_status = {}  # 주문 ID -> 취소 결과 (기본 canceled)
+
+    async def get_ticker(self, key_id, symbol):
+        self.calls.append("ticker")
+        return {"price": self.price, "limits": {"min_amount": 0.001, "min_notional": 5.0}}
+
+    async def get_balance(self, key_id, fresh=False):
+        self.calls.append("balance")
+        return {"assets": [{"asset": "USDT", "free": self.quote}, {"asset": "BTC", "free": 100.0}]}
+
+    async def place_order(self, key_id, symbol, side, amount, order_type="market", price=None, reason=""):
+        self.calls.append(f"market_{side}")
+        return {"status": "filled", "order_id": "m"}
+
+    async def place_orders(self, key_id, symbol, orders, reason=""):
+        self.calls.append(("batch", len(orders)))
+        results = []
+        for o in orders:
+            oid = str(next(self._ids))
+            self.orders[oid] = {"id": oid, "status": "open", "side": o["side"], "price": o["price"],
+                                "timestamp": next(self._ts)}
+            results.append({"status": "open", "order_id": oid, "local_order_id": f"lo-{oid}"})
+        return results
+
+    async def cancel_orders(self, key_id, symbol, orders):
+        self.calls.append(("cancel", len(orders)))
+        results = []
+        for oid, _ in orders:
+            status = self.cancel_status.get(oid, "canceled")
+            if status == "canceled":
+                self.orders[oid]["status"] = "canceled"
+            results.append({"order_id": oid, "status": status})
+        return results
+
+    async def get_account_orders(self, key_id, symbol, since=None, limit=500, include_trades=True):
+        """거래소처럼 since 이후 오래된 순으로 limit건만 반환합니다."""
+        self.calls.append("account_orders" if include_trades else "orders_only")
+        page = sorted((o for o in self.orders.values() if o["timestamp"] >= (since or 0)),
+                      key=lambda o: o["timestamp"])[:limit]
+        return {"orders": page, "trades": [],
+                "next_since": page[-1]["timestamp"] if len(page) >= limit else None}
+
+    def add_foreign_orders(self, count):
+        """다른 봇/수동 주문 (그리드가 추적하지 않음)."""
+        for _ in range(count):
+            oid = f"x{next(self._ids)}"
+            self.orders[oid] = {"id": oid, "status": "canceled", "side": "buy", "price": 1.0,
+                                "timestamp": next(self._ts)}
+
+    def move_to(self, price):
+        """price까지 움직이며 지나친 지정가 주문을 체결시킵니다."""
+        lo, hi = sorted((self.price, price))
+        for o in self.orders.values():
+            if o["status"] == "open" and lo <= o["price"] <= hi:
+                o["status"] = "closed"
+        self.price = price
+
+
+def _config(count=11, lower=100.0, upper=110.0):
+    return {
+        "name": "grid",
+        "global_settings": {"symbol": "BTC/USDT", "exchange": "k1"},
+        "pipeline": {"strategy": {"id": "grid_v1", "params": {
+            "lower_price": lower, "upper_price": upper, "grid_count": count}}},
+    }
+
+
+class TestGridV1Strategy(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.adapter = FakeGridAdapter(price=105.5)
+        self.grid = GridV1Strategy(_config())
+        self.context = {"adapter": self.adapter}
+        await self.grid.execute(self.context)
+
+    async def test_start_places_all_levels_in_one_batch(self):
+        self.assertEqual(self.grid.state, "RUNNING")
+        self.assertIn(("batch", 10), self.adapter.calls)
+        # 현재가에 가장 가까운 레벨(105)은 비워 둠
+        self.assertEqual(self.grid.sides.tolist(), [BUY] * 5 + [NONE] + [SELL] * 5)
+        self.assertEqual(int((self.grid.status == OPEN).sum()), 10)
+
+    async def test_crossed_levels_by_binary_search(self):
+        self.assertEqual(self.grid.crossed_levels(105.5, 102.5).tolist(), [3, 4, 5])
+        self.assertEqual(self.grid.crossed_levels(107.0, 107.0).tolist(), [7])
+        self.assertEqual(self.grid.crossed_levels(105.2, 105.8).tolist(), [])
+
+    async def test_fill_places_counter_order(self):
+        self.adapter.calls.clear()
+        await self.grid.execute(self.context)
+        # 교차한 레벨이 없으면 시세 조회만
+        self.assertEqual(self.adapter.calls, ["ticker"])
+
+        self.adapter.calls.clear()
+        self.adapter.move_to(102.5)  # 104, 103 매수 체결
+        await self.grid.execute(self.context)
+        self.assertEqual(self.adapter.calls, ["ticker", "orders_only", ("batch", 2)])
+        self.assertEqual(self.grid.sides[2:7].tolist(), [BUY, NONE, SELL, SELL, SELL])
+        self.assertEqual(self.grid.status[3], EMPTY)
+        self.assertAlmostEqual(self.grid.inventory, self.grid.qty * 7)
+
+    async def test_fills_found_past_first_page(self):
+        self.adapter.add_foreign_orders(1200)
+        self.adapter.move_to(102.5)
+        await self.grid.execute(self.context)  # 104, 103 체결 -> 105, 104에 매도 (다른 주문 1200건 뒤에 접수)
+        self.adapter.calls.clear()
+        self.adapter.move_to(104.6)  # 새 매도(104) 체결: 첫 페이지(500건)에 없음
+        await self.grid.execute(self.context)
+
+        self.assertEqual(self.adapter.calls.count("orders_only"), 3)
+        self.assertNotIn("account_orders", self.adapter.calls)
+        self.assertEqual(self.grid.status[4], EMPTY)
+        self.assertEqual(self.grid.sides[3], BUY)
+        self.assertAlmostEqual(self.grid.inventory, self.grid.qty * 6)
+
+    async def test_layout_change_cancels_and_rebuilds(self):
+        self.grid.on_config_change(_config(count=5), {"grid_count"})
+        self.adapter.calls.clear()
+        await self.grid.execute(self.context)
+        self.assertEqual(self.adapter.calls[1], ("cancel", 10))
+        self.assertIn(("batch", 4), self.adapter.calls)  # 100, 102.5, 107.5, 110 (105는 비움)
+        self.assertEqual(len(self.grid.levels), 5)
+
+    async def test_rebuild_waits_for_unconfirmed_cancels(self):
+        buy_id, sell_id = self.grid.order_ids[4], self.grid.order_ids[6]
+        self.adapter.orders[buy_id]["status"] = "closed"  # 취소 전에 체결됨
+        self.adapter.cancel_status = {buy_id: "not_found", sell_id: "failed"}
+        self.grid.on_config_change(_config(count=5), {"grid_count"})
+        await self.grid.execute(self.context)
+
+        # 체결된 매수는 재고에 반영, 취소 실패한 매도는 OPEN으로 남고 재배치는 보류
+        self.assertAlmostEqual(self.grid.inventory, self.grid.qty * 6)
+        self.assertEqual(len(self.grid.levels), 11)
+        self.assertEqual(np.flatnonzero(self.grid.status == OPEN).tolist(), [6])
+        self.assertEqual(self.grid.order_ids[6], sell_id)
+
+        self.adapter.cancel_status = {}
+        self.adapter.calls.clear()
+        await self.grid.execute(self.context)
+        self.assertEqual(self.adapter.calls[1], ("cancel", 1))
+        self.assertEqual(len(self.grid.levels), 5)
+
+    async def test_stop_cancels_and_liquidates_inventory(self):
+        self.adapter.calls.clear()
+        await self.grid.on_stop(self.context)
+        self.assertEqual(self.adapter.calls, [("cancel", 10), "balance", "market_sell"])
+        self.assertEqual(self.grid.inventory, 0.0)
+
+    async def test_checkpoint_round_trip(self):
+        restored = GridV1Strategy(_config())
+        restored.restore_state(self.grid.snapshot_state())
+        self.assertEqual(restored.order_ids.tolist(), self.grid.order_ids.tolist())
+        self.assertEqual((restored.state, restored.qty), ("RUNNING", self.grid.qty))
+
+    def test_missing_bounds_rejected(self):
+        config = _config()
+        del config["pipeline"]["strategy"]["params"]["upper_price"]
+        with self.assertRaises(ValueError):
+            GridV1Strategy(config)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import math
+import unittest
+
+import numpy as np
+
+from services.execution_service.strategies.indicators import ATR, EMA, RSI, VWAP, Bollinger, RollingZScore
+
+
+def _prices(n=300, seed=7):
+    rng = np.random.default_rng(seed)
+    return 100.0 + np.cumsum(rng.normal(0.0, 0.5, n))
+
+
+class TestIndicators(unittest.TestCase):
+    def assertClose(self, a, b, places=7):
+        if isinstance(a, tuple):
+            for x, y in zip(a, b):
+                self.assertAlmostEqual(x, y, places=places)
+        else:
+            self.assertAlmostEqual(a, b, places=places)
+
+    def _check_warm_up_matches_streaming(self, make, rows):
+        """배열 워밍업 후 이어서 update한 결과 == 처음부터 하나씩 update한 결과."""
+        streamed, warmed = make(), make()
+        for row in rows:
+            expected = streamed.update(*row)
+        split = len(rows) * 2 // 3
+        warmed.warm_up(*[np.array(col) for col in zip(*rows[:split])])
+        for row in rows[split:]:
+            got = warmed.update(*row)
+        self.assertClose(got, expected)
+
+    def test_ema(self):
+        prices = _prices()
+        ema = EMA(period=10)
+        for p in prices:
+            ema.update(p)
+        ref = prices[0]
+        for p in prices[1:]:
+            ref += (2 / 11) * (p - ref)
+        self.assertClose(ema.value, ref)
+        self._check_warm_up_matches_streaming(lambda: EMA(period=10), [(p,) for p in prices])
+        with self.assertRaises(ValueError):
+            EMA()
+
+    def test_wilder_rsi(self):
+        prices = _prices()
+        period = 14
+        changes = np.diff(prices)
+        gains, losses = np.clip(changes, 0, None), np.clip(-changes, 0, None)
+        avg_gain, avg_loss = gains[:period].mean(), losses[:period].mean()
+        for g, l in zip(gains[period:], losses[period:]):
+            avg_gain = (avg_gain * (period - 1) + g) / period
+            avg_loss = (avg_loss * (period - 1) + l) / period
+
+        rsi = RSI(period)
+        values = [rsi.update(p) for p in prices]
+        self.assertIsNone(values[period - 1])
+        self.assertIsNotNone(values[period])
+        self.assertClose(values[-1], 100 - 100 / (1 + avg_gain / avg_loss))
+        self._check_warm_up_matches_streaming(lambda: RSI(period), [(p,) for p in prices])
+
+        flat = RSI(3)
+        flat.warm_up([1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(flat.value, 100.0)
+
+    def test_bollinger_and_zscore(self):
+        prices = _prices(1000)
+        bands = Bollinger(20, 2.0)
+        z = RollingZScore(20)
+        for p in prices:
+            bands.update(p)
+            z.update(p)
+        window = prices[-20:]
+        self.assertClose(bands.value, (window.mean(), window.mean() + 2 * window.std(), window.mean() - 2 * window.std()))
+        self.assertClose(z.value, (prices[-1] - window.mean()) / window.std())
+        self.assertGreater(bands.value.width, 0.0)
+
+        self._check_warm_up_matches_streaming(lambda: Bollinger(20), [(p,) for p in prices])
+        self._check_warm_up_matches_streaming(lambda: RollingZScore(20), [(p,) for p in prices])
+        self.assertIsNone(RollingZScore(5).warm_up([1.0, 2.0]))
+
+    def test_atr(self):
+        closes = _prices()
+        highs, lows = closes + 0.7, closes - 0.6
+        rows = list(zip(highs, lows, closes))
+        atr = ATR(14)
+        for row in rows:
+            atr.update(*row)
+        tr = [highs[0] - lows[0]] + [
+            max(h - l, abs(h - pc), abs(l - pc)) for h, l, pc in zip(highs[1:], lows[1:], closes[:-1])
+        ]
+        ref = float(np.mean(tr[:14]))
+        for x in tr[14:]:
+            ref = (ref * 13 + x) / 14
+        self.assertClose(atr.value, ref)
+        self._check_warm_up_matches_streaming(lambda: ATR(14), rows)
+
+    def test_vwap(self):
+        prices, volumes = _prices(50), np.linspace(1.0, 2.0, 50)
+        vwap = VWAP()
+        self.assertIsNone(vwap.value)
+        vwap.warm_up(prices[:30], volumes[:30])
+        for p, v in zip(prices[30:], volumes[30:]):
+            vwap.update(p, v)
+        self.assertClose(vwap.value, float(np.dot(prices, volumes) / volumes.sum()))
+        vwap.reset()
+        self.assertFalse(vwap.ready)
+
+    def test_ema_warm_up_handles_long_history(self):
+        ema = EMA(alpha=0.01)
+        ema.warm_up(np.full(100_000, 5.0))
+        self.assertTrue(math.isclose(ema.value, 5.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import AsyncMock
+import sys
+import os
+
+# ledger_adapter.py는 서비스 디렉토리 기준의 flat import를 사용하므로 sys.path에 추가합니다.
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from ledger_adapter import LedgerAwareAdapter
+
+
+class TestLedgerOrderRecovery(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.bot_client = AsyncMock()
+        self.bot_client.create_local_order.return_value = {"id": "lo-1", "status": "PENDING"}
+        self.raw = AsyncMock()
+        self.ledger = LedgerAwareAdapter(self.raw, self.bot_client, "bot-1")
+
+    async def test_local_order_id_is_client_order_id(self):
+        self.raw.place_order.return_value = {"status": "open", "order_id": "11", "details": {}}
+        await self.ledger.place_order("k", "BTC/USDT", "buy", 1.0)
+        self.assertEqual(self.raw.place_order.await_args.kwargs["client_order_id"], "lo-1")
+
+    async def test_unknown_outcome_recovered_by_client_id(self):
+        self.raw.place_order.return_value = {"status": "unknown", "client_order_id": "lo-1", "error": "timeout"}
+        self.raw.get_order_by_client_id.return_value = {
+            "status": "filled", "order_id": "11",
+            "details": {"info": {"fills": [{"price": "100", "qty": "1", "tradeId": 5, "commission": "0"}]}},
+        }
+        await self.ledger.place_order("k", "BTC/USDT", "buy", 1.0)
+
+        self.raw.get_order_by_client_id.assert_awaited_once_with("k", "BTC/USDT", "lo-1")
+        self.bot_client.record_execution.assert_awaited_once()
+        self.bot_client.update_order_status.assert_awaited_once_with("lo-1", "FILLED")
+
+    async def test_unknown_outcome_left_for_reconciler(self):
+        self.raw.place_order.return_value = {"status": "unknown", "client_order_id": "lo-1", "error": "timeout"}
+        self.raw.get_order_by_client_id.return_value = None
+        await self.ledger.place_order("k", "BTC/USDT", "buy", 1.0)
+
+        # FAILED가 아니라 SENT로 남아 대사 워커가 clientOrderId로 확정합니다.
+        self.bot_client.update_order_status.assert_awaited_once_with("lo-1", "SENT", exchange_order_id=None)
+
+    async def test_session_id_stamped_on_prepare(self):
+        ledger = LedgerAwareAdapter(self.raw, self.bot_client, "bot-1", session_id="sess-1")
+        self.raw.place_order.return_value = {"status": "open", "order_id": "11", "details": {}}
+        await ledger.place_order("k", "BTC/USDT", "buy", 1.0)
+        self.assertEqual(self.bot_client.create_local_order.await_args.kwargs["session_id"], "sess-1")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import AsyncMock
+
+# ledger_outbox.py는 서비스 디렉토리 기준의 flat import를 사용하므로 sys.path에 추가합니다.
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from ledger_adapter import LedgerAwareAdapter
+from ledger_outbox import LedgerOutbox
+from order_ids import uuid7
+
+
+class TestOrderIds(unittest.TestCase):
+    def test_uuid7_is_time_ordered_and_unique(self):
+        ids = [uuid7(1_700_000_000.0) for _ in range(1000)] + [uuid7(1_700_000_001.0)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(all(len(i) == 36 and i[14] == "7" for i in ids))
+
+
+def _label(op):
+    payload = op["payload"]
+    if op["op"] == "create_local_order":
+        return ("prepare", payload["id"])
+    if op["op"] == "update_order_status":
+        return ("status", payload["status"])
+    return ("exec", payload["exchange_trade_id"])
+
+
+class TestLedgerOutbox(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.calls = []
+        self.batches = []
+        self.bot_client = AsyncMock()
+        self.bot_client.apply_ledger_batch.side_effect = self._apply
+        self.outbox = LedgerOutbox(self.bot_client, retry_backoff=(0.001, 0.001))
+
+    def _apply(self, ops):
+        self.batches.append(len(ops))
+        self.calls.extend(_label(op) for op in ops)
+        return {"applied": len(ops), "error": None}
+
+    async def asyncTearDown(self):
+        await self.outbox.close(timeout=1.0)
+
+    async def test_delivers_in_order(self):
+        order = await self.outbox.create_local_order("bot-1", "BTC/USDT", "BUY", 1.0, "test", None, order_id="o-1")
+        self.assertEqual(order["status"], "PENDING")
+        await self.outbox.record_execution({"exchange_trade_id": "t1", "local_order_id": "o-1"})
+        await self.outbox.update_order_status("o-1", "FILLED")
+
+        self.assertTrue(await self.outbox.flush(timeout=1.0))
+        self.assertEqual(self.calls, [("prepare", "o-1"), ("exec", "t1"), ("status", "FILLED")])
+        self.assertEqual(self.outbox.metrics()["delivered_total"], 3)
+
+    async def test_concurrent_appends_share_one_fsync(self):
+        await asyncio.gather(*[
+            self.outbox.update_order_status(f"o-{i}", "SENT") for i in range(50)
+        ])
+        self.assertEqual(self.outbox.metrics()["fsync_batches_total"], 1)
+        self.assertTrue(await self.outbox.flush(timeout=1.0))
+        self.assertEqual(len(self.calls), 50)
+
+    async def test_partial_batch_resumes_from_first_unapplied(self):
+        script = [None, {"applied": 1, "error": {"index": 1, "status_code": 503, "detail": "busy"}}]
+
+        def flaky(ops):
+            if not script:
+                return self._apply(ops)
+            self.batches.append(len(ops))
+            return script.pop(0)
+
+        self.bot_client.apply_ledger_batch.side_effect = flaky
+        await asyncio.gather(
+            self.outbox.create_local_order("bot-1", "BTC/USDT", "BUY", 1.0, "test", None, order_id="o-1"),
+            self.outbox.update_order_status("o-1", "SENT"),
+        )
+
+        self.assertTrue(await self.outbox.flush(timeout=1.0))
+        # 1회차: 전송 실패, 2회차: PREPARE만 반영, 3회차: SENT부터 재전달
+        self.assertEqual(self.batches, [2, 2, 1])
+        self.assertEqual(self.calls, [("status", "SENT")])
+        self.assertEqual(self.outbox.metrics()["retries_total"], 2)
+
+    async def test_permanent_error_moves_op_to_dead_letters(self):
+        def reject_first(ops):
+            if _label(ops[0]) == ("status", "SENT"):
+                self.batches.append(len(ops))
+                return {"applied": 0, "error": {"index": 0, "status_code": 404, "detail": "Local Order not found"}}
+            return self._apply(ops)
+
+        self.bot_client.apply_ledger_batch.side_effect = reject_first
+        await self.outbox.update_order_status("ghost", "SENT")
+        await self.outbox.update_order_status("o-1", "FILLED")
+
+        self.assertTrue(await self.outbox.flush(timeout=1.0))
+        self.assertEqual(self.calls, [("status", "FILLED")])
+        dead = self.outbox.dead_letters()
+        self.assertEqual([d["payload"]["local_order_id"] for d in dead], ["ghost"])
+        self.assertEqual(dead[0]["error"]["status_code"], 404)
+
+    async def test_pending_entries_survive_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "outbox.db")
+            offline = AsyncMock()
+            offline.apply_ledger_batch.return_value = None  # BotService 다운
+            first = LedgerOutbox(offline, db_path=path, retry_backoff=(0.001, 0.001))
+            await first.create_local_order("bot-1", "BTC/USDT", "BUY", 1.0, "test", None, order_id="o-1")
+            self.assertFalse(await first.flush(timeout=0.05))
+            await first.close(timeout=0.01)
+
+            second = LedgerOutbox(self.bot_client, db_path=path)
+            second.start()
+            self.assertTrue(await second.flush(timeout=1.0))
+            self.assertEqual(self.calls, [("prepare", "o-1")])
+            await second.close()
+
+            # 전달 위치(delivered_seq)도 저장되므로 다시 열어도 재전달하지 않음
+            third = LedgerOutbox(self.bot_client, db_path=path)
+            self.assertEqual(third.pending(), 0)
+            await third.close()
+
+    async def test_place_order_does_not_wait_for_bot_service(self):
+        prepared = asyncio.Event()
+
+        async def slow_batch(ops):
+            await prepared.wait()
+            return self._apply(ops)
+
+        self.bot_client.apply_ledger_batch.side_effect = slow_batch
+        raw = AsyncMock()
+        raw.place_order.return_value = {"status": "open", "order_id": "11", "details": {}}
+        adapter = LedgerAwareAdapter(raw, self.bot_client, "bot-1", outbox=self.outbox)
+
+        await adapter.place_order("k", "BTC/USDT", "buy", 1.0)
+
+        # BotService가 PREPARE에 응답하기 전에 거래소 주문이 이미 전송됨
+        client_order_id = raw.place_order.await_args.kwargs["client_order_id"]
+        self.assertEqual(self.outbox.pending(), 2)
+        self.assertEqual(self.calls, [])
+
+        prepared.set()
+        self.assertTrue(await self.outbox.flush(timeout=1.0))
+        self.assertEqual(self.calls, [("prepare", client_order_id), ("status", "SENT")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import random
+import unittest
+
+from services.execution_service.strategies.orderflow_exhaustion_v1 import OrderflowExhaustionV1Strategy
+from services.execution_service.strategies.orderflow_fleet import OrderflowFleet, _SymbolGroup
+
+SYMBOL = "BTC/USDT"
+
+
+class FakeClock:
+    def __init__(self, now=1_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class ReplayAdapter:
+    """현재 라운드의 스냅샷을 돌려주는 어댑터. 주문은 항상 체결됩니다."""
+
+    def __init__(self):
+        self.snapshot = None
+        self.snapshot_calls = 0
+        self.orders = []
+
+    async def get_snapshot(self, key_id, symbols, components=None, depth_limit=50, trades_limit=100,
+                           depth_mode="full", trades_since=None):
+        self.snapshot_calls += 1
+        return self.snapshot
+
+    async def get_balance(self, key_id, fresh=False):
+        return {"assets": [{"asset": "USDT", "free": 10_000.0}, {"asset": "BTC", "free": 10.0}]}
+
+    async def place_order(self, key_id, symbol, side, amount, order_type="market", price=None, reason=""):
+        self.orders.append((side, amount))
+        return {"status": "filled"}
+
+
+def _market(rounds=120, seed=11):
+    """스윕(스프레드 확대 + 한쪽 체결 폭주) 후 되돌림이 반복되는 시장 스냅샷 시퀀스."""
+    rng = random.Random(seed)
+    mid, trades, out = 100.0, [], []
+    for r in range(rounds):
+        now = 1_000.0 + r
+        burst = rng.random() < 0.25
+        side = rng.choice(["buy", "sell"])
+        spread = rng.uniform(0.3, 0.8) if burst else rng.uniform(0.05, 0.15)
+        mid *= 1 + (rng.uniform(0.001, 0.004) * (1 if side == "buy" else -1) if burst else rng.uniform(-0.0008, 0.0008))
+        for i in range(rng.randint(1, 6)):
+            s = side if burst or rng.random() < 0.5 else rng.choice(["buy", "sell"])
+            trades.append({"id": f"{r}-{i}", "timestamp": int(now * 1000) - rng.randint(0, 900),
+                           "side": s, "price": mid, "amount": rng.uniform(0.05, 1.5) * (4 if burst else 1)})
+        trades = [t for t in trades if t["timestamp"] >= (now - 60) * 1000]
+        out.append((now, {"symbols": {SYMBOL: {
+            "ticker": {"price": mid, "limits": {"min_amount": 0.0001}},
+            "depth": {"best_bid": mid - spread / 2, "best_ask": mid + spread / 2},
+            "trades": {"trades": list(trades), "next_cursor": None},
+        }}}))
+    return out
+
+
+def _variants(n, seed=5):
+    rng = random.Random(seed)
+    return [{
+        "trades_lookback_sec": rng.randint(3, 20),
+        "delta_ratio_threshold": rng.uniform(1.2, 4.0),
+        "min_total_quote_volume": rng.uniform(0.0, 150.0),
+        "spread_expand_ratio_threshold": rng.uniform(1.0, 2.5),
+        "sweep_move_pct_threshold": rng.uniform(0.0, 0.003),
+        "confirm_absorption_ticks": rng.randint(1, 3),
+        "spread_ema_alpha": rng.uniform(0.1, 0.6),
+        "spread_normalized_max_ratio": rng.uniform(1.0, 2.0),
+        "take_profit_pct": rng.uniform(0.001, 0.005),
+        "time_stop_sec": rng.randint(10, 30),
+        "cooldown_sec": rng.randint(0, 5),
+    } for _ in range(n)]
+
+
+def _strategy(params, key="k1"):
+    return OrderflowExhaustionV1Strategy({
+        "name": "fleet-bot",
+        "global_settings": {"symbol": SYMBOL, "exchange": key},
+        "pipeline": {"strategy": {"id": "orderflow_exhaustion_v1", "params": params}},
+    })
+
+
+class TestOrderflowFleet(unittest.IsolatedAsyncioTestCase):
+    FIELDS = ("state", "last_signal_side", "absorption_count", "position_side", "position_qty", "entry_price")
+    FLOATS = ("last_mid", "spread_ema", "sweep_high", "sweep_low", "cooldown_until", "stop_price")
+
+    async def test_batch_matches_individual_evaluation(self):
+        variants = _variants(60)
+        solo = [_strategy(p) for p in variants]
+        batched = [_strategy(p) for p in variants]
+        clock, fleet = FakeClock(), OrderflowFleet(max_age_sec=0.0)
+        solo_adapter, fleet_adapter = ReplayAdapter(), ReplayAdapter()
+        solo_ctx = {"adapter": solo_adapter, "clock": clock}
+        fleet_ctx = {"adapter": fleet_adapter, "clock": clock, "orderflow_fleet": fleet}
+        for bot in batched:
+            fleet.sync(bot)
+
+        for now, snapshot in _market():
+            clock.now = now
+            solo_adapter.snapshot = fleet_adapter.snapshot = snapshot
+            for a in solo:
+                await a.execute(solo_ctx)
+            # 같은 업데이트에서 청산된 봇이 곧바로 다시 평가되지 않도록 신호 평가 봇부터 실행
+            # (개별 실행은 청산 다음 틱부터 평가하므로 순서를 맞춤)
+            for b in sorted(batched, key=lambda bot: bot.state == "IN_POSITION"):
+                await b.execute(fleet_ctx)
+            for a, b in zip(solo, batched):
+                for name in self.FIELDS:
+                    self.assertEqual(getattr(a, name), getattr(b, name), (now, name))
+                for name in self.FLOATS:
+                    x, y = getattr(a, name), getattr(b, name)
+                    if x is None or y is None:
+                        self.assertEqual(x, y, (now, name))
+                    else:
+                        self.assertAlmostEqual(x, y, places=9, msg=(now, name))
+
+        self.assertGreater(len(solo_adapter.orders), 10)  # 시나리오가 실제로 진입/청산을 만들었는지
+        self.assertEqual(sorted(solo_adapter.orders), sorted(fleet_adapter.orders))
+
+    async def test_one_snapshot_per_update_regardless_of_fleet_size(self):
+        clock, fleet, adapter = FakeClock(), OrderflowFleet(max_age_sec=0.5), ReplayAdapter()
+        bots = [_strategy(p) for p in _variants(1000)]
+        context = {"adapter": adapter, "clock": clock, "orderflow_fleet": fleet}
+        for bot in bots:
+            fleet.sync(bot)
+        market = _market(rounds=3)
+        for now, snapshot in market:
+            clock.now, adapter.snapshot = now, snapshot
+            for bot in bots:
+                if bot.state != "IN_POSITION":
+                    await bot.execute(context)
+        self.assertEqual(adapter.snapshot_calls, len(market))
+        self.assertEqual(fleet.metrics()["groups"], 1)
+        self.assertEqual(fleet.metrics()["market_updates"], len(market))
+
+    async def test_groups_and_slot_reuse(self):
+        clock, fleet, adapter = FakeClock(), OrderflowFleet(), ReplayAdapter()
+        adapter.snapshot = _market(rounds=1)[0][1]
+        a, b, c = _strategy({}), _strategy({}, key="k2"), _strategy({})
+        for bot in (a, b, c):
+            await bot.execute({"adapter": adapter, "clock": clock, "orderflow_fleet": fleet})
+        self.assertEqual(fleet.metrics()["groups"], 2)
+
+        await b.on_stop({"adapter": adapter, "clock": clock})
+        self.assertEqual(fleet.metrics(), {**fleet.metrics(), "groups": 1, "bots": 2})
+
+        # 파라미터 변경은 슬롯에 바로 반영됨
+        a.on_config_change({**a.config, "pipeline": {"strategy": {
+            "id": "orderflow_exhaustion_v1", "params": {"delta_ratio_threshold": 7.0}}}}, {"delta_ratio_threshold"})
+        group, slot = fleet._slots[a]
+        self.assertEqual(group.delta_ratio_threshold[slot], 7.0)
+
+    def test_busy_symbol_cursor_resets_instead_of_lagging(self):
+        """틱당 체결이 trades_limit보다 많으면 공유 커서를 버리고 다음 틱은 최신 체결부터 받습니다."""
+        group, limit, now = _SymbolGroup("k1", SYMBOL), 200, 1_000.0
+        exchange_trades = [{"id": str(i), "timestamp": 990_000 + i * 5, "side": "buy", "price": 1.0, "amount": 1.0}
+                           for i in range(3 * limit)]
+        group.trades_cursor = "id:0"
+        oldest_after_cursor = exchange_trades[1:limit + 1]  # fromId: 커서 이후 가장 오래된 limit건
+        group._merge_trades({"trades": oldest_after_cursor, "next_cursor": f"id:{limit}"}, now, 10.0, limit)
+        self.assertIsNone(group.trades_cursor)
+
+        group._merge_trades({"trades": exchange_trades[-limit:], "next_cursor": "id:599"}, now, 10.0, limit)
+        self.assertEqual(group.trade_window[-1]["id"], exchange_trades[-1]["id"])
+        self.assertEqual(len(group.trade_window), limit)  # 커서 없이 받은 최신 목록으로 윈도우 교체
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -31,12 +31,73 @@ class TestOrderflowExhaustionV1Strategy(unittest.IsolatedAsyncioTestCase):
     async def test_execute_no_data(self):
         # Setup mocks to return None
         self.mock_adapter.get_ticker.return_value = None
+        self.mock_adapter.get_snapshot.return_value = None
         
         await self.strategy.execute(self.context)
         
         # Should remain FLAT
         self.assertEqual(self.strategy.state, "FLAT")
 
+    async def test_execute_uses_single_snapshot(self):
+        self.mock_adapter.get_snapshot.return_value = {
+            "timestamp": 0,
+            "symbols": {
+                "BTC/USDT": {
+                    "ticker": {"price": 100.0, "limits": {}},
+                    "depth": {"best_bid": 99.9, "best_ask": 100.1, "bids": [], "asks": []},
+                    "trades": {"trades": []},
+                }
+            },
+        }
+
+        await self.strategy.execute(self.context)
+
+        self.mock_adapter.get_snapshot.assert_awaited_once()
+        self.mock_adapter.get_ticker.assert_not_called()
+        self.mock_adapter.get_depth.assert_not_called()
+        self.mock_adapter.get_trades.assert_not_called()
+        self.assertAlmostEqual(self.strategy.spread_ema, 0.2)
+
+    async def test_trade_cursor_window(self):
+        now = 1_000.0
+        first = self.strategy._merge_trades(
+            {"trades": [{"id": "1", "timestamp": 985_000}, {"id": "2", "timestamp": 995_000}], "next_cursor": "id:2"},
+            now,
+        )
+        # lookback(10s) 밖의 체결은 버려집니다.
+        self.assertEqual([t["id"] for t in first["trades"]], ["2"])
+        self.assertEqual(self.strategy._trades_cursor, "id:2")
+
+        second = self.strategy._merge_trades(
+            {"trades": [{"id": "3", "timestamp": 999_000}], "next_cursor": "id:3"}, now
+        )
+        self.assertEqual([t["id"] for t in second["trades"]], ["2", "3"])
+
+    async def test_busy_symbol_cursor_resets_instead_of_lagging(self):
+        """틱당 체결이 trades_limit보다 많으면 커서를 버리고 다음 틱은 최신 체결부터 받습니다."""
+        limit = self.strategy.params.trades_limit
+        exchange_trades = [{"id": str(i), "timestamp": 990_000 + i * 5, "side": "buy", "price": 1.0, "amount": 1.0}
+                           for i in range(3 * limit)]  # 10초(990~1000초) 동안 limit의 3배
+
+        def fetch(since):
+            if since is None:  # 최신 limit건
+                page = exchange_trades[-limit:]
+            else:  # fromId: 커서 이후 가장 오래된 limit건
+                after = int(since.split(":")[1])
+                page = [t for t in exchange_trades if int(t["id"]) > after][:limit]
+            return {"trades": page, "next_cursor": f"id:{page[-1]['id']}" if page else since}
+
+        now = 1_000.0
+        self.strategy._merge_trades(fetch(None), now)
+        self.assertEqual(self.strategy._trades_cursor, None)  # 가득 찬 페이지 -> 커서 사용 안 함
+        window = self.strategy._merge_trades(fetch(self.strategy._trades_cursor), now)["trades"]
+        self.assertEqual(window[-1]["id"], exchange_trades[-1]["id"])  # 항상 최신 체결까지 포함
+
+        # 커서가 lookback보다 뒤처진 경우(가장 최근 체결도 윈도우 밖)에도 초기화
+        self.strategy._trades_cursor = "id:0"
+        self.strategy._merge_trades({"trades": [{"id": "1", "timestamp": 900_000}], "next_cursor": "id:1"}, now)
+        self.assertIsNone(self.strategy._trades_cursor)
+
     async def test_on_stop_liquidation(self):
         # Simulate being IN_POSITION (LONG)
         self.strategy.state = "IN_POSITION"
@@ -0,0 +1,146 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from pipeline import PipelineGraph
+from strategies.indicators import EMA
+
+MIN = 60_000
+
+
+class FakeCandleAdapter:
+    """분당 봉을 돌려주는 어댑터. now_ms 이전에 시작한 봉만 (진행 중인 봉 포함) 반환합니다."""
+
+    def __init__(self, closes):
+        self.closes = closes
+        self.now_ms = 0
+        self.calls = []
+
+    async def get_candles(self, key_id, symbol, timeframe="1m", since=None, limit=500):
+        self.calls.append((key_id, symbol, timeframe, since))
+        rows = [[i * MIN, c, c + 1, c - 1, c, 1.0] for i, c in enumerate(self.closes) if i * MIN <= self.now_ms]
+        if since is not None:
+            rows = [r for r in rows if r[0] >= since]
+        return {"candles": rows[-limit:]}
+
+
+def _bot(name, fast_id="fast", schedule="ON_CANDLE_CLOSE", key="k1", symbol="BTC/USDT"):
+    return {
+        "name": name,
+        "global_settings": {"exchange": key, "symbol": symbol},
+        "pipeline": {
+            "data_source": {"frame": "1m"},
+            "indicators": [
+                {"id": fast_id, "type": "EMA", "params": {"period": 3}},
+                {"id": "slow", "type": "ema", "params": {"period": 8}},
+                {"id": "bb", "type": "BOLLINGER", "params": {"period": 5}},
+            ],
+            "triggers": {"schedule": schedule, "conditions": [
+                {"left": fast_id, "op": ">", "right": "slow"},
+                {"left": "close", "op": "<=", "right": "bb.upper"},
+            ]},
+            "risk_management": {"stop_loss": 0.05},
+            "strategy": {"id": "test_trading_v1"},
+        },
+    }
+
+
+class TestPipelineGraph(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.closes = list(100 + np.cumsum(np.random.default_rng(3).normal(0, 1, 60)))
+        self.adapter = FakeCandleAdapter(self.closes)
+        self.graph = PipelineGraph()
+
+    async def _at(self, minute, pipelines, second=5):
+        """minute분 second초 시점에 모든 봇 틱 실행 -> 발화 여부 목록."""
+        self.adapter.now_ms = minute * MIN + second * 1000
+        return [await p.should_run(self.adapter, self.adapter.now_ms / 1000) for p in pipelines]
+
+    async def test_identical_nodes_are_shared_across_bots(self):
+        a = self.graph.compile(_bot("a"))
+        b = self.graph.compile(_bot("b", fast_id="quick"))  # 지표 id만 다르고 정의는 같음
+        c = self.graph.compile(_bot("c", symbol="ETH/USDT"))
+        # 봇당 소스 1 + 지표 3 + 필드 2 + 조건 2 = 8 노드, a/b는 전부 공유
+        self.assertEqual(self.graph.metrics()["nodes"], 16)
+        self.assertEqual(self.graph.metrics()["sources"], 2)
+
+        await self._at(20, [a, b, c])
+        self.assertEqual(len(self.adapter.calls), 2)  # 심볼당 1회
+        self.assertEqual(a.values()["fast"], b.values()["quick"])
+
+        self.graph.release(c)
+        self.assertEqual(self.graph.metrics()["nodes"], 8)
+        self.graph.release(a)
+        self.assertEqual(self.graph.metrics()["nodes"], 8)  # b가 아직 사용 중
+        self.graph.release(b)
+        self.assertEqual(self.graph.metrics(), {**self.graph.metrics(), "nodes": 0, "pipelines": 0})
+
+    async def test_nodes_evaluate_only_when_inputs_change(self):
+        a, b = self.graph.compile(_bot("a")), self.graph.compile(_bot("b"))
+        await self._at(20, [a, b])
+        fired = self.graph.metrics()
+        # 같은 분 안의 추가 틱: 조회/계산 없음, ON_CANDLE_CLOSE라 발화도 없음
+        for second in (10, 30, 55):
+            self.assertEqual(await self._at(20, [a, b], second=second), [False, False])
+        self.assertEqual(self.graph.metrics(), fired)
+
+        # 다음 봉 마감 후 조회 1회, 지표는 새 봉 하나만 반영
+        await self._at(21, [a, b])
+        self.assertEqual(self.graph.metrics()["fetches"], fired["fetches"] + 1)
+        self.assertEqual(self.adapter.calls[-1][3], 20 * MIN)
+
+        ema = EMA(period=3)
+        for close in self.closes[:21]:
+            ema.update(close)
+        self.assertAlmostEqual(a.values()["fast"], ema.value)
+
+    async def test_trigger_matches_direct_evaluation(self):
+        a = self.graph.compile(_bot("a"))
+        fast, slow = EMA(period=3), EMA(period=8)
+        for minute in range(1, 40):
+            fired = (await self._at(minute, [a]))[0]
+            close = self.closes[minute - 1]
+            fast.update(close), slow.update(close)
+            bands = a.values()["bb"]
+            expected = fast.value > slow.value and bands is not None and close <= bands.upper
+            self.assertEqual(fired, expected, minute)
+
+    async def test_legacy_pipeline_has_no_nodes(self):
+        legacy = {"name": "grid", "global_settings": {"exchange": "k1", "symbol": "BTC/USDT"},
+                  "pipeline": {"data_source": {"frame": "1h"}, "triggers": {"schedule": "ALWAYS"},
+                               "strategy": {"id": "grid_v1"}}}
+        compiled = self.graph.compile(legacy)
+        self.assertTrue(compiled.trivial)
+        self.assertTrue(await compiled.should_run(self.adapter, 0.0))
+        self.assertEqual(self.adapter.calls, [])
+
+    def test_invalid_pipelines_rejected(self):
+        def bad(mutate):
+            config = _bot("x")
+            mutate(config["pipeline"])
+            return config
+
+        cases = [
+            lambda p: p["indicators"].append({"id": "m", "type": "MACD"}),
+            lambda p: p["indicators"].append({"id": "fast", "type": "EMA", "params": {"period": 5}}),
+            lambda p: p["indicators"].append({"id": "e", "type": "EMA", "params": {}}),
+            lambda p: p["triggers"]["conditions"].append({"left": "nope", "op": ">", "right": 1}),
+            lambda p: p["triggers"]["conditions"].append({"left": "fast", "op": "~", "right": 1}),
+            lambda p: p["triggers"]["conditions"].append({"left": "fast.upper", "op": ">", "right": 1}),
+            lambda p: p["data_source"].update(frame="3m"),
+            lambda p: p["triggers"].update(schedule="HOURLY"),
+        ]
+        for mutate in cases:
+            with self.assertRaises(ValueError):
+                self.graph.compile(bad(mutate))
+        self.assertEqual(self.graph.metrics()["nodes"], 0)  # 실패한 컴파일은 노드를 남기지 않음
+
+
+if __name__ == '__main__':
+    unittest.main()
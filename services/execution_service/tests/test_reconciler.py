@@ -0,0 +1,112 @@
+import unittest
+from unittest.mock import AsyncMock
+import sys
+import os
+
+# reconciler.py는 서비스 디렉토리 기준의 flat import를 사용하므로 sys.path에 추가합니다.
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from clock import VirtualClock
+from reconciler import OrderReconciler
+
+# 2024-01-01T00:10:00 UTC
+NOW = 1704067800.0
+
+
+def _order(oid, status, exchange_order_id=None, ts="2024-01-01T00:00:00", symbol="BTC/USDT"):
+    return {"id": oid, "bot_id": "bot-1", "symbol": symbol, "side": "BUY", "quantity": 1.0,
+            "status": status, "exchange_order_id": exchange_order_id, "timestamp": ts}
+
+
+class TestOrderReconciler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.bot_client = AsyncMock()
+        self.bot_client.get_bot.return_value = {"global_settings": {"exchange": "key-1"}}
+        self.bot_client.record_execution.return_value = True
+        self.adapter_client = AsyncMock()
+        self.balance_book = AsyncMock()
+        self.reconciler = OrderReconciler(
+            self.bot_client, self.adapter_client, balance_book=self.balance_book,
+            clock=VirtualClock(start=NOW), pending_expiry_sec=3600,
+        )
+
+    async def test_late_fill_committed_with_one_query_per_group(self):
+        self.bot_client.get_unresolved_orders.return_value = [
+            _order("lo-1", "SENT", "11"),
+            _order("lo-2", "SENT", "12"),
+        ]
+        self.adapter_client.get_account_orders.return_value = {
+            "orders": [
+                {"id": "11", "client_order_id": None, "status": "closed"},
+                {"id": "12", "client_order_id": None, "status": "open"},
+            ],
+            "trades": [
+                {"id": "t1", "order_id": "11", "timestamp": 1704067300000, "side": "buy",
+                 "price": 100.0, "amount": 0.4, "cost": 40.0, "fee": 0.0, "fee_asset": "USDT"},
+                {"id": "t2", "order_id": "11", "timestamp": 1704067301000, "side": "buy",
+                 "price": 101.0, "amount": 0.6, "cost": 60.6, "fee": 0.0, "fee_asset": "USDT"},
+            ],
+        }
+
+        await self.reconciler.run_once()
+
+        self.adapter_client.get_account_orders.assert_awaited_once()
+        self.assertEqual(self.bot_client.record_execution.await_count, 2)
+        self.bot_client.update_order_status.assert_awaited_once_with("lo-1", "FILLED", exchange_order_id="11")
+        self.balance_book.reconcile.assert_awaited_once_with("key-1")
+
+        metrics = self.reconciler.metrics()
+        self.assertEqual(metrics["backlog"], 1)
+        self.assertEqual(metrics["resolved_total"], 1)
+        self.assertEqual(metrics["fills_committed_total"], 2)
+        self.assertEqual(metrics["last_resolution_latency_sec"], 600.0)
+
+    async def test_pending_orders(self):
+        self.bot_client.get_unresolved_orders.return_value = [
+            _order("fresh", "PENDING", ts="2024-01-01T00:09:50"),   # 유예 시간 내 -> 건드리지 않음
+            _order("by-client-id", "PENDING"),
+            _order("stale", "PENDING", ts="2023-12-31T22:00:00"),   # 만료 -> FAILED
+        ]
+        self.adapter_client.get_account_orders.return_value = {
+            "orders": [{"id": "21", "client_order_id": "by-client-id", "status": "open"}],
+            "trades": [],
+        }
+
+        await self.reconciler.run_once()
+
+        calls = {c.args[0]: c for c in self.bot_client.update_order_status.await_args_list}
+        self.assertNotIn("fresh", calls)
+        self.assertEqual(calls["by-client-id"].args[1], "SENT")
+        self.assertEqual(calls["by-client-id"].kwargs["exchange_order_id"], "21")
+        self.assertEqual(calls["stale"].args[1], "FAILED")
+        self.assertEqual(self.reconciler.metrics()["backlog"], 2)
+
+    async def test_pages_past_full_page_until_order_found(self):
+        self.bot_client.get_unresolved_orders.return_value = [_order("lo-1", "SENT", "900")]
+        fill = {"id": "t9", "order_id": "900", "timestamp": 1704067500000, "side": "buy",
+                "price": 100.0, "amount": 1.0, "cost": 100.0, "fee": 0.0, "fee_asset": "USDT"}
+        first_page = {
+            "orders": [{"id": str(i), "client_order_id": None, "status": "closed"} for i in range(500)],
+            "trades": [],
+            "next_since": 1704067400000,
+        }
+        second_page = {
+            "orders": [{"id": "900", "client_order_id": None, "status": "closed"}],
+            "trades": [fill],
+            "next_since": 1704067500000,
+        }
+        self.adapter_client.get_account_orders.side_effect = [first_page, second_page]
+
+        await self.reconciler.run_once()
+
+        # 그룹 주문을 찾으면 next_since가 남아 있어도 더 조회하지 않습니다.
+        self.assertEqual(self.adapter_client.get_account_orders.await_count, 2)
+        self.assertEqual(self.adapter_client.get_account_orders.await_args_list[1].kwargs["since"], 1704067400000)
+        self.bot_client.record_execution.assert_awaited_once()
+        self.bot_client.update_order_status.assert_awaited_once_with("lo-1", "FILLED", exchange_order_id="900")
+
+
+if __name__ == '__main__':
+    unittest.main()
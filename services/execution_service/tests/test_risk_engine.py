@@ -0,0 +1,180 @@
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from balance_book import BalanceBook
+from ledger_adapter import LedgerAwareAdapter
+from risk_engine import RiskEngine, RiskLimits
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class TestRiskEngine(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.risk = RiskEngine(RiskLimits(max_order_notional=1_000.0, max_position_notional=1_500.0), clock=self.clock)
+        self.risk.mark_price("k1", "BTC/USDT", 100.0)
+
+    def test_notional_and_position_limits(self):
+        self.assertTrue(self.risk.check("k1", "BTC/USDT", "buy", 9.0).allowed)
+        self.assertEqual(self.risk.check("k1", "BTC/USDT", "buy", 11.0).rule, "order_notional")
+        self.assertEqual(self.risk.check("k1", "BTC/USDT", "buy", 5.0, price=300.0).rule, "order_notional")
+
+        self.risk.on_fill("k1", "BTC/USDT", "BUY", 9.0, 100.0)
+        self.assertEqual(self.risk.check("k1", "BTC/USDT", "buy", 7.0).rule, "position_notional")
+        self.assertTrue(self.risk.check("k1", "BTC/USDT", "buy", 5.0).allowed)
+        self.assertEqual(self.risk.check("k2", "BTC/USDT", "buy", 1.0).rule, "no_price")  # 가격 모름
+
+    def test_kill_switch_blocks_new_exposure_but_allows_exit(self):
+        self.risk.on_fill("k1", "BTC/USDT", "BUY", 2.0, 100.0)
+        self.risk.engage_kill_switch("drawdown")
+        self.assertEqual(self.risk.check("k1", "BTC/USDT", "buy", 1.0).rule, "kill_switch")
+        self.assertEqual(self.risk.check("k1", "BTC/USDT", "sell", 3.0).rule, "kill_switch")  # 반대 포지션 진입
+        self.assertTrue(self.risk.check("k1", "BTC/USDT", "sell", 2.0).allowed)  # 청산
+        self.risk.release_kill_switch()
+        self.assertTrue(self.risk.check("k1", "BTC/USDT", "buy", 1.0).allowed)
+
+    def test_daily_loss_from_fills_resets_next_day(self):
+        self.risk.set_limits("k1", max_daily_loss=50.0)
+        self.risk.on_fill("k1", "BTC/USDT", "BUY", 2.0, 100.0, trade_id="t1")
+        self.risk.on_fill("k1", "BTC/USDT", "SELL", 1.0, 60.0, fee=1.0, fee_asset="USDT", trade_id="t2")
+        self.risk.on_fill("k1", "BTC/USDT", "SELL", 1.0, 60.0, fee=1.0, fee_asset="USDT", trade_id="t2")  # 중복
+        self.assertAlmostEqual(self.risk.daily_pnl("k1"), -41.0)
+        self.assertAlmostEqual(self.risk.position("k1", "BTC/USDT"), 1.0)
+        self.assertTrue(self.risk.check("k1", "BTC/USDT", "buy", 1.0).allowed)
+
+        self.risk.on_fill("k1", "BTC/USDT", "SELL", 1.0, 90.0, trade_id="t3")
+        self.assertEqual(self.risk.check("k1", "BTC/USDT", "buy", 1.0).rule, "daily_loss")
+        self.assertTrue(self.risk.check("k2", "BTC/USDT", "buy", 1.0, price=100.0).allowed)  # 다른 키
+
+        self.clock.now += 86_400
+        self.assertTrue(self.risk.check("k1", "BTC/USDT", "buy", 1.0).allowed)
+
+    def test_spot_position_floors_at_zero(self):
+        # 추적 이전 보유분 1 BTC 매도: 포지션은 -1이 아니라 0, 원가를 모르므로 손익 없음
+        risk = RiskEngine(RiskLimits(max_position_notional=50.0), clock=self.clock)
+        risk.on_fill("k1", "BTC/USDT", "SELL", 1.0, 100.0, trade_id="t1")
+        self.assertEqual(risk.position("k1", "BTC/USDT"), 0.0)
+        self.assertEqual(risk.daily_pnl("k1"), 0.0)
+
+        risk.engage_kill_switch("drawdown")
+        self.assertEqual(risk.check("k1", "BTC/USDT", "buy", 1.0).rule, "kill_switch")  # 청산이 아님
+        risk.release_kill_switch()
+        self.assertEqual(risk.check("k1", "BTC/USDT", "buy", 1.0).rule, "position_notional")
+
+        risk.on_fill("k1", "BTC/USDT", "BUY", 0.4, 100.0, trade_id="t2")
+        risk.on_fill("k1", "BTC/USDT", "SELL", 1.0, 110.0, trade_id="t3")
+        self.assertEqual(risk.position("k1", "BTC/USDT"), 0.0)
+        self.assertAlmostEqual(risk.daily_pnl("k1"), 4.0)  # 추적된 0.4분만 실현
+
+    def test_open_orders_count_toward_position_limit(self):
+        self.assertTrue(self.risk.check("k1", "BTC/USDT", "buy", 9.0, order_ref="o1").allowed)
+        self.assertEqual(self.risk.check("k1", "BTC/USDT", "buy", 9.0, order_ref="o2").rule, "position_notional")
+        self.assertEqual(self.risk.open_exposure("k1", "BTC/USDT"), (9.0, 0.0))
+
+        self.risk.on_fill("k1", "BTC/USDT", "BUY", 4.0, 100.0, trade_id="t1", order_ref="o1")
+        self.assertEqual(self.risk.open_exposure("k1", "BTC/USDT"), (5.0, 0.0))
+        self.assertEqual(self.risk.check("k1", "BTC/USDT", "buy", 7.0).rule, "position_notional")  # 4 + 5 + 7
+
+        self.risk.release("o1")  # 잔량 취소
+        self.assertTrue(self.risk.check("k1", "BTC/USDT", "buy", 7.0).allowed)
+        self.assertEqual(self.risk.metrics()["open_orders"], 0)
+
+    def test_resting_sells_reduce_exit_room(self):
+        self.risk.on_fill("k1", "BTC/USDT", "BUY", 2.0, 100.0)
+        self.risk.engage_kill_switch("drawdown")
+        self.assertTrue(self.risk.check("k1", "BTC/USDT", "sell", 2.0, order_ref="s1").allowed)
+        self.assertEqual(self.risk.check("k1", "BTC/USDT", "sell", 2.0).rule, "kill_switch")  # 이미 매도 주문이 걸림
+
+    def test_order_rate_window(self):
+        self.risk.set_limits(max_orders_per_min=3)
+        for _ in range(3):
+            self.assertTrue(self.risk.check("k1", "BTC/USDT", "buy", 0.1).allowed)
+        self.assertEqual(self.risk.check("k1", "BTC/USDT", "buy", 0.1).rule, "order_rate")
+        self.clock.now += 61
+        self.assertTrue(self.risk.check("k1", "BTC/USDT", "buy", 0.1).allowed)
+        self.assertEqual(self.risk.metrics()["rejections_by_rule"], {"order_rate": 1})
+
+    def test_unknown_limit_rejected(self):
+        with self.assertRaises(ValueError):
+            self.risk.set_limits(max_leverage=3)
+
+
+class TestLedgerRiskGate(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.bot_client = AsyncMock()
+        self.bot_client.create_local_order.return_value = {"id": "lo-1", "status": "PENDING"}
+        self.raw = AsyncMock()
+        self.risk = RiskEngine(RiskLimits(max_order_notional=500.0), clock=FakeClock())
+        self.ledger = LedgerAwareAdapter(self.raw, self.bot_client, "bot-1", risk_engine=self.risk)
+
+    async def test_rejected_order_recorded_and_not_sent(self):
+        self.raw.get_ticker.return_value = {"price": 100.0}
+        await self.ledger.get_ticker("k", "BTC/USDT")  # 최근 가격 갱신
+        result = await self.ledger.place_order("k", "BTC/USDT", "buy", 10.0)
+
+        self.assertEqual(result["status"], "rejected")
+        self.raw.place_order.assert_not_awaited()
+        self.assertIn("RISK_REJECTED[order_notional]", self.bot_client.create_local_order.await_args.kwargs["reason"])
+        self.bot_client.update_order_status.assert_awaited_once_with("lo-1", "REJECTED")
+
+    async def test_fills_update_position_and_batch_is_filtered(self):
+        self.raw.place_order.return_value = {
+            "status": "filled", "id": "11",
+            "details": {"info": {"fills": [{"price": "100", "qty": "2", "tradeId": 5, "commission": "0"}]}},
+        }
+        await self.ledger.place_order("k", "BTC/USDT", "buy", 2.0, price=100.0)
+        self.assertEqual(self.risk.position("k", "BTC/USDT"), 2.0)
+
+        self.raw.place_orders.return_value = [{"status": "open", "order_id": "21"}]
+        results = await self.ledger.place_orders("k", "BTC/USDT", [
+            {"side": "buy", "amount": 10.0, "price": 100.0},
+            {"side": "buy", "amount": 1.0, "price": 100.0},
+        ])
+        self.assertEqual([r["status"] for r in results], ["rejected", "open"])
+        self.assertEqual(len(self.raw.place_orders.await_args.args[2]), 1)
+
+    async def test_batch_counts_earlier_orders_in_same_batch(self):
+        self.risk.set_limits(max_position_notional=250.0)
+        self.raw.place_orders.return_value = [{"status": "open", "order_id": "41"}, {"status": "open", "order_id": "42"}]
+        results = await self.ledger.place_orders("k", "BTC/USDT", [
+            {"side": "buy", "amount": 1.0, "price": 100.0},
+            {"side": "buy", "amount": 1.0, "price": 100.0},
+            {"side": "buy", "amount": 1.0, "price": 100.0},
+        ])
+        self.assertEqual([r["status"] for r in results], ["open", "open", "rejected"])
+        self.assertIn("position_notional", results[2]["reason"])
+        self.assertEqual(self.risk.open_exposure("k", "BTC/USDT"), (2.0, 0.0))  # 걸린 주문은 노출로 남음
+
+    async def test_exit_after_restart_with_kill_switch(self):
+        # 재시작 직후: 리스크 엔진에는 포지션이 없고 잔고 장부도 시딩 전. 키는 BTC 2개를 보유 중.
+        adapter_client = AsyncMock()
+        adapter_client.get_balance.return_value = {"assets": [{"asset": "BTC", "free": 2.0, "locked": 0.0}]}
+        risk = RiskEngine(RiskLimits(max_position_notional=100.0), clock=FakeClock(),
+                          balance_book=BalanceBook(adapter_client))
+        ledger = LedgerAwareAdapter(self.raw, self.bot_client, "bot-1", risk_engine=risk,
+                                    balance_book=risk.balance_book)
+        risk.engage_kill_switch("drawdown")
+        self.raw.place_order.return_value = {"status": "filled", "id": "31"}
+
+        self.assertEqual((await ledger.place_order("k", "BTC/USDT", "sell", 3.0, price=100.0))["status"], "rejected")
+        self.assertEqual((await ledger.place_order("k", "BTC/USDT", "buy", 1.0, price=100.0))["status"], "rejected")
+        result = await ledger.place_order("k", "BTC/USDT", "sell", 2.0, price=100.0)
+        self.assertEqual(result["status"], "filled")
+        self.raw.place_order.assert_awaited_once()
+        adapter_client.get_balance.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest.mock import AsyncMock
+
+# strategy_registry.py는 서비스 디렉토리 기준의 flat import를 사용하므로 sys.path에 추가합니다.
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from engine import BotRunner
+from strategy_registry import StrategyRegistry
+
+PLUGIN_TEMPLATE = """
+STRATEGY = {{"id": "demo_v1", "class": "DemoStrategy", "name": "Demo", "version": "{version}", "schema": {{}}}}
+
+
+class DemoStrategy:
+    VERSION = "{version}"
+
+    def __init__(self, config):
+        self.config = config
+"""
+
+
+class TestStrategyRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.package = f"plugins_{id(self)}"
+        self.plugin_dir = os.path.join(self.tmp.name, self.package)
+        os.mkdir(self.plugin_dir)
+        sys.path.insert(0, self.tmp.name)
+        self.mtime = 1_700_000_000
+
+    def tearDown(self):
+        sys.path.remove(self.tmp.name)
+        for name in [m for m in sys.modules if m.startswith(self.package)]:
+            del sys.modules[name]
+        self.tmp.cleanup()
+
+    def _write_plugin(self, version: str, filename: str = "demo.py"):
+        path = os.path.join(self.plugin_dir, filename)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(textwrap.dedent(PLUGIN_TEMPLATE.format(version=version)))
+        # 같은 초 안에 다시 써도 변경이 감지되도록 mtime을 직접 증가
+        self.mtime += 10
+        os.utime(path, (self.mtime, self.mtime))
+
+    def _registry(self):
+        return StrategyRegistry(self.plugin_dir, package=self.package, entry_point_group=None)
+
+    def test_discovers_metadata_without_importing(self):
+        self._write_plugin("1.0.0")
+        registry = self._registry()
+
+        self.assertNotIn(f"{self.package}.demo", sys.modules)
+        meta = registry.list_metadata()
+        self.assertEqual([(m["id"], m["version"], m["loaded"]) for m in meta], [("demo_v1", "1.0.0", False)])
+        self.assertNotIn("class", meta[0])
+
+        instance, entry = registry.create("demo_v1", {"name": "bot"})
+        self.assertEqual(instance.VERSION, "1.0.0")
+        self.assertTrue(registry.list_metadata()[0]["loaded"])
+        with self.assertRaises(KeyError):
+            registry.create("unknown", {})
+
+    def test_new_version_applies_to_new_bots_only(self):
+        self._write_plugin("1.0.0")
+        registry = self._registry()
+        running, _ = registry.create("demo_v1", {})
+
+        self._write_plugin("1.1.0")
+        self.assertEqual(registry.refresh(), [("demo_v1", "1.1.0")])
+        self.assertEqual(registry.refresh(), [])  # 변경 없으면 다시 읽지 않음
+
+        booted, entry = registry.create("demo_v1", {})
+        self.assertEqual((entry.version, booted.VERSION), ("1.1.0", "1.1.0"))
+        self.assertEqual(running.VERSION, "1.0.0")
+        # 이미 로드된 이전 버전은 고정(pin)한 봇을 위해 남아 있음
+        pinned, _ = registry.create("demo_v1", {}, version="1.0.0")
+        self.assertEqual(pinned.VERSION, "1.0.0")
+        self.assertEqual(registry.versions("demo_v1"), ["1.0.0", "1.1.0"])
+
+    def test_versions_sort_numerically(self):
+        self._write_plugin("1.9.0", "demo_a.py")
+        self._write_plugin("1.10.0", "demo_b.py")
+        registry = self._registry()
+
+        self.assertEqual(registry.resolve("demo_v1").version, "1.10.0")
+
+
+class TestRunnerStrategyResolution(unittest.TestCase):
+    def _runner(self, strategy_id, registry):
+        config = {"id": "bot-1", "name": "bot", "global_settings": {"exchange": "k", "symbol": "BTC/USDT"},
+                  "pipeline": {"strategy": {"id": strategy_id, "params": {}}}}
+        return BotRunner(config, AsyncMock(), AsyncMock(), strategy_registry=registry)
+
+    def test_builtin_strategies_are_registered(self):
+        registry = StrategyRegistry(entry_point_group=None)
+        ids = {m["id"] for m in registry.list_metadata()}
+        self.assertTrue({"test_trading_v1", "orderflow_exhaustion_v1"} <= ids)
+
+        runner = self._runner("orderflow_exhaustion_v1", registry)
+        runner._initialize_strategy()
+        self.assertEqual(type(runner.strategy_instance).__name__, "OrderflowExhaustionV1Strategy")
+        self.assertEqual(runner.strategy_version, "1.0.0")
+
+    def test_unknown_strategy_falls_back_to_default(self):
+        runner = self._runner("not_implemented_v1", StrategyRegistry(entry_point_group=None))
+        runner._initialize_strategy()
+        self.assertEqual(type(runner.strategy_instance).__name__, "TestTradingStrategy")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import AsyncMock
+import sys
+import os
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from clock import VirtualClock
+from trade_reconciler import TradeReconciler
+
+# 2024-01-03T00:00:00 UTC
+NOW = 1704240000.0
+DAY_MS = 86_400_000
+
+
+class CappedExchange:
+    """since부터 최대 24시간 구간만 반환하는 거래소 (Binance myTrades와 같은 제약)."""
+
+    def __init__(self, trades):
+        self.trades = trades
+        self.calls = []
+
+    async def get_account_trades(self, key_id, symbol, since=None, limit=1000):
+        self.calls.append(since)
+        page = [t for t in self.trades if since <= t["timestamp"] < since + DAY_MS][:limit]
+        return {"symbol": symbol, "trades": page, "next_since": page[-1]["timestamp"] if len(page) >= limit else None}
+
+
+def _trade(i, ts_ms):
+    return {"id": str(i), "order_id": f"ex-{i // 10}", "timestamp": ts_ms, "side": "buy",
+            "price": 100.0, "amount": 0.1, "cost": 10.0, "fee": 0.01, "fee_asset": "USDT"}
+
+
+class TestTradeReconciler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.bot_client = AsyncMock()
+        self.bot_client.get_bots.return_value = [
+            {"id": "bot-1", "global_settings": {"exchange": "key-1", "symbol": "BTC/USDT"}},
+            {"id": "bot-2", "global_settings": {"exchange": "key-1", "symbol": "BTC/USDT"}},
+            {"id": "bot-3", "global_settings": {}},  # 키/심볼 없는 봇은 제외
+        ]
+        self.bot_client.import_executions.side_effect = lambda fills, bot_ids: {
+            "received": len(fills), "duplicates": 1, "imported": len(fills) - 1, "unmatched": [], "rematched": 0,
+        }
+
+    async def test_pages_since_cursor_and_imports_once_per_group(self):
+        # 마지막 기록 체결: 2024-01-01T12:00:00 -> 그 이후 36시간 동안 체결 2500건 (같은 ms 체결 포함)
+        start_ms = int((NOW - 36 * 3600) * 1000)
+        trades = [_trade(i, start_ms + (i // 2) * 50_000) for i in range(2500)]
+        exchange = CappedExchange(trades)
+        self.bot_client.get_execution_cursor.return_value = {
+            "last_execution_at": "2024-01-01T12:01:00", "oldest_unresolved_at": None,
+        }
+        reconciler = TradeReconciler(self.bot_client, exchange, clock=VirtualClock(start=NOW), page_limit=1000)
+
+        report = await reconciler.run()
+
+        self.bot_client.get_execution_cursor.assert_awaited_once_with("BTC/USDT", ["bot-1", "bot-2"])
+        self.assertEqual(exchange.calls[0], start_ms)  # 마지막 체결 - overlap(60초)
+        [group] = report["groups"]
+        self.assertEqual(group["fetched"], 2500)  # 페이지 경계의 같은 시각 체결은 Trade ID로 중복 제거
+        self.assertEqual((report["imported"], report["duplicates"], report["errors"]), (2499, 1, 0))
+
+        self.bot_client.import_executions.assert_awaited_once()
+        fills, bot_ids = self.bot_client.import_executions.await_args.args
+        self.assertEqual(bot_ids, ["bot-1", "bot-2"])
+        self.assertEqual(fills[0]["timestamp"], "2024-01-01T12:00:00")
+        self.assertEqual((fills[0]["side"], fills[0]["exchange_order_id"]), ("BUY", "ex-0"))
+
+    async def test_lookback_is_capped_and_failures_reported(self):
+        self.bot_client.get_execution_cursor.return_value = {"last_execution_at": None, "oldest_unresolved_at": None}
+        adapter = AsyncMock()
+        adapter.get_account_trades.return_value = None
+        reconciler = TradeReconciler(self.bot_client, adapter, clock=VirtualClock(start=NOW), max_lookback_sec=3600)
+
+        report = await reconciler.run()
+
+        self.assertEqual(adapter.get_account_trades.await_args.kwargs["since"], int((NOW - 3600) * 1000))
+        self.assertEqual(report["groups"][0]["error"], "trade fetch failed")
+        self.assertEqual(report["errors"], 1)
+        self.bot_client.import_executions.assert_not_awaited()
+        self.assertEqual(reconciler.metrics()["errors"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from clock import RealClock
+
+logger = logging.getLogger("execution-service.trade-reconciler")
+
+
+def _epoch(ts: str) -> float:
+    """BotService 타임스탬프(naive UTC ISO) -> epoch 초."""
+    parsed = datetime.fromisoformat(ts)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class TradeReconciler:
+    """
+    부팅 시 거래소 내 체결과 원장(GlobalExecution)을 대사하여 빠진 체결을 일괄 기록합니다.
+
+    - 모든 봇을 설정의 (거래소 키, 심볼)로 묶고, 그룹마다 마지막 기록 체결(또는 더 오래된 미해결 주문) 이후의
+      내 체결을 GET /account/trades로 페이지 단위 조회합니다.
+    - 조회한 체결은 그룹당 POST /executions/import 1회로 보냅니다. BotService가 Trade ID로 비교하여
+      빠진 체결만 한 트랜잭션으로 기록하고 FIFO를 다시 매칭합니다 (재실행해도 안전).
+    - 주문 상태 확정은 OrderReconciler가 이어서 처리합니다.
+    """
+
+    def __init__(
+        self,
+        bot_client,
+        adapter_client,
+        clock=None,
+        page_limit: int = 1000,
+        window_sec: float = 86400.0,
+        max_lookback_sec: float = 7 * 86400.0,
+        overlap_sec: float = 60.0,
+        concurrency: int = 4,
+    ):
+        self.bot_client = bot_client
+        self.adapter_client = adapter_client
+        self.clock = clock or RealClock()
+        self.page_limit = page_limit
+        # 거래소가 since 이후 조회 구간을 제한할 수 있으므로(예: Binance 24시간) 이 단위로 구간을 넘깁니다.
+        self.window_sec = window_sec
+        self.max_lookback_sec = max_lookback_sec
+        self.overlap_sec = overlap_sec
+        self.concurrency = concurrency
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    async def run(self) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        bots = await self.bot_client.get_bots()
+        if bots is None:
+            logger.error("체결 대사 건너뜀: 봇 목록을 조회할 수 없습니다.")
+            return None
+
+        groups: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+        for bot in bots:
+            settings = bot.get("global_settings") or {}
+            if settings.get("exchange") and settings.get("symbol"):
+                groups[(settings["exchange"], settings["symbol"])].append(bot["id"])
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(
+            self._reconcile_group(key_id, symbol, bot_ids, semaphore)
+            for (key_id, symbol), bot_ids in groups.items()
+        ))
+
+        self.last_report = {
+            "finished_at": datetime.utcfromtimestamp(self.clock.time()).isoformat(),
+            "duration_sec": round(time.perf_counter() - started, 3),
+            "groups": results,
+            "fetched": sum(r["fetched"] for r in results),
+            "imported": sum(r["imported"] for r in results),
+            "duplicates": sum(r["duplicates"] for r in results),
+            "unmatched": sum(len(r["unmatched"]) for r in results),
+            "rematched": sum(r["rematched"] for r in results),
+            "errors": sum(1 for r in results if r["error"]),
+        }
+        summary = {k: v for k, v in self.last_report.items() if k != "groups"}
+        if self.last_report["imported"] or self.last_report["errors"]:
+            logger.warning(f"체결 대사: 원장에 없던 체결을 기록했습니다 {summary}")
+        else:
+            logger.info(f"체결 대사 완료: 원장과 거래소 일치 {summary}")
+        return self.last_report
+
+    async def _reconcile_group(self, key_id: str, symbol: str, bot_ids: List[str], semaphore) -> Dict[str, Any]:
+        result = {
+            "key_id": key_id, "symbol": symbol, "bots": len(bot_ids), "since": None, "pages": 0,
+            "fetched": 0, "imported": 0, "duplicates": 0, "unmatched": [], "rematched": 0, "error": None,
+        }
+        async with semaphore:
+            cursor = await self.bot_client.get_execution_cursor(symbol, bot_ids)
+            if cursor is None:
+                result["error"] = "cursor unavailable"
+                return result
+            since_ms = self._since_ms(cursor)
+            result["since"] = since_ms
+
+            trades = await self._fetch_trades(key_id, symbol, since_ms, result)
+            if trades is None:
+                result["error"] = "trade fetch failed"
+                return result
+            result["fetched"] = len(trades)
+            if not trades:
+                return result
+
+            report = await self.bot_client.import_executions([self._fill(symbol, t) for t in trades], bot_ids)
+            if report is None:
+                result["error"] = "import failed"
+                return result
+        result.update(
+            imported=report.get("imported", 0), duplicates=report.get("duplicates", 0),
+            unmatched=report.get("unmatched", []), rematched=report.get("rematched", 0),
+        )
+        if result["unmatched"]:
+            logger.warning(f"체결 대사 ({key_id}/{symbol}): 봇 주문과 매칭되지 않는 체결 {len(result['unmatched'])}건 "
+                           f"(수동 매매 등): {result['unmatched'][:10]}")
+        return result
+
+    def _since_ms(self, cursor: Dict[str, Any]) -> int:
+        """마지막 기록 체결과 가장 오래된 미해결 주문 중 이른 시각 - overlap. 최대 max_lookback_sec까지."""
+        now = self.clock.time()
+        marks = [_epoch(ts) for ts in (cursor.get("last_execution_at"), cursor.get("oldest_unresolved_at")) if ts]
+        start = min(marks) - self.overlap_sec if marks else now - self.max_lookback_sec
+        return int(max(start, now - self.max_lookback_sec) * 1000)
+
+    async def _fetch_trades(self, key_id: str, symbol: str, since_ms: int,
+                            result: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """since 이후 내 체결을 페이지 단위로 모두 가져옵니다 (Trade ID로 중복 제거, 오래된 순)."""
+        now_ms = int(self.clock.time() * 1000)
+        window_ms = int(self.window_sec * 1000)
+        trades: Dict[str, Dict[str, Any]] = {}
+        cursor = since_ms
+        while cursor <= now_ms:
+            page = await self.adapter_client.get_account_trades(key_id, symbol, since=cursor, limit=self.page_limit)
+            if page is None:
+                return None
+            result["pages"] += 1
+            for trade in page.get("trades", []):
+                trades.setdefault(str(trade["id"]), trade)
+            next_since = page.get("next_since")
+            if next_since is not None:
+                # 페이지가 가득 참: 마지막 체결 시각부터 이어서 (같은 시각의 체결만으로 가득 찼다면 1ms 전진)
+                cursor = next_since if next_since > cursor else cursor + 1
+            else:
+                cursor += window_ms
+        return sorted(trades.values(), key=lambda t: (t.get("timestamp") or 0, t["id"]))
+
+    def _fill(self, symbol: str, trade: Dict[str, Any]) -> Dict[str, Any]:
+        """어댑터 표준 체결 포맷 -> BotService ExecutionImportFill."""
+        price = float(trade.get("price") or 0.0)
+        qty = float(trade.get("amount") or 0.0)
+        ts = trade.get("timestamp")
+        return {
+            "exchange_trade_id": str(trade["id"]),
+            "exchange_order_id": str(trade.get("order_id")),
+            "client_order_id": trade.get("client_order_id"),
+            "symbol": symbol,
+            "side": (trade.get("side") or "").upper(),
+            "price": price,
+            "quantity": qty,
+            "quote_qty": float(trade.get("cost") or price * qty),
+            "fee": float(trade.get("fee") or 0.0),
+            "fee_asset": trade.get("fee_asset"),
+            "timestamp": datetime.utcfromtimestamp((ts / 1000) if ts else self.clock.time()).isoformat(),
+        }
+
+    def metrics(self) -> Optional[Dict[str, Any]]:
+        if self.last_report is None:
+            return None
+        return {k: v for k, v in self.last_report.items() if k != "groups"}
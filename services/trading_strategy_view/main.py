@@ -1,17 +1,30 @@
+import logging
+import os
+import time
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import httpx
+
+logger = logging.getLogger("trading-strategy-view")
 
 app = FastAPI(title="TradingStrategyViewService", version="1.0.0")
 
+# ExecutionService 전략 레지스트리 (실제 실행 가능한 전략의 메타데이터 SSOT)
+EXECUTION_SERVICE_URL = os.getenv("EXECUTION_SERVICE_URL", "http://execution-service:8000")
+REGISTRY_CACHE_TTL_SEC = float(os.getenv("STRATEGY_REGISTRY_CACHE_TTL_SEC", "30"))
+
 class StrategyDefinition(BaseModel):
     id: str
     name: str
     description: str
     version: str
     schema: Dict[str, Any]  # Field name matches JSON key exactly (No aliases)
+    versions: List[str] = []  # ExecutionService에 등록된 모든 버전 (오름차순)
+    available: bool = False   # ExecutionService에서 실행 가능한 전략인지 여부
 
-# 인메모리 전략 정의 (Mock 데이터)
+# 정적 전략 카탈로그. ExecutionService 레지스트리를 조회할 수 없을 때의 대체값이자,
+# 아직 구현되지 않은 전략의 소개용 정의입니다. 레지스트리에 있는 전략은 레지스트리 값이 우선합니다.
 STRATEGIES = [
     {
         "id": "grid_v1",
@@ -67,6 +80,7 @@ STRATEGIES = [
             "type": "object",
             "properties": {
                 "depth_limit": {"type": "integer", "minimum": 5, "maximum": 200, "default": 50, "title": "오더북 Depth Limit"},
+                "depth_mode": {"type": "string", "enum": ["top", "full"], "default": "top", "title": "오더북 조회 모드 (top=최우선 호가만)"},
                 "trades_limit": {"type": "integer", "minimum": 20, "maximum": 1000, "default": 200, "title": "최근 체결 조회 개수"},
                 "trades_lookback_sec": {"type": "integer", "minimum": 3, "maximum": 60, "default": 10, "title": "체결 집계 구간(초)"},
 
@@ -95,14 +109,58 @@ STRATEGIES = [
     }
 ]
 
+_registry_cache: Dict[str, Any] = {"fetched_at": 0.0, "entries": None}
+
+async def _fetch_registry() -> Optional[List[Dict[str, Any]]]:
+    """ExecutionService의 GET /strategies 결과를 TTL 동안 캐시합니다. 실패 시 None."""
+    now = time.monotonic()
+    if _registry_cache["entries"] is not None and now - _registry_cache["fetched_at"] < REGISTRY_CACHE_TTL_SEC:
+        return _registry_cache["entries"]
+    try:
+        async with httpx.AsyncClient(timeout=2.0) as client:
+            resp = await client.get(f"{EXECUTION_SERVICE_URL}/strategies")
+            resp.raise_for_status()
+            entries = resp.json()
+    except Exception as e:
+        logger.warning(f"전략 레지스트리 조회 실패, 정적 카탈로그 사용: {e}")
+        return None
+    _registry_cache.update(fetched_at=now, entries=entries)
+    return entries
+
+def _merge(registry: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """정적 카탈로그 + 레지스트리 (전략별 최신 버전). 레지스트리에만 있는 전략은 뒤에 추가됩니다."""
+    latest: Dict[str, Dict[str, Any]] = {}
+    versions: Dict[str, List[str]] = {}
+    for entry in registry or []:  # 레지스트리는 (id, version) 오름차순
+        latest[entry["id"]] = entry
+        versions.setdefault(entry["id"], []).append(entry["version"])
+
+    merged = []
+    for static in STRATEGIES:
+        entry = latest.pop(static["id"], None)
+        merged.append(_definition(static, entry, versions.get(static["id"], [])))
+    for strategy_id, entry in latest.items():
+        merged.append(_definition({}, entry, versions[strategy_id]))
+    return merged
+
+def _definition(static: Dict[str, Any], entry: Optional[Dict[str, Any]], versions: List[str]) -> Dict[str, Any]:
+    definition = {**static, "versions": versions, "available": entry is not None}
+    if entry is not None:
+        for key in ("id", "name", "description", "version", "schema"):
+            if key in entry:
+                definition[key] = entry[key]
+        definition.setdefault("name", entry["id"])
+        definition.setdefault("description", "")
+        definition.setdefault("schema", {"type": "object", "properties": {}})
+    return definition
+
 @app.get("/strategies", response_model=List[StrategyDefinition])
-def get_strategies():
-    # Transform keys if necessary, here we just return the list
-    return STRATEGIES
+async def get_strategies():
+    return _merge(await _fetch_registry())
 
 @app.get("/strategies/{strategy_id}", response_model=StrategyDefinition)
-def get_strategy(strategy_id: str):
-    for s in STRATEGIES:
+async def get_strategy(strategy_id: str):
+    for s in _merge(await _fetch_registry()):
         if s["id"] == strategy_id:
             return s
     raise HTTPException(status_code=404, detail="Strategy not found")